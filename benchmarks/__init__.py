@@ -0,0 +1,9 @@
+"""
+End-to-end benchmarks of the workflow executor.
+
+`python -m benchmarks.run` starts local stand-ins for the external systems (a fake
+Airflow REST API, an HTTP echo server and an SFTP server; SQL queries run against a
+scratch SQLite database), generates synthetic workflows, runs them through the real
+executor and reports runs per minute, node-start latency, DB writes per run and peak
+RSS as JSON. Pass --baseline to compare against an earlier result.
+"""
@@ -0,0 +1,406 @@
+"""
+Soak scenarios for the Airflow integration against the fake Airflow server.
+
+    python -m benchmarks.airflow_soak --runs 1000 --dags 50 --out soak.json
+    python -m benchmarks.airflow_soak --scenarios client --error-rate 0.02 --latency 0.02
+
+Each scenario starts a fresh fake server whose virtual clock runs --clock-speed times
+faster than real time, keeps --runs DAG runs in flight at once and reports JSON:
+
+  client         AirflowAPI: trigger every run, poll them all until terminal, then
+                 collect task instances, logs and XComs per run
+  async_client   the same with AsyncAirflowAPI on one event loop (--concurrency caps
+                 the calls in flight)
+  trigger_nodes  airflow_trigger nodes (waitForCompletion) through the node pool: pool
+                 wait, node duration, polls per run and how late completion is noticed
+  preflight      the executor's pre-run wait for running DAGs, one caller per run,
+                 sharing the DAG state cache
+  routes         /api/airflow/batch, /api/airflow/execute and the MCP airflow_check
+                 tool through the Flask test client
+
+Latencies are in milliseconds; `errors` counts failed calls by HTTP status.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .fake_airflow import FakeAirflow, VirtualClock, FaultRule
+from .run import prepare_environment, percentiles, peak_rss_mb, report
+
+SCENARIOS = ('client', 'async_client', 'trigger_nodes', 'preflight', 'routes')
+
+SOAK_METRICS = {
+    'requestsPerSecond': 'higher',
+    'latencyMs.p50': 'lower',
+    'latencyMs.p95': 'lower',
+    'completionLagMs.p95': 'lower',
+    'requestsPerRun': 'lower',
+    'errorRate': 'lower',
+    'peakRssMb': 'lower',
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.airflow_soak', description='Airflow integration soak tests')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument('--runs', type=int, default=1000, help='DAG runs in flight per scenario')
+    parser.add_argument('--dags', type=int, default=50, help='DAGs the runs are spread over')
+    parser.add_argument('--tasks', type=int, default=3, help='tasks per DAG')
+    parser.add_argument('--task-duration', type=float, default=60.0, help='virtual seconds per task')
+    parser.add_argument('--clock-speed', type=float, default=60.0, help='virtual seconds per real second')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='chance that a task fails')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra seconds per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 503')
+    parser.add_argument('--concurrency', type=int, default=64, help='client threads (client, routes)')
+    parser.add_argument('--batch-size', type=int, default=100, help='operations per /api/airflow/batch call')
+    parser.add_argument('--airflow-poll-interval', type=float, default=0.5, help='AIRFLOW_POLL_INTERVAL for nodes and preflight')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write the JSON result here (default: stdout)')
+    parser.add_argument('--baseline', help='earlier result to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='relative change counted as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 on a regression')
+    parser.add_argument('--workdir', help='scratch directory (default: a temporary one, removed afterwards)')
+    return parser.parse_args(argv)
+
+class Recorder:
+    """Thread-safe latency samples and error counts per operation."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.error_samples = []
+        self.calls = 0
+
+    def record(self, operation, started, result):
+        elapsed = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.calls += 1
+            self.latencies.setdefault(operation, []).append(elapsed)
+            if not result.get('success'):
+                status = str(result.get('status_code') or 'error')
+                self.errors[status] = self.errors.get(status, 0) + 1
+                if len(self.error_samples) < 5:
+                    self.error_samples.append(f"{operation}: {result.get('error')}")
+
+    def call(self, operation, func, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        self.record(operation, started, result)
+        return result
+
+    def summary(self, wall):
+        every = [v for values in self.latencies.values() for v in values]
+        return {
+            'calls': self.calls,
+            'wallSeconds': round(wall, 3),
+            'requestsPerSecond': round(self.calls / wall, 1) if wall else None,
+            'latencyMs': percentiles(every, 50, 95, 99),
+            'latencyMsByOperation': {op: percentiles(values, 50, 95) for op, values in sorted(self.latencies.items())},
+            'errors': self.errors,
+            'errorSamples': self.error_samples,
+            'errorRate': round(sum(self.errors.values()) / self.calls, 4) if self.calls else 0,
+        }
+
+class Soak:
+    """One fake server plus a credential pointing at it, for a single scenario."""
+
+    def __init__(self, args, storage):
+        self.args = args
+        self.clock = VirtualClock(args.clock_speed)
+        faults = [FaultRule(status=503, rate=args.error_rate)] if args.error_rate else []
+        self.airflow = FakeAirflow(clock=self.clock, latency=args.latency, jitter=args.jitter, faults=faults, seed=args.seed,
+                                   tasks_per_dag=args.tasks, task_duration=args.task_duration, failure_rate=args.failure_rate).start()
+        self.dag_ids = [f"soak_dag_{i}" for i in range(args.dags)]
+        for dag_id in self.dag_ids:
+            self.airflow.add_dag(dag_id)
+        self.credential = storage.create_credential({'name': f"soak {self.airflow.url}", 'type': 'airflow',
+                                                     'data': {'baseUrl': self.airflow.url, 'username': 'soak', 'password': 'soak'}})
+        self.workflow_id = storage.create_workflow({'name': 'soak', 'nodes': [], 'edges': []})['id']
+        self.peak_active = 0
+        self._sampling = threading.Event()
+
+    def dag_for(self, index):
+        return self.dag_ids[index % len(self.dag_ids)]
+
+    def active_runs(self):
+        with self.airflow.lock:
+            count = 0
+            for runs in self.airflow.runs.values():
+                for run in runs.values():
+                    self.airflow.settle(run)
+                    count += run['state'] in ('queued', 'running')
+            return count
+
+    def sample_active(self):
+        """Track the peak number of unfinished runs in the background until stop()."""
+        def sample():
+            while not self._sampling.wait(0.25):
+                self.peak_active = max(self.peak_active, self.active_runs())
+        threading.Thread(target=sample, name='soak-sampler', daemon=True).start()
+
+    def server_summary(self, runs):
+        stats = self.airflow.stats
+        return {'serverRequests': stats['requests'], 'requestsPerRun': round(stats['requests'] / runs, 2) if runs else None,
+                'injectedFaults': stats['faults'], 'maxInFlightRequests': stats['maxInFlight'], 'peakActiveRuns': self.peak_active}
+
+    def stop(self):
+        self._sampling.set()
+        self.airflow.stop()
+
+def scenario_client(soak, args, storage):
+    from server_py.airflow_api import AirflowAPI
+    api = AirflowAPI(soak.airflow.url, 'soak', 'soak', credential_id=soak.credential['id'])
+    recorder = Recorder()
+    soak.sample_active()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix='soak-client') as pool:
+        triggered = list(pool.map(lambda i: recorder.call('trigger_dag', api.trigger_dag, soak.dag_for(i), conf={'run': i}), range(args.runs)))
+        pending = [(r['data']['dag_id'], r['data']['dag_run_id']) for r in triggered if r.get('success')]
+        finished, rounds = [], 0
+        while pending:
+            rounds += 1
+            states = list(pool.map(lambda run: recorder.call('get_dag_run', api.get_dag_run, *run), pending))
+            finished.extend(run for run, r in zip(pending, states) if r.get('success') and r['data']['state'] in ('success', 'failed'))
+            pending = [run for run, r in zip(pending, states) if not (r.get('success') and r['data']['state'] in ('success', 'failed'))]
+            if pending:
+                time.sleep(args.airflow_poll_interval)
+
+        def collect(run):
+            instances = recorder.call('list_task_instances', api.list_task_instances, *run)
+            for ti in (instances.get('data') or {}).get('task_instances', []):
+                recorder.call('get_task_logs', api.get_task_logs, *run, ti['task_id'], max(ti['try_number'], 1))
+                if ti['state'] == 'success':
+                    recorder.call('get_xcom', api.get_xcom, *run, ti['task_id'], 'return_value')
+        list(pool.map(collect, finished))
+    return {**recorder.summary(time.perf_counter() - started), 'pollRounds': rounds, **soak.server_summary(args.runs)}
+
+def scenario_async_client(soak, args, storage):
+    import asyncio
+    from server_py.airflow_async import AsyncAirflowAPI
+    recorder = Recorder()
+    soak.sample_active()
+
+    async def soak_runs():
+        api = AsyncAirflowAPI(soak.airflow.url, 'soak', 'soak', credential_id=soak.credential['id'])
+        limit = asyncio.Semaphore(args.concurrency)
+
+        async def call(operation, method, *call_args, **kwargs):
+            async with limit:
+                started = time.perf_counter()
+                result = await method(*call_args, **kwargs)
+                recorder.record(operation, started, result)
+                return result
+
+        triggered = await asyncio.gather(*(call('trigger_dag', api.trigger_dag, soak.dag_for(i), conf={'run': i}) for i in range(args.runs)))
+        pending = [(r['data']['dag_id'], r['data']['dag_run_id']) for r in triggered if r.get('success')]
+        finished, rounds = [], 0
+        while pending:
+            rounds += 1
+            states = await asyncio.gather(*(call('get_dag_run', api.get_dag_run, *run) for run in pending))
+            done = [r.get('success') and r['data']['state'] in ('success', 'failed') for r in states]
+            finished.extend(run for run, is_done in zip(pending, done) if is_done)
+            pending = [run for run, is_done in zip(pending, done) if not is_done]
+            if pending:
+                await asyncio.sleep(args.airflow_poll_interval)
+
+        async def collect(run):
+            instances = await call('list_task_instances', api.list_task_instances, *run)
+            task_instances = (instances.get('data') or {}).get('task_instances', [])
+            await asyncio.gather(*(call('get_task_logs', api.get_task_logs, *run, ti['task_id'], max(ti['try_number'], 1)) for ti in task_instances))
+            await asyncio.gather(*(call('get_xcom', api.get_xcom, *run, ti['task_id'], 'return_value') for ti in task_instances if ti['state'] == 'success'))
+        await asyncio.gather(*(collect(run) for run in finished))
+        return rounds
+
+    started = time.perf_counter()
+    rounds = asyncio.run(soak_runs())
+    return {**recorder.summary(time.perf_counter() - started), 'pollRounds': rounds, **soak.server_summary(args.runs)}
+
+def scenario_trigger_nodes(soak, args, storage):
+    from server_py.nodes.registry import run_node, get_pool
+    from server_py.nodes.airflow_node import AirflowTriggerNode
+    recorder = Recorder()
+    queue_waits, durations, lags = [], [], []
+    lock = threading.Lock()
+    # One execution per node, as nodes of one execution never poll concurrently
+    execution_ids = [storage.create_execution(soak.workflow_id)['id'] for _ in range(args.runs)]
+
+    def run_one(index):
+        node = AirflowTriggerNode({'dagId': soak.dag_for(index), 'credentialId': soak.credential['id'], 'waitForCompletion': True},
+                                  {}, [], storage, execution_ids[index], node_id=f"trigger_{index}", workflow_nodes=[])
+        submitted = time.perf_counter()
+        execute = node.execute
+
+        def timed_execute():
+            with lock:
+                queue_waits.append((time.perf_counter() - submitted) * 1000)
+            return execute()
+        node.execute = timed_execute
+        result = recorder.call('trigger_node', lambda: {'success': True, **run_node(node)})
+        finished_real, finished_virtual = time.perf_counter(), soak.clock.now()
+        with lock:
+            durations.append((finished_real - submitted) * 1000)
+        if result.get('success'):
+            with soak.airflow.lock:
+                run = soak.airflow.runs[result['dagId']][result['dagRunId']]
+                soak.airflow.settle(run)
+                # Real milliseconds between the run finishing and the node noticing
+                lag = (finished_virtual - run['end']) / args.clock_speed * 1000 if run['end'] else None
+            if lag is not None:
+                with lock:
+                    lags.append(lag)
+
+    soak.sample_active()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.runs, thread_name_prefix='soak-caller') as callers:
+        list(callers.map(run_one, range(args.runs)))
+    wall = time.perf_counter() - started
+    return {
+        **recorder.summary(wall),
+        'nodePoolSize': get_pool('airflow')._max_workers,
+        'poolWaitMs': percentiles(queue_waits, 50, 95),
+        'nodeDurationMs': percentiles(durations, 50, 95),
+        'completionLagMs': percentiles(lags, 50, 95),
+        **soak.server_summary(args.runs),
+    }
+
+def scenario_preflight(soak, args, storage):
+    from server_py import executor
+    from server_py.nodes.airflow_node import get_airflow_connection
+    base_url, auth_headers = get_airflow_connection(storage, soak.credential['id'])
+    for index in range(args.runs):
+        soak.airflow.trigger(soak.dag_for(index))
+    last_end = {}
+    waits, lags = [], []
+    lock = threading.Lock()
+
+    execution_ids = [storage.create_execution(soak.workflow_id)['id'] for _ in range(args.runs)]
+
+    def wait_one(index):
+        dag_id = soak.dag_for(index)
+        execution_id = execution_ids[index]
+        started = time.perf_counter()
+        ready = executor.wait_for_dags_to_complete(
+            [{'dag_id': dag_id, 'base_url': base_url, 'auth_headers': auth_headers, 'credential_id': soak.credential['id']}],
+            [], execution_id, storage)
+        finished_virtual = soak.clock.now()
+        with lock:
+            waits.append((time.perf_counter() - started) * 1000)
+            if ready and dag_id in last_end:
+                lags.append((finished_virtual - last_end[dag_id]) / args.clock_speed * 1000)
+        return ready
+
+    with soak.airflow.lock:
+        for dag_id in soak.dag_ids:
+            runs = list(soak.airflow.runs[dag_id].values())
+            if runs:
+                # The run a preflight check waits on: the DAG's latest one
+                latest = runs[-1]
+                dag = soak.airflow.dags[dag_id]
+                last_end[dag_id] = latest['queued'] + dag['queue_delay'] + len(dag['task_ids']) * dag['task_duration']
+    soak.sample_active()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.runs, thread_name_prefix='soak-preflight') as callers:
+        ready = list(callers.map(wait_one, range(args.runs)))
+    wall = time.perf_counter() - started
+    polls = soak.airflow.stats['routes'].get('GET /dags/([^/]+)/dagRuns', 0)
+    return {
+        'callers': args.runs,
+        'wallSeconds': round(wall, 3),
+        'ready': sum(ready),
+        'latencyMs': percentiles(waits, 50, 95, 99),
+        'completionLagMs': percentiles(lags, 50, 95),
+        'statePolls': polls,
+        'statePollsPerCaller': round(polls / args.runs, 3) if args.runs else None,
+        **soak.server_summary(args.runs),
+    }
+
+def scenario_routes(soak, args, storage):
+    from server_py.main import create_app
+    app = create_app()
+    credential_id = soak.credential['id']
+    recorder = Recorder()
+
+    def post(operation, path, payload):
+        def call():
+            response = app.test_client().post(path, json=payload)
+            body = response.get_json(silent=True) or {}
+            ok = response.status_code < 400 and body.get('success', body.get('status') != 'error')
+            error = body.get('error') or body.get('message') or next(
+                (r.get('error') for r in body.get('results', []) if not r.get('success')), None)
+            return {'success': ok, 'status_code': response.status_code, 'data': body, 'error': error}
+        return recorder.call(operation, call)
+
+    soak.sample_active()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix='soak-routes') as pool:
+        triggered = list(pool.map(lambda i: post('execute trigger_dag', '/api/airflow/execute', {
+            'operation': 'trigger_dag', 'credentialId': credential_id, 'params': {'dag_id': soak.dag_for(i)}}), range(args.runs)))
+        runs = [(r['data']['result']['dag_id'], r['data']['result']['dag_run_id']) for r in triggered if r.get('success')]
+        batches = [runs[i:i + args.batch_size] for i in range(0, len(runs), args.batch_size)]
+        batch_results = list(pool.map(lambda batch: post('batch get_dag_run', '/api/airflow/batch', {
+            'credentialId': credential_id,
+            'operations': [{'operation': 'get_dag_run', 'params': {'dag_id': dag_id, 'dag_run_id': run_id}} for dag_id, run_id in batch]
+        }), batches))
+        list(pool.map(lambda dag_id: post('mcp list_dag_runs', '/api/mcp/airflow/check', {
+            'operation': 'list_dag_runs', 'credentialId': credential_id, 'dagId': dag_id, 'limit': 100}), soak.dag_ids))
+    wall = time.perf_counter() - started
+    batch_latencies = recorder.latencies.get('batch get_dag_run', [])
+    ops = sum(len(r['data'].get('results', [])) for r in batch_results)
+    return {
+        **recorder.summary(wall),
+        'batchOperations': ops,
+        'batchOpsPerSecond': round(ops / (sum(batch_latencies) / 1000), 1) if batch_latencies else None,
+        **soak.server_summary(args.runs),
+    }
+
+SCENARIO_FUNCTIONS = {
+    'client': scenario_client,
+    'async_client': scenario_async_client,
+    'trigger_nodes': scenario_trigger_nodes,
+    'preflight': scenario_preflight,
+    'routes': scenario_routes,
+}
+
+def main(argv=None):
+    args = parse_args(argv)
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out_path = os.path.abspath(args.out) if args.out else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    names = [name for name in args.scenarios.split(',') if name]
+    for name in names:
+        if name not in SCENARIO_FUNCTIONS:
+            raise SystemExit(f"Unknown scenario '{name}'")
+
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix='orchestrator-soak-')
+    cwd = os.getcwd()
+    prepare_environment(workdir, args)
+    sys.path.insert(0, repo_root)
+    results = {}
+    try:
+        from server_py.models import init_db
+        from server_py.storage import storage
+        init_db()
+        for name in names:
+            print(f"Soaking {name} ({args.runs} runs over {args.dags} DAGs)...", file=sys.stderr)
+            soak = Soak(args, storage)
+            try:
+                results[name] = {**SCENARIO_FUNCTIONS[name](soak, args, storage), 'peakRssMb': peak_rss_mb()}
+            finally:
+                soak.stop()
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report(results, args, repo_root, out_path, baseline_path, SOAK_METRICS)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,732 @@
+"""
+Stateful fake of the Airflow 2.x stable REST API (/api/v1), for benchmarks and soak tests.
+
+It models DAGs made of a chain of tasks, DAG runs, task instances (with try numbers),
+task logs and XComs, plus connections, pools, variables and event logs, covering the
+endpoints AirflowAPI wraps. Run and task state is derived from a VirtualClock: a
+triggered run is queued for `queue_delay` seconds, then its tasks run one after another
+for `task_duration` seconds each, failing with probability `failure_rate`. A clock with
+speed 60 turns a 10-minute DAG into 10 real seconds; speed 0 only moves on advance().
+
+Every request can be slowed (`latency` plus random `jitter`) and answered with injected
+errors: FaultRule(status=503, rate=0.05, path=r'/dagRuns$'). List endpoints paginate with
+limit/offset and cap limit at `page_limit` like Airflow's maximum_page_limit.
+
+Control endpoints, for driving a server in another process:
+  GET  /_fake/stats                       request counts by route and status
+  POST /_fake/clock   {"advance": s} or {"speed": x}
+  POST /_fake/faults  [{"status": 503, "rate": 0.1, "path": "..."}]
+  POST /_fake/dags    {"dag_id": ..., "tasks": n, "task_duration": s, ...}
+
+    python -m benchmarks.fake_airflow --port 8080 --dags 50 --clock-speed 60
+"""
+import re
+import json
+import time
+import random
+import argparse
+import itertools
+import threading
+from datetime import datetime, timezone
+from .standins import StandinServer, JSONRequestHandler
+
+TERMINAL_TASK_STATES = ('success', 'failed', 'skipped', 'upstream_failed', 'removed')
+
+class VirtualClock:
+    """Epoch seconds that advance `speed` times faster than real time, plus manual advance()."""
+
+    def __init__(self, speed=1.0, start=None):
+        self._lock = threading.Lock()
+        self._base = time.time() if start is None else start
+        self._real = time.monotonic()
+        self._speed = speed
+
+    def now(self):
+        with self._lock:
+            return self._base + (time.monotonic() - self._real) * self._speed
+
+    def advance(self, seconds):
+        with self._lock:
+            self._base += seconds
+
+    def set_speed(self, speed):
+        with self._lock:
+            now = time.monotonic()
+            self._base += (now - self._real) * self._speed
+            self._real = now
+            self._speed = speed
+
+def iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts is not None else None
+
+def parse_iso(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+class FaultRule:
+    """Answer matching requests with `status` (or delay them by `delay` seconds) at `rate`."""
+
+    def __init__(self, status=None, rate=1.0, path=None, method=None, delay=0.0, limit=None, retry_after=None):
+        self.status = status
+        self.rate = rate
+        self.path = re.compile(path) if path else None
+        self.method = method.upper() if method else None
+        self.delay = delay
+        self.remaining = limit
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{k: data[k] for k in ('status', 'rate', 'path', 'method', 'delay', 'limit', 'retry_after') if k in data})
+
+    def matches(self, method, path):
+        return (self.method is None or self.method == method) and (self.path is None or self.path.search(path))
+
+class ApiError(Exception):
+    def __init__(self, status, title, detail=None):
+        super().__init__(detail or title)
+        self.status = status
+        self.title = title
+        self.detail = detail or title
+
+class FakeAirflow(StandinServer):
+    def __init__(self, clock=None, latency=0.0, jitter=0.0, faults=(), page_limit=100, seed=0,
+                 auto_create_dags=True, tasks_per_dag=3, task_duration=0.0, queue_delay=0.0, failure_rate=0.0, port=0):
+        self.clock = clock or VirtualClock()
+        self.latency = latency
+        self.jitter = jitter
+        self.faults = list(faults)
+        self.page_limit = page_limit
+        self.auto_create_dags = auto_create_dags
+        self.defaults = {'tasks': tasks_per_dag, 'task_duration': task_duration, 'queue_delay': queue_delay, 'failure_rate': failure_rate}
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.dags = {}
+        self.runs = {}
+        self.connections = {}
+        self.pools = {'default_pool': {'name': 'default_pool', 'slots': 128, 'description': 'Default pool'}}
+        self.variables = {}
+        self.event_logs = []
+        self._event_ids = itertools.count(1)
+        self.stats = {'requests': 0, 'routes': {}, 'statuses': {}, 'faults': 0, 'inFlight': 0, 'maxInFlight': 0}
+        super().__init__(_AirflowHandler, port)
+
+    # --- model ---
+
+    def add_dag(self, dag_id, tasks=None, task_duration=None, queue_delay=None, failure_rate=None, is_paused=False, tags=()):
+        settings = {**self.defaults, **{k: v for k, v in (('tasks', tasks), ('task_duration', task_duration),
+                                                          ('queue_delay', queue_delay), ('failure_rate', failure_rate)) if v is not None}}
+        task_ids = settings['tasks'] if isinstance(settings['tasks'], list) else [f"task_{i + 1}" for i in range(settings['tasks'])]
+        with self.lock:
+            self.dags[dag_id] = {
+                'dag_id': dag_id,
+                'task_ids': task_ids,
+                'task_duration': settings['task_duration'],
+                'queue_delay': settings['queue_delay'],
+                'failure_rate': settings['failure_rate'],
+                'is_paused': is_paused,
+                'tags': list(tags),
+                'created': self.clock.now()
+            }
+            self.runs.setdefault(dag_id, {})
+        return self.dags[dag_id]
+
+    def get_dag(self, dag_id, create=False):
+        dag = self.dags.get(dag_id)
+        if dag is None and create and self.auto_create_dags:
+            dag = self.add_dag(dag_id)
+        if dag is None:
+            raise ApiError(404, 'DAG not found', f"DAG with dag_id: '{dag_id}' not found")
+        return dag
+
+    def get_run(self, dag_id, run_id):
+        self.get_dag(dag_id)
+        run = self.runs[dag_id].get(run_id)
+        if run is None:
+            raise ApiError(404, 'DAGRun not found', f"DAGRun with DAG ID: '{dag_id}' and DagRun ID: '{run_id}' not found")
+        self.settle(run)
+        return run
+
+    def get_ti(self, run, task_id):
+        ti = run['tis'].get(task_id)
+        if ti is None:
+            raise ApiError(404, 'Task instance not found', f"Task instance {task_id} not found in run {run['dag_run_id']}")
+        return ti
+
+    def log_event(self, event, dag_id=None, run_id=None, task_id=None):
+        self.event_logs.append({'event_log_id': next(self._event_ids), 'when': iso(self.clock.now()), 'event': event,
+                                'dag_id': dag_id, 'run_id': run_id, 'task_id': task_id, 'owner': 'admin', 'extra': None})
+
+    def _new_ti(self, dag, task_id):
+        return {'task_id': task_id, 'state': None, 'try_number': 0, 'start': None, 'end': None, 'queued': None,
+                'fails': self.random.random() < dag['failure_rate'], 'xcom': {}}
+
+    def trigger(self, dag_id, conf=None, dag_run_id=None, logical_date=None):
+        with self.lock:
+            dag = self.get_dag(dag_id, create=True)
+            now = self.clock.now()
+            logical = parse_iso(logical_date) if logical_date else now
+            run_id = dag_run_id or f"manual__{iso(logical)}"
+            while not dag_run_id and run_id in self.runs[dag_id]:
+                # Two triggers within the clock's resolution
+                logical += 0.000001
+                run_id = f"manual__{iso(logical)}"
+            if run_id in self.runs[dag_id]:
+                raise ApiError(409, 'Conflict', f"DAGRun with DAG ID: '{dag_id}' and DAGRun ID: '{run_id}' already exists")
+            run = {
+                'dag_id': dag_id, 'dag_run_id': run_id, 'conf': conf or {}, 'logical': logical, 'queued': now,
+                'start': None, 'end': None, 'state': 'queued', 'manual_state': False, 'note': None,
+                'tis': {task_id: self._new_ti(dag, task_id) for task_id in dag['task_ids']}
+            }
+            self.runs[dag_id][run_id] = run
+            self.log_event('trigger', dag_id, run_id)
+            return run
+
+    def settle(self, run, now=None):
+        """Advance a run and its task instances to the clock's current time."""
+        now = self.clock.now() if now is None else now
+        dag = self.dags[run['dag_id']]
+        if run['state'] == 'queued':
+            if dag['is_paused'] or now < run['queued'] + dag['queue_delay']:
+                return
+            run['state'] = 'running'
+            run['start'] = run['queued'] + dag['queue_delay']
+        if run['state'] != 'running':
+            return
+        cursor = run['start']
+        for task_id in dag['task_ids']:
+            ti = run['tis'][task_id]
+            if ti['state'] in TERMINAL_TASK_STATES:
+                if ti['state'] in ('failed', 'upstream_failed'):
+                    return self._finish(run, 'failed', ti['end'] or cursor)
+                cursor = max(cursor, ti['end'] or cursor)
+                continue
+            if ti['state'] is None:
+                if now < cursor:
+                    return
+                ti.update(state='running', start=cursor, queued=cursor, try_number=ti['try_number'] + 1)
+            if now < ti['start'] + dag['task_duration']:
+                return
+            ti['end'] = ti['start'] + dag['task_duration']
+            if ti['fails']:
+                ti['state'] = 'failed'
+                for later in dag['task_ids'][dag['task_ids'].index(task_id) + 1:]:
+                    if run['tis'][later]['state'] is None:
+                        run['tis'][later]['state'] = 'upstream_failed'
+                return self._finish(run, 'failed', ti['end'])
+            ti['state'] = 'success'
+            ti['xcom']['return_value'] = {'task_id': task_id, 'rows': self.random.randint(0, 10000), 'try_number': ti['try_number']}
+            cursor = ti['end']
+        self._finish(run, 'success', cursor)
+
+    def _finish(self, run, state, end):
+        run['state'] = state
+        run['end'] = end
+
+    def set_run_state(self, run, state):
+        if state == 'queued':
+            self.clear(run, None, False)
+            return
+        now = self.clock.now()
+        for ti in run['tis'].values():
+            if ti['state'] not in TERMINAL_TASK_STATES:
+                ti['state'] = 'success' if state == 'success' else ('failed' if ti['state'] == 'running' else 'skipped')
+                ti['end'] = now
+        run['state'] = state
+        run['start'] = run['start'] or now
+        run['end'] = now
+
+    def set_ti_state(self, run, ti, state):
+        now = self.clock.now()
+        ti['state'] = state
+        ti['start'] = ti['start'] or now
+        ti['end'] = now
+        if run['state'] in ('success', 'failed') and state == 'success' and all(
+                t['state'] in ('success', 'skipped') for t in run['tis'].values()):
+            run['state'] = 'success'
+
+    def clear(self, run, task_ids, only_failed, dry_run=False):
+        """Reset task instances (all, or `task_ids`) so they run again; the run is re-queued."""
+        dag = self.dags[run['dag_id']]
+        cleared = [ti for task_id, ti in run['tis'].items()
+                   if (not task_ids or task_id in task_ids) and (not only_failed or ti['state'] in ('failed', 'upstream_failed'))]
+        if dry_run:
+            return cleared
+        for ti in cleared:
+            ti.update(state=None, start=None, end=None, queued=None, fails=self.random.random() < dag['failure_rate'])
+        if cleared:
+            # Tasks downstream of a cleared failure were never run, so they run again too
+            for ti in run['tis'].values():
+                if ti['state'] == 'upstream_failed':
+                    ti['state'] = None
+            run.update(state='queued', queued=self.clock.now(), start=None, end=None)
+            self.log_event('clear', run['dag_id'], run['dag_run_id'])
+        return cleared
+
+    # --- serialisation ---
+
+    def dag_json(self, dag):
+        return {
+            'dag_id': dag['dag_id'], 'root_dag_id': None, 'is_paused': dag['is_paused'], 'is_active': True,
+            'is_subdag': False, 'last_parsed_time': iso(dag['created']), 'fileloc': f"/opt/airflow/dags/{dag['dag_id']}.py",
+            'file_token': dag['dag_id'], 'owners': ['airflow'], 'description': None, 'schedule_interval': None,
+            'timetable_description': 'Never, external triggers only', 'tags': [{'name': t} for t in dag['tags']],
+            'max_active_tasks': 16, 'max_active_runs': 16, 'has_task_concurrency_limits': False, 'has_import_errors': False
+        }
+
+    def run_json(self, run):
+        return {
+            'dag_id': run['dag_id'], 'dag_run_id': run['dag_run_id'], 'logical_date': iso(run['logical']),
+            'execution_date': iso(run['logical']), 'data_interval_start': iso(run['logical']), 'data_interval_end': iso(run['logical']),
+            'start_date': iso(run['start']), 'end_date': iso(run['end']), 'state': run['state'], 'run_type': 'manual',
+            'external_trigger': True, 'conf': run['conf'], 'last_scheduling_decision': iso(self.clock.now()), 'note': run['note']
+        }
+
+    def ti_json(self, run, ti):
+        duration = (ti['end'] - ti['start']) if ti['end'] is not None and ti['start'] is not None else None
+        return {
+            'task_id': ti['task_id'], 'dag_id': run['dag_id'], 'dag_run_id': run['dag_run_id'], 'execution_date': iso(run['logical']),
+            'start_date': iso(ti['start']), 'end_date': iso(ti['end']), 'duration': duration, 'state': ti['state'],
+            'try_number': ti['try_number'], 'map_index': -1, 'max_tries': ti['try_number'], 'hostname': 'fake-worker',
+            'unixname': 'airflow', 'pool': 'default_pool', 'pool_slots': 1, 'queue': 'default', 'priority_weight': 1,
+            'operator': 'PythonOperator', 'queued_when': iso(ti['queued']), 'pid': None, 'executor_config': '{}', 'note': None
+        }
+
+    def task_log(self, run, ti, try_number):
+        dag = self.dags[run['dag_id']]
+        if try_number < 1 or try_number > max(ti['try_number'], 1):
+            raise ApiError(404, 'Not found', f"Task log for try {try_number} not found")
+        start = ti['start'] or self.clock.now()
+        lines = [
+            f"[{iso(start)}] {{taskinstance.py:1159}} INFO - Dependencies all met for <TaskInstance: {run['dag_id']}.{ti['task_id']} {run['dag_run_id']} [running]>",
+            f"[{iso(start)}] {{taskinstance.py:1360}} INFO - Starting attempt {try_number} of {max(ti['try_number'], 1)}",
+            f"[{iso(start)}] {{standard_task_runner.py:55}} INFO - Started process to run task {ti['task_id']}",
+        ]
+        if try_number == ti['try_number'] and ti['state'] in ('success', 'failed'):
+            end = iso(ti['end'])
+            if ti['state'] == 'success':
+                lines.append(f"[{end}] {{python.py:177}} INFO - Done. Returned value was: {json.dumps(ti['xcom'].get('return_value'))}")
+                lines.append(f"[{end}] {{taskinstance.py:1398}} INFO - Marking task as SUCCESS. dag_id={run['dag_id']}, task_id={ti['task_id']}")
+            else:
+                lines.append(f"[{end}] {{taskinstance.py:1851}} ERROR - Task failed with exception")
+                lines.append(f"[{end}] {{taskinstance.py:1398}} INFO - Marking task as FAILED. dag_id={run['dag_id']}, task_id={ti['task_id']}")
+        elif ti['state'] == 'running':
+            lines.append(f"[{iso(self.clock.now())}] {{{dag['dag_id']}.py:42}} INFO - Still working...")
+        return '\n'.join(lines) + '\n'
+
+    def page(self, items, query, key):
+        limit = min(int(query.get('limit', self.page_limit)), self.page_limit)
+        offset = int(query.get('offset', 0))
+        return {key: items[offset:offset + limit], 'total_entries': len(items)}
+
+class _AirflowHandler(JSONRequestHandler):
+    ROUTES = []
+
+    @classmethod
+    def route(cls, method, pattern):
+        def register(func):
+            cls.ROUTES.append((method, re.compile('^/api/v1' + pattern + '$'), pattern, func))
+            return func
+        return register
+
+    def handle_request(self):
+        airflow = self.server.standin
+        path, query = self.split_path()
+        with airflow.lock:
+            airflow.stats['requests'] += 1
+            airflow.stats['inFlight'] += 1
+            airflow.stats['maxInFlight'] = max(airflow.stats['maxInFlight'], airflow.stats['inFlight'])
+        try:
+            if path.startswith('/_fake/'):
+                status, body = self.control(path)
+                return self.respond(status, body)
+            body = self.read_json() if self.command in ('POST', 'PATCH') else {}
+            for method, regex, pattern, func in self.ROUTES:
+                match = regex.match(path)
+                if match and method == self.command:
+                    break
+            else:
+                return self.respond(404, _problem(404, 'Not found', f"{self.command} {path}"), 'unmatched')
+            delay = airflow.latency + (airflow.random.random() * airflow.jitter if airflow.jitter else 0)
+            fault = self.pick_fault(path)
+            if fault and fault.delay:
+                delay += fault.delay
+            if delay:
+                time.sleep(delay)
+            if fault and fault.status:
+                headers = {'Retry-After': str(fault.retry_after)} if fault.retry_after is not None else {}
+                return self.respond(fault.status, _problem(fault.status, 'Injected fault'), pattern, headers)
+            try:
+                with airflow.lock:
+                    result = func(airflow, query, body, *match.groups())
+            except ApiError as e:
+                return self.respond(e.status, _problem(e.status, e.title, e.detail), pattern)
+            except (ValueError, KeyError, TypeError) as e:
+                return self.respond(400, _problem(400, 'Bad request', str(e)), pattern)
+            status, payload = result if isinstance(result, tuple) else (200, result)
+            self.respond(status, payload, pattern)
+        finally:
+            with airflow.lock:
+                airflow.stats['inFlight'] -= 1
+
+    do_GET = do_POST = do_PATCH = do_DELETE = handle_request
+
+    def pick_fault(self, path):
+        airflow = self.server.standin
+        with airflow.lock:
+            for rule in airflow.faults:
+                if rule.matches(self.command, path) and rule.remaining != 0 and airflow.random.random() < rule.rate:
+                    if rule.remaining is not None:
+                        rule.remaining -= 1
+                    if rule.status:
+                        airflow.stats['faults'] += 1
+                    return rule
+        return None
+
+    def respond(self, status, payload, route=None, headers=None):
+        airflow = self.server.standin
+        if route:
+            key = f"{self.command} {route}"
+            with airflow.lock:
+                airflow.stats['routes'][key] = airflow.stats['routes'].get(key, 0) + 1
+                airflow.stats['statuses'][str(status)] = airflow.stats['statuses'].get(str(status), 0) + 1
+        if isinstance(payload, str) and 'text/plain' in self.headers.get('Accept', ''):
+            body, content_type = payload.encode(), 'text/plain; charset=utf-8'
+        elif isinstance(payload, str):
+            # Logs and DAG sources: JSON unless the client asks for plain text, as in Airflow
+            body, content_type = json.dumps({'content': payload, 'continuation_token': None}).encode(), 'application/json'
+        else:
+            body, content_type = (b'' if payload is None else json.dumps(payload).encode()), 'application/json'
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def control(self, path):
+        airflow = self.server.standin
+        body = self.read_json() if self.command == 'POST' else {}
+        if path == '/_fake/stats':
+            with airflow.lock:
+                states = {}
+                for runs in airflow.runs.values():
+                    for run in runs.values():
+                        airflow.settle(run)
+                        states[run['state']] = states.get(run['state'], 0) + 1
+                return 200, {**json.loads(json.dumps(airflow.stats)), 'runStates': states, 'clock': iso(airflow.clock.now())}
+        if path == '/_fake/clock' and self.command == 'POST':
+            if 'speed' in body:
+                airflow.clock.set_speed(float(body['speed']))
+            if 'advance' in body:
+                airflow.clock.advance(float(body['advance']))
+            return 200, {'clock': iso(airflow.clock.now())}
+        if path == '/_fake/faults' and self.command == 'POST':
+            with airflow.lock:
+                airflow.faults = [FaultRule.from_dict(rule) for rule in body]
+            return 200, {'faults': len(airflow.faults)}
+        if path == '/_fake/dags' and self.command == 'POST':
+            dag = airflow.add_dag(body.pop('dag_id'), **body)
+            return 200, airflow.dag_json(dag)
+        return 404, _problem(404, 'Not found', path)
+
+def _problem(status, title, detail=None):
+    return {'type': 'about:blank', 'title': title, 'status': status, 'detail': detail or title}
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+route = _AirflowHandler.route
+
+# --- DAGs ---
+
+@route('GET', '/dags')
+def list_dags(af, query, body):
+    dags = [af.dags[k] for k in sorted(af.dags)]
+    if 'paused' in query:
+        dags = [d for d in dags if d['is_paused'] == _flag(query['paused'])]
+    if query.get('dag_id_pattern'):
+        dags = [d for d in dags if query['dag_id_pattern'] in d['dag_id']]
+    return af.page([af.dag_json(d) for d in dags], query, 'dags')
+
+@route('GET', '/dags/([^/]+)')
+def get_dag(af, query, body, dag_id):
+    return af.dag_json(af.get_dag(dag_id))
+
+@route('GET', '/dags/([^/]+)/details')
+def get_dag_details(af, query, body, dag_id):
+    dag = af.get_dag(dag_id)
+    return {**af.dag_json(dag), 'catchup': False, 'concurrency': 16, 'default_view': 'grid', 'orientation': 'LR',
+            'start_date': iso(dag['created']), 'dag_run_timeout': None, 'doc_md': None, 'params': {}, 'is_paused_upon_creation': None}
+
+@route('PATCH', '/dags/([^/]+)')
+def patch_dag(af, query, body, dag_id):
+    dag = af.get_dag(dag_id)
+    if 'is_paused' in body:
+        dag['is_paused'] = bool(body['is_paused'])
+        af.log_event('paused' if dag['is_paused'] else 'unpaused', dag_id)
+    return af.dag_json(dag)
+
+@route('DELETE', '/dags/([^/]+)')
+def delete_dag(af, query, body, dag_id):
+    af.get_dag(dag_id)
+    del af.dags[dag_id]
+    af.runs.pop(dag_id, None)
+    return 204, None
+
+@route('GET', '/dags/([^/]+)/tasks')
+def get_dag_tasks(af, query, body, dag_id):
+    dag = af.get_dag(dag_id)
+    return {'tasks': [_task_json(dag, t) for t in dag['task_ids']], 'total_entries': len(dag['task_ids'])}
+
+@route('GET', '/dags/([^/]+)/tasks/([^/]+)')
+def get_task(af, query, body, dag_id, task_id):
+    dag = af.get_dag(dag_id)
+    if task_id not in dag['task_ids']:
+        raise ApiError(404, 'Task not found', f"Task {task_id} not found")
+    return _task_json(dag, task_id)
+
+def _task_json(dag, task_id):
+    index = dag['task_ids'].index(task_id)
+    return {'task_id': task_id, 'owner': 'airflow', 'operator_name': 'PythonOperator', 'pool': 'default_pool', 'retries': 0,
+            'execution_timeout': None, 'trigger_rule': 'all_success', 'is_mapped': False,
+            'downstream_task_ids': dag['task_ids'][index + 1:index + 2]}
+
+@route('GET', '/dagSources/([^/]+)')
+def get_dag_source(af, query, body, file_token):
+    dag = af.get_dag(file_token)
+    chain = ' >> '.join(dag['task_ids'])
+    return f"from airflow import DAG\n\nwith DAG('{dag['dag_id']}', schedule=None) as dag:\n    ...\n    {chain}\n"
+
+# --- DAG runs ---
+
+@route('GET', '/dags/([^/]+)/dagRuns')
+def list_dag_runs(af, query, body, dag_id):
+    if dag_id == '~':
+        runs = [r for dag_runs in af.runs.values() for r in dag_runs.values()]
+    else:
+        af.get_dag(dag_id, create=True)
+        runs = list(af.runs[dag_id].values())
+    for run in runs:
+        af.settle(run)
+    if query.get('state'):
+        runs = [r for r in runs if r['state'] in query['state'].split(',')]
+    order_by = query.get('order_by', 'id')
+    field = order_by.lstrip('-')
+    key = {'execution_date': 'logical', 'logical_date': 'logical', 'start_date': 'start', 'end_date': 'end'}.get(field)
+    if key:
+        runs.sort(key=lambda r: (r[key] is None, r[key] or 0), reverse=order_by.startswith('-'))
+    elif order_by.startswith('-'):
+        runs.reverse()
+    return af.page([af.run_json(r) for r in runs], query, 'dag_runs')
+
+@route('POST', '/dags/([^/]+)/dagRuns')
+def trigger_dag(af, query, body, dag_id):
+    return af.run_json(af.trigger(dag_id, body.get('conf'), body.get('dag_run_id'), body.get('logical_date')))
+
+@route('GET', '/dags/([^/]+)/dagRuns/([^/]+)')
+def get_dag_run(af, query, body, dag_id, run_id):
+    return af.run_json(af.get_run(dag_id, run_id))
+
+@route('PATCH', '/dags/([^/]+)/dagRuns/([^/]+)')
+def patch_dag_run(af, query, body, dag_id, run_id):
+    run = af.get_run(dag_id, run_id)
+    if body.get('state') not in ('success', 'failed', 'queued'):
+        raise ApiError(400, 'Bad request', f"Invalid state: {body.get('state')}")
+    af.set_run_state(run, body['state'])
+    return af.run_json(run)
+
+@route('DELETE', '/dags/([^/]+)/dagRuns/([^/]+)')
+def delete_dag_run(af, query, body, dag_id, run_id):
+    af.get_run(dag_id, run_id)
+    del af.runs[dag_id][run_id]
+    return 204, None
+
+@route('GET', '/dags/~/dagRuns/~/statistics')
+def dag_run_statistics(af, query, body):
+    stats = []
+    for dag_id in filter(None, query.get('dag_ids', '').split(',')):
+        counts = {}
+        for run in af.runs.get(dag_id, {}).values():
+            af.settle(run)
+            counts[run['state']] = counts.get(run['state'], 0) + 1
+        stats.append({'dag_id': dag_id, 'stats': [{'state': s, 'count': c} for s, c in counts.items()]})
+    return {'dags': stats, 'total_entries': len(stats)}
+
+@route('POST', '/dags/([^/]+)/clearTaskInstances')
+def clear_task_instances(af, query, body, dag_id):
+    af.get_dag(dag_id)
+    if body.get('dag_run_id'):
+        runs = [af.get_run(dag_id, body['dag_run_id'])]
+    else:
+        start = parse_iso(body['start_date']) if body.get('start_date') else None
+        end = parse_iso(body['end_date']) if body.get('end_date') else None
+        runs = [r for r in af.runs[dag_id].values() if (start is None or r['logical'] >= start) and (end is None or r['logical'] <= end)]
+    cleared = []
+    for run in runs:
+        af.settle(run)
+        if body.get('only_running') and run['state'] != 'running':
+            continue
+        for ti in af.clear(run, body.get('task_ids'), body.get('only_failed'), body.get('dry_run', True)):
+            cleared.append({'dag_id': dag_id, 'dag_run_id': run['dag_run_id'], 'execution_date': iso(run['logical']), 'task_id': ti['task_id']})
+    return {'task_instances': cleared}
+
+# --- Task instances, logs, XComs ---
+
+@route('GET', '/dags/([^/]+)/dagRuns/([^/]+)/taskInstances')
+def list_task_instances(af, query, body, dag_id, run_id):
+    run = af.get_run(dag_id, run_id)
+    return af.page([af.ti_json(run, ti) for ti in run['tis'].values()], query, 'task_instances')
+
+@route('GET', '/dags/([^/]+)/dagRuns/([^/]+)/taskInstances/([^/]+)')
+def get_task_instance(af, query, body, dag_id, run_id, task_id):
+    run = af.get_run(dag_id, run_id)
+    return af.ti_json(run, af.get_ti(run, task_id))
+
+@route('PATCH', '/dags/([^/]+)/dagRuns/([^/]+)/taskInstances/([^/]+)')
+def patch_task_instance(af, query, body, dag_id, run_id, task_id):
+    run = af.get_run(dag_id, run_id)
+    ti = af.get_ti(run, task_id)
+    if body.get('state') not in ('success', 'failed', 'skipped'):
+        raise ApiError(400, 'Bad request', f"Invalid state: {body.get('state')}")
+    if not body.get('dry_run'):
+        af.set_ti_state(run, ti, body['state'])
+    return {'task_id': task_id, 'dag_id': dag_id, 'dag_run_id': run_id, 'execution_date': iso(run['logical'])}
+
+@route('GET', '/dags/([^/]+)/dagRuns/([^/]+)/taskInstances/([^/]+)/logs/(\\d+)')
+def get_task_logs(af, query, body, dag_id, run_id, task_id, try_number):
+    run = af.get_run(dag_id, run_id)
+    return af.task_log(run, af.get_ti(run, task_id), int(try_number))
+
+@route('GET', '/dags/([^/]+)/dagRuns/([^/]+)/taskInstances/([^/]+)/xcomEntries')
+def list_xcoms(af, query, body, dag_id, run_id, task_id):
+    run = af.get_run(dag_id, run_id)
+    ti = af.get_ti(run, task_id)
+    entries = [_xcom_json(run, ti, key, with_value=False) for key in ti['xcom']]
+    return af.page(entries, query, 'xcom_entries')
+
+@route('GET', '/dags/([^/]+)/dagRuns/([^/]+)/taskInstances/([^/]+)/xcomEntries/([^/]+)')
+def get_xcom(af, query, body, dag_id, run_id, task_id, key):
+    run = af.get_run(dag_id, run_id)
+    ti = af.get_ti(run, task_id)
+    if key not in ti['xcom']:
+        raise ApiError(404, 'XCom entry not found', f"XCom entry {key} not found")
+    return _xcom_json(run, ti, key)
+
+def _xcom_json(run, ti, key, with_value=True):
+    entry = {'key': key, 'timestamp': iso(ti['end']), 'execution_date': iso(run['logical']), 'task_id': ti['task_id'],
+             'dag_id': run['dag_id'], 'map_index': -1}
+    if with_value:
+        entry['value'] = json.dumps(ti['xcom'][key])
+    return entry
+
+# --- Connections, pools, variables ---
+
+def _crud(collection, key_field, path, title):
+    @route('GET', path)
+    def list_items(af, query, body):
+        items = getattr(af, collection)
+        return af.page([items[k] for k in sorted(items)], query, collection)
+
+    @route('GET', path + '/([^/]+)')
+    def get_item(af, query, body, key):
+        item = getattr(af, collection).get(key)
+        if item is None:
+            raise ApiError(404, f"{title} not found", f"{title} with {key_field} `{key}` not found")
+        return item
+
+    @route('POST', path)
+    def create_item(af, query, body):
+        key = body[key_field]
+        if key in getattr(af, collection):
+            raise ApiError(409, 'Conflict', f"{title} `{key}` already exists")
+        getattr(af, collection)[key] = body
+        return body
+
+    @route('PATCH', path + '/([^/]+)')
+    def update_item(af, query, body, key):
+        item = get_item(af, query, body, key)
+        item.update({k: v for k, v in body.items() if k != key_field})
+        return item
+
+    @route('DELETE', path + '/([^/]+)')
+    def delete_item(af, query, body, key):
+        get_item(af, query, body, key)
+        del getattr(af, collection)[key]
+        return 204, None
+
+_crud('connections', 'connection_id', '/connections', 'Connection')
+_crud('pools', 'name', '/pools', 'Pool')
+_crud('variables', 'key', '/variables', 'Variable')
+
+# --- Monitoring ---
+
+@route('GET', '/eventLogs')
+def list_event_logs(af, query, body):
+    events = [e for e in reversed(af.event_logs)
+              if all(not query.get(f) or e.get(f) == query[f] for f in ('dag_id', 'event', 'owner'))]
+    return af.page(events, query, 'event_logs')
+
+@route('GET', '/eventLogs/(\\d+)')
+def get_event_log(af, query, body, event_log_id):
+    event = next((e for e in af.event_logs if e['event_log_id'] == int(event_log_id)), None)
+    if event is None:
+        raise ApiError(404, 'Event log not found')
+    return event
+
+@route('GET', '/importErrors')
+def list_import_errors(af, query, body):
+    return af.page([], query, 'import_errors')
+
+@route('GET', '/importErrors/(\\d+)')
+def get_import_error(af, query, body, import_error_id):
+    raise ApiError(404, 'Import error not found')
+
+@route('GET', '/dagWarnings')
+def list_dag_warnings(af, query, body):
+    return af.page([], query, 'dag_warnings')
+
+@route('GET', '/health')
+def get_health(af, query, body):
+    now = iso(af.clock.now())
+    return {'metadatabase': {'status': 'healthy'}, 'scheduler': {'status': 'healthy', 'latest_scheduler_heartbeat': now},
+            'triggerer': {'status': 'healthy', 'latest_triggerer_heartbeat': now}}
+
+@route('GET', '/version')
+def get_version(af, query, body):
+    return {'version': '2.8.1', 'git_version': None}
+
+@route('GET', '/config')
+def get_config(af, query, body):
+    return {'sections': [{'name': 'api', 'options': [{'key': 'maximum_page_limit', 'value': str(af.page_limit)}]}]}
+
+@route('GET', '/plugins')
+def list_plugins(af, query, body):
+    return af.page([], query, 'plugins')
+
+@route('GET', '/providers')
+def list_providers(af, query, body):
+    return af.page([], query, 'providers')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.fake_airflow', description='Stateful fake Airflow 2.x REST API')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--dags', type=int, default=10, help='DAGs to create up front (bench_dag_0...)')
+    parser.add_argument('--tasks', type=int, default=3)
+    parser.add_argument('--task-duration', type=float, default=60.0, help='virtual seconds per task')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--clock-speed', type=float, default=1.0)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    args = parser.parse_args(argv)
+    airflow = FakeAirflow(clock=VirtualClock(args.clock_speed), latency=args.latency, jitter=args.jitter,
+                          tasks_per_dag=args.tasks, task_duration=args.task_duration, failure_rate=args.failure_rate,
+                          port=args.port)
+    for i in range(args.dags):
+        airflow.add_dag(f"bench_dag_{i}")
+    airflow.start()
+    print(json.dumps({'baseUrl': airflow.url}), flush=True)
+    airflow.serve_until_interrupted()
+
+if __name__ == '__main__':
+    main()
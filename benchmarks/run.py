@@ -0,0 +1,328 @@
+"""
+Run the executor benchmarks and write the results as JSON.
+
+    python -m benchmarks.run --runs 20 --concurrency 4 --out bench.json
+    python -m benchmarks.run --baseline bench.json --fail-on-regression
+
+Everything runs in a scratch directory (its own local.db, artifact store and result
+cache), so the benchmark never touches the development database. Executions go through
+the real executor on its inline thread pool; only the external systems are stand-ins.
+
+Per scenario the result holds:
+  runsPerMinute       completed executions per minute of wall time
+  runDurationMs       p50/p95 of single execution durations
+  firstNodeStartMs    p50/p95 from execution start to its first node starting
+  nodeStartLatencyMs  p50/p95/max gap between a node becoming runnable and starting
+  dbWritesPerRun      INSERT/UPDATE/DELETE statements against local.db per execution
+  peakRssMb           peak resident set size of the process so far
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from concurrent.futures import wait
+
+from .workflows import SCENARIOS, BENCH_TABLE_ROWS, NODE_KINDS, generate_workflow
+
+# Metric -> 'higher' or 'lower' is better, for --baseline comparisons
+COMPARED_METRICS = {
+    'runsPerMinute': 'higher',
+    'runDurationMs.p50': 'lower',
+    'runDurationMs.p95': 'lower',
+    'firstNodeStartMs.p50': 'lower',
+    'nodeStartLatencyMs.p50': 'lower',
+    'nodeStartLatencyMs.p95': 'lower',
+    'dbWritesPerRun': 'lower',
+    'peakRssMb': 'lower',
+}
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description='End-to-end executor benchmarks')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument('--shape', action='append', default=[], metavar='WxD:kind=weight,...',
+                        help=f"extra scenario, e.g. 6x3:sql=2,http=1 (kinds: {', '.join(NODE_KINDS)})")
+    parser.add_argument('--runs', type=int, default=20, help='measured executions per scenario')
+    parser.add_argument('--warmup', type=int, default=1, help='unmeasured executions per scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='execution worker threads')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--airflow-latency', type=float, default=0.0, help='seconds added to every fake Airflow request')
+    parser.add_argument('--airflow-run-duration', type=float, default=0.0, help='seconds a triggered DAG run stays running')
+    parser.add_argument('--airflow-poll-interval', type=float, default=0.1, help='AIRFLOW_POLL_INTERVAL for the executor')
+    parser.add_argument('--echo-latency', type=float, default=0.0, help='seconds the HTTP echo server waits per request')
+    parser.add_argument('--out', help='write the JSON result here (default: stdout)')
+    parser.add_argument('--baseline', help='earlier result to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='relative change counted as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 on a regression')
+    parser.add_argument('--workdir', help='scratch directory (default: a temporary one, removed afterwards)')
+    return parser.parse_args(argv)
+
+def parse_shape(spec):
+    """'6x3:sql=2,http=1' -> (name, width, depth, {'sql': 2, 'http': 1})"""
+    try:
+        size, _, mix_text = spec.partition(':')
+        width, depth = (int(v) for v in size.lower().split('x'))
+        mix = {}
+        for part in (mix_text or 'python=1').split(','):
+            kind, _, weight = part.partition('=')
+            if kind not in NODE_KINDS:
+                raise ValueError(kind)
+            mix[kind] = int(weight or 1)
+    except ValueError:
+        raise SystemExit(f"Invalid --shape '{spec}'")
+    return spec, width, depth, mix
+
+def prepare_environment(workdir, args):
+    """Point every path the server derives from the cwd or environment into the scratch directory."""
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    os.environ.update({
+        'RESULT_CACHE_PATH': os.path.join(workdir, 'result_cache.db'),
+        'ARTIFACT_STORE_DIR': os.path.join(workdir, 'artifact_store'),
+        'EXECUTION_ARCHIVE_DIR': os.path.join(workdir, 'execution_archive'),
+        'EXECUTION_MODE': 'inline',
+        'EXECUTION_WORKERS': str(args.concurrency),
+        'AIRFLOW_POLL_INTERVAL': str(args.airflow_poll_interval),
+        'RETENTION_ENABLED': '0',
+        'SCHEDULER_ENABLED': '0',
+    })
+
+def start_standins(workdir, args, storage):
+    from .standins import EchoServer, SFTPServer
+    from .fake_airflow import FakeAirflow
+
+    airflow = FakeAirflow(latency=args.airflow_latency, tasks_per_dag=1, task_duration=args.airflow_run_duration, seed=args.seed).start()
+    echo = EchoServer(latency=args.echo_latency).start()
+    sftp_root = os.path.join(workdir, 'sftp_root')
+    os.makedirs(sftp_root, exist_ok=True)
+    for i in range(20):
+        with open(os.path.join(sftp_root, f"file_{i}.csv"), 'w') as f:
+            f.write('id,value\n' + ''.join(f"{j},{j * i}\n" for j in range(50)))
+    sftp = SFTPServer(sftp_root).start()
+
+    airflow_credential = storage.create_credential({'name': 'bench airflow', 'type': 'airflow',
+                                                    'data': {'baseUrl': airflow.url, 'username': 'bench', 'password': 'bench'}})
+    sftp_credential = storage.create_credential({'name': 'bench sftp', 'type': 'sftp',
+                                                 'data': {'username': sftp.username, 'password': sftp.password}})
+    targets = {
+        'echo_url': echo.url,
+        'airflow_credential': airflow_credential['id'],
+        'sftp_host': sftp.host,
+        'sftp_port': sftp.port,
+        'sftp_credential': sftp_credential['id'],
+    }
+    return targets, (airflow, echo, sftp)
+
+def seed_database(engine):
+    from sqlalchemy import text
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS bench_rows (id INTEGER PRIMARY KEY, name TEXT, value REAL)"))
+        conn.execute(text("DELETE FROM bench_rows"))
+        conn.execute(text("INSERT INTO bench_rows (id, name, value) VALUES (:id, :name, :value)"),
+                     [{'id': i, 'name': f"row {i}", 'value': i * 1.5} for i in range(1, BENCH_TABLE_ROWS + 1)])
+
+class WriteCounter:
+    """Counts write statements issued through a SQLAlchemy engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            self.count += 1
+
+def percentiles(values, *qs):
+    if not values:
+        return {f"p{q}": None for q in qs}
+    ordered = sorted(values)
+    return {f"p{q}": round(ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))], 3) for q in qs}
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def node_timings(trace):
+    """(ms from execution start to the first node, [ms each later node waited after the previous one])."""
+    from server_py.tracing import decode_trace
+    spans = decode_trace(trace)
+    workflow = next((s for s in spans if s['parentId'] is None), None)
+    nodes = sorted((s for s in spans if s['category'] == 'node'), key=lambda s: s['start'])
+    if not workflow or not nodes:
+        return None, []
+    # Nodes run one after another, so a node is runnable once the previous one has finished
+    gaps = [(b['start'] - (a['start'] + a['duration'])) / 1000 for a, b in zip(nodes, nodes[1:])]
+    return (nodes[0]['start'] - workflow['start']) / 1000, gaps
+
+def run_scenario(name, workflow_id, args, write_counter):
+    from server_py.storage import storage
+    from server_py.executor import get_execution_pool, run_execution
+
+    def launch(count):
+        # start_execution() without the event-bus channel, keeping the futures to wait on
+        ids, futures = [], []
+        for _ in range(count):
+            execution_id = storage.create_execution(workflow_id)['id']
+            ids.append(execution_id)
+            futures.append(get_execution_pool().submit(run_execution, execution_id, workflow_id))
+        wait(futures)
+        return ids
+
+    launch(args.warmup)
+    write_counter.count = 0
+    started = time.perf_counter()
+    execution_ids = launch(args.runs)
+    wall = time.perf_counter() - started
+    writes = write_counter.count
+
+    durations, first_node, gaps, statuses, errors = [], [], [], {}, []
+    for execution_id in execution_ids:
+        execution = storage.get_execution(execution_id, include_logs=False)
+        statuses[execution['status']] = statuses.get(execution['status'], 0) + 1
+        if execution['status'] != 'completed' and len(errors) < 3:
+            errors.append(next((r.get('error') for r in (execution.get('results') or {}).values()
+                                if isinstance(r, dict) and r.get('error')), execution['status']))
+        trace = storage.get_trace(execution_id)
+        if trace:
+            root = max((row[4] + row[5] for row in trace['spans'] if not row[1]), default=0)
+            durations.append(root / 1000)
+            first, node_gaps = node_timings(trace)
+            if first is not None:
+                first_node.append(first)
+            gaps.extend(node_gaps)
+
+    return {
+        'runs': args.runs,
+        'statuses': statuses,
+        'errors': errors,
+        'wallSeconds': round(wall, 3),
+        'runsPerMinute': round(args.runs / wall * 60, 2) if wall else None,
+        'runDurationMs': percentiles(durations, 50, 95),
+        'firstNodeStartMs': percentiles(first_node, 50, 95),
+        'nodeStartLatencyMs': {**percentiles(gaps, 50, 95), 'max': round(max(gaps), 3) if gaps else None},
+        'dbWritesPerRun': round(writes / args.runs, 2) if args.runs else None,
+        'peakRssMb': peak_rss_mb(),
+    }
+
+def metric_value(result, path):
+    value = result
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def compare(current, baseline, tolerance, metrics=COMPARED_METRICS):
+    """Per scenario and metric: baseline, current, relative change and whether it regressed."""
+    comparison = {}
+    regressions = []
+    for name, result in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        rows = {}
+        for metric, better in metrics.items():
+            old, new = metric_value(base, metric), metric_value(result, metric)
+            if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+                continue
+            change = (new - old) / old if old else 0.0
+            worse = -change if better == 'higher' else change
+            rows[metric] = {'baseline': old, 'current': new, 'change': round(change, 4), 'regressed': worse > tolerance}
+            if worse > tolerance:
+                regressions.append(f"{name}.{metric}")
+        comparison[name] = rows
+    return {'baseline': baseline.get('meta', {}), 'tolerance': tolerance, 'scenarios': comparison, 'regressions': regressions}
+
+def print_comparison(comparison):
+    for name, rows in comparison['scenarios'].items():
+        print(f"{name}", file=sys.stderr)
+        for metric, row in rows.items():
+            flag = '  REGRESSION' if row['regressed'] else ''
+            print(f"  {metric:<24} {row['baseline']:>10} -> {row['current']:>10} ({row['change']:+.1%}){flag}", file=sys.stderr)
+
+def git_revision(path):
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=path, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def report(results, args, repo_root, out_path, baseline_path, metrics=COMPARED_METRICS):
+    """Write the results with run metadata (and a baseline comparison); returns the exit status."""
+    output = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(repo_root),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'settings': {key: value for key, value in vars(args).items() if key not in ('out', 'baseline', 'workdir')},
+        },
+        'scenarios': results,
+    }
+    exit_code = 0
+    if baseline_path:
+        with open(baseline_path) as f:
+            output['comparison'] = compare(output, json.load(f), args.tolerance, metrics)
+        print_comparison(output['comparison'])
+        if args.fail_on_regression and output['comparison']['regressions']:
+            exit_code = 1
+
+    text = json.dumps(output, indent=2)
+    if out_path:
+        with open(out_path, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return exit_code
+
+def main(argv=None):
+    args = parse_args(argv)
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out_path = os.path.abspath(args.out) if args.out else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    scenarios = []
+    for name in filter(None, args.scenarios.split(',')):
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'")
+        scenarios.append((name, *SCENARIOS[name]))
+    scenarios.extend(parse_shape(spec) for spec in args.shape)
+
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix='orchestrator-bench-')
+    cwd = os.getcwd()
+    prepare_environment(workdir, args)
+    sys.path.insert(0, repo_root)
+    try:
+        # Imported only now: the server reads its paths and settings at import time
+        from server_py.models import init_db, engine
+        from server_py.storage import storage
+        init_db()
+        seed_database(engine)
+        targets, servers = start_standins(workdir, args, storage)
+        write_counter = WriteCounter(engine)
+
+        results = {}
+        for index, (name, width, depth, mix) in enumerate(scenarios):
+            workflow = storage.create_workflow(generate_workflow(f"bench {name}", width, depth, mix, targets, seed=args.seed + index))
+            print(f"Running {name} ({width}x{depth}, {args.runs} runs)...", file=sys.stderr)
+            results[name] = {'width': width, 'depth': depth, 'mix': mix, **run_scenario(name, workflow['id'], args, write_counter)}
+        for server in servers:
+            server.stop()
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return report(results, args, repo_root, out_path, baseline_path)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Local stand-ins for the systems workflows talk to: an HTTP echo server for api_request
+nodes and an SFTP server (paramiko, backed by a directory) for sftp_operation nodes.
+Each listens on 127.0.0.1 on a free port and serves from daemon threads.
+"""
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl
+
+import paramiko
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The executor opens many pooled connections at once
+    request_queue_size = 128
+
+class StandinServer:
+    """An HTTP stand-in; `handler_class` reaches the stand-in as `self.server.standin`."""
+
+    def __init__(self, handler_class, port=0):
+        self.httpd = _HTTPServer(('127.0.0.1', port), handler_class)
+        self.httpd.standin = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def serve_until_interrupted(self):
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            self.stop()
+
+class JSONRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def split_path(self):
+        parts = urlsplit(self.path)
+        return parts.path, dict(parse_qsl(parts.query))
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def read_json(self):
+        body = self.read_body()
+        try:
+            return json.loads(body) if body else {}
+        except ValueError:
+            return {}
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload).encode(), 'application/json')
+
+    def send_text(self, status, text):
+        self.send_body(status, text.encode(), 'text/plain; charset=utf-8')
+
+class EchoServer(StandinServer):
+    """Answers every request with a JSON description of it, after `latency` seconds."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        super().__init__(_EchoHandler)
+
+class _EchoHandler(JSONRequestHandler):
+    def echo(self):
+        if self.server.standin.latency:
+            time.sleep(self.server.standin.latency)
+        path, query = self.split_path()
+        body = self.read_body().decode('utf-8', 'replace')
+        self.send_json(200, {'method': self.command, 'path': path, 'query': query, 'body': body})
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = echo
+
+class _SSHServer(paramiko.ServerInterface):
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        if username == self.username and password == self.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+class _SFTPHandle(paramiko.SFTPHandle):
+    def stat(self):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.fstat((self.readfile or self.writefile).fileno()))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+class _DirectorySFTP(paramiko.SFTPServerInterface):
+    """SFTP operations confined to `root`; enough for list, upload, download and delete."""
+
+    def __init__(self, server, root):
+        super().__init__(server)
+        self.root = root
+
+    def _local(self, path):
+        local = os.path.realpath(os.path.join(self.root, path.lstrip('/')))
+        if local != self.root and not local.startswith(self.root + os.sep):
+            raise PermissionError(path)
+        return local
+
+    def canonicalize(self, path):
+        relative = os.path.relpath(self._local(path), self.root)
+        return '/' if relative == '.' else '/' + relative
+
+    def list_folder(self, path):
+        try:
+            local = self._local(path)
+            entries = []
+            for name in os.listdir(local):
+                attrs = paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(local, name)))
+                attrs.filename = name
+                entries.append(attrs)
+            return entries
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._local(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        try:
+            local = self._local(path)
+            fd = os.open(local, flags, 0o644)
+            if flags & os.O_WRONLY:
+                mode = 'ab' if flags & os.O_APPEND else 'wb'
+            elif flags & os.O_RDWR:
+                mode = 'a+b' if flags & os.O_APPEND else 'r+b'
+            else:
+                mode = 'rb'
+            f = os.fdopen(fd, mode)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        handle = _SFTPHandle(flags)
+        handle.filename = local
+        handle.readfile = f if 'r' in mode or '+' in mode else None
+        handle.writefile = f if mode != 'rb' else None
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(self._local(path))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+class SFTPServer:
+    """Password-authenticated SFTP server serving the files under `root`."""
+
+    def __init__(self, root, username='bench', password='bench'):
+        self.root = os.path.realpath(root)
+        self.username = username
+        self.password = password
+        self.host_key = paramiko.RSAKey.generate(2048)
+        # Clients dropping the connection after a transfer is routine here
+        logging.getLogger('paramiko.transport').setLevel(logging.CRITICAL)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(128)
+        self.host, self.port = self.sock.getsockname()
+        self._stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._accept, name='SFTPServer', daemon=True).start()
+        return self
+
+    def _accept(self):
+        while not self._stopped.is_set():
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(client)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler('sftp', paramiko.SFTPServer, _DirectorySFTP, self.root)
+            try:
+                # Negotiation continues on the transport's own thread
+                transport.start_server(server=_SSHServer(self.username, self.password))
+            except (paramiko.SSHException, EOFError, OSError):
+                transport.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.sock.close()
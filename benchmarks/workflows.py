@@ -0,0 +1,61 @@
+"""
+Synthetic workflow definitions for the benchmarks.
+
+A workflow is `depth` layers of `width` nodes; every node below the first layer depends
+on one or two nodes of the layer above. Node types are drawn (with a fixed seed) from a
+mix such as {'sql': 2, 'http': 1}, and each type is configured against a stand-in.
+"""
+import random
+
+NODE_KINDS = ('sql', 'http', 'airflow', 'sftp', 'python')
+
+# Named scenarios: (width, depth, node mix)
+SCENARIOS = {
+    'linear': (1, 8, {'python': 1}),
+    'wide': (8, 2, {'sql': 1, 'http': 1}),
+    'deep': (2, 10, {'sql': 1, 'http': 1, 'python': 1}),
+    'airflow': (2, 3, {'airflow': 2, 'http': 1}),
+    'mixed': (4, 4, {'sql': 2, 'http': 2, 'airflow': 1, 'sftp': 1, 'python': 1}),
+}
+
+BENCH_TABLE_ROWS = 200
+
+def node_config(kind, index, targets):
+    """Config for one node of `kind`; `targets` holds the stand-in addresses and credential ids."""
+    if kind == 'sql':
+        return 'sql_query', {'query': f"SELECT id, name, value FROM bench_rows WHERE id % 7 = {index % 7}"}
+    if kind == 'http':
+        return 'api_request', {'url': f"{targets['echo_url']}/node/{index}", 'method': 'POST', 'body': '{"node": %d}' % index}
+    if kind == 'airflow':
+        return 'airflow_trigger', {'dagId': f"bench_dag_{index % 3}", 'credentialId': targets['airflow_credential'], 'waitForCompletion': True}
+    if kind == 'sftp':
+        return 'sftp_operation', {'host': targets['sftp_host'], 'port': targets['sftp_port'], 'operation': 'list',
+                                  'remotePath': '/', 'credentialId': targets['sftp_credential']}
+    if kind == 'python':
+        return 'python_script', {'code': f"result = sum(i * i for i in range({1000 + index}))"}
+    raise ValueError(f"Unknown node kind '{kind}'")
+
+def generate_workflow(name, width, depth, mix, targets, seed=0):
+    """A workflow definition (as accepted by storage.create_workflow)."""
+    rng = random.Random(seed)
+    kinds = [kind for kind in mix for _ in range(mix[kind])]
+    nodes, edges, layers = [], [], []
+    index = 0
+    for level in range(depth):
+        layer = []
+        for column in range(width):
+            node_id = f"n{index}"
+            node_type, config = node_config(rng.choice(kinds), index, targets)
+            nodes.append({
+                'id': node_id,
+                'type': 'custom',
+                'position': {'x': column * 250, 'y': level * 150},
+                'data': {'label': f"{node_type} {index}", 'type': node_type, 'config': config}
+            })
+            if layers:
+                for parent in rng.sample(layers[-1], min(len(layers[-1]), rng.choice((1, 2)))):
+                    edges.append({'id': f"e{parent}-{node_id}", 'source': parent, 'target': node_id})
+            layer.append(node_id)
+            index += 1
+        layers.append(layer)
+    return {'name': name, 'description': f"Benchmark: width {width}, depth {depth}, mix {mix}", 'nodes': nodes, 'edges': edges}
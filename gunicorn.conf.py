@@ -0,0 +1,73 @@
+"""
+Production server configuration. Run with:
+
+    gunicorn -c gunicorn.conf.py
+
+Web workers only serve the API and frontend when EXECUTION_MODE=queue; workflow runs
+are then picked up by `python -m server_py.worker`. Send HUP to the master for a
+graceful reload (new workers start before old ones finish their in-flight requests).
+
+In the default inline mode workflows run inside the web workers, so workers are not
+recycled (a recycled worker would take its running executions with it) and only one
+worker, elected with a lock file, runs the scheduler and retention.
+"""
+import os
+import tempfile
+import multiprocessing
+
+EXECUTION_MODE = os.environ.get('EXECUTION_MODE', 'inline')
+
+wsgi_app = 'server_py.wsgi:app'
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+
+# init_db() and the node manifest load run once in the master before forking
+preload_app = True
+
+# Workers export their metrics here so /metrics on any of them reports all of them; the
+# directory is new for each master, so counters start over when the server restarts
+os.environ.setdefault('METRICS_MULTIPROCESS_DIR', tempfile.mkdtemp(prefix='orchestrator-metrics-'))
+
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 60))
+keepalive = int(os.environ.get('WEB_KEEPALIVE', 5))
+
+# Recycle workers periodically; jitter keeps them from restarting all at once. Off by
+# default in inline mode, where a worker may be in the middle of running workflows
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 5000 if EXECUTION_MODE == 'queue' else 0))
+max_requests_jitter = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 500))
+
+accesslog = None
+errorlog = '-'
+
+def post_fork(server, worker):
+    # Connections opened in the master during preload must not be shared across processes
+    from server_py.models import engine
+    engine.dispose()
+
+background_lock = None
+
+def start_background_services():
+    from server_py.scheduler import start_scheduler
+    from server_py.retention import start_retention
+    from server_py.executor import recover_stale_executions, start_heartbeat
+    recover_stale_executions()
+    start_heartbeat()
+    start_scheduler()
+    start_retention()
+
+def post_worker_init(worker):
+    global background_lock
+    # In queue mode the execution worker process runs the scheduler and retention instead
+    if EXECUTION_MODE != 'queue':
+        from server_py.process_lock import elect
+        # Held for the worker's lifetime; another worker takes over when this one exits
+        background_lock = elect(os.path.join(tempfile.gettempdir(), 'orchestrator_background.lock'),
+                                start_background_services, name='scheduler and retention')
+    if os.environ.get('WARMUP_IMPORTS', '1') == '1':
+        from server_py.lazy_imports import warm_up
+        from server_py.utils import log
+        warm_up(log_fn=log)
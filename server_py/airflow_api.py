@@ -2,11 +2,13 @@ import base64
 import requests
 from datetime import datetime
 from typing import Optional, Dict, Any, List
+from .metrics import track_call
 
 
 class AirflowAPI:
-    def __init__(self, base_url: str, username: str, password: str):
+    def __init__(self, base_url: str, username: str, password: str, credential_id: Optional[int] = None):
         self.base_url = base_url.rstrip('/')
+        self.credential_id = credential_id
         self.auth_headers = {
             'Authorization': f'Basic {base64.b64encode(f"{username}:{password}".encode()).decode()}',
             'Content-Type': 'application/json'
@@ -15,15 +17,16 @@ class AirflowAPI:
     def _request(self, method: str, endpoint: str, params: Optional[Dict] = None, json_data: Optional[Dict] = None) -> Dict[str, Any]:
         url = f"{self.base_url}/api/v1{endpoint}"
         try:
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=self.auth_headers,
-                params=params,
-                json=json_data,
-                timeout=30
-            )
-            response.raise_for_status()
+            with track_call('airflow', self.credential_id):
+                response = requests.request(
+                    method=method,
+                    url=url,
+                    headers=self.auth_headers,
+                    params=params,
+                    json=json_data,
+                    timeout=30
+                )
+                response.raise_for_status()
             if response.text:
                 return {'success': True, 'data': response.json()}
             return {'success': True, 'data': None}
@@ -34,7 +37,7 @@ class AirflowAPI:
                 error_msg = error_data.get('detail', str(e))
             except:
                 pass
-            return {'success': False, 'error': error_msg, 'status_code': e.response.status_code if e.response else None}
+            return {'success': False, 'error': error_msg, 'status_code': e.response.status_code if e.response is not None else None}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -0,0 +1,224 @@
+"""
+Asyncio counterpart of AirflowAPI for operations that touch many DAGs, runs or tasks.
+
+AsyncAirflowAPI subclasses AirflowAPI and only replaces _request with a coroutine, so
+every AirflowAPI method (and every AIRFLOW_OPERATIONS entry) keeps its name, parameters
+and result shape and simply returns an awaitable. Requests go through the pooled
+keep-alive connections of async_http, bounded per host, so querying a few hundred DAGs
+is one burst of concurrent round trips instead of a sequence of them.
+
+SyncAirflowAPI is a blocking facade with the same methods for thread-based callers
+(Flask routes, nodes); its calls run on the shared async-http loop.
+"""
+import os
+import time
+import asyncio
+import functools
+from typing import Optional, Dict, List
+from .airflow_api import AirflowAPI, AIRFLOW_OPERATIONS
+from .async_http import HTTPError, pool_for_loop, run_sync
+from .metrics import track_call
+
+AIRFLOW_REQUEST_TIMEOUT = 30
+AIRFLOW_BATCH_CONCURRENCY = int(os.environ.get('AIRFLOW_BATCH_CONCURRENCY', 8))
+AIRFLOW_BATCH_MAX_CONCURRENCY = 64
+
+
+class AsyncAirflowAPI(AirflowAPI):
+    async def _request(self, method: str, endpoint: str, params: Optional[Dict] = None, json_data: Optional[Dict] = None) -> Dict:
+        url = f"{self.base_url}/api/v1{endpoint}"
+        try:
+            with track_call('airflow', self.credential_id):
+                response = await pool_for_loop().request(method, url, headers=self.auth_headers, params=params,
+                                                         json_data=json_data, timeout=AIRFLOW_REQUEST_TIMEOUT)
+                response.raise_for_status()
+            if response.body:
+                return {'success': True, 'data': response.json()}
+            return {'success': True, 'data': None}
+        except HTTPError as e:
+            error_msg = str(e)
+            try:
+                error_msg = e.response.json().get('detail', str(e))
+            except Exception:
+                pass
+            return {'success': False, 'error': error_msg, 'status_code': e.response.status}
+        except TimeoutError:
+            return {'success': False, 'error': f"Timed out after {AIRFLOW_REQUEST_TIMEOUT}s: {method} {url}"}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    async def call_many(self, calls: List, concurrency: Optional[int] = None) -> List[Dict]:
+        """
+        Run [(method name, kwargs), ...] concurrently; results come back in input order.
+        `concurrency` caps the calls in flight below the per-host connection limit.
+        """
+        limit = asyncio.Semaphore(concurrency) if concurrency else None
+
+        async def run(method_name, kwargs):
+            method = getattr(self, method_name)
+            if limit is None:
+                return await method(**kwargs)
+            async with limit:
+                return await method(**kwargs)
+        return await asyncio.gather(*(run(name, kwargs or {}) for name, kwargs in calls))
+
+    async def latest_dag_runs(self, dag_ids: List[str]) -> Dict[str, Dict]:
+        """{dag_id: list_dag_runs(limit=1) result} for every DAG, fetched concurrently."""
+        results = await self.call_many([('list_dag_runs', {'dag_id': dag_id, 'limit': 1}) for dag_id in dag_ids])
+        return dict(zip(dag_ids, results))
+
+    async def collect_task_logs(self, dag_id: str, dag_run_id: str) -> Dict:
+        """Task instances of a run with the logs of each task's latest try, fetched concurrently."""
+        instances = await self.list_task_instances(dag_id, dag_run_id)
+        if not instances.get('success'):
+            return instances
+        task_instances = (instances.get('data') or {}).get('task_instances', [])
+        logs = await self.call_many([('get_task_logs', {'dag_id': dag_id, 'dag_run_id': dag_run_id, 'task_id': ti['task_id'],
+                                                        'task_try_number': max(ti.get('try_number') or 1, 1)})
+                                     for ti in task_instances])
+        return {'success': True, 'data': [{**ti, 'logs': log.get('data') if log.get('success') else None,
+                                           'logs_error': None if log.get('success') else log.get('error')}
+                                          for ti, log in zip(task_instances, logs)]}
+
+
+class SyncAirflowAPI:
+    """Blocking facade: AsyncAirflowAPI's methods, each run to completion on the shared loop."""
+
+    def __init__(self, base_url: str, username: str, password: str, credential_id: Optional[int] = None):
+        self.api = AsyncAirflowAPI(base_url, username, password, credential_id=credential_id)
+        self.base_url = self.api.base_url
+        self.credential_id = credential_id
+
+    def __getattr__(self, name):
+        attr = getattr(self.api, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            return run_sync(attr(*args, **kwargs))
+        return call
+
+
+def plan_batch(operations):
+    """
+    Check the operations and resolve their ids (`id`, default the index as a string) and
+    `dependsOn` references (ids or indexes) into {index: [dependency indexes]}. Returns
+    (error message or None, deps).
+    """
+    ids = {}
+    for index, op in enumerate(operations):
+        if not isinstance(op, dict):
+            return f"Operation {index} must be an object", None
+        op_id = str(op.get('id', index))
+        if not isinstance(op.get('params') or {}, dict):
+            return f"Operation {op_id}: params must be an object", None
+        if op.get('timeout') is not None:
+            try:
+                valid_timeout = float(op['timeout']) > 0
+            except (TypeError, ValueError):
+                valid_timeout = False
+            if not valid_timeout:
+                return f"Operation {op_id}: timeout must be a positive number of seconds", None
+        if op_id in ids:
+            return f"Duplicate operation id '{op_id}'", None
+        ids[op_id] = index
+    deps = {}
+    for index, op in enumerate(operations):
+        depends_on = op.get('dependsOn') or []
+        if not isinstance(depends_on, list):
+            depends_on = [depends_on]
+        deps[index] = []
+        for ref in depends_on:
+            if str(ref) not in ids:
+                return f"Operation {op.get('id', index)} depends on unknown operation '{ref}'", None
+            deps[index].append(ids[str(ref)])
+    # Kahn's algorithm: anything left unordered is on a cycle
+    remaining = {index: len(d) for index, d in deps.items()}
+    dependents = {index: [] for index in deps}
+    for index, d in deps.items():
+        for dep in d:
+            dependents[dep].append(index)
+    ready = [index for index, count in remaining.items() if count == 0]
+    ordered = 0
+    while ready:
+        index = ready.pop()
+        ordered += 1
+        for dependent in dependents[index]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    if ordered < len(operations):
+        return "Operation dependencies contain a cycle", None
+    return None, deps
+
+async def run_batch(api: AsyncAirflowAPI, operations: List[Dict], deps: Dict[int, List[int]], concurrency: int = AIRFLOW_BATCH_CONCURRENCY,
+                    stop_on_error: bool = False, timeout: Optional[float] = None) -> List[Dict]:
+    """
+    Run AIRFLOW_OPERATIONS entries with at most `concurrency` in flight. An operation starts
+    once its dependencies succeeded and is skipped if one did not; with `stop_on_error`
+    the first failure also skips everything not yet started. Results are in input order
+    with `startedMs` (since the batch started) and `durationMs`.
+    """
+    limit = asyncio.Semaphore(max(1, concurrency))
+    finished = [asyncio.Event() for _ in operations]
+    results = [None] * len(operations)
+    batch_started = time.perf_counter()
+    first_failure = []
+
+    def skipped(index, reason):
+        op = operations[index]
+        return {'id': str(op.get('id', index)), 'operation': op.get('operation'), 'status': 'skipped',
+                'success': False, 'result': None, 'error': f"Skipped: {reason}", 'startedMs': None, 'durationMs': 0}
+
+    async def execute(index):
+        op = operations[index]
+        operation = op.get('operation')
+        entry = {'id': str(op.get('id', index)), 'operation': operation}
+        started = time.perf_counter()
+        entry['startedMs'] = round((started - batch_started) * 1000, 1)
+        op_timeout = float(op['timeout']) if op.get('timeout') is not None else timeout
+        try:
+            if operation not in AIRFLOW_OPERATIONS:
+                result = {'success': False, 'error': f'Unknown operation: {operation}'}
+            else:
+                method = getattr(api, AIRFLOW_OPERATIONS[operation]['method'], None)
+                if not method:
+                    result = {'success': False, 'error': f"Method not implemented: {AIRFLOW_OPERATIONS[operation]['method']}"}
+                else:
+                    result = await asyncio.wait_for(method(**(op.get('params') or {})), op_timeout)
+        except TimeoutError:
+            result = {'success': False, 'error': f"Timed out after {op_timeout}s", 'timedOut': True}
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        success = result.get('success', False)
+        entry.update({
+            'status': 'success' if success else ('timeout' if result.get('timedOut') else 'failed'),
+            'success': success,
+            'result': result.get('data') if success else None,
+            'error': None if success else result.get('error'),
+            'durationMs': round((time.perf_counter() - started) * 1000, 1)
+        })
+        return entry
+
+    async def run(index):
+        try:
+            for dep in deps[index]:
+                await finished[dep].wait()
+            failed_deps = [results[dep]['id'] for dep in deps[index] if results[dep]['status'] != 'success']
+            if failed_deps:
+                results[index] = skipped(index, f"dependency {', '.join(failed_deps)} did not succeed")
+                return
+            async with limit:
+                # Re-checked after waiting for a slot
+                if stop_on_error and first_failure:
+                    results[index] = skipped(index, f"stopOnError after operation {first_failure[0]} failed")
+                    return
+                results[index] = await execute(index)
+            if not results[index]['success']:
+                first_failure.append(results[index]['id'])
+        finally:
+            finished[index].set()
+
+    await asyncio.gather(*(run(index) for index in range(len(operations))))
+    return results
@@ -9,19 +9,39 @@ from datetime import datetime, timedelta
 from flask import request, jsonify, send_file
 from .storage import storage
 from .airflow_api import AirflowAPI, AIRFLOW_OPERATIONS
+from .airflow_async import AsyncAirflowAPI, AIRFLOW_BATCH_CONCURRENCY, AIRFLOW_BATCH_MAX_CONCURRENCY, plan_batch, run_batch
+from .async_http import run_sync
 from .utils import log, resolve_variables, get_ai
 
-def get_airflow_client(credential_id: int):
-    cred = storage.get_credential(credential_id)
-    if not cred or cred.get('type') != 'airflow':
+def build_airflow_client(cred):
+    if cred.get('type') != 'airflow':
         return None
     cred_data = cred.get('data', {})
     return AirflowAPI(
         base_url=cred_data.get('baseUrl', ''),
         username=cred_data.get('username', ''),
-        password=cred_data.get('password', '')
+        password=cred_data.get('password', ''),
+        credential_id=cred.get('id')
+    )
+
+def build_async_airflow_client(cred):
+    if cred.get('type') != 'airflow':
+        return None
+    cred_data = cred.get('data', {})
+    # Only for the fan-out routes (latest runs, batch), which run it on the shared event loop
+    return AsyncAirflowAPI(
+        base_url=cred_data.get('baseUrl', ''),
+        username=cred_data.get('username', ''),
+        password=cred_data.get('password', ''),
+        credential_id=cred.get('id')
     )
 
+def get_airflow_client(credential_id: int):
+    return storage.get_credential_artifact(int(credential_id), 'airflow_client', build_airflow_client)
+
+def get_async_airflow_client(credential_id: int):
+    return storage.get_credential_artifact(int(credential_id), 'airflow_async_client', build_async_airflow_client)
+
 def register_airflow_routes(app):
     @app.post('/api/airflow/mark-failed')
     def mark_failed():
@@ -90,7 +110,7 @@ If the user's request cannot be mapped to an operation, return:
             )
             
             raw_content = response.choices[0].message.content or "{}"
-            log(f"NL Airflow Response: {raw_content}")
+            log(f"NL Airflow Response: {raw_content}", level='debug')
             parsed = json.loads(raw_content)
             
             if parsed.get('operation') is None:
@@ -134,7 +154,7 @@ If the user's request cannot be mapped to an operation, return:
             })
             
         except Exception as e:
-            log(f"NL Airflow Error: {e}")
+            log(f"NL Airflow Error: {e}", level='error')
             return jsonify({
                 'success': False,
                 'error': str(e)
@@ -190,51 +210,68 @@ If the user's request cannot be mapped to an operation, return:
                 'error': result.get('error') if not result.get('success') else None
             })
         except Exception as e:
-            log(f"Airflow operation error: {e}")
+            log(f"Airflow operation error: {e}", level='error')
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.post('/api/airflow/dag-runs/latest')
+    def latest_dag_runs():
+        data = request.get_json() or {}
+        dag_ids = data.get('dagIds') or []
+        credential_id = data.get('credentialId')
+        
+        if not credential_id:
+            return jsonify({'success': False, 'error': 'No Airflow credential provided'}), 400
+        
+        airflow_client = get_async_airflow_client(int(credential_id))
+        if not airflow_client:
+            return jsonify({'success': False, 'error': 'Invalid Airflow credential'}), 400
+        
+        results = run_sync(airflow_client.latest_dag_runs(dag_ids))
+        runs = {}
+        for dag_id, result in results.items():
+            if result.get('success'):
+                dag_runs = (result.get('data') or {}).get('dag_runs', [])
+                runs[dag_id] = {'success': True, 'run': dag_runs[0] if dag_runs else None}
+            else:
+                runs[dag_id] = {'success': False, 'error': result.get('error')}
+        return jsonify({'success': all(r['success'] for r in runs.values()), 'runs': runs})
+
     @app.post('/api/airflow/batch')
     def batch_airflow_operations():
-        data = request.get_json()
+        data = request.get_json() or {}
         operations = data.get('operations', [])
         credential_id = data.get('credentialId')
         
         if not credential_id:
             return jsonify({'success': False, 'error': 'No Airflow credential provided'}), 400
         
-        airflow_client = get_airflow_client(int(credential_id))
+        if not isinstance(operations, list):
+            return jsonify({'success': False, 'error': 'operations must be a list'}), 400
+        
+        error, deps = plan_batch(operations)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        airflow_client = get_async_airflow_client(int(credential_id))
         if not airflow_client:
             return jsonify({'success': False, 'error': 'Invalid Airflow credential'}), 400
         
-        results = []
-        for op in operations:
-            operation = op.get('operation')
-            params = op.get('params', {})
-            
-            if operation not in AIRFLOW_OPERATIONS:
-                results.append({'success': False, 'error': f'Unknown operation: {operation}'})
-                continue
-            
-            op_config = AIRFLOW_OPERATIONS[operation]
-            method_name = op_config['method']
-            method = getattr(airflow_client, method_name, None)
-            
-            if not method:
-                results.append({'success': False, 'error': f'Method not implemented: {method_name}'})
-                continue
-            
-            try:
-                result = method(**params)
-                results.append({
-                    'success': result.get('success', False),
-                    'operation': operation,
-                    'result': result.get('data') if result.get('success') else None,
-                    'error': result.get('error') if not result.get('success') else None
-                })
-            except Exception as e:
-                results.append({'success': False, 'error': str(e)})
+        try:
+            concurrency = int(data['concurrency']) if data.get('concurrency') is not None else AIRFLOW_BATCH_CONCURRENCY
+            timeout = float(data['timeout']) if data.get('timeout') is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'concurrency must be an integer and timeout a number of seconds'}), 400
+        if concurrency < 1:
+            return jsonify({'success': False, 'error': 'concurrency must be at least 1'}), 400
+        if timeout is not None and timeout <= 0:
+            return jsonify({'success': False, 'error': 'timeout must be positive'}), 400
+        concurrency = min(concurrency, AIRFLOW_BATCH_MAX_CONCURRENCY)
+        started = time.time()
+        results = run_sync(run_batch(airflow_client, operations, deps, concurrency, bool(data.get('stopOnError')), timeout))
         
         return jsonify({
             'success': all(r.get('success') for r in results),
-            'results': results
+            'results': results,
+            'concurrency': concurrency,
+            'durationMs': int((time.time() - started) * 1000)
         })
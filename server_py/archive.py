@@ -0,0 +1,49 @@
+"""
+On-disk storage for compacted executions and the per-execution files written under /tmp.
+"""
+import os
+import re
+import glob
+import gzip
+import json
+
+ARCHIVE_DIR = os.environ.get('EXECUTION_ARCHIVE_DIR', os.path.join(os.getcwd(), 'execution_archive'))
+ARTIFACT_DIR = '/tmp'
+# Files written per execution as <prefix>_<execution id>_<node id>...
+ARTIFACT_PREFIXES = ('query_result', 'api_response', 'dag_log')
+ARTIFACT_PATTERN = re.compile(r'^(' + '|'.join(ARTIFACT_PREFIXES) + r')_(\d+)_')
+
+def archive_path(execution_id):
+    return os.path.join(ARCHIVE_DIR, f"execution_{execution_id}.json.gz")
+
+def write_archive(execution_id, payload):
+    """Write the archived logs/results of an execution atomically; returns the archive path."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = archive_path(execution_id)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        json.dump(payload, f, default=str)
+    os.replace(tmp_path, path)
+    return path
+
+def read_archive(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+def execution_artifact_paths(execution_id):
+    paths = []
+    for prefix in ARTIFACT_PREFIXES:
+        paths.extend(glob.glob(os.path.join(ARTIFACT_DIR, f"{prefix}_{execution_id}_*")))
+    return paths
+
+def remove_execution_files(execution_ids):
+    """Delete the /tmp artifacts and archive of each execution; returns the number of files removed."""
+    removed = 0
+    for execution_id in execution_ids:
+        for path in execution_artifact_paths(execution_id) + [archive_path(execution_id)]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
@@ -0,0 +1,163 @@
+"""
+Content-addressed store for execution outputs (Excel exports, downloaded files, DAG logs).
+
+Blobs are named by the SHA-256 of their content under ARTIFACT_STORE_DIR/<2 hex>/<hash>,
+so identical outputs from repeated runs are stored once. The `artifacts` table holds
+metadata and a reference count; `artifact_refs` records which execution node produced
+which blob. Node results carry the blob path (`excel_path`, `logs_path`, `path`) plus an
+`artifacts` map of {name: metadata}, and deleting an execution releases its references.
+Unreferenced blobs are removed by collect_garbage() once older than ARTIFACT_GC_GRACE.
+"""
+import os
+import time
+import hashlib
+import tempfile
+from .storage import storage
+
+ARTIFACT_STORE_DIR = os.environ.get('ARTIFACT_STORE_DIR', os.path.join(os.getcwd(), 'artifact_store'))
+# Unreferenced blobs are kept this long, so outputs reused soon after their execution is deleted are still there
+ARTIFACT_GC_GRACE = int(os.environ.get('ARTIFACT_GC_GRACE', 3600))
+
+def blob_path(sha256):
+    return os.path.join(ARTIFACT_STORE_DIR, sha256[:2], sha256)
+
+class BlobWriter:
+    """
+    File-like sink that hashes what is written to a temporary file; close() returns the
+    hash and commit() moves the file to its content address.
+    """
+
+    def __init__(self):
+        os.makedirs(ARTIFACT_STORE_DIR, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=ARTIFACT_STORE_DIR, suffix='.tmp')
+        self._file = os.fdopen(fd, 'wb')
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.sha256 = None
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        self.sha256 = self._hash.hexdigest()
+        return self.sha256
+
+    def commit(self):
+        """
+        Move the content to its address once the artifact row is recorded. An existing blob
+        is replaced too: the garbage collector may have tombstoned it and be removing it.
+        """
+        path = blob_path(self.sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self.tmp_path, path)
+        return path
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+def _record(writer, execution_id, node_id, name, content_type, filename):
+    # The row goes first so the garbage collector cannot delete the blob between the two steps
+    try:
+        sha256 = writer.close()
+        meta = storage.add_artifact(sha256, writer.size, content_type, execution_id, node_id, name, filename)
+        meta['path'] = writer.commit()
+    except Exception:
+        writer.abort()
+        raise
+    return meta
+
+def put_bytes(data, execution_id, node_id, name, content_type=None, filename=None):
+    """Store `data` (bytes or str) as the `name` output of an execution node; returns its metadata."""
+    writer = BlobWriter()
+    try:
+        writer.write(data)
+    except Exception:
+        writer.abort()
+        raise
+    return _record(writer, execution_id, node_id, name, content_type, filename)
+
+def put_stream(fill, execution_id, node_id, name, content_type=None, filename=None):
+    """Like put_bytes, but `fill(file_obj)` writes the content, e.g. sftp.getfo or s3.download_fileobj."""
+    writer = BlobWriter()
+    try:
+        fill(writer)
+    except Exception:
+        writer.abort()
+        raise
+    return _record(writer, execution_id, node_id, name, content_type, filename)
+
+def link_result_artifacts(execution_id, node_id, result):
+    """Reference the artifacts of a result reused from another execution (checkpoints, cache hits)."""
+    if not isinstance(result, dict):
+        return
+    for name, meta in (result.get('artifacts') or {}).items():
+        if isinstance(meta, dict) and meta.get('sha256') and os.path.exists(blob_path(meta['sha256'])):
+            storage.add_artifact(meta['sha256'], meta.get('size', 0), meta.get('contentType'), execution_id, node_id, name, meta.get('filename'))
+
+def execution_files(execution):
+    """
+    (node_id, name, path, filename) for every stored file of an execution, falling back to
+    the paths recorded in results for executions from before the artifact store.
+    """
+    files = []
+    seen = set()
+    for ref in storage.get_execution_artifacts(execution['id']):
+        path = blob_path(ref['sha256'])
+        if os.path.exists(path):
+            files.append((ref['nodeId'], ref['name'], path, ref['filename']))
+            seen.add((ref['nodeId'], ref['name']))
+    for node_id, result in (execution.get('results') or {}).items():
+        if not isinstance(result, dict):
+            continue
+        for name, key in (('excel', 'excel_path'), ('dag_log', 'logs_path'), ('download', 'path')):
+            path = result.get(key)
+            if (node_id, name) not in seen and isinstance(path, str) and os.path.exists(path):
+                files.append((node_id, name, path, os.path.basename(path)))
+    return files
+
+def read_range(sha256, start=0, length=None):
+    with open(blob_path(sha256), 'rb') as f:
+        f.seek(start)
+        return f.read() if length is None else f.read(length)
+
+def collect_garbage(now=None):
+    """
+    Delete blobs no execution references any more; returns (blobs removed, bytes freed).
+
+    Each blob is tombstoned in the database before its file is touched, and the file is
+    moved aside rather than deleted until the tombstone row is gone: if add_artifact claims
+    the blob back in between, the file is put back (or the writer has already re-created it).
+    """
+    now = now or time.time()
+    used_before = int((now - ARTIFACT_GC_GRACE) * 1000)
+    removed = freed = 0
+    for sha256, size in storage.get_unreferenced_artifacts(used_before):
+        if not storage.tombstone_artifact(sha256, used_before):
+            continue
+        path = blob_path(sha256)
+        doomed = f"{path}.{os.getpid()}.gc"
+        try:
+            os.replace(path, doomed)
+        except FileNotFoundError:
+            doomed = None
+        except OSError:
+            # Leave it for the next pass; the tombstone is retried as an unreferenced blob
+            continue
+        if storage.delete_artifact_tombstone(sha256):
+            if doomed:
+                os.remove(doomed)
+                removed += 1
+                freed += size
+        elif doomed:
+            os.replace(doomed, path)
+    return removed, freed
@@ -0,0 +1,371 @@
+"""
+Small asyncio HTTP/1.1 client for high fan-out calls (see airflow_async.py).
+
+Connections are kept alive and reused per (scheme, host, port). A semaphore per host
+bounds the requests in flight to one server (ASYNC_HTTP_PER_HOST) and a global one
+bounds them overall (ASYNC_HTTP_MAX_CONNECTIONS). Streams belong to an event loop, so
+each loop gets its own pool (pool_for_loop()).
+
+Thread-based code runs coroutines on a shared background loop with run_sync(); the
+caller's context variables (trace span, call target, log correlation) go with it.
+
+Only the standard library is used: request bodies are bytes, responses are read fully
+into memory, and Content-Length, chunked and read-until-close bodies are supported.
+Like requests, it honours the environment: HTTP(S)_PROXY/NO_PROXY (https through a
+CONNECT tunnel), REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE/SSL_CERT_FILE for certificate
+verification, follows redirects and accepts gzip/deflate responses.
+"""
+import os
+import ssl
+import gzip
+import json
+import time
+import zlib
+import base64
+import asyncio
+import threading
+import contextvars
+import weakref
+from collections import deque
+from urllib.parse import urlsplit, urlencode, urljoin, unquote
+from urllib.request import getproxies, proxy_bypass
+
+ASYNC_HTTP_PER_HOST = int(os.environ.get('ASYNC_HTTP_PER_HOST', 64))
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.environ.get('ASYNC_HTTP_MAX_CONNECTIONS', 256))
+# Idle keep-alive connections older than this are not reused (servers close them first)
+ASYNC_HTTP_IDLE_SECONDS = float(os.environ.get('ASYNC_HTTP_IDLE_SECONDS', 30))
+ASYNC_HTTP_TIMEOUT = float(os.environ.get('ASYNC_HTTP_TIMEOUT', 30))
+MAX_HEADER_LINE = 64 * 1024
+MAX_REDIRECTS = 30
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+class HTTPError(Exception):
+    def __init__(self, response):
+        kind = 'Client' if response.status < 500 else 'Server'
+        super().__init__(f"{response.status} {kind} Error: {response.reason} for url: {response.url}")
+        self.response = response
+
+
+class Response:
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.status_code = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.body)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HTTPError(self)
+
+
+class ProxyError(ConnectionError):
+    pass
+
+
+class TooManyRedirects(Exception):
+    pass
+
+
+def ssl_context_from_env():
+    """Default verification, or the CA bundle named by the variables requests reads."""
+    bundle = os.environ.get('REQUESTS_CA_BUNDLE') or os.environ.get('CURL_CA_BUNDLE') or os.environ.get('SSL_CERT_FILE')
+    if bundle and os.path.isdir(bundle):
+        return ssl.create_default_context(capath=bundle)
+    return ssl.create_default_context(cafile=bundle or None)
+
+
+def proxy_for(scheme, host):
+    """The proxy URL the environment sets for this scheme and host, or None."""
+    proxies = getproxies()
+    proxy = proxies.get(scheme) or proxies.get('all')
+    if not proxy or proxy_bypass(host):
+        return None
+    return proxy if '://' in proxy else f"http://{proxy}"
+
+
+def _proxy_headers(proxy):
+    parts = urlsplit(proxy)
+    if not parts.username:
+        return {}
+    credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+    return {'Proxy-Authorization': 'Basic ' + base64.b64encode(credentials.encode()).decode()}
+
+
+def _decode_body(payload, encoding):
+    encoding = encoding.lower()
+    if encoding in ('gzip', 'x-gzip'):
+        return gzip.decompress(payload)
+    if encoding == 'deflate':
+        try:
+            return zlib.decompress(payload)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header
+            return zlib.decompress(payload, -zlib.MAX_WBITS)
+    return payload
+
+
+class _Connection:
+    def __init__(self, reader, writer, proxy_headers=None):
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = time.monotonic()
+        self.reused = False
+        # Set for plain http through a proxy: requests use the absolute URL
+        self.proxy_headers = proxy_headers
+
+    def close(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+class AsyncHTTPPool:
+    def __init__(self, per_host=ASYNC_HTTP_PER_HOST, max_connections=ASYNC_HTTP_MAX_CONNECTIONS):
+        self.per_host = per_host
+        self.idle = {}
+        self.host_limits = {}
+        self.total_limit = asyncio.Semaphore(max_connections)
+        self.ssl_context = None
+        self.proxies = {}
+        self.stats = {'requests': 0, 'connectionsOpened': 0}
+
+    async def request(self, method, url, headers=None, params=None, json_data=None, body=None, timeout=ASYNC_HTTP_TIMEOUT,
+                      allow_redirects=True):
+        """
+        Send a request, following redirects, and return the final Response (any status);
+        raises on network errors and timeouts. `timeout` covers the whole exchange.
+        """
+        if params:
+            query = urlencode({k: v for k, v in params.items() if v is not None}, doseq=True)
+            if query:
+                url += ('&' if urlsplit(url).query else '?') + query
+        headers = dict(headers or {})
+        if json_data is not None:
+            body = json.dumps(json_data).encode()
+            headers.setdefault('Content-Type', 'application/json')
+        async with asyncio.timeout(timeout):
+            for _ in range(MAX_REDIRECTS + 1):
+                response = await self._send(method, url, headers, body)
+                location = response.headers.get('location')
+                if not allow_redirects or response.status not in REDIRECT_STATUSES or not location:
+                    return response
+                next_url = urljoin(url, location)
+                # Same rules as requests: 303 (and 301/302 after a POST) become a GET without
+                # a body, and credentials are not sent to another host
+                if (response.status == 303 and method != 'HEAD') or (response.status in (301, 302) and method == 'POST'):
+                    method, body = 'GET', None
+                    headers.pop('Content-Type', None)
+                if urlsplit(next_url).hostname != urlsplit(url).hostname:
+                    headers.pop('Authorization', None)
+                url = next_url
+        raise TooManyRedirects(f"Exceeded {MAX_REDIRECTS} redirects: {url}")
+
+    async def _send(self, method, url, headers, body):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        host_limit = self.host_limits.get(key)
+        if host_limit is None:
+            host_limit = self.host_limits[key] = asyncio.Semaphore(self.per_host)
+        async with host_limit, self.total_limit:
+            self.stats['requests'] += 1
+            while True:
+                connection = self._take_idle(key) or await self._open(key)
+                try:
+                    response, reusable = await self._exchange(connection, key, method, path, headers, body, url)
+                except (ConnectionError, asyncio.IncompleteReadError, _StaleConnection) as e:
+                    connection.close()
+                    # The server may drop an idle keep-alive connection just as it is reused;
+                    # nothing was answered on it, so retry on another one
+                    if connection.reused and not isinstance(e, asyncio.IncompleteReadError):
+                        continue
+                    raise
+                except BaseException:
+                    connection.close()
+                    raise
+                break
+        if reusable:
+            connection.idle_since = time.monotonic()
+            connection.reused = True
+            self.idle.setdefault(key, deque()).append(connection)
+        else:
+            connection.close()
+        return response
+
+    def _take_idle(self, key):
+        idle = self.idle.get(key)
+        now = time.monotonic()
+        while idle:
+            connection = idle.pop()
+            if now - connection.idle_since < ASYNC_HTTP_IDLE_SECONDS and not connection.reader.at_eof():
+                return connection
+            connection.close()
+        return None
+
+    def _ssl(self):
+        if self.ssl_context is None:
+            self.ssl_context = ssl_context_from_env()
+        return self.ssl_context
+
+    async def _open(self, key):
+        scheme, host, port = key
+        if key not in self.proxies:
+            self.proxies[key] = proxy_for(scheme, host)
+        proxy = self.proxies[key]
+        if proxy is None:
+            reader, writer = await asyncio.open_connection(host, port, ssl=self._ssl() if scheme == 'https' else None, limit=MAX_HEADER_LINE)
+            self.stats['connectionsOpened'] += 1
+            return _Connection(reader, writer)
+
+        proxy_parts = urlsplit(proxy)
+        proxy_tls = proxy_parts.scheme == 'https'
+        reader, writer = await asyncio.open_connection(
+            proxy_parts.hostname, proxy_parts.port or (443 if proxy_tls else 80),
+            ssl=self._ssl() if proxy_tls else None, limit=MAX_HEADER_LINE)
+        self.stats['connectionsOpened'] += 1
+        if scheme != 'https':
+            return _Connection(reader, writer, proxy_headers=_proxy_headers(proxy))
+        try:
+            lines = [f"CONNECT {host}:{port} HTTP/1.1", f"Host: {host}:{port}"]
+            lines += [f"{name}: {value}" for name, value in _proxy_headers(proxy).items()]
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+            status_line = (await reader.readline()).decode('latin-1')
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            status = status_line.split(' ', 2)[1] if status_line.count(' ') else ''
+            if status != '200':
+                raise ProxyError(f"Proxy {proxy_parts.hostname} refused CONNECT {host}:{port}: {status_line.strip()}")
+            await writer.start_tls(self._ssl(), server_hostname=host)
+        except BaseException:
+            writer.close()
+            raise
+        return _Connection(reader, writer)
+
+    async def _exchange(self, connection, key, method, path, headers, body, url):
+        scheme, host, port = key
+        default_port = 443 if scheme == 'https' else 80
+        target = url if connection.proxy_headers is not None else path
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {host}" if port == default_port else f"Host: {host}:{port}",
+                 'Connection: keep-alive', 'Accept-Encoding: gzip, deflate']
+        lines += [f"{name}: {value}" for name, value in {**headers, **(connection.proxy_headers or {})}.items()]
+        if body or method in ('POST', 'PUT', 'PATCH'):
+            lines.append(f"Content-Length: {len(body or b'')}")
+        connection.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b''))
+        await connection.writer.drain()
+
+        reader = connection.reader
+        while True:
+            status_line = await reader.readline()
+            if not status_line:
+                raise _StaleConnection()
+            version, status, reason = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+            status = int(status)
+            response_headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                response_headers[name.strip().lower()] = value.strip()
+            # Skip interim responses such as 100 Continue
+            if status >= 200 or status == 101:
+                break
+
+        keep_alive = response_headers.get('connection', '').lower() != 'close' and version != 'HTTP/1.0'
+        if method == 'HEAD' or status in (204, 304):
+            payload = b''
+        elif 'chunked' in response_headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';', 1)[0].strip() or b'0', 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            payload = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            payload = await reader.readexactly(int(response_headers['content-length']))
+        else:
+            payload = await reader.read()
+            keep_alive = False
+        if payload and response_headers.get('content-encoding'):
+            payload = _decode_body(payload, response_headers['content-encoding'])
+        return Response(url, status, reason, response_headers, payload), keep_alive
+
+    async def close(self):
+        for idle in self.idle.values():
+            while idle:
+                idle.pop().close()
+
+
+class _StaleConnection(Exception):
+    """The connection was closed before any response byte arrived."""
+
+
+_pools = weakref.WeakKeyDictionary()
+
+def pool_for_loop(loop=None):
+    """The connection pool of the running (or given) event loop."""
+    loop = loop or asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = AsyncHTTPPool()
+    return pool
+
+
+class _LoopThread:
+    """A daemon thread running the event loop that run_sync() submits to."""
+
+    def __init__(self):
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def get_loop(self):
+        if self.loop is None:
+            with self.lock:
+                if self.loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name='async-http', daemon=True).start()
+                    self.loop = loop
+        return self.loop
+
+    def run(self, coro, timeout=None):
+        loop = self.get_loop()
+        context = contextvars.copy_context()
+        done = threading.Event()
+        tasks = []
+
+        def start():
+            task = loop.create_task(coro, context=context)
+            task.add_done_callback(lambda _: done.set())
+            tasks.append(task)
+        loop.call_soon_threadsafe(start)
+        if not done.wait(timeout):
+            loop.call_soon_threadsafe(lambda: tasks and tasks[0].cancel())
+            raise TimeoutError(f"Coroutine did not finish within {timeout}s")
+        return tasks[0].result()
+
+
+_loop_thread = _LoopThread()
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the shared background loop in a copy of the caller's context and wait for it."""
+    return _loop_thread.run(coro, timeout)
@@ -0,0 +1,108 @@
+"""
+Helpers for the bulk import endpoints. Bodies are either a JSON array (or {"items": [...]})
+or NDJSON (one object per line, Content-Type application/x-ndjson), which is read
+incrementally. Items are validated, then written in batched transactions of
+BULK_BATCH_SIZE; every item gets its own result entry in request order.
+
+Validation is cheap pure-Python work that would not gain from threads under the GIL, so it
+runs inline as items stream in rather than on a pool. Items with an `id` are partial
+updates and only the fields they carry are checked.
+"""
+import os
+import json
+from flask import request
+
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 200))
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+def iter_bulk_items():
+    """Yield (index, item, error) for every object in the request body."""
+    if request.mimetype in NDJSON_TYPES:
+        index = 0
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield index, json.loads(line), None
+            except ValueError as e:
+                yield index, None, f"Invalid JSON: {e}"
+            index += 1
+        return
+
+    body = request.get_json(silent=True)
+    items = body.get('items') if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise ValueError('Body must be a JSON array, {"items": [...]} or NDJSON')
+    for index, item in enumerate(items):
+        yield index, item, None
+
+def _check_name(item):
+    """`name` is required for new rows; partial updates by `id` may leave it out."""
+    if 'name' not in item and item.get('id') is not None:
+        return None
+    if not isinstance(item.get('name'), str) or not item['name'].strip():
+        return 'name is required'
+    return None
+
+def validate_workflow(item):
+    if not isinstance(item, dict):
+        return 'Item must be an object'
+    error = _check_name(item)
+    if error:
+        return error
+    nodes = item.get('nodes', [])
+    if not isinstance(nodes, list) or not isinstance(item.get('edges', []), list):
+        return 'nodes and edges must be arrays'
+    node_ids = [node.get('id') for node in nodes if isinstance(node, dict)]
+    if len(node_ids) != len(nodes):
+        return 'every node must be an object'
+    if len(set(node_ids)) != len(node_ids):
+        return 'node ids must be unique'
+    return None
+
+def validate_credential(item):
+    if not isinstance(item, dict):
+        return 'Item must be an object'
+    error = _check_name(item)
+    if error:
+        return error
+    if ('type' in item or item.get('id') is None) and (not isinstance(item.get('type'), str) or not item['type']):
+        return 'type is required'
+    if not isinstance(item.get('data', {}), dict):
+        return 'data must be an object'
+    return None
+
+def run_bulk(items, validate, save, upsert=False, batch_size=BULK_BATCH_SIZE):
+    """
+    Validate items and pass valid ones to `save(batch, upsert)` in batches, where a batch is a
+    list of (index, item) and `save` returns one result dict per entry.
+    """
+    results = []
+    batch = []
+
+    def flush():
+        if not batch:
+            return
+        try:
+            results.extend(save(list(batch), upsert))
+        except Exception as e:
+            # The whole batch was rolled back
+            results.extend({'index': index, 'status': 'error', 'error': str(e)} for index, _ in batch)
+        batch.clear()
+
+    for index, item, error in items:
+        error = error or validate(item)
+        if error:
+            results.append({'index': index, 'status': 'error', 'error': error})
+            continue
+        batch.append((index, item))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    results.sort(key=lambda result: result['index'])
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return {'results': results, 'summary': summary}
@@ -0,0 +1,133 @@
+import time
+import threading
+from collections import deque
+
+CHANNEL_HISTORY = 5000
+CLOSED_CHANNEL_TTL = 300
+
+class _Channel:
+    def __init__(self, history):
+        self.cond = threading.Condition()
+        self.events = deque(maxlen=history)
+        self.seq = 0
+        self.status = None
+        self.closed_at = None
+
+class ExecutionEventBus:
+    """
+    In-process pub/sub for live execution progress. Each execution gets a channel with
+    a monotonically increasing sequence number and a bounded replay buffer, so
+    subscribers can resume from the last sequence they saw.
+    """
+
+    def __init__(self, history=CHANNEL_HISTORY):
+        self._history = history
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def _channel(self, execution_id, create=True):
+        with self._lock:
+            channel = self._channels.get(execution_id)
+            if channel is None and create:
+                self._purge_closed()
+                channel = self._channels[execution_id] = _Channel(self._history)
+            return channel
+
+    def _purge_closed(self):
+        cutoff = time.time() - CLOSED_CHANNEL_TTL
+        for execution_id in [k for k, c in self._channels.items() if c.closed_at and c.closed_at < cutoff]:
+            del self._channels[execution_id]
+
+    def is_live(self, execution_id):
+        return self._channel(execution_id, create=False) is not None
+
+    def publish(self, execution_id, event_type, data):
+        channel = self._channel(execution_id)
+        with channel.cond:
+            channel.seq += 1
+            channel.events.append((channel.seq, event_type, data))
+            channel.cond.notify_all()
+            return channel.seq
+
+    def publish_status(self, execution_id, status):
+        channel = self._channel(execution_id)
+        if channel.status == status:
+            return
+        channel.status = status
+        self.publish(execution_id, 'status', {'status': status})
+        if status in ('completed', 'failed'):
+            with channel.cond:
+                channel.closed_at = time.time()
+                channel.cond.notify_all()
+
+    def log_position(self, execution_id, log_count):
+        """
+        Sequence to read after so that a stream resumed from a log cursor (`log_count`
+        entries delivered) continues with log entry `log_count`: the event that published
+        entry `log_count - 1`, or the one just before the event publishing entry `log_count`.
+        0 for a fresh channel. None if the channel does not exist or neither event is
+        in the replay buffer.
+        """
+        channel = self._channel(execution_id, create=False)
+        if channel is None:
+            return None
+        with channel.cond:
+            if log_count <= 0 and (not channel.events or channel.events[0][0] == 1):
+                return 0
+            for seq, event_type, data in channel.events:
+                if event_type != 'log':
+                    continue
+                if data.get('index') == log_count - 1:
+                    return seq
+                if data.get('index') == log_count:
+                    return seq - 1
+            return None
+
+    def is_closed(self, execution_id):
+        """True once the execution reached a terminal status (or has no channel)."""
+        channel = self._channel(execution_id, create=False)
+        return channel is None or channel.closed_at is not None
+
+    def read(self, execution_id, after=0, timeout=15):
+        """
+        Wait up to `timeout` for events newer than `after`.
+        Returns (events, closed, truncated); truncated means events after `after`
+        have already been dropped from the replay buffer.
+        """
+        channel = self._channel(execution_id, create=False)
+        if channel is None:
+            return [], True, False
+        with channel.cond:
+            if channel.seq <= after and not channel.closed_at:
+                channel.cond.wait(timeout)
+            events = [event for event in channel.events if event[0] > after]
+            truncated = bool(channel.events) and channel.events[0][0] > after + 1
+            return events, channel.closed_at is not None, truncated
+
+class ExecutionLogs(list):
+    """Execution log list that publishes every appended entry to the event bus."""
+
+    def __init__(self, execution_id, iterable=()):
+        super().__init__(iterable)
+        self.execution_id = execution_id
+
+    def append(self, entry):
+        super().append(entry)
+        event_bus.publish(self.execution_id, 'log', {'index': len(self) - 1, **entry})
+
+class ExecutionResults(dict):
+    """Per-node results that publish a node state transition whenever a node's entry changes."""
+
+    def __init__(self, execution_id, iterable=()):
+        super().__init__(iterable)
+        self.execution_id = execution_id
+
+    def __setitem__(self, node_id, result):
+        super().__setitem__(node_id, result)
+        if isinstance(result, dict):
+            event = {'nodeId': node_id, 'status': result.get('status')}
+            if result.get('error'):
+                event['error'] = result['error']
+            event_bus.publish(self.execution_id, 'node', event)
+
+event_bus = ExecutionEventBus()
@@ -0,0 +1,426 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from .storage import storage
+from .utils import log
+from .nodes.registry import run_node
+from .nodes.airflow_node import get_airflow_connection, AIRFLOW_TIMEOUT, AIRFLOW_POLL_INTERVAL
+from .http_client import get_session
+from .events import ExecutionLogs, ExecutionResults, event_bus
+from .result_cache import run_cached, context_delta, fingerprint
+from .artifacts import link_result_artifacts
+from .metrics import NODE_DURATION, NODE_THREADS_ABANDONED, call_target, register_collector
+from .tracing import span, open_span, close_span, set_span_status, trace_execution
+from .profiling import execution_profiling_mode, profiling_session
+from .log_pipeline import correlation
+
+# 'inline' runs executions on a bounded thread pool inside the web process; 'queue' only
+# records them as pending and leaves them to a separate `python -m server_py.worker` process.
+EXECUTION_MODE = os.environ.get('EXECUTION_MODE', 'inline')
+EXECUTION_WORKERS = int(os.environ.get('EXECUTION_WORKERS', 16))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 4))
+
+# Concurrent executions watching the same DAG share one Airflow poll per interval
+DAG_STATE_CACHE_SECONDS = float(os.environ.get('DAG_STATE_CACHE_SECONDS', 5))
+WAIT_LOG_REPEAT_SECONDS = 60
+_dag_state_cache = {}
+_dag_state_lock = threading.Lock()
+
+# Executions this process has queued or is running get their heartbeat_at refreshed every
+# EXECUTION_HEARTBEAT_INTERVAL seconds. Unfinished executions without one for
+# STALE_EXECUTION_SECONDS were left behind by a process that crashed or restarted, and are
+# failed so they stop blocking their workflow's schedules.
+EXECUTION_HEARTBEAT_INTERVAL = float(os.environ.get('EXECUTION_HEARTBEAT_INTERVAL', 30))
+STALE_EXECUTION_SECONDS = float(os.environ.get('STALE_EXECUTION_SECONDS', 300))
+_owned_executions = set()
+_heartbeat_lock = threading.Lock()
+_heartbeat_pid = None
+
+_execution_pool = None
+_execution_pool_lock = threading.Lock()
+
+def get_execution_pool():
+    global _execution_pool
+    if _execution_pool is None:
+        with _execution_pool_lock:
+            if _execution_pool is None:
+                _execution_pool = ThreadPoolExecutor(max_workers=EXECUTION_WORKERS, thread_name_prefix='execution')
+    return _execution_pool
+
+def _collect_execution_pool_metrics():
+    pool = _execution_pool
+    if pool is None:
+        return []
+    return [
+        ('execution_pool_size', 'gauge', 'Execution worker threads', [({}, pool._max_workers)]),
+        ('execution_pool_queue_depth', 'gauge', 'Executions waiting for a worker thread', [({}, pool._work_queue.qsize())])
+    ]
+
+register_collector(_collect_execution_pool_metrics)
+
+def own_execution(execution_id):
+    with _heartbeat_lock:
+        _owned_executions.add(execution_id)
+    start_heartbeat()
+
+def release_execution(execution_id):
+    with _heartbeat_lock:
+        _owned_executions.discard(execution_id)
+
+def recover_stale_executions(now=None):
+    """Fail unfinished executions no live process is responsible for; returns their ids."""
+    stale_before = int(((now or time.time()) - STALE_EXECUTION_SECONDS) * 1000)
+    # Pending executions wait for the worker process in queue mode; only claimed ones have an owner
+    stale = storage.get_stale_execution_ids(stale_before, include_pending=EXECUTION_MODE != 'queue')
+    with _heartbeat_lock:
+        stale = [execution_id for execution_id in stale if execution_id not in _owned_executions]
+    for execution_id in stale:
+        log(f"Execution {execution_id} has had no heartbeat for {STALE_EXECUTION_SECONDS:.0f}s; marking it failed", level='warning')
+        storage.fail_execution(execution_id, f"interrupted: the process running it stopped (no heartbeat for {STALE_EXECUTION_SECONDS:.0f}s)")
+    return stale
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(EXECUTION_HEARTBEAT_INTERVAL)
+        try:
+            with _heartbeat_lock:
+                owned = list(_owned_executions)
+            if owned:
+                storage.touch_executions(owned)
+            recover_stale_executions()
+        except Exception as e:
+            log(f"Execution heartbeat failed: {e}", level='error')
+
+def start_heartbeat():
+    """Start this process's heartbeat thread, which also recovers stale executions; idempotent."""
+    global _heartbeat_pid
+    with _heartbeat_lock:
+        # A forked child has no heartbeat thread even if its parent started one
+        if _heartbeat_pid == os.getpid():
+            return
+        _heartbeat_pid = os.getpid()
+    threading.Thread(target=_heartbeat_loop, name='execution-heartbeat', daemon=True).start()
+
+def get_dag_state(dag_id, base_url, auth_headers):
+    key = (base_url, dag_id)
+    with _dag_state_lock:
+        cached = _dag_state_cache.get(key)
+    if cached and time.time() - cached[0] < DAG_STATE_CACHE_SECONDS:
+        return cached[1]
+    state = fetch_dag_state(dag_id, base_url, auth_headers)
+    with _dag_state_lock:
+        _dag_state_cache[key] = (time.time(), state)
+    return state
+
+def fetch_dag_state(dag_id, base_url, auth_headers):
+    try:
+        response = get_session().get(
+            f"{base_url}/api/v1/dags/{dag_id}/dagRuns",
+            params={'order_by': '-execution_date', 'limit': 1},
+            headers=auth_headers,
+            timeout=AIRFLOW_TIMEOUT
+        )
+        response.raise_for_status()
+        dag_runs = response.json().get('dag_runs', [])
+        if dag_runs:
+            return dag_runs[0].get('state', 'unknown')
+        return 'no_runs'
+    except Exception as e:
+        log(f"Error checking DAG state for {dag_id}: {e}", level='warning', rate_key=f"dag-state:{dag_id}")
+        return 'unknown'
+
+def wait_for_dags_to_complete(dag_infos, logs, execution_id, storage):
+    max_wait_time = 3600
+    poll_interval = AIRFLOW_POLL_INTERVAL
+    elapsed = 0
+    # Repeat an unchanged "DAG X is running" line only every WAIT_LOG_REPEAT_SECONDS
+    last_logged = (None, None, -WAIT_LOG_REPEAT_SECONDS)
+    
+    while elapsed < max_wait_time:
+        all_complete = True
+        for dag_info in dag_infos:
+            dag_id = dag_info['dag_id']
+            base_url = dag_info['base_url']
+            auth_headers = dag_info['auth_headers']
+            
+            if not base_url:
+                continue
+            
+            with call_target('airflow', dag_info.get('credential_id')):
+                state = get_dag_state(dag_id, base_url, auth_headers)
+            running_states = ['running', 'queued', 'scheduled', 'up_for_retry', 'up_for_reschedule', 'restarting', 'deferred']
+            
+            if state.lower() in running_states:
+                all_complete = False
+                if last_logged[:2] != (dag_id, state) or elapsed - last_logged[2] >= WAIT_LOG_REPEAT_SECONDS:
+                    last_logged = (dag_id, state, elapsed)
+                    logs.append({
+                        'timestamp': datetime.now().isoformat(),
+                        'level': 'INFO',
+                        'message': f"DAG {dag_id} is currently {state}. Waiting for it to reach a terminal state..."
+                    })
+                    storage.update_execution(execution_id, 'waiting', logs)
+                break
+        
+        if all_complete:
+            return True
+        
+        with span('wait', 'poll'):
+            time.sleep(poll_interval)
+        elapsed += poll_interval
+    
+    logs.append({
+        'timestamp': datetime.now().isoformat(),
+        'level': 'ERROR',
+        'message': f"Timeout waiting for DAGs to reach a terminal state after {max_wait_time} seconds"
+    })
+    return False
+
+def collect_dag_infos_from_workflow(nodes, storage):
+    dag_infos = []
+    for node in nodes:
+        node_data = node.get('data', {})
+        node_type = node_data.get('type')
+        
+        if node_type in ['airflow_trigger', 'airflow_log_check']:
+            config = node_data.get('config', {})
+            dag_id = config.get('dagId', '')
+            credential_id = config.get('credentialId')
+            
+            base_url, auth_headers = get_airflow_connection(storage, credential_id)
+            
+            if dag_id and base_url:
+                dag_infos.append({
+                    'dag_id': dag_id,
+                    'base_url': base_url,
+                    'auth_headers': auth_headers,
+                    'credential_id': credential_id
+                })
+    return dag_infos
+
+def execute_workflow_async(execution_id, workflow_id):
+    with correlation(executionId=execution_id), trace_execution(execution_id, lambda trace: storage.save_trace(execution_id, trace)):
+        plan = storage.get_workflow_plan(workflow_id)
+        mode = execution_profiling_mode(plan.workflow.get('settings') if plan else None)
+        if not mode:
+            _run_workflow(execution_id, workflow_id)
+            return
+        with profiling_session('execution', f"execution {execution_id}", mode, storage.save_profile,
+                               execution_id=execution_id, workflow_id=workflow_id):
+            _run_workflow(execution_id, workflow_id)
+
+def _run_workflow(execution_id, workflow_id):
+    plan = storage.get_workflow_plan(workflow_id)
+    if not plan:
+        return
+    
+    logs = ExecutionLogs(execution_id)
+    results = ExecutionResults(execution_id)
+    nodes = plan.nodes
+    
+    # A resumed execution reuses the checkpoints of the execution it was resumed from
+    execution = storage.get_execution(execution_id, include_logs=False)
+    params = (execution.get('params') if execution else None) or {}
+    resumed_from = execution.get('resumedFrom') if execution else None
+    checkpoints = storage.get_checkpoints(resumed_from) if resumed_from else {}
+    if resumed_from:
+        logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Resuming execution {resumed_from} ({len(checkpoints)} checkpointed nodes)"})
+    
+    logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': 'Checking if any involved DAGs are currently running...'})
+    storage.update_execution(execution_id, 'checking', logs)
+    
+    dag_infos = collect_dag_infos_from_workflow([n for n in nodes if n.get('id') not in checkpoints], storage)
+    
+    if dag_infos:
+        with span('preflight', 'preflight', dags=len(dag_infos)) as preflight:
+            dags_ready = wait_for_dags_to_complete(dag_infos, logs, execution_id, storage)
+            if not dags_ready:
+                set_span_status(preflight, 'timeout')
+        if not dags_ready:
+            logs.append({'timestamp': datetime.now().isoformat(), 'level': 'ERROR', 'message': 'Workflow aborted: DAGs did not complete in time'})
+            storage.update_execution(execution_id, 'failed', logs, results)
+            return
+    
+    logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': 'Starting workflow execution...'})
+    storage.update_execution(execution_id, 'running', logs)
+    
+    # Batch parameters seed the context so templates like {{region}} resolve per run
+    execution_context = dict(params)
+    
+    for warning in plan.warnings:
+        logs.append({'timestamp': datetime.now().isoformat(), 'level': 'WARN', 'message': warning})
+    
+    current_nodes = list(plan.roots)
+    visited = set()
+    executed = set()
+    assertion_failed = False
+    
+    while current_nodes and not assertion_failed:
+        next_batch = []
+        for node in current_nodes:
+            node_id = node.get('id')
+            if node_id in visited: continue
+            visited.add(node_id)
+            
+            node_data = node.get('data', {})
+            node_type = node_data.get('type')
+            config = node_data.get('config', {})
+            config_hash = fingerprint(config)
+            upstream_ids = plan.upstream_ids(node_id)
+            
+            # Reuse a checkpoint only if the node is unchanged and none of its inputs were recomputed
+            checkpoint = checkpoints.get(node_id)
+            if checkpoint and checkpoint['configHash'] == config_hash and not executed.intersection(upstream_ids):
+                execution_context.update(checkpoint['context'])
+                storage.save_checkpoint(execution_id, node_id, config_hash, checkpoint['result'], checkpoint['context'])
+                link_result_artifacts(execution_id, node_id, checkpoint['result'])
+                logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Reusing checkpointed result of node {node_data.get('label')} from execution {resumed_from}"})
+                results[node_id] = {**checkpoint['result'], 'checkpoint': resumed_from}
+                next_batch.extend(plan.next_nodes(node_id, 'output' if node_type == 'condition' else None))
+                continue
+            executed.add(node_id)
+            
+            logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Executing node {node_data.get('label')} ({node_type})..."})
+            results[node_id] = {'status': 'running'}
+            storage.update_execution(execution_id, 'running', logs, results)
+            
+            output_handle = 'output'
+            thread_abandoned = False
+            node_started = time.perf_counter()
+            node_span = open_span(node_data.get('label') or node_id, 'node', nodeId=node_id, type=node_type)
+            try:
+                if node_id in plan.config_errors:
+                    raise Exception(f"Invalid config: {'; '.join(plan.config_errors[node_id])}")
+                retries = int(config.get('retries', 0))
+                retry_delay = int(config.get('retryDelay', 5))
+                # No default: nodes such as airflow_trigger bound their own waits, and a timed-out
+                # node's thread keeps running (and holding its pool slot) after the node fails
+                timeout = float(config['timeout']) if config.get('timeout') else None
+                
+                def run_with_retry(func, *args, **kwargs):
+                    last_exc = None
+                    for attempt in range(retries + 1):
+                        try:
+                            return func(*args, **kwargs)
+                        except FutureTimeoutError:
+                            # The attempt is still running in its pool thread; a retry would run it twice
+                            raise
+                        except Exception as e:
+                            last_exc = e
+                            if attempt < retries:
+                                logs.append({'timestamp': datetime.now().isoformat(), 'level': 'WARN', 'message': f"Attempt {attempt + 1} failed: {e}. Retrying in {retry_delay}s..."})
+                                with span(f"retry delay after attempt {attempt + 1}", 'retry', error=str(e)):
+                                    time.sleep(retry_delay)
+                    raise last_exc
+
+                node_class = plan.node_classes[node_id]
+                if node_class:
+                    node_instance = node_class(config, execution_context, logs, storage, execution_id, node_id=node_id, workflow_nodes=nodes)
+                    context_before = dict(execution_context)
+                    try:
+                        with call_target(node_class.service, config.get('credentialId')):
+                            node_result = run_cached(node_instance, node_type, upstream_ids, lambda: run_with_retry(run_node, node_instance, timeout=timeout))
+                    except FutureTimeoutError:
+                        thread_abandoned = True
+                        NODE_THREADS_ABANDONED.inc(node_type=node_type)
+                        raise Exception(f"Node timed out after {timeout} seconds; its worker thread could not be cancelled and was abandoned")
+                    results[node_id] = node_result
+                    if node_result.get('status') == 'failure':
+                        assertion_failed = True
+                        break
+                    storage.save_checkpoint(execution_id, node_id, config_hash, node_result, context_delta(context_before, execution_context))
+                    
+                next_batch.extend(plan.next_nodes(node_id, output_handle if node_type == 'condition' else None))
+            except Exception as e:
+                logs.append({'timestamp': datetime.now().isoformat(), 'level': 'ERROR', 'message': f"Error: {e}"})
+                results[node_id] = {'status': 'failure', 'error': str(e)}
+                if thread_abandoned:
+                    results[node_id]['threadAbandoned'] = True
+                assertion_failed = True
+                break
+            finally:
+                close_span(node_span, results[node_id].get('status'))
+                NODE_DURATION.observe(time.perf_counter() - node_started, node_type=node_type, status=results[node_id].get('status'))
+            
+            storage.update_execution(execution_id, 'running', logs, results)
+        current_nodes = next_batch
+    
+    final_status = 'failed' if assertion_failed else 'completed'
+    logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO' if not assertion_failed else 'ERROR', 'message': f'Workflow {final_status}.'})
+    storage.update_execution(execution_id, final_status, logs, results)
+
+def run_execution(execution_id, workflow_id):
+    try:
+        execute_workflow_async(execution_id, workflow_id)
+    except Exception as e:
+        log(f"Execution {execution_id} crashed: {e}", level='error')
+        storage.fail_execution(execution_id, str(e))
+    finally:
+        release_execution(execution_id)
+
+def start_execution(workflow_id, resumed_from=None, params=None):
+    """
+    Create an execution for the workflow and schedule it according to EXECUTION_MODE.
+    With `resumed_from`, successful nodes of that execution are reused from their checkpoints.
+    """
+    return dispatch_execution(storage.create_execution(workflow_id, resumed_from=resumed_from, params=params))
+
+def dispatch_execution(execution):
+    """Run a newly created execution on the pool, or leave it pending for the worker in queue mode."""
+    if EXECUTION_MODE != 'queue':
+        # Open the event channel now so stream subscribers attach to it rather than polling
+        event_bus.publish_status(execution['id'], execution['status'])
+        own_execution(execution['id'])
+        get_execution_pool().submit(run_execution, execution['id'], execution['workflowId'])
+    return execution
+
+def dispatch_batch(execution_ids, workflow_id, concurrency):
+    """Feed a batch's executions to the shared execution pool, at most `concurrency` at a time."""
+    slots = threading.Semaphore(concurrency)
+    for execution_id in execution_ids:
+        slots.acquire()
+        future = get_execution_pool().submit(run_execution, execution_id, workflow_id)
+        future.add_done_callback(lambda _: slots.release())
+
+def start_batch(workflow_id, param_sets, concurrency=BATCH_CONCURRENCY):
+    """
+    Run the workflow once per parameter set. In queue mode the executions are only recorded
+    as pending and the worker's slot count bounds concurrency instead.
+    """
+    batch = storage.create_batch(workflow_id, param_sets, concurrency)
+    execution_ids = [
+        storage.create_execution(workflow_id, params=params, batch_id=batch['id'])['id']
+        for params in param_sets
+    ]
+    if EXECUTION_MODE != 'queue':
+        for execution_id in execution_ids:
+            event_bus.publish_status(execution_id, 'pending')
+            own_execution(execution_id)
+        threading.Thread(
+            target=dispatch_batch, args=(execution_ids, workflow_id, concurrency),
+            name=f"batch-{batch['id']}", daemon=True
+        ).start()
+    return batch
+
+def summarize_batch(batch):
+    """Aggregate a batch into a matrix of parameter sets x node statuses."""
+    rows = []
+    counts = {}
+    for index, execution in enumerate(batch['executions']):
+        counts[execution['status']] = counts.get(execution['status'], 0) + 1
+        rows.append({
+            'index': index,
+            'params': execution['params'],
+            'executionId': execution['id'],
+            'status': execution['status'],
+            'nodes': {node_id: result.get('status') for node_id, result in execution['results'].items() if isinstance(result, dict)}
+        })
+    finished = counts.get('completed', 0) + counts.get('failed', 0)
+    if finished < len(rows):
+        status = 'running'
+    else:
+        status = 'failed' if counts.get('failed') else 'completed'
+    summary = {k: v for k, v in batch.items() if k != 'executions'}
+    return {**summary, 'status': status, 'counts': counts, 'matrix': rows}
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import threading
+import contextvars
+import http.cookiejar
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from .metrics import record_call
+from .tracing import span, set_span_status
+
+CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 10))
+READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 120))
+POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 16))
+POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 64))
+
+# Bodies larger than this are spilled to disk instead of being held in memory
+STREAM_THRESHOLD = int(os.environ.get('HTTP_STREAM_THRESHOLD', 1024 * 1024))
+PREVIEW_BYTES = int(os.environ.get('HTTP_PREVIEW_BYTES', 4096))
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class _RejectCookies(http.cookiejar.CookiePolicy):
+    """The session is shared across workflows, so never carry cookies between requests."""
+    netscape = True
+    rfc2965 = False
+    hide_cookie2 = False
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+    def domain_return_ok(self, domain, request):
+        return False
+
+    def path_return_ok(self, path, request):
+        return False
+
+
+class _InstrumentedSession(requests.Session):
+    """Records every request under the service/credential of the node making it."""
+
+    def request(self, method, url, *args, **kwargs):
+        started = time.perf_counter()
+        with span(f"{method} {urlsplit(url).path}", 'call') as record:
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except Exception:
+                record_call(time.perf_counter() - started, failed=True)
+                raise
+            if response.status_code >= 400:
+                set_span_status(record, str(response.status_code))
+        record_call(time.perf_counter() - started, failed=response.status_code >= 400)
+        return response
+
+
+def get_session():
+    """Return the process-wide pooled session (keep-alive connections are reused across nodes)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = _InstrumentedSession()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.cookies.set_policy(_RejectCookies())
+                _session = session
+    return _session
+
+
+def get_timeout(config):
+    """Build a (connect, read) timeout tuple from node config, falling back to the server defaults."""
+    connect = config.get('connectTimeout') or CONNECT_TIMEOUT
+    read = config.get('readTimeout') or READ_TIMEOUT
+    return (float(connect), float(read))
+
+
+def _decode_preview(raw):
+    return raw[:PREVIEW_BYTES].decode('utf-8', errors='replace')
+
+
+def request_streamed(method, url, headers=None, data=None, timeout=None, spill_path=None,
+                     stream_threshold=STREAM_THRESHOLD):
+    """
+    Issue a request on the pooled session and read the body incrementally.
+    Small bodies are parsed (JSON when possible) and returned in full; bodies larger
+    than stream_threshold are written to spill_path and only a bounded preview is kept.
+    """
+    started = time.time()
+    response = get_session().request(method, url, headers=headers, data=data,
+                                     timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT), stream=True)
+    try:
+        response.raise_for_status()
+        buffer = bytearray()
+        size = 0
+        spill_file = None
+        try:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if spill_file is None:
+                    buffer.extend(chunk)
+                    if spill_path and len(buffer) > stream_threshold:
+                        spill_file = open(spill_path, 'wb')
+                        spill_file.write(buffer)
+                        buffer = buffer[:PREVIEW_BYTES]
+                else:
+                    spill_file.write(chunk)
+        finally:
+            if spill_file:
+                spill_file.close()
+
+        result = {
+            'status_code': response.status_code,
+            'size': size,
+            'elapsed_ms': int((time.time() - started) * 1000)
+        }
+        if spill_file:
+            result.update({'truncated': True, 'body_path': spill_path, 'preview': _decode_preview(bytes(buffer))})
+            return result
+
+        body = bytes(buffer)
+        try:
+            result['data'] = json.loads(body) if body else None
+        except ValueError:
+            result['data'] = body.decode(response.encoding or 'utf-8', errors='replace')
+        result['truncated'] = False
+        return result
+    finally:
+        response.close()
+
+
+def preview_of(result):
+    """Return the part of a request_streamed result that is safe to persist in execution results."""
+    if result.get('truncated'):
+        return {'preview': result['preview'], 'body_path': result['body_path'], 'size': result['size']}
+    data = result.get('data')
+    if result.get('size', 0) > PREVIEW_BYTES:
+        text = data if isinstance(data, str) else json.dumps(data, default=str)
+        return {'preview': text[:PREVIEW_BYTES], 'size': result['size']}
+    return {'data': data}
+
+
+def run_batch(request_specs, concurrency=8, timeout=None, spill_path_for=None):
+    """
+    Run a list of request specs ({method, url, headers, body}) concurrently with at most
+    `concurrency` requests in flight. Returns per-request status entries in input order.
+    """
+    def run_one(index, spec):
+        entry = {'index': index, 'method': spec['method'], 'url': spec['url']}
+        try:
+            result = request_streamed(
+                spec['method'], spec['url'], headers=spec.get('headers'), data=spec.get('body') or None,
+                timeout=timeout, spill_path=spill_path_for(index) if spill_path_for else None
+            )
+            entry.update({'ok': True, 'status_code': result['status_code'], 'elapsed_ms': result['elapsed_ms']})
+            entry.update(preview_of(result))
+        except requests.exceptions.HTTPError as e:
+            entry.update({'ok': False, 'status_code': e.response.status_code if e.response is not None else None, 'error': str(e)})
+        except Exception as e:
+            entry.update({'ok': False, 'status_code': None, 'error': str(e)})
+        return entry
+
+    if not request_specs:
+        return []
+    workers = max(1, min(int(concurrency), len(request_specs)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-batch') as pool:
+        # Each request runs in a copy of the caller's context so it joins the caller's trace
+        return list(pool.map(lambda args: contextvars.copy_context().run(run_one, *args), enumerate(request_specs)))
@@ -0,0 +1,59 @@
+import time
+import types
+import importlib
+import threading
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a heavy SDK that is only imported on first attribute access.
+    Importing one of these at module level costs nothing at startup.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__['_module'] = module
+        return module
+
+    @property
+    def is_loaded(self):
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+boto3 = LazyModule('boto3')
+paramiko = LazyModule('paramiko')
+openai = LazyModule('openai')
+git = LazyModule('git')
+
+HEAVY_MODULES = [boto3, paramiko, openai, git]
+
+def warm_up(modules=None, log_fn=None):
+    """Import the heavy SDKs in a background thread; returns the thread."""
+    def run():
+        for module in modules or HEAVY_MODULES:
+            started = time.time()
+            try:
+                module._load()
+                if log_fn:
+                    log_fn(f"Warm-up imported {module.__name__} in {int((time.time() - started) * 1000)}ms")
+            except ImportError as e:
+                if log_fn:
+                    log_fn(f"Warm-up skipped {module.__name__}: {e}")
+
+    thread = threading.Thread(target=run, name='import-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,196 @@
+"""
+Structured, non-blocking logging shared by every module (through utils.log).
+
+Callers only build a small record and put it on a bounded queue; a background thread
+formats records as JSON lines (or the classic text format with LOG_FORMAT=text) and
+writes them to stdout in batches. When the queue is full records are dropped and
+counted rather than blocking request threads.
+
+Each record carries the correlation ids bound in the current context: `requestId` for
+API requests and `executionId` for workflow runs (node pools copy the context into
+their worker threads). Identical messages beyond LOG_RATE_LIMIT_BURST per
+LOG_RATE_LIMIT_WINDOW seconds are suppressed, and the next one that gets through
+reports how many were.
+
+Records from the standard `logging` module (werkzeug, libraries) are routed through the
+same pipeline once install_stdlib_bridge() has run.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from .metrics import LOG_RECORDS_DROPPED
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40, 'critical': 50}
+
+LOG_LEVEL = LEVELS.get(os.environ.get('LOG_LEVEL', 'info').lower(), 20)
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+LOG_RATE_LIMIT_BURST = int(os.environ.get('LOG_RATE_LIMIT_BURST', 5))
+LOG_RATE_LIMIT_WINDOW = float(os.environ.get('LOG_RATE_LIMIT_WINDOW', 60))
+# Records written per stream write
+LOG_BATCH_SIZE = 500
+RATE_LIMIT_MAX_KEYS = 10000
+
+_correlation = contextvars.ContextVar('log_correlation', default={})
+
+def bind_context(**ids):
+    """Add correlation ids to the current context; returns a token for reset_context()."""
+    return _correlation.set({**_correlation.get(), **ids})
+
+def reset_context(token):
+    _correlation.reset(token)
+
+@contextmanager
+def correlation(**ids):
+    token = bind_context(**ids)
+    try:
+        yield
+    finally:
+        _correlation.reset(token)
+
+def get_correlation():
+    return _correlation.get()
+
+class RateLimiter:
+    """Lets `burst` records per key through each `window` seconds and counts the rest."""
+
+    def __init__(self, burst=LOG_RATE_LIMIT_BURST, window=LOG_RATE_LIMIT_WINDOW):
+        self.burst = burst
+        self.window = window
+        self.lock = threading.Lock()
+        # key -> [window start, records in window, suppressed since last emitted]
+        self.keys = {}
+
+    def check(self, key, now):
+        """(allowed, number of records suppressed before this one)."""
+        with self.lock:
+            entry = self.keys.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                if len(self.keys) >= RATE_LIMIT_MAX_KEYS:
+                    self._prune(now)
+                suppressed = entry[2] if entry else 0
+                self.keys[key] = [now, 1, 0]
+                return True, suppressed
+            entry[1] += 1
+            if entry[1] > self.burst:
+                entry[2] += 1
+                return False, 0
+            suppressed, entry[2] = entry[2], 0
+            return True, suppressed
+
+    def _prune(self, now):
+        expired = [key for key, entry in self.keys.items() if now - entry[0] >= self.window]
+        for key in expired or list(self.keys):
+            del self.keys[key]
+
+def format_json(record):
+    ts = datetime.fromtimestamp(record['ts'], timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    return json.dumps({**record, 'ts': ts}, default=str, separators=(',', ':'))
+
+def format_text(record):
+    line = f"{datetime.fromtimestamp(record['ts']).strftime('%I:%M:%S %p')} [{record['source']}] "
+    if record['level'] != 'info':
+        line += record['level'].upper() + ' '
+    line += str(record['msg'])
+    extra = {k: v for k, v in record.items() if k not in ('ts', 'level', 'source', 'msg', 'thread')}
+    if extra:
+        line += ' (' + ', '.join(f"{k}={v}" for k, v in extra.items()) + ')'
+    return line
+
+class LogPipeline:
+    def __init__(self, level=LOG_LEVEL, fmt=LOG_FORMAT, queue_size=LOG_QUEUE_SIZE, limiter=None):
+        self.level = level
+        self.formatter = format_text if fmt == 'text' else format_json
+        self.queue_size = queue_size
+        self.limiter = limiter or RateLimiter()
+        self._reset()
+
+    def _reset(self):
+        # Also the fork hook: the writer thread does not survive fork, so a child starts afresh
+        self.queue = queue.Queue(self.queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def emit(self, level, source, message, rate_key=None, **fields):
+        levelno = LEVELS.get(level, 20)
+        if levelno < self.level:
+            return
+        now = time.time()
+        allowed, suppressed = self.limiter.check((source, rate_key or message), now)
+        if not allowed:
+            LOG_RECORDS_DROPPED.inc(reason='rate_limited')
+            return
+        record = {'ts': now, 'level': level, 'source': source, 'msg': message,
+                  'thread': threading.current_thread().name, **_correlation.get(), **fields}
+        if suppressed:
+            record['suppressed'] = suppressed
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason='queue_full')
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name='log-writer', daemon=True)
+                self._thread.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for record in batch:
+                try:
+                    lines.append(self.formatter(record))
+                except Exception as e:
+                    lines.append(self.formatter({**record, 'msg': repr(record.get('msg')), 'formatError': str(e)}))
+            try:
+                # Looked up per batch so redirected stdout (tests, CLI capture) is honoured
+                sys.stdout.write('\n'.join(lines) + '\n')
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                pass
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self, timeout=2.0):
+        """Wait (up to `timeout` seconds) until every queued record has been written."""
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks and self._thread is not None and time.time() < deadline:
+            time.sleep(0.01)
+
+pipeline = LogPipeline()
+os.register_at_fork(after_in_child=pipeline._reset)
+atexit.register(pipeline.flush)
+
+class PipelineHandler(logging.Handler):
+    """Forwards standard-library log records into the pipeline."""
+
+    def emit(self, record):
+        try:
+            message = record.getMessage()
+            if record.exc_info:
+                message += '\n' + logging.Formatter().formatException(record.exc_info)
+            pipeline.emit(record.levelname.lower(), record.name, message)
+        except Exception:
+            self.handleError(record)
+
+def install_stdlib_bridge():
+    """Route the root logger (and so werkzeug's request log) through the pipeline; idempotent."""
+    if not any(isinstance(handler, PipelineHandler) for handler in logging.root.handlers):
+        logging.root.addHandler(PipelineHandler())
@@ -1,52 +1,82 @@
 import os
 import time
-from flask import Flask, send_from_directory, request, jsonify, send_file
+import uuid
+import socket
+import threading
+
+PROCESS_STARTED_AT = time.time()
+
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from .models import init_db
 from .utils import log
+from .log_pipeline import bind_context, reset_context, install_stdlib_bridge
 from .workflows import register_workflow_routes
 from .airflow_routes import register_airflow_routes
 from .management import register_management_routes
 from .mcp.tools import register_mcp_routes
+from .schedule_routes import register_schedule_routes
+from .profile_routes import register_profile_routes
+from .scheduler import start_scheduler
+from .retention import start_retention
+from .executor import recover_stale_executions, start_heartbeat
+from .nodes.registry import load_node_registry
+from .lazy_imports import warm_up
+from .storage import storage
+from .static_files import serve_static
+from .metrics import HTTP_REQUEST_DURATION, render as render_metrics
 
-app = Flask(__name__, static_folder='../client/dist', static_url_path='')
-CORS(app)
+STATIC_FOLDER = os.environ.get('STATIC_DIR', os.path.join(os.path.dirname(__file__), '..', 'client', 'dist'))
 
-init_db()
+startup_stats = {'startupMs': None, 'firstRequestMs': None}
 
-@app.before_request
 def log_request():
     request.start_time = time.time()
+    # Every log record made while serving the request carries its id
+    request.request_id = request.headers.get('X-Request-Id') or uuid.uuid4().hex[:16]
+    request.correlation_token = bind_context(requestId=request.request_id)
 
-@app.after_request
 def log_response(response):
     if hasattr(request, 'start_time') and request.path.startswith('/api'):
-        duration = int((time.time() - request.start_time) * 1000)
-        log(f"{request.method} {request.path} {response.status_code} in {duration}ms")
+        elapsed = time.time() - request.start_time
+        # The route pattern rather than the path keeps label cardinality bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_DURATION.observe(elapsed, method=request.method, route=route, status=response.status_code)
+        duration = int(elapsed * 1000)
+        log(f"{request.method} {request.path} {response.status_code} in {duration}ms",
+            method=request.method, route=route, status=response.status_code, durationMs=duration)
+        if startup_stats['firstRequestMs'] is None:
+            startup_stats['firstRequestMs'] = duration
+            log(f"First API request served in {duration}ms")
+    if hasattr(request, 'request_id'):
+        response.headers['X-Request-Id'] = request.request_id
     return response
 
-# Register module routes
-register_workflow_routes(app)
-register_airflow_routes(app)
-register_management_routes(app)
-register_mcp_routes(app)
+def clear_request_context(exc=None):
+    # Streamed responses (stream_with_context) tear the request down a second time
+    token = getattr(request, 'correlation_token', None)
+    if token is not None:
+        del request.correlation_token
+        try:
+            reset_context(token)
+        except ValueError:
+            # Torn down from a different context than the one the token was created in
+            pass
 
-@app.route('/api/health')
 def health_check():
-    return jsonify({"status": "healthy", "time": time.time()})
+    return jsonify({"status": "healthy", "time": time.time(), **startup_stats})
+
+def metrics_endpoint():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
-@app.route('/')
-@app.route('/<path:path>')
 def serve_frontend(path=''):
-    if path and os.path.exists(os.path.join(app.static_folder or '', path)):
-        return send_from_directory(app.static_folder or '', path)
-    if os.path.exists(os.path.join(app.static_folder or '', 'index.html')):
-        return send_from_directory(app.static_folder or '', 'index.html')
+    static_folder = STATIC_FOLDER
+    if path and os.path.isfile(os.path.join(static_folder, path)):
+        return serve_static(static_folder, path)
+    if os.path.exists(os.path.join(static_folder, 'index.html')):
+        return serve_static(static_folder, 'index.html')
     return "Frontend build not found. Please run 'npm run build' or check client/dist directory.", 404
 
-from .storage import storage
-
-@app.route('/api/workflows/<int:id>/generate-test', methods=['POST'])
 def generate_workflow_test(id):
     workflow = storage.get_workflow(id)
     if not workflow:
@@ -86,7 +116,61 @@ def generate_workflow_test(id):
     # For now, we return it so the frontend can use it
     return jsonify({"status": "success", "file_path": file_path, "code": '\n'.join(test_code)})
 
+def create_app():
+    """
+    Build the Flask application. Database setup and the node manifest load happen here, so a
+    preloading server (gunicorn --preload) does them once in the master process.
+    """
+    app = Flask(__name__, static_folder=None)
+    CORS(app)
+
+    init_db()
+    load_node_registry()
+
+    install_stdlib_bridge()
+    app.before_request(log_request)
+    app.after_request(log_response)
+    app.teardown_request(clear_request_context)
+
+    # Register module routes
+    register_workflow_routes(app)
+    register_airflow_routes(app)
+    register_management_routes(app)
+    register_mcp_routes(app)
+    register_schedule_routes(app)
+    register_profile_routes(app)
+
+    app.add_url_rule('/api/health', view_func=health_check)
+    app.add_url_rule('/metrics', view_func=metrics_endpoint)
+    app.add_url_rule('/api/workflows/<int:id>/generate-test', view_func=generate_workflow_test, methods=['POST'])
+    app.add_url_rule('/', view_func=serve_frontend)
+    app.add_url_rule('/<path:path>', view_func=serve_frontend)
+
+    startup_stats['startupMs'] = int((time.time() - PROCESS_STARTED_AT) * 1000)
+    log(f"Application initialised in {startup_stats['startupMs']}ms")
+    return app
+
+def warm_up_when_listening(port, timeout=30):
+    """Preload heavy SDKs once the server accepts connections, keeping them off the first request."""
+    def wait_and_warm():
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=1):
+                    break
+            except OSError:
+                time.sleep(0.2)
+        warm_up(log_fn=log)
+    threading.Thread(target=wait_and_warm, name='warmup-wait', daemon=True).start()
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
+    if os.environ.get('WARMUP_IMPORTS', '1') == '1':
+        warm_up_when_listening(port)
+    app = create_app()
+    recover_stale_executions()
+    start_heartbeat()
+    start_scheduler()
+    start_retention()
     log(f"serving on port {port}")
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -1,10 +1,127 @@
 import os
 import json
 import io
+import time
 import zipfile
-from flask import request, jsonify, send_file
+from flask import request, jsonify, send_file, Response, stream_with_context
 from .storage import storage
 from .utils import log
+from .slack_notifier import notifier
+from .nodes.registry import get_node_capabilities
+from .events import event_bus
+from .result_cache import result_cache
+from .bulk import iter_bulk_items, run_bulk, validate_credential
+from .retention import retention, DEFAULT_POLICY
+from .artifacts import blob_path, execution_files
+from .tracing import analyze, get_active_trace, to_chrome_trace
+
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_DB_POLL_SECONDS = 2
+STREAM_REPLAY_RETRY_SECONDS = 0.2
+TERMINAL_STATUSES = ('completed', 'failed')
+LOG_PAGE_DEFAULT = 500
+LOG_PAGE_MAX = 5000
+
+def format_sse(event_type, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+def snapshot_event(id):
+    """The full execution as a `snapshot` event, with the log cursor it brings the client to."""
+    execution = storage.get_execution(id)
+    log_count = len(execution['logs']) if execution else 0
+    return format_sse('snapshot', execution, log_count), log_count
+
+def stream_live_execution(id, after):
+    """
+    Relay events published by an executor running in this process. Event ids are log
+    cursors (log entries delivered so far), as in stream_polled_execution, so a client can
+    resume from either stream; node and status events carry no id of their own.
+    """
+    position = event_bus.log_position(id, after)
+    while True:
+        if position is None:
+            # The client is too far behind the replay buffer: send the full state instead,
+            # then replay logs from the database until the stream reaches the buffer
+            event, after = snapshot_event(id)
+            yield event
+            while position is None:
+                page = storage.get_execution_logs(id, after=after - 1, limit=LOG_PAGE_MAX)
+                entries = page[0] if page else []
+                for entry in entries:
+                    after = entry.pop('seq') + 1
+                    yield format_sse('log', {'index': after - 1, **entry}, after)
+                position = event_bus.log_position(id, after)
+                if position is None and not entries:
+                    if event_bus.is_closed(id):
+                        # Finished: the database holds every entry and they have all been sent
+                        yield format_sse('end', {'seq': after})
+                        return
+                    # The database lags the bus by the entries not yet written
+                    time.sleep(STREAM_REPLAY_RETRY_SECONDS)
+        events, closed, truncated = event_bus.read(id, position, timeout=STREAM_HEARTBEAT_SECONDS)
+        if truncated:
+            position = None
+            continue
+        for seq, event_type, data in events:
+            if event_type == 'log':
+                if data['index'] < after:
+                    position = seq
+                    continue
+                after = data['index'] + 1
+                yield format_sse(event_type, data, after)
+            else:
+                yield format_sse(event_type, data)
+            position = seq
+        if closed:
+            yield format_sse('end', {'seq': after})
+            return
+        if not events:
+            yield ': keepalive\n\n'
+
+def stream_polled_execution(id, after):
+    """
+    Fallback for executions running in another process (EXECUTION_MODE=queue). Each poll
+    reads the status column and the new execution_logs rows; node results are only read
+    when one of those moved. Event ids are log cursors, as in stream_live_execution.
+    """
+    node_states = {}
+    status = None
+    while True:
+        # Status first: logs written together with a final status are then read below
+        current = storage.get_execution_status(id)
+        if current is None:
+            yield format_sse('end', {'seq': after})
+            return
+        moved = current != status
+        has_more = True
+        while has_more:
+            page = storage.get_execution_logs(id, after=after - 1, limit=LOG_PAGE_MAX)
+            entries, has_more = page if page else ([], False)
+            for entry in entries:
+                after = entry.pop('seq') + 1
+                yield format_sse('log', {'index': after - 1, **entry}, after)
+            moved = moved or bool(entries)
+        if moved:
+            for node_id, result in (storage.get_execution_results(id) or {}).items():
+                state = (result.get('status'), result.get('error')) if isinstance(result, dict) else (None, None)
+                if node_states.get(node_id) != state:
+                    node_states[node_id] = state
+                    event = {'nodeId': node_id, 'status': state[0]}
+                    if state[1]:
+                        event['error'] = state[1]
+                    yield format_sse('node', event)
+        if current != status:
+            status = current
+            yield format_sse('status', {'status': status})
+        if status in TERMINAL_STATUSES:
+            yield format_sse('end', {'seq': after})
+            return
+        time.sleep(STREAM_DB_POLL_SECONDS)
 
 def register_management_routes(app):
     @app.get('/api/credentials')
@@ -18,11 +135,45 @@ def register_management_routes(app):
         credential = storage.create_credential(data)
         return jsonify(credential), 201
 
+    @app.post('/api/credentials/bulk')
+    def bulk_save_credentials():
+        upsert = request.args.get('upsert', 'false').lower() == 'true'
+        try:
+            return jsonify(run_bulk(iter_bulk_items(), validate_credential, storage.bulk_save_credentials, upsert=upsert))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+    @app.delete('/api/credentials/bulk')
+    def bulk_delete_credentials():
+        ids = (request.get_json(silent=True) or {}).get('ids')
+        if not isinstance(ids, list):
+            return jsonify({'message': 'ids must be an array'}), 400
+        return jsonify({'results': storage.bulk_delete_credentials(ids)})
+
     @app.delete('/api/credentials/<int:id>')
     def delete_credential(id):
         storage.delete_credential(id)
         return '', 204
 
+    @app.get('/api/nodes')
+    def list_node_types():
+        return jsonify(get_node_capabilities())
+
+    @app.get('/api/cache')
+    def get_cache_stats():
+        return jsonify(result_cache.stats())
+
+    @app.delete('/api/cache')
+    def clear_cache():
+        return jsonify({'removed': result_cache.clear()})
+
+    @app.get('/api/notifications/<delivery_id>')
+    def get_notification_delivery(delivery_id):
+        delivery = notifier.get_delivery(delivery_id)
+        if not delivery:
+            return jsonify({'message': 'Delivery not found'}), 404
+        return jsonify(delivery)
+
     @app.get('/api/executions')
     def list_executions():
         workflow_id = request.args.get('workflowId', type=int)
@@ -37,11 +188,118 @@ def register_management_routes(app):
 
     @app.get('/api/executions/<int:id>')
     def get_execution(id):
-        execution = storage.get_execution(id)
+        # ?logs=false skips the full log list; page through it with /logs instead
+        include_logs = request.args.get('logs', 'true').lower() != 'false'
+        execution = storage.get_execution(id, include_logs=include_logs)
         if not execution:
             return jsonify({'message': 'Execution not found'}), 404
         return jsonify(execution)
 
+    @app.get('/api/executions/<int:id>/archive')
+    def get_execution_archive(id):
+        archived = storage.get_archived_execution(id)
+        if archived is None:
+            return jsonify({'message': 'Archive not found'}), 404
+        return jsonify(archived)
+
+    @app.get('/api/executions/<int:id>/artifacts')
+    def list_execution_artifacts(id):
+        if not storage.get_execution(id, include_logs=False):
+            return jsonify({'message': 'Execution not found'}), 404
+        return jsonify(storage.get_execution_artifacts(id))
+
+    @app.get('/api/artifacts/<sha256>')
+    def download_artifact(sha256):
+        artifact = storage.get_artifact(sha256)
+        if not artifact or not os.path.exists(blob_path(sha256)):
+            return jsonify({'message': 'Artifact not found'}), 404
+        # conditional=True serves Range requests and ETag/If-None-Match revalidation
+        return send_file(
+            blob_path(sha256),
+            mimetype=artifact['contentType'] or 'application/octet-stream',
+            as_attachment=request.args.get('download', 'false').lower() == 'true',
+            download_name=request.args.get('filename') or sha256,
+            conditional=True,
+            etag=sha256
+        )
+
+    @app.get('/api/executions/<int:id>/trace')
+    def get_execution_trace(id):
+        trace = get_active_trace(id) or storage.get_trace(id)
+        if not trace:
+            return jsonify({'message': 'Trace not found'}), 404
+        if request.args.get('format') == 'chrome':
+            response = jsonify(to_chrome_trace(trace))
+            response.headers['Content-Disposition'] = f'attachment; filename=execution_{id}_trace.json'
+            return response
+        analysis = analyze(trace)
+        if request.args.get('spans', 'true').lower() == 'false':
+            analysis.pop('spans')
+        return jsonify(analysis)
+
+    @app.get('/api/retention')
+    def get_retention_status():
+        return jsonify({'defaults': DEFAULT_POLICY, 'lastRun': retention.last_run})
+
+    @app.post('/api/retention/run')
+    def run_retention():
+        vacuum = request.args.get('vacuum')
+        stats = retention.run_once(vacuum=None if vacuum is None else vacuum.lower() == 'true')
+        if stats is None:
+            return jsonify({'message': 'A retention pass is already running'}), 409
+        return jsonify(stats)
+
+    @app.get('/api/executions/<int:id>/logs')
+    def get_execution_logs(id):
+        after = request.args.get('after', -1, type=int)
+        limit = max(1, min(request.args.get('limit', LOG_PAGE_DEFAULT, type=int), LOG_PAGE_MAX))
+        levels = [level.strip() for level in request.args.get('level', '').split(',') if level.strip()]
+        page = storage.get_execution_logs(id, after=after, levels=levels or None, limit=limit)
+        if page is None:
+            return jsonify({'message': 'Execution not found'}), 404
+        entries, has_more = page
+        return jsonify({
+            'entries': entries,
+            'nextAfter': entries[-1]['seq'] if entries else after,
+            'hasMore': has_more
+        })
+
+    @app.get('/api/executions/<int:id>/dag-logs/<node_id>')
+    def get_dag_logs(id, node_id):
+        execution = storage.get_execution(id, include_logs=False)
+        if not execution:
+            return jsonify({'message': 'Execution not found'}), 404
+        result = execution['results'].get(node_id)
+        if not isinstance(result, dict):
+            return jsonify({'message': 'DAG logs not found'}), 404
+        logs_path = result.get('logs_path')
+        if logs_path and os.path.exists(logs_path):
+            # conditional=True lets clients fetch byte ranges of large task logs
+            return send_file(logs_path, mimetype='text/plain', conditional=True)
+        if result.get('logs_text'):
+            return Response(result['logs_text'], mimetype='text/plain')
+        return jsonify({'message': 'DAG logs not found'}), 404
+
+    @app.get('/api/executions/<int:id>/stream')
+    def stream_execution(id):
+        after = request.args.get('after', type=int)
+        if after is None:
+            last_event_id = request.headers.get('Last-Event-ID', '')
+            after = int(last_event_id) if last_event_id.isdigit() else 0
+
+        if event_bus.is_live(id):
+            generator = stream_live_execution(id, after)
+        else:
+            if not storage.get_execution(id, include_logs=False):
+                return jsonify({'message': 'Execution not found'}), 404
+            generator = stream_polled_execution(id, after)
+
+        return Response(
+            stream_with_context(generator),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
     @app.get('/api/executions/<int:id>/export')
     def export_execution(id):
         execution = storage.get_execution(id)
@@ -61,13 +319,14 @@ def register_management_routes(app):
             log_content = '\n'.join([f"[{l.get('timestamp', '')}] {l.get('level', '')}: {l.get('message', '')}" for l in logs])
             zf.writestr('execution.log', log_content)
             
+            for node_id, name, path, filename in execution_files(execution):
+                if name == 'excel':
+                    zf.write(path, f'results/node_{node_id}.xlsx')
+                elif name == 'download':
+                    zf.write(path, f'files/node_{node_id}_{filename or "download"}')
+            
             results = execution.get('results', {})
             for node_id, node_result in results.items():
-                if isinstance(node_result, dict) and node_result.get('excel_path'):
-                    excel_path = node_result.get('excel_path')
-                    if os.path.exists(excel_path):
-                        zf.write(excel_path, f'results/node_{node_id}.xlsx')
-                
                 # Still include CSV data if available
                 csv_data = node_result.get('csv_data') if isinstance(node_result, dict) else node_result
                 if csv_data:
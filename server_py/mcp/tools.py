@@ -3,6 +3,8 @@ from functools import wraps
 from flask import request, jsonify
 from datetime import datetime
 from ..storage import storage
+from ..lazy_imports import paramiko
+from ..nodes.s3_node import build_s3_client
 
 def register_mcp_routes(app):
     """
@@ -92,12 +94,12 @@ def register_mcp_routes(app):
         try:
             from ..nodes.registry import get_node_class
             node_class = get_node_class('sql_query')
-            node = node_class(mock_node, {}, [], storage, 'mcp_exec')
+            node = node_class(mock_node['data'], {}, [], storage, 'mcp_exec', node_id=mock_node['id'])
             
-            # The node.execute() already handles errors and returns a success dict
-            # or raises an exception. Let's capture the result and return it.
-            result = node.execute()
-            return jsonify(result)
+            # run_query() raises on SQL errors; the workflow-only parts of the node
+            # (Excel export, assertions) are not needed for tool calls.
+            rows = node.run_query(query)
+            return jsonify({"status": "success", "count": len(rows), "results": rows})
         except Exception as e:
             # Check if it's the specific "does not return rows" error from SQLAlchemy
             err_msg = str(e)
@@ -135,7 +137,7 @@ def register_mcp_routes(app):
                 
             from ..airflow_api import AirflowAPI
             cred_data = cred.get('data', {})
-            api = AirflowAPI(cred_data.get('url'), cred_data.get('username'), cred_data.get('password'))
+            api = AirflowAPI(cred_data.get('baseUrl', ''), cred_data.get('username'), cred_data.get('password'), credential_id=cred.get('id'))
             
             mapping = {
                 "health": lambda: api.get_health(),
@@ -182,10 +184,9 @@ def register_mcp_routes(app):
         operation = data.get('operation')
         credential_id = data.get('credentialId')
         try:
-            cred = storage.get_credential(int(credential_id))
-            import boto3
-            c = cred['data']
-            s3 = boto3.client('s3', aws_access_key_id=c['accessKey'], aws_secret_access_key=c['secretKey'], region_name=c.get('region', 'us-east-1'))
+            s3 = storage.get_credential_artifact(int(credential_id), 's3_client', build_s3_client)
+            if s3 is None:
+                return jsonify({"status": "error", "message": f"Credential {credential_id} not found"}), 404
             bucket = data.get('bucket')
             key = data.get('key')
             
@@ -226,7 +227,6 @@ def register_mcp_routes(app):
             if not cred:
                 return jsonify({"status": "error", "message": f"Credential {credential_id} not found"}), 404
             
-            import paramiko
             c = cred['data']
             
             # Use host/port from credential data if not provided in request
@@ -296,8 +296,8 @@ def register_mcp_routes(app):
             elif operation == 'query_limited':
                 mock_node['data']['query'] = f"{data.get('query')} LIMIT {min(data.get('limit', 100), 100)}"
             
-            node = node_class(mock_node, {}, [], storage, 'mcp_inspect')
-            result = node.execute()
-            return jsonify(result)
+            node = node_class(mock_node['data'], {}, [], storage, 'mcp_inspect', node_id=mock_node['id'])
+            rows = node.run_query(mock_node['data'].get('query', ''))
+            return jsonify({"status": "success", "count": len(rows), "results": rows})
         except Exception as e: return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -0,0 +1,327 @@
+"""
+In-process metrics exposed in the Prometheus text format at /metrics.
+
+Recording is lock-free: every thread updates its own shard of each metric and a scrape
+merges the shards, so hot paths (node runs, external calls, DB writes) never contend.
+Shards of threads that have exited are folded into a retired total on the next scrape.
+
+Values are per process. With METRICS_MULTIPROCESS_DIR set (gunicorn.conf.py sets it),
+each process also exports its values to <dir>/<pid>.json every METRICS_EXPORT_INTERVAL
+seconds and a scrape adds up the files of every process, so any gunicorn worker serves
+the totals. Counters and histograms of exited processes are kept; gauges only count
+live ones. Values read by collectors at scrape time are from the process scraped,
+identified by the `pid` in process_start_time_seconds.
+
+External calls are labelled with the service and credential of the node being run:
+the executor sets them with call_target(), the pooled HTTP session records every
+request under the current target, and SQL/SFTP/S3 code wraps its calls in track_call().
+"""
+import os
+import json
+import time
+import atexit
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from .tracing import span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+METRICS_MULTIPROCESS_DIR = os.environ.get('METRICS_MULTIPROCESS_DIR')
+METRICS_EXPORT_INTERVAL = float(os.environ.get('METRICS_EXPORT_INTERVAL', 5))
+
+_metrics = []
+_collectors = []
+_registry_lock = threading.Lock()
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _metrics.append(self)
+
+    def _shard(self):
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            if METRICS_MULTIPROCESS_DIR and _exporter_pid != os.getpid():
+                _start_exporter()
+        return shard
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _merge_into(self, total, values):
+        for key, value in values.items():
+            total[key] = total.get(key, 0) + value
+
+    def _collect(self):
+        total = {}
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    # The thread can no longer write to its shard
+                    self._merge_into(self._retired, shard.copy())
+            self._shards = alive
+            self._merge_into(total, self._retired)
+            shards = [shard for _, shard in alive]
+        for shard in shards:
+            self._merge_into(total, shard.copy())
+        return total
+
+    def _label_text(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self, values=None):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for key, value in sorted((self._collect() if values is None else values).items()):
+            lines.append(f'{self.name}{self._label_text(key)} {_format(value)}')
+        return lines
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """A gauge built from increments (e.g. work in flight); each thread adds its own deltas."""
+    type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        # [count per bucket..., +Inf count, sum]
+        entry = shard.get(key)
+        if entry is None:
+            entry = shard[key] = [0] * (len(self.buckets) + 2)
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _merge_into(self, total, values):
+        for key, entry in values.items():
+            merged = total.get(key)
+            if merged is None:
+                total[key] = list(entry)
+            else:
+                for i, value in enumerate(entry):
+                    merged[i] += value
+
+    def render(self, values=None):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for key, entry in sorted((self._collect() if values is None else values).items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), entry[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{self._label_text(key, [("le", _format(bound))])} {cumulative}')
+            lines.append(f'{self.name}_sum{self._label_text(key)} {_format(entry[-1])}')
+            lines.append(f'{self.name}_count{self._label_text(key)} {cumulative}')
+        return lines
+
+def _format(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+def register_collector(collect):
+    """
+    Register `collect()` to be called on every scrape. It returns a list of
+    (name, type, help, [(labels dict, value), ...]) for values read at scrape time.
+    """
+    with _registry_lock:
+        _collectors.append(collect)
+
+_exporter_pid = None
+
+def export():
+    """Write this process's values to METRICS_MULTIPROCESS_DIR/<pid>.json."""
+    with _registry_lock:
+        metrics = list(_metrics)
+    snapshot = {metric.name: [[list(key), value] for key, value in metric._collect().items()] for metric in metrics}
+    path = os.path.join(METRICS_MULTIPROCESS_DIR, f'{os.getpid()}.json')
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(f'{path}.tmp', path)
+
+def _export_quietly():
+    try:
+        export()
+    except OSError:
+        pass
+
+def _export_loop():
+    while True:
+        time.sleep(METRICS_EXPORT_INTERVAL)
+        _export_quietly()
+
+def _start_exporter():
+    global _exporter_pid
+    with _registry_lock:
+        if _exporter_pid == os.getpid():
+            return
+        _exporter_pid = os.getpid()
+    threading.Thread(target=_export_loop, name='metrics-export', daemon=True).start()
+    atexit.register(_export_quietly)
+
+def _reset_after_fork():
+    # What the parent recorded before forking is in the parent's file, not this process's
+    global _exporter_pid
+    _exporter_pid = None
+    for metric in _metrics:
+        metric._local = threading.local()
+        metric._shards = []
+        metric._retired = {}
+        metric._lock = threading.Lock()
+
+if METRICS_MULTIPROCESS_DIR:
+    os.makedirs(METRICS_MULTIPROCESS_DIR, exist_ok=True)
+    os.register_at_fork(before=_export_quietly, after_in_child=_reset_after_fork)
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+def _all_process_values(metrics):
+    """{metric name: values} of this process plus the files exported by the others."""
+    totals = {metric.name: metric._collect() for metric in metrics}
+    by_name = {metric.name: metric for metric in metrics}
+    for filename in os.listdir(METRICS_MULTIPROCESS_DIR):
+        pid = filename[:-len('.json')]
+        if not filename.endswith('.json') or not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        try:
+            with open(os.path.join(METRICS_MULTIPROCESS_DIR, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        alive = _process_alive(int(pid))
+        for name, values in snapshot.items():
+            metric = by_name.get(name)
+            if metric is None or (isinstance(metric, Gauge) and not alive):
+                continue
+            metric._merge_into(totals[name], {tuple(key): value for key, value in values})
+    return totals
+
+def render():
+    lines = []
+    with _registry_lock:
+        metrics = list(_metrics)
+        collectors = list(_collectors)
+    totals = _all_process_values(metrics) if METRICS_MULTIPROCESS_DIR else {}
+    for metric in metrics:
+        lines.extend(metric.render(totals.get(metric.name)))
+    for collect in collectors:
+        try:
+            families = collect()
+        except Exception as e:
+            lines.append(f'# collector {getattr(collect, "__name__", collect)} failed: {e}')
+            continue
+        for name, metric_type, help, samples in families:
+            lines.extend([f'# HELP {name} {help}', f'# TYPE {name} {metric_type}'])
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f'{name}{{{label_text}}} {_format(value)}' if label_text else f'{name} {_format(value)}')
+    return '\n'.join(lines) + '\n'
+
+# Service and credential of the node whose calls are being made
+_call_target = contextvars.ContextVar('metrics_call_target', default=('http', ''))
+
+@contextmanager
+def call_target(service, credential=None):
+    token = _call_target.set((service or 'http', '' if credential is None else str(credential)))
+    try:
+        yield
+    finally:
+        _call_target.reset(token)
+
+def record_call(duration, failed=False, service=None, credential=None):
+    target_service, target_credential = _call_target.get()
+    service = service or target_service
+    credential = target_credential if credential is None else str(credential)
+    EXTERNAL_CALL_DURATION.observe(duration, service=service, credential=credential)
+    if failed:
+        EXTERNAL_CALL_ERRORS.inc(service=service, credential=credential)
+
+@contextmanager
+def track_call(service=None, credential=None, name=None):
+    """Time an external call (also as a trace span) and count it as an error if it raises."""
+    started = time.perf_counter()
+    with span(name or service or _call_target.get()[0], 'call'):
+        try:
+            yield
+        except Exception:
+            record_call(time.perf_counter() - started, True, service, credential)
+            raise
+    record_call(time.perf_counter() - started, False, service, credential)
+
+HTTP_REQUEST_DURATION = Histogram('http_request_duration_seconds', 'API request duration', ('method', 'route', 'status'))
+NODE_DURATION = Histogram('node_duration_seconds', 'Node run time including retries', ('node_type', 'status'))
+NODES_IN_PROGRESS = Gauge('node_pool_active', 'Nodes currently running per worker pool', ('pool',))
+NODE_THREADS_ABANDONED = Counter('node_threads_abandoned_total', 'Timed-out nodes whose worker thread was left running', ('node_type',))
+EXTERNAL_CALL_DURATION = Histogram('external_call_duration_seconds', 'Latency of calls to Airflow, SQL, SFTP, S3 and HTTP endpoints', ('service', 'credential'))
+EXTERNAL_CALL_ERRORS = Counter('external_call_errors_total', 'Failed calls to external systems', ('service', 'credential'))
+DB_WRITE_DURATION = Histogram('db_write_duration_seconds', 'Latency of execution state writes', ('operation',))
+EXECUTIONS_FINISHED = Counter('executions_finished_total', 'Executions that reached a terminal status', ('status',))
+LOG_RECORDS_DROPPED = Counter('log_records_dropped_total', 'Log records not written because they were rate limited or the queue was full', ('reason',))
+
+PROCESS_STARTED_AT = time.time()
+register_collector(lambda: [(
+    'process_start_time_seconds', 'gauge', 'Start time of this process', [({'pid': str(os.getpid())}, PROCESS_STARTED_AT)]
+)])
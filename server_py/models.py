@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, create_engine
+from sqlalchemy import Column, Float, Integer, String, Text, ForeignKey, Index, TypeDecorator, create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+import struct
+import zlib
 import json
 import os
+from . import typed_json
 
 Base = declarative_base()
 
@@ -16,6 +19,69 @@ def timestamp_to_iso(ts):
         return datetime.fromtimestamp(ts / 1000 if ts > 1e11 else ts).isoformat()
     return str(ts)
 
+# Values shorter than this are stored as plain text; compressing them saves nothing
+COMPRESSION_MIN_BYTES = int(os.environ.get('COLUMN_COMPRESSION_MIN_BYTES', 512))
+COMPRESSION_LEVEL = int(os.environ.get('COLUMN_COMPRESSION_LEVEL', 6))
+
+# Frame: magic, format version, codec, uncompressed length, payload. The leading NUL byte
+# can never start a JSON document, so framed values are told apart from legacy text rows.
+FRAME_MAGIC = b'\x00HZ'
+FRAME_HEADER = struct.Struct('>3sBBI')
+FRAME_VERSION = 1
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+
+def encode_text(value):
+    """Frame (and compress, when it helps) a text value for a CompressedText column."""
+    raw = value.encode('utf-8')
+    payload = zlib.compress(raw, COMPRESSION_LEVEL)
+    codec = CODEC_ZLIB
+    if len(payload) >= len(raw):
+        payload, codec = raw, CODEC_NONE
+    return FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, codec, len(raw)) + payload
+
+def decode_text(value):
+    """Text of a CompressedText value as loaded from the database: framed bytes or legacy text."""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value.startswith(FRAME_MAGIC):
+        return value.decode('utf-8')
+    _, version, codec, length = FRAME_HEADER.unpack_from(value)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported compressed column version {version}")
+    payload = value[FRAME_HEADER.size:]
+    if codec == CODEC_ZLIB:
+        payload = zlib.decompress(payload, bufsize=length or zlib.DEF_BUF_SIZE)
+    elif codec != CODEC_NONE:
+        raise ValueError(f"Unsupported compressed column codec {codec}")
+    return payload.decode('utf-8')
+
+def load_json(value, default=None, object_hook=None):
+    """Parse a JSON column value, decompressing it first if it is framed."""
+    if not value:
+        return default
+    if not isinstance(value, (str, bytes, memoryview)):
+        return value
+    return json.loads(decode_text(value), object_hook=object_hook)
+
+class CompressedText(TypeDecorator):
+    """
+    Text column stored as a framed, compressed blob. Rows are returned as stored (legacy
+    text or framed bytes) and only decompressed by decode_text/load_json when a value is
+    actually read, so loading an execution does not inflate logs nobody asked for.
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str) and len(value) >= COMPRESSION_MIN_BYTES:
+            return encode_text(value)
+        return value
+
+    def process_result_value(self, value, dialect):
+        return value
+
 class Workflow(Base):
     __tablename__ = 'workflows'
     
@@ -25,6 +91,8 @@ class Workflow(Base):
     nodes = Column(Text, nullable=False, default='[]')
     edges = Column(Text, nullable=False, default='[]')
     last_prompt = Column(Text, nullable=True)
+    # Per-workflow options, e.g. {"retention": {"maxAgeDays": 30, "maxCount": 200}}
+    settings = Column(Text, nullable=True)
     created_at = Column(Integer, nullable=True)
     updated_at = Column(Integer, nullable=True)
     
@@ -38,6 +106,7 @@ class Workflow(Base):
             'nodes': json.loads(self.nodes) if isinstance(self.nodes, str) else self.nodes,
             'edges': json.loads(self.edges) if isinstance(self.edges, str) else self.edges,
             'lastPrompt': self.last_prompt,
+            'settings': json.loads(self.settings) if self.settings else {},
             'createdAt': timestamp_to_iso(self.created_at),
             'updatedAt': timestamp_to_iso(self.updated_at)
         }
@@ -50,6 +119,8 @@ class Credential(Base):
     type = Column(String, nullable=False)
     data = Column(Text, nullable=False)
     created_at = Column(Integer, nullable=True)
+    # Version stamp the per-process credential caches compare against
+    updated_at = Column(Integer, nullable=True)
     
     def to_dict(self):
         return {
@@ -66,30 +137,326 @@ class Execution(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     workflow_id = Column(Integer, ForeignKey('workflows.id'), nullable=False)
     status = Column(String, nullable=False, default='pending')
-    logs = Column(Text, default='[]')
-    results = Column(Text, default='{}')
+    logs = Column(CompressedText, default='[]')
+    results = Column(CompressedText, default='{}')
     started_at = Column(Integer, nullable=True)
     completed_at = Column(Integer, nullable=True)
+    resumed_from = Column(Integer, nullable=True)
+    batch_id = Column(Integer, ForeignKey('execution_batches.id'), nullable=True)
+    params = Column(Text, nullable=True)
+    # Set once the logs and full results have been moved to the compressed archive
+    archived_at = Column(Integer, nullable=True)
+    # Refreshed while the process responsible for the execution is alive (see executor heartbeat)
+    heartbeat_at = Column(Integer, nullable=True)
     
     workflow = relationship("Workflow", back_populates="executions")
     
+    __table_args__ = (
+        # Keeps active-execution lookups (queue polling, metrics) off the wide rows
+        Index('ix_executions_status', 'status'),
+    )
+    
+    def to_dict(self, include_logs=True):
+        data = {
+            'id': self.id,
+            'workflowId': self.workflow_id,
+            'status': self.status,
+            'results': load_json(self.results, {}),
+            'startedAt': timestamp_to_iso(self.started_at),
+            'completedAt': timestamp_to_iso(self.completed_at),
+            'resumedFrom': self.resumed_from,
+            'batchId': self.batch_id,
+            'params': json.loads(self.params) if self.params else None,
+            'archived': self.archived_at is not None
+        }
+        if include_logs:
+            data['logs'] = load_json(self.logs, [])
+        return data
+
+class ExecutionBatch(Base):
+    """One workflow run once per parameter set; each run is an Execution with batch_id set."""
+    __tablename__ = 'execution_batches'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    workflow_id = Column(Integer, ForeignKey('workflows.id'), nullable=False)
+    params = Column(Text, default='[]')
+    concurrency = Column(Integer, nullable=False, default=4)
+    created_at = Column(Integer, nullable=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'workflowId': self.workflow_id,
+            'params': json.loads(self.params) if self.params else [],
+            'concurrency': self.concurrency,
+            'createdAt': timestamp_to_iso(self.created_at)
+        }
+
+class Schedule(Base):
+    """A cron or fixed-interval trigger for a workflow, run by the in-process scheduler."""
+    __tablename__ = 'schedules'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    workflow_id = Column(Integer, ForeignKey('workflows.id'), nullable=False)
+    name = Column(String, nullable=True)
+    cron = Column(String, nullable=True)
+    interval_seconds = Column(Integer, nullable=True)
+    params = Column(Text, nullable=True)
+    enabled = Column(Integer, nullable=False, default=1)
+    # skip | run_once | catch_up
+    misfire_policy = Column(String, nullable=False, default='run_once')
+    misfire_grace_seconds = Column(Integer, nullable=False, default=60)
+    max_catch_up = Column(Integer, nullable=False, default=10)
+    jitter_seconds = Column(Integer, nullable=False, default=0)
+    # skip | queue, applied when the workflow already has an active execution
+    overlap_policy = Column(String, nullable=False, default='skip')
+    next_run_at = Column(Integer, nullable=True)
+    last_run_at = Column(Integer, nullable=True)
+    last_execution_id = Column(Integer, nullable=True)
+    created_at = Column(Integer, nullable=True)
+    updated_at = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_schedules_enabled_next_run', 'enabled', 'next_run_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'workflowId': self.workflow_id,
+            'name': self.name,
+            'cron': self.cron,
+            'intervalSeconds': self.interval_seconds,
+            'params': json.loads(self.params) if self.params else None,
+            'enabled': bool(self.enabled),
+            'misfirePolicy': self.misfire_policy,
+            'misfireGraceSeconds': self.misfire_grace_seconds,
+            'maxCatchUp': self.max_catch_up,
+            'jitterSeconds': self.jitter_seconds,
+            'overlapPolicy': self.overlap_policy,
+            'nextRunAt': timestamp_to_iso(self.next_run_at),
+            'lastRunAt': timestamp_to_iso(self.last_run_at),
+            'lastExecutionId': self.last_execution_id,
+            'createdAt': timestamp_to_iso(self.created_at),
+            'updatedAt': timestamp_to_iso(self.updated_at)
+        }
+
+class ScheduledRun(Base):
+    """A schedule fire waiting for its workflow's active execution to finish (overlapPolicy queue, catch_up)."""
+    __tablename__ = 'scheduled_runs'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    schedule_id = Column(Integer, ForeignKey('schedules.id'), nullable=False)
+    workflow_id = Column(Integer, ForeignKey('workflows.id'), nullable=False)
+    params = Column(Text, nullable=True)
+    queued_at = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_scheduled_runs_workflow', 'workflow_id', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
+            'scheduleId': self.schedule_id,
             'workflowId': self.workflow_id,
+            'params': json.loads(self.params) if self.params else None,
+            'queuedAt': timestamp_to_iso(self.queued_at)
+        }
+
+class SlackDelivery(Base):
+    """State of a queued Slack message, so any process can report it (see slack_notifier)."""
+    __tablename__ = 'slack_deliveries'
+    
+    id = Column(String, primary_key=True)
+    execution_id = Column(Integer, ForeignKey('executions.id'), nullable=True)
+    status = Column(String, nullable=False, default='queued')
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    queued_at = Column(Float, nullable=True)
+    delivered_at = Column(Float, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_slack_deliveries_execution', 'execution_id'),
+    )
+    
+    def to_dict(self):
+        data = {
+            'id': self.id,
             'status': self.status,
-            'logs': json.loads(self.logs) if isinstance(self.logs, str) else self.logs,
-            'results': json.loads(self.results) if isinstance(self.results, str) else self.results,
-            'startedAt': timestamp_to_iso(self.started_at),
-            'completedAt': timestamp_to_iso(self.completed_at)
+            'attempts': self.attempts,
+            'executionId': self.execution_id,
+            'queuedAt': self.queued_at
+        }
+        if self.error is not None:
+            data['error'] = self.error
+        if self.delivered_at is not None:
+            data['deliveredAt'] = self.delivered_at
+        return data
+
+class ExecutionLog(Base):
+    """One row per execution log entry, indexed for tailing and level filtering."""
+    __tablename__ = 'execution_logs'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    execution_id = Column(Integer, ForeignKey('executions.id'), nullable=False)
+    seq = Column(Integer, nullable=False)
+    timestamp = Column(String, nullable=True)
+    level = Column(String, nullable=True)
+    message = Column(Text, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_execution_logs_execution_seq', 'execution_id', 'seq', unique=True),
+        Index('ix_execution_logs_execution_level_seq', 'execution_id', 'level', 'seq'),
+    )
+    
+    def to_dict(self):
+        return {
+            'seq': self.seq,
+            'timestamp': self.timestamp,
+            'level': self.level,
+            'message': self.message
+        }
+
+class ExecutionCheckpoint(Base):
+    """A completed node's result and context contribution, reused when a failed execution is resumed."""
+    __tablename__ = 'execution_checkpoints'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    execution_id = Column(Integer, ForeignKey('executions.id'), nullable=False)
+    node_id = Column(String, nullable=False)
+    config_hash = Column(String, nullable=True)
+    result = Column(CompressedText, default='{}')
+    context = Column(CompressedText, default='{}')
+    created_at = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_execution_checkpoints_execution_node', 'execution_id', 'node_id', unique=True),
+    )
+    
+    def to_dict(self):
+        return {
+            'nodeId': self.node_id,
+            'configHash': self.config_hash,
+            'result': load_json(self.result, {}, typed_json.object_hook),
+            'context': load_json(self.context, {}, typed_json.object_hook),
+            'createdAt': timestamp_to_iso(self.created_at)
+        }
+
+class ExecutionTrace(Base):
+    """Timing spans of one execution in the compact form produced by tracing.Trace.encode()."""
+    __tablename__ = 'execution_traces'
+    
+    execution_id = Column(Integer, ForeignKey('executions.id'), primary_key=True)
+    spans = Column(CompressedText, nullable=False)
+    created_at = Column(Integer, nullable=True)
+
+class Artifact(Base):
+    """A content-addressed blob in the artifact store; ref_count counts the executions using it."""
+    __tablename__ = 'artifacts'
+    
+    sha256 = Column(String, primary_key=True)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(Integer, nullable=True)
+    last_used_at = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_artifacts_ref_count', 'ref_count'),
+    )
+    
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'size': self.size,
+            'contentType': self.content_type,
+            'refCount': self.ref_count,
+            'createdAt': timestamp_to_iso(self.created_at),
+            'lastUsedAt': timestamp_to_iso(self.last_used_at)
+        }
+
+class ArtifactRef(Base):
+    """An execution node's named output (e.g. 'excel', 'dag_log', 'download') pointing at a blob."""
+    __tablename__ = 'artifact_refs'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    execution_id = Column(Integer, ForeignKey('executions.id'), nullable=False)
+    node_id = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    sha256 = Column(String, ForeignKey('artifacts.sha256'), nullable=False)
+    filename = Column(String, nullable=True)
+    created_at = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_artifact_refs_execution_node_name', 'execution_id', 'node_id', 'name', unique=True),
+        Index('ix_artifact_refs_sha256', 'sha256'),
+    )
+    
+    def to_dict(self):
+        return {
+            'executionId': self.execution_id,
+            'nodeId': self.node_id,
+            'name': self.name,
+            'sha256': self.sha256,
+            'filename': self.filename,
+            'createdAt': timestamp_to_iso(self.created_at)
+        }
+
+class Profile(Base):
+    """A stored request or execution profile; `data` holds its function table and folded stacks."""
+    __tablename__ = 'profiles'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)
+    target = Column(String, nullable=True)
+    mode = Column(String, nullable=False)
+    execution_id = Column(Integer, nullable=True)
+    workflow_id = Column(Integer, nullable=True)
+    duration_ms = Column(Float, nullable=True)
+    samples = Column(Integer, nullable=True)
+    data = Column(CompressedText, nullable=False)
+    created_at = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_profiles_execution_id', 'execution_id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'target': self.target,
+            'mode': self.mode,
+            'executionId': self.execution_id,
+            'workflowId': self.workflow_id,
+            'durationMs': self.duration_ms,
+            'samples': self.samples,
+            'createdAt': timestamp_to_iso(self.created_at)
         }
 
 db_url = 'sqlite:///local.db'
 engine = create_engine(db_url, echo=False)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def add_missing_columns():
+    """create_all does not alter existing tables, so add columns and indexes introduced since a table was created."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
 
 def get_db():
     db = SessionLocal()
@@ -0,0 +1,71 @@
+from datetime import datetime
+from .registry import BaseNode, register_node
+from .. import http_client
+from ..utils import resolve_variables
+
+@register_node('api_request')
+class APIRequestNode(BaseNode):
+    resource_pool = 'http'
+    service = 'http'
+    cacheable = True
+    streamable = True
+
+    def can_cache(self):
+        if self.config.get('mode') == 'batch':
+            return all((spec.get('method') or self.config.get('method', 'GET')).upper() == 'GET' for spec in self.config.get('requests', []))
+        return self.config.get('method', 'GET').upper() == 'GET'
+
+    def should_cache_result(self, result):
+        # Bodies spilled to disk belong to the execution that fetched them
+        entries = result.get('requests', [result])
+        return super().should_cache_result(result) and not any('body_path' in entry for entry in entries)
+
+    def execute(self):
+        request_timeout = http_client.get_timeout(self.config)
+        if self.config.get('mode') == 'batch':
+            return self.execute_batch(request_timeout)
+
+        url = resolve_variables(self.config.get('url', ''), self.context)
+        method = self.config.get('method', 'GET').upper()
+        headers = self.config.get('headers', {})
+        body = resolve_variables(self.config.get('body', ''), self.context)
+
+        self.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Sending {method} request to {url}"})
+        response = http_client.request_streamed(
+            method, url, headers=headers, data=body or None, timeout=request_timeout,
+            spill_path=f"/tmp/api_response_{self.execution_id}_{self.node_id}.bin"
+        )
+
+        if response['truncated']:
+            self.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Response of {response['size']} bytes streamed to {response['body_path']}"})
+            self.context[self.node_id] = {'response': response['preview'], 'body_path': response['body_path']}
+        else:
+            self.context[self.node_id] = {'response': response['data']}
+        return {'status': 'success', 'status_code': response['status_code'], **http_client.preview_of(response)}
+
+    def execute_batch(self, request_timeout):
+        specs = [
+            {
+                'method': (spec.get('method') or self.config.get('method', 'GET')).upper(),
+                'url': resolve_variables(spec.get('url', ''), self.context),
+                'headers': {k: resolve_variables(v, self.context) for k, v in (spec.get('headers') or self.config.get('headers') or {}).items()},
+                'body': resolve_variables(spec.get('body', ''), self.context)
+            }
+            for spec in self.config.get('requests', [])
+        ]
+        concurrency = int(self.config.get('concurrency', 8))
+        self.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Sending batch of {len(specs)} requests (concurrency {concurrency})"})
+        batch = http_client.run_batch(
+            specs, concurrency=concurrency, timeout=request_timeout,
+            spill_path_for=lambda idx: f"/tmp/api_response_{self.execution_id}_{self.node_id}_{idx}.bin"
+        )
+        failed = [entry for entry in batch if not entry['ok']]
+        self.context[self.node_id] = {'responses': [entry.get('data', entry.get('preview')) for entry in batch], 'failed': len(failed)}
+
+        if failed and self.config.get('failOnError', True):
+            error_msg = f"{len(failed)} of {len(batch)} batch requests failed"
+            self.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'ERROR', 'message': error_msg})
+            return {'status': 'failure', 'error': error_msg, 'requests': batch}
+
+        self.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Batch finished: {len(batch) - len(failed)} succeeded, {len(failed)} failed"})
+        return {'status': 'success', 'requests': batch}
@@ -0,0 +1,20 @@
+import json
+import requests
+from datetime import datetime
+from .registry import BaseNode, register_node
+
+@register_node('python_script')
+class PythonScriptNode(BaseNode):
+    resource_pool = 'cpu'
+    io_bound = False
+
+    def execute(self):
+        script_code = self.config.get('code', '')
+        self.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': "Executing Python script..."})
+
+        local_scope = {'context': self.context, 'result': None, 'requests': requests, 'json': json}
+        exec(script_code, {}, local_scope)
+
+        script_result = local_scope.get('result')
+        self.context[self.node_id] = {'result': script_result}
+        return {'status': 'success', 'result': script_result}
@@ -1,33 +1,219 @@
 import os
+import json
+import tempfile
 import importlib
 import pkgutil
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from ..metrics import NODES_IN_PROGRESS, register_collector
+from ..profiling import profile_thread
 
 class BaseNode:
-    def __init__(self, config, context, logs, storage, execution_id):
+    # Capabilities the executor uses to route and optimise a node type:
+    #   resource_pool - name of the executor pool the node runs on (see POOL_SIZES)
+    #   io_bound      - spends its time waiting on external systems rather than the CPU
+    #   cacheable     - read-only, so its output may be reused for identical inputs
+    #   streamable    - can produce large outputs that are spilled to disk instead of memory
+    resource_pool = 'io'
+    # External system the node calls, used to label call metrics (airflow, sql, sftp, s3, http)
+    service = None
+    io_bound = True
+    cacheable = False
+    streamable = False
+
+    def __init__(self, config, context, logs, storage, execution_id, node_id=None, workflow_nodes=None):
         self.config = config
         self.context = context
         self.logs = logs
         self.storage = storage
         self.execution_id = execution_id
+        self.node_id = node_id
+        self.workflow_nodes = workflow_nodes or []
+
+    # Config keys left out of the result cache key (e.g. settings re-applied on a cache hit)
+    cache_exclude_config = ()
+    # Config keys that must be set before the node can run
+    required_config = ()
+    # Executor settings every node accepts, with the smallest value each allows
+    numeric_settings = {'retries': 0, 'retryDelay': 0, 'timeout': 0}
+
+    @classmethod
+    def validate_config(cls, config):
+        """
+        Problems with a node's config that are known without running it. Templates are not
+        resolved yet, so only structure, required keys and executor settings are checked.
+        """
+        if not isinstance(config, dict):
+            return ['config must be an object']
+        errors = [f"{key} is required" for key in cls.required_config if not config.get(key)]
+        for key, minimum in cls.numeric_settings.items():
+            value = config.get(key)
+            if value is None or value == '':
+                continue
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                errors.append(f"{key} must be a number")
+                continue
+            if number < minimum:
+                errors.append(f"{key} must be at least {minimum}")
+        return errors
 
     def execute(self):
         raise NotImplementedError("Subclasses must implement execute()")
 
+    def can_cache(self):
+        """Whether this node's current configuration is read-only and may be served from the result cache."""
+        return self.cacheable
+
+    def should_cache_result(self, result):
+        return isinstance(result, dict) and result.get('status') == 'success'
+
+    def restore_cached(self, result):
+        """Adapt a cached result to this execution; the cached context has already been restored."""
+        return result
+
+    @classmethod
+    def capabilities(cls):
+        return {
+            'resourcePool': cls.resource_pool,
+            'ioBound': cls.io_bound,
+            'cacheable': cls.cacheable,
+            'streamable': cls.streamable
+        }
+
 NODE_REGISTRY = {}
+NODE_MODULES = {}
+# {node type: module name} read from the manifest; node modules are imported on first use
+_manifest = None
+
+# Maps node types to the module defining them, so a process only imports the node modules
+# its workflows use. Invalidated when any node module changes.
+MANIFEST_PATH = os.environ.get('NODE_MANIFEST_PATH', os.path.join(tempfile.gettempdir(), 'orchestrator_node_manifest.json'))
 
 def register_node(node_type):
     def decorator(cls):
+        cls.node_type = node_type
         NODE_REGISTRY[node_type] = cls
+        NODE_MODULES[node_type] = cls.__module__.rsplit('.', 1)[-1]
         return cls
     return decorator
 
+def _modules_fingerprint():
+    nodes_path = os.path.dirname(__file__)
+    entries = []
+    with os.scandir(nodes_path) as it:
+        for entry in it:
+            if entry.name.endswith('.py') and entry.name not in ('__init__.py', 'registry.py'):
+                stat = entry.stat()
+                entries.append([entry.name, int(stat.st_mtime), stat.st_size])
+    return sorted(entries)
+
+def _load_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+        if manifest.get('fingerprint') == _modules_fingerprint():
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _write_manifest():
+    try:
+        tmp_path = f"{MANIFEST_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'fingerprint': _modules_fingerprint(), 'nodes': NODE_MODULES}, f)
+        os.replace(tmp_path, MANIFEST_PATH)
+    except OSError:
+        pass
+
+def _import_node_module(module_name):
+    importlib.import_module(f'.{module_name}', package='server_py.nodes')
+
 def discover_nodes():
+    global _manifest
     nodes_path = os.path.dirname(__file__)
     for _, name, _ in pkgutil.iter_modules([nodes_path]):
         if name != 'registry':
-            importlib.import_module(f'.{name}', package='server_py.nodes')
+            _import_node_module(name)
+    _manifest = dict(NODE_MODULES)
+    _write_manifest()
 
-def get_node_class(node_type):
-    if not NODE_REGISTRY:
+def load_node_registry():
+    """
+    Load the node type to module map at startup. Node modules are imported by
+    get_node_class() when their type is first used; without a manifest matching the
+    modules on disk, all of them are imported once to rebuild it.
+    """
+    global _manifest
+    if _manifest is not None:
+        return
+    manifest = _load_manifest()
+    if manifest is None:
         discover_nodes()
-    return NODE_REGISTRY.get(node_type)
+    else:
+        _manifest = manifest['nodes']
+
+def get_node_class(node_type):
+    cls = NODE_REGISTRY.get(node_type)
+    if cls is None:
+        load_node_registry()
+        # The manifest matches the modules on disk, so a type it does not list does not exist
+        module_name = _manifest.get(node_type)
+        if module_name:
+            _import_node_module(module_name)
+            cls = NODE_REGISTRY.get(node_type)
+    return cls
+
+def get_node_capabilities():
+    load_node_registry()
+    for module_name in set(_manifest.values()):
+        _import_node_module(module_name)
+    return {node_type: cls.capabilities() for node_type, cls in NODE_REGISTRY.items()}
+
+# Worker pools nodes are routed to by their resource_pool. CPU-bound work gets a pool
+# sized to the machine so it cannot starve the IO pools; every size can be overridden
+# with NODE_POOL_<NAME>_SIZE.
+POOL_SIZES = {
+    'io': 32,
+    'http': 32,
+    'airflow': 16,
+    'sql': 8,
+    'cpu': os.cpu_count() or 2
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name):
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                size = int(os.environ.get(f'NODE_POOL_{name.upper()}_SIZE', POOL_SIZES.get(name, POOL_SIZES['io'])))
+                pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f'node-{name}')
+                _pools[name] = pool
+    return pool
+
+def _execute_tracked(node):
+    with NODES_IN_PROGRESS.track_inprogress(pool=node.resource_pool), profile_thread():
+        return node.execute()
+
+def run_node(node, timeout=None):
+    """Run node.execute() on the pool matching its resource_pool and wait for the result."""
+    pool = get_pool(node.resource_pool)
+    future = pool.submit(contextvars.copy_context().run, _execute_tracked, node)
+    return future.result(timeout=timeout)
+
+def _collect_pool_metrics():
+    with _pools_lock:
+        pools = dict(_pools)
+    return [
+        ('node_pool_size', 'gauge', 'Worker threads per node pool', [({'pool': name}, pool._max_workers) for name, pool in pools.items()]),
+        ('node_pool_queue_depth', 'gauge', 'Nodes waiting for a free worker per pool', [({'pool': name}, pool._work_queue.qsize()) for name, pool in pools.items()])
+    ]
+
+register_collector(_collect_pool_metrics)
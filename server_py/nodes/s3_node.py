@@ -0,0 +1,59 @@
+import os
+from .registry import BaseNode, register_node
+from ..utils import resolve_variables, save_download
+from ..metrics import track_call
+from ..lazy_imports import boto3
+
+def build_s3_client(cred):
+    # boto3 clients are thread-safe, so one per credential is shared by all nodes
+    cred_data = cred.get('data', {})
+    return boto3.client(
+        's3',
+        aws_access_key_id=cred_data.get('accessKey'),
+        aws_secret_access_key=cred_data.get('secretKey'),
+        region_name=cred_data.get('region', 'us-east-1')
+    )
+
+@register_node('s3_operation')
+class S3OperationNode(BaseNode):
+    resource_pool = 'io'
+    service = 's3'
+    cacheable = True
+    required_config = ('credentialId',)
+
+    def can_cache(self):
+        return self.config.get('operation', 'list') == 'list'
+
+    def execute(self):
+        bucket = resolve_variables(self.config.get('bucket', ''), self.context)
+        operation = self.config.get('operation', 'list')
+        key = resolve_variables(self.config.get('key', ''), self.context)
+        credential_id = self.config.get('credentialId')
+
+        if not credential_id:
+            raise Exception("S3 credentials required")
+
+        cred = self.storage.get_credential(int(credential_id))
+        if not cred or cred.get('type') != 's3':
+            raise Exception("Invalid S3 credential")
+
+        s3 = self.storage.get_credential_artifact(int(credential_id), 's3_client', build_s3_client)
+
+        with track_call('s3', credential_id):
+            if operation == 'list':
+                response = s3.list_objects_v2(Bucket=bucket, Prefix=self.config.get('prefix', ''))
+                contents = [obj['Key'] for obj in response.get('Contents', [])]
+                self.context[self.node_id] = {'files': contents}
+                return {'status': 'success', 'files': contents}
+            elif operation == 'upload':
+                content = resolve_variables(self.config.get('content', ''), self.context)
+                s3.put_object(Bucket=bucket, Key=key, Body=content)
+            elif operation == 'download':
+                downloaded_content, download = save_download(
+                    lambda file_obj: s3.download_fileobj(bucket, key, file_obj), self.node_id, self.execution_id, os.path.basename(key)
+                )
+                self.context[self.node_id] = {'content': downloaded_content, 'path': download['path']}
+                return {'status': 'success', **download}
+            elif operation == 'delete':
+                s3.delete_object(Bucket=bucket, Key=key)
+        return {'status': 'success'}
@@ -0,0 +1,62 @@
+import io
+import os
+from .registry import BaseNode, register_node
+from ..utils import resolve_variables, save_download
+from ..metrics import track_call
+from ..lazy_imports import paramiko
+
+@register_node('sftp_operation')
+class SFTPOperationNode(BaseNode):
+    resource_pool = 'io'
+    service = 'sftp'
+    cacheable = True
+    streamable = True
+    required_config = ('credentialId',)
+
+    def can_cache(self):
+        return self.config.get('operation', 'list') == 'list'
+
+    def execute(self):
+        host = resolve_variables(self.config.get('host', ''), self.context)
+        port = int(self.config.get('port', 22))
+        operation = self.config.get('operation', 'list') # list, upload, download, delete
+        remote_path = resolve_variables(self.config.get('remotePath', ''), self.context)
+        credential_id = self.config.get('credentialId')
+
+        if not credential_id:
+            raise Exception("SFTP credentials required")
+
+        cred = self.storage.get_credential(int(credential_id))
+        if not cred or cred.get('type') != 'sftp':
+            raise Exception("Invalid SFTP credential")
+
+        cred_data = cred.get('data', {})
+        with track_call('sftp', credential_id):
+            return self._run_operation(host, port, operation, remote_path, cred_data)
+
+    def _run_operation(self, host, port, operation, remote_path, cred_data):
+        transport = paramiko.Transport((host, port))
+        transport.connect(username=cred_data.get('username'), password=cred_data.get('password'))
+        sftp = paramiko.SFTPClient.from_transport(transport)
+
+        try:
+            if operation == 'list':
+                files = sftp.listdir(remote_path or '.')
+                self.context[self.node_id] = {'files': files}
+                return {'status': 'success', 'files': files}
+            elif operation == 'upload':
+                content = resolve_variables(self.config.get('content', ''), self.context)
+                file_obj = io.BytesIO(content.encode() if isinstance(content, str) else content)
+                sftp.putfo(file_obj, remote_path)
+            elif operation == 'download':
+                downloaded_content, download = save_download(
+                    lambda file_obj: sftp.getfo(remote_path, file_obj), self.node_id, self.execution_id, os.path.basename(remote_path)
+                )
+                self.context[self.node_id] = {'content': downloaded_content, 'path': download['path']}
+                return {'status': 'success', **download}
+            elif operation == 'delete':
+                sftp.remove(remote_path)
+            return {'status': 'success'}
+        finally:
+            sftp.close()
+            transport.close()
@@ -1,6 +1,6 @@
-import requests
 from .registry import BaseNode, register_node
 from ..utils import log, resolve_variables
+from ..slack_notifier import notifier
 from datetime import datetime
 
 @register_node('slack_notification')
@@ -8,7 +8,7 @@ class SlackNotificationNode(BaseNode):
     def execute(self):
         webhook_url = resolve_variables(self.config.get('webhookUrl', ''), self.context)
         message = resolve_variables(self.config.get('message', 'Workflow notification'), self.context)
-        
+
         credential_id = self.config.get('credentialId')
         if credential_id:
             cred = self.storage.get_credential(int(credential_id))
@@ -20,12 +20,19 @@ class SlackNotificationNode(BaseNode):
             raise Exception("Slack Webhook URL is missing")
 
         self.logs.append({
-            'timestamp': datetime.now().isoformat(), 
-            'level': 'INFO', 
-            'message': f"Sending Slack notification to {webhook_url[:20]}..."
+            'timestamp': datetime.now().isoformat(),
+            'level': 'INFO',
+            'message': f"Queueing Slack notification to {webhook_url[:20]}..."
         })
-        
-        response = requests.post(webhook_url, json={"text": message})
-        response.raise_for_status()
-        
-        return {'status': 'success', 'response': response.text}
+
+        delivery_id = notifier.enqueue(webhook_url, message, execution_id=self.execution_id)
+
+        # Delivery is asynchronous by default; opt in to waiting when the workflow depends on it
+        if self.config.get('waitForDelivery'):
+            delivery = notifier.wait(delivery_id, timeout=float(self.config.get('deliveryTimeout', 60)))
+            if not delivery or delivery['status'] != 'delivered':
+                status = delivery['status'] if delivery else 'unknown'
+                raise Exception(f"Slack delivery {status}: {(delivery or {}).get('error', 'timed out')}")
+            return {'status': 'success', 'deliveryId': delivery_id, 'delivery': 'delivered'}
+
+        return {'status': 'success', 'deliveryId': delivery_id, 'delivery': 'queued'}
@@ -1,37 +1,144 @@
+import re
+import json
+import threading
 import sqlalchemy
 from sqlalchemy import text
 from .registry import BaseNode, register_node
-from ..utils import log, resolve_variables
+from ..utils import log, resolve_variables, export_to_excel, artifact_ref
+from ..metrics import track_call
 from datetime import datetime
 
+# Engines (and their connection pools) are shared across nodes and executions per connection string
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(conn_str):
+    with _engines_lock:
+        engine = _engines.get(conn_str)
+        if engine is None:
+            engine = _engines[conn_str] = sqlalchemy.create_engine(conn_str, pool_pre_ping=True)
+        return engine
+
+def build_connection_string(cred):
+    cred_data = cred.get('data', {})
+    if cred.get('type') == 'mssql':
+        return f"mssql+pymssql://{cred_data.get('username')}:{cred_data.get('password')}@{cred_data.get('host')}:{cred_data.get('port', 1433)}/{cred_data.get('database')}"
+    return None
+
+# String literals, quoted identifiers and comments, blanked out before looking for keywords
+SQL_NON_CODE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\[[^\]]*\]|--[^\n]*|/\*.*?\*/", re.S)
+SQL_WRITE_KEYWORDS = re.compile(r'\b(into|insert|update|delete|merge|drop|alter|create|truncate|exec|execute|grant|revoke)\b', re.I)
+
+def is_read_only_query(query):
+    """A single SELECT/WITH statement that does not write (no SELECT ... INTO, DML or DDL)."""
+    statements = [s.strip() for s in SQL_NON_CODE.sub(' ', query).split(';') if s.strip()]
+    if len(statements) != 1:
+        return False
+    return statements[0].lower().startswith(('select', 'with')) and not SQL_WRITE_KEYWORDS.search(statements[0])
+
+ASSERTION_BUILTINS = {
+    'any': any, 'all': all, 'len': len, 'sum': sum, 'min': min, 'max': max,
+    'abs': abs, 'round': round, 'True': True, 'False': False, 'int': int,
+    'str': str, 'float': float, 'list': list, 'dict': dict, 'bool': bool,
+    'type': type, 'isinstance': isinstance
+}
+
 @register_node('sql_query')
 class SQLQueryNode(BaseNode):
-    def execute(self):
-        query = resolve_variables(self.config.get('query', ''), self.context)
+    resource_pool = 'sql'
+    service = 'sql'
+    cacheable = True
+    # The assertion is re-evaluated against cached rows, so editing it does not re-run the query
+    cache_exclude_config = ('pythonAssertion',)
+
+    def can_cache(self):
+        return is_read_only_query(resolve_variables(self.config.get('query', ''), self.context))
+
+    def should_cache_result(self, result):
+        # The query succeeded even when the assertion failed
+        return isinstance(result, dict)
+
+    def restore_cached(self, result):
+        return self.finish(self.context[self.node_id]['results'])
+
+    def run_query(self, query):
         credential_id = self.config.get('credentialId')
-        self.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Running SQL: {query}"})
-        
-        query_results = []
         try:
             if credential_id:
                 cred = self.storage.get_credential(int(credential_id))
                 if cred:
-                    cred_type = cred.get('type')
-                    cred_data = cred.get('data', {})
-                    
-                    if cred_type == 'mssql':
-                        conn_str = f"mssql+pymssql://{cred_data.get('username')}:{cred_data.get('password')}@{cred_data.get('host')}:{cred_data.get('port', 1433)}/{cred_data.get('database')}"
-                        engine = sqlalchemy.create_engine(conn_str)
-                        with engine.connect() as conn:
+                    conn_str = self.storage.get_credential_artifact(int(credential_id), 'sql_connection_string', build_connection_string)
+                    if conn_str:
+                        with track_call('sql', credential_id), get_engine(conn_str).connect() as conn:
                             result = conn.execute(text(query))
-                            query_results = [dict(row._mapping) for row in result]
-            else:
-                from ..models import engine as internal_engine
-                with internal_engine.connect() as conn:
-                    result = conn.execute(text(query))
-                    query_results = [dict(row._mapping) for row in result]
+                            return [dict(row._mapping) for row in result]
+                    raise Exception(f"Unsupported SQL credential type: {cred.get('type')}")
+                return []
+            # Use internal database engine
+            from ..models import engine as internal_engine
+            with track_call('sql', 'internal'), internal_engine.connect() as conn:
+                result = conn.execute(text(query))
+                return [dict(row._mapping) for row in result]
         except Exception as e:
+            log(f"SQL Execution failed: {e}", level='error')
             raise Exception(f"SQL Error: {str(e)}")
 
+    def evaluate_assertion(self, python_assertion, query_results):
+        """Evaluate the node's Python assertion; returns (passed, error_message)."""
+        try:
+            # Create a safe local scope for assertion evaluation
+            local_scope = {
+                'results': query_results,
+                'count': len(query_results),
+                'context': self.context,
+                'ctx': self.context,
+                'prev': self.context,
+                'datetime': datetime,
+                'json': json,
+                're': re
+            }
+            # Include previous node results as direct variables if they are valid identifiers
+            for k, v in self.context.items():
+                if k and isinstance(k, str) and k.isidentifier():
+                    local_scope[k] = v
+
+            if not eval(python_assertion, {"__builtins__": ASSERTION_BUILTINS}, local_scope):
+                return False, f"Assertion failed: '{python_assertion}' evaluated to False"
+            return True, None
+        except Exception as e:
+            return False, f"Assertion error: {str(e)}"
+
+    def execute(self):
+        query = resolve_variables(self.config.get('query', ''), self.context)
+        self.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Running SQL: {query}"})
+
+        return self.finish(self.run_query(query))
+
+    def finish(self, query_results):
+        """Export the rows, evaluate the assertion and publish them to the context."""
+        excel = export_to_excel(query_results, self.node_id, self.execution_id)
+        excel_path = excel['path'] if excel else None
+        artifacts = {'excel': artifact_ref(excel)} if excel else {}
+        if excel_path:
+            self.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Query results exported to Excel: {excel_path}"})
+
         record_count = len(query_results)
-        return {'status': 'success', 'count': record_count, 'results': query_results}
+
+        # Process Python assertion if provided
+        python_assertion = self.config.get('pythonAssertion', '').strip()
+        assertion_passed = True
+        assertion_error = None
+
+        if python_assertion:
+            assertion_passed, assertion_error = self.evaluate_assertion(python_assertion, query_results)
+            if assertion_passed:
+                self.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Assertion passed: '{python_assertion}'"})
+            else:
+                self.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'ERROR', 'message': assertion_error})
+
+        self.context['queryResult'] = {'record_count': record_count}
+        self.context[self.node_id] = {'count': record_count, 'excel_path': excel_path, 'results': query_results, 'assertion_passed': assertion_passed}
+
+        if assertion_passed:
+            return {'status': 'success', 'count': record_count, 'excel_path': excel_path, 'artifacts': artifacts}
+        return {'status': 'failure', 'count': record_count, 'excel_path': excel_path, 'artifacts': artifacts, 'error': assertion_error}
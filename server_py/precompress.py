@@ -0,0 +1,41 @@
+"""
+Write .gz (and .br when the brotli package is installed) siblings for the built
+frontend so the server can send precompressed assets without compressing per request:
+
+    python -m server_py.precompress client/dist
+"""
+import os
+import sys
+import gzip
+
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.html', '.svg', '.json', '.txt', '.map', '.ico')
+MIN_SIZE = 1024
+
+def precompress(root):
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    written = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, name)
+            if os.path.getsize(path) < MIN_SIZE:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            with open(path + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            written += 1
+            if brotli:
+                with open(path + '.br', 'wb') as f:
+                    f.write(brotli.compress(data, quality=11))
+                written += 1
+    return written
+
+if __name__ == '__main__':
+    target = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '..', 'client', 'dist')
+    print(f"Wrote {precompress(target)} precompressed files under {target}")
@@ -0,0 +1,83 @@
+"""
+Inter-process file locks: fcntl.flock on POSIX, msvcrt.locking on Windows.
+
+FileLock is taken without blocking and released on close (or when the process exits),
+so it doubles as a leader election between processes on one host: elect() keeps
+trying in the background and runs a callback once this process holds the lock.
+"""
+import os
+import time
+import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+from .utils import log
+
+ELECTION_INTERVAL = float(os.environ.get('ELECTION_INTERVAL', 15))
+
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """Take the lock if no other process holds it; True when this process holds it."""
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, 'a+')
+        try:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+def elect(path, on_elected, name='leader', interval=ELECTION_INTERVAL):
+    """
+    Run `on_elected()` in the one process that holds the lock at `path`. The others retry
+    every `interval` seconds and take over when the holder exits. Returns the FileLock.
+    """
+    lock = FileLock(path)
+
+    def elected():
+        log(f"Process {os.getpid()} elected to run the {name}")
+        on_elected()
+
+    def campaign():
+        while not lock.acquire():
+            time.sleep(interval)
+        elected()
+
+    if lock.acquire():
+        elected()
+    else:
+        threading.Thread(target=campaign, name=f"{name}-election", daemon=True).start()
+    return lock
@@ -0,0 +1,91 @@
+from flask import g, request, jsonify, Response
+from .storage import storage
+from .utils import log
+from .profiling import PROFILING_ADMIN_TOKEN, PROFILE_MODES, profiling_session, hot_functions, to_folded, is_admin
+
+HOT_FUNCTIONS_DEFAULT = 10
+
+def start_request_profile():
+    mode = request.headers.get('X-Profile') or request.args.get('profile')
+    if not mode or not is_admin(request):
+        return
+    if mode not in PROFILE_MODES:
+        mode = 'cprofile'
+    saved = {}
+    def save(summary):
+        saved['id'] = storage.save_profile(summary)
+        saved['summary'] = summary
+    session = profiling_session('request', f"{request.method} {request.path}", mode, save)
+    session.__enter__()
+    g.profile = (session, saved)
+
+def finish_request_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    session, saved = profile
+    session.__exit__(None, None, None)
+    log(f"Profiled {request.method} {request.path} as profile {saved['id']}")
+    if request.headers.get('X-Profile-Return') == '1' or request.args.get('profileReturn') == '1':
+        # The caller asked for the profile in place of the response body
+        summary = saved['summary']
+        top = request.args.get('top', HOT_FUNCTIONS_DEFAULT, type=int)
+        response = jsonify({'id': saved['id'], 'status': response.status_code, 'mode': summary['mode'],
+                            'durationMs': summary['durationMs'], 'hotFunctions': hot_functions(summary, top)})
+    response.headers['X-Profile-Id'] = str(saved['id'])
+    return response
+
+def abandon_request_profile(exc=None):
+    # after_request does not run when a view raises past the error handlers
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile[0].__exit__(None, None, None)
+
+def forbidden():
+    return jsonify({'message': 'Profiles require the profiling admin token'}), 403
+
+def register_profile_routes(app):
+    if PROFILING_ADMIN_TOKEN:
+        app.before_request(start_request_profile)
+        app.after_request(finish_request_profile)
+        app.teardown_request(abandon_request_profile)
+
+    @app.get('/api/profiles')
+    def list_profiles():
+        if not is_admin(request):
+            return forbidden()
+        top = request.args.get('top', HOT_FUNCTIONS_DEFAULT, type=int)
+        sort = 'cumulativeMs' if request.args.get('sort') == 'cumulative' else 'selfMs'
+        profiles = storage.get_profiles(
+            kind=request.args.get('kind'),
+            execution_id=request.args.get('executionId', type=int),
+            workflow_id=request.args.get('workflowId', type=int),
+            limit=min(request.args.get('limit', 50, type=int), 200)
+        )
+        for profile in profiles:
+            profile['hotFunctions'] = hot_functions(profile, top, sort)
+            del profile['functions']
+        return jsonify(profiles)
+
+    @app.get('/api/profiles/<int:id>')
+    def get_profile(id):
+        if not is_admin(request):
+            return forbidden()
+        profile = storage.get_profile(id)
+        if not profile:
+            return jsonify({'message': 'Profile not found'}), 404
+        if request.args.get('format') == 'folded':
+            if profile['mode'] != 'sampling':
+                return jsonify({'message': 'Folded stacks are only recorded in sampling mode'}), 400
+            response = Response(to_folded(profile), mimetype='text/plain')
+            response.headers['Content-Disposition'] = f'attachment; filename=profile_{id}.folded'
+            return response
+        return jsonify(profile)
+
+    @app.delete('/api/profiles/<int:id>')
+    def delete_profile(id):
+        if not is_admin(request):
+            return forbidden()
+        if not storage.delete_profile(id):
+            return jsonify({'message': 'Profile not found'}), 404
+        return '', 204
@@ -0,0 +1,247 @@
+"""
+On-demand profiling of API requests and workflow executions.
+
+Two modes:
+- 'cprofile': deterministic, every call of the profiled threads (precise call counts,
+  noticeably slows hot Python code)
+- 'sampling': a background thread records the stacks of the profiled threads every
+  PROFILE_SAMPLE_INTERVAL seconds (cheap, statistical, shows where time is spent waiting)
+
+Request profiling is admin-only: it is switched on by setting PROFILING_ADMIN_TOKEN, and
+a request is profiled when it carries `X-Profile: cprofile|sampling` (or `?profile=`)
+plus the token in `X-Profile-Token`. Without the token the hooks are not even
+registered, so unprofiled requests pay nothing.
+
+Executions are profiled when their workflow has `settings.profiling.enabled`. The
+session lives in a context variable that node pools copy into their worker threads, so
+node threads join it; outside a session that costs one context variable lookup per node.
+
+Profiles are summarised (hot functions, and folded stacks for flame graphs in sampling
+mode) and stored in the `profiles` table.
+"""
+import os
+import sys
+import hmac
+import time
+import random
+import pstats
+import cProfile
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILING_ADMIN_TOKEN = os.environ.get('PROFILING_ADMIN_TOKEN', '')
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.005))
+# Functions and folded stacks kept per stored profile
+PROFILE_MAX_FUNCTIONS = int(os.environ.get('PROFILE_MAX_FUNCTIONS', 300))
+PROFILE_MAX_STACKS = int(os.environ.get('PROFILE_MAX_STACKS', 500))
+PROFILE_MAX_DEPTH = 96
+PROFILE_MAX_STORED = int(os.environ.get('PROFILE_MAX_STORED', 200))
+PROFILE_MODES = ('cprofile', 'sampling')
+
+_session = contextvars.ContextVar('profile_session', default=None)
+
+class ProfileSession:
+    def __init__(self, kind, target, mode='cprofile', execution_id=None, workflow_id=None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}'")
+        self.kind = kind
+        self.target = target
+        self.mode = mode
+        self.execution_id = execution_id
+        self.workflow_id = workflow_id
+        self.started_at = None
+        self.started = None
+        self.duration = 0.0
+        self.profilers = []
+        # Sampling mode: thread id -> number of blocks the thread is inside
+        self.threads = {}
+        self.samples = Counter()
+        self.sample_count = 0
+        self.unprofiled_threads = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        if self.mode == 'sampling':
+            self._sampler = threading.Thread(target=self._sample_loop, name='profile-sampler', daemon=True)
+            self._sampler.start()
+        return self
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.started
+        if self._sampler:
+            self._stop.set()
+            self._sampler.join()
+
+    @contextmanager
+    def thread(self):
+        """Profile the current thread for the enclosed block."""
+        if self.mode == 'sampling':
+            ident = threading.get_ident()
+            with self._lock:
+                self.threads[ident] = self.threads.get(ident, 0) + 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    if self.threads[ident] == 1:
+                        del self.threads[ident]
+                    else:
+                        self.threads[ident] -= 1
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another deterministic profiler already owns this thread (or, on Python 3.12+,
+            # the process); that profiler sees the calls instead
+            with self._lock:
+                self.unprofiled_threads += 1
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self.profilers.append(profiler)
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop.wait(PROFILE_SAMPLE_INTERVAL):
+            with self._lock:
+                idents = [ident for ident in self.threads if ident != own]
+            if not idents:
+                continue
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[tuple(stack)] += 1
+                self.sample_count += 1
+
+    def summary(self):
+        """The stored form: metadata, hot functions and (sampling mode) folded stacks."""
+        if self.mode == 'sampling':
+            functions, stacks = _summarise_samples(self.samples)
+        else:
+            functions, stacks = _summarise_stats(self.profilers), []
+        return {
+            'kind': self.kind,
+            'target': self.target,
+            'mode': self.mode,
+            'executionId': self.execution_id,
+            'workflowId': self.workflow_id,
+            'startedAt': self.started_at,
+            'durationMs': round(self.duration * 1000, 2),
+            'samples': self.sample_count if self.mode == 'sampling' else None,
+            'sampleIntervalMs': PROFILE_SAMPLE_INTERVAL * 1000 if self.mode == 'sampling' else None,
+            'unprofiledThreads': self.unprofiled_threads,
+            'functions': functions,
+            'stacks': stacks
+        }
+
+def _function_name(filename, line, name):
+    return f"{name} ({os.path.basename(filename)}:{line})" if line else name
+
+def _summarise_stats(profilers):
+    if not profilers:
+        return []
+    stats = pstats.Stats(profilers[0])
+    for profiler in profilers[1:]:
+        stats.add(profiler)
+    functions = []
+    for (filename, line, name), (primitive_calls, calls, self_time, cumulative, _callers) in stats.stats.items():
+        functions.append({
+            'function': _function_name(filename, line, name),
+            'file': filename,
+            'line': line,
+            'calls': calls,
+            'selfMs': round(self_time * 1000, 3),
+            'cumulativeMs': round(cumulative * 1000, 3)
+        })
+    functions.sort(key=lambda f: f['selfMs'], reverse=True)
+    return functions[:PROFILE_MAX_FUNCTIONS]
+
+def _summarise_samples(samples):
+    interval_ms = PROFILE_SAMPLE_INTERVAL * 1000
+    self_counts, total_counts = Counter(), Counter()
+    folded = Counter()
+    for stack, count in samples.items():
+        self_counts[stack[-1]] += count
+        # Recursive functions count once per sample towards their inclusive time
+        for frame in set(stack):
+            total_counts[frame] += count
+        folded[';'.join(_function_name(*frame) for frame in stack)] += count
+    functions = [{
+        'function': _function_name(*frame),
+        'file': frame[0],
+        'line': frame[1],
+        'samples': count,
+        'selfMs': round(self_counts[frame] * interval_ms, 3),
+        'cumulativeMs': round(count * interval_ms, 3)
+    } for frame, count in total_counts.items()]
+    functions.sort(key=lambda f: (f['selfMs'], f['cumulativeMs']), reverse=True)
+    return functions[:PROFILE_MAX_FUNCTIONS], [[stack, count] for stack, count in folded.most_common(PROFILE_MAX_STACKS)]
+
+def hot_functions(profile, top=10, sort='selfMs'):
+    """The `top` entries of a stored profile's function table by `sort` (selfMs or cumulativeMs)."""
+    return sorted(profile.get('functions', []), key=lambda f: f.get(sort, 0), reverse=True)[:top]
+
+def to_folded(profile):
+    """Folded stacks ('a;b;c count' lines) as read by flamegraph.pl and speedscope."""
+    return ''.join(f"{stack} {count}\n" for stack, count in profile.get('stacks', []))
+
+@contextmanager
+def profile_thread():
+    """Join the current thread to the active profiling session, if any."""
+    session = _session.get()
+    if session is None:
+        yield
+        return
+    with session.thread():
+        yield
+
+@contextmanager
+def profiling_session(kind, target, mode, save, **meta):
+    """Profile the enclosed block (and node threads started from it); `save(summary)` persists it."""
+    session = ProfileSession(kind, target, mode, **meta).start()
+    token = _session.set(session)
+    try:
+        with session.thread():
+            yield session
+    finally:
+        _session.reset(token)
+        session.stop()
+        save(session.summary())
+
+def execution_profiling_mode(settings):
+    """
+    The mode a workflow's `settings.profiling` ({enabled, mode, rate}) asks for this run, or
+    None. `rate` (default 1) profiles only that fraction of executions.
+    """
+    config = (settings or {}).get('profiling') or {}
+    if not config.get('enabled') or random.random() >= float(config.get('rate', 1)):
+        return None
+    mode = config.get('mode', 'sampling')
+    return mode if mode in PROFILE_MODES else 'sampling'
+
+def is_admin(request):
+    """
+    Whether the request carries the profiling admin token. Only the header is accepted:
+    query strings end up in access logs, proxy logs and browser history.
+    """
+    token = request.headers.get('X-Profile-Token')
+    return bool(PROFILING_ADMIN_TOKEN and token) and hmac.compare_digest(token.encode(), PROFILING_ADMIN_TOKEN.encode())
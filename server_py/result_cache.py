@@ -0,0 +1,156 @@
+"""
+Opt-in result cache for read-only nodes.
+
+A node opts in with `"cache": true` in its config (and optionally `cacheTtl` seconds).
+Entries are keyed by node type, the node's fully resolved config, its credential and
+the outputs of its upstream nodes, and hold the node's result plus the context it wrote,
+encoded with typed_json so datetimes, Decimals and bytes come back as the same types.
+They live in a local sqlite file with a TTL and a total size bound (least recently used
+entries are evicted first).
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from .utils import resolve_variables
+from . import typed_json
+
+CACHE_PATH = os.environ.get('RESULT_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'orchestrator_result_cache.db'))
+DEFAULT_TTL = int(os.environ.get('RESULT_CACHE_TTL', 3600))
+MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+MAX_ENTRY_BYTES = int(os.environ.get('RESULT_CACHE_MAX_ENTRY_BYTES', 32 * 1024 * 1024))
+
+# Execution-control settings that do not change what a node reads
+NON_KEY_CONFIG = ('cache', 'cacheTtl', 'retries', 'retryDelay', 'timeout')
+
+def _resolve_config(value, context):
+    if isinstance(value, str):
+        return resolve_variables(value, context)
+    if isinstance(value, dict):
+        return {k: _resolve_config(v, context) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve_config(v, context) for v in value]
+    return value
+
+def fingerprint(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+def context_delta(before, after):
+    """Entries a node added or replaced in the shared execution context."""
+    return {k: v for k, v in after.items() if k not in before or before[k] is not v}
+
+def cache_key(node, node_type, upstream_ids):
+    excluded = NON_KEY_CONFIG + tuple(node.cache_exclude_config)
+    config = {k: v for k, v in node.config.items() if k not in excluded}
+    return fingerprint({
+        'type': node_type,
+        'config': _resolve_config(config, node.context),
+        'credentialId': node.config.get('credentialId'),
+        'upstream': {node_id: fingerprint(node.context.get(node_id)) for node_id in sorted(upstream_ids)}
+    })
+
+class ResultCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, node_type TEXT, value TEXT, size INTEGER, '
+                'created_at REAL, expires_at REAL, last_access REAL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access)')
+        return self._conn
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute('SELECT value, expires_at FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                db.commit()
+                return None
+            db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            db.commit()
+        return typed_json.loads(row[0])
+
+    def set(self, key, node_type, value, ttl=DEFAULT_TTL):
+        payload = typed_json.dumps(value)
+        if len(payload) > MAX_ENTRY_BYTES:
+            return False
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                'INSERT OR REPLACE INTO entries (key, node_type, value, size, created_at, expires_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, node_type, payload, len(payload), now, now + ttl, now)
+            )
+            self._evict(db, now)
+            db.commit()
+        return True
+
+    def _evict(self, db, now):
+        db.execute('DELETE FROM entries WHERE expires_at < ?', (now,))
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute('SELECT key, size FROM entries ORDER BY last_access').fetchall():
+            db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            db = self._db()
+            removed = db.execute('DELETE FROM entries').rowcount
+            db.commit()
+        return removed
+
+    def stats(self):
+        with self._lock:
+            db = self._db()
+            count, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+            by_type = dict(db.execute('SELECT node_type, COUNT(*) FROM entries GROUP BY node_type').fetchall())
+        return {'entries': count, 'bytes': size, 'maxBytes': self.max_bytes, 'byType': by_type}
+
+result_cache = ResultCache()
+
+def run_cached(node, node_type, upstream_ids, run):
+    """
+    Run `run()` for the node through the result cache when the node opted in and its
+    configuration is read-only. Records 'hit' or 'miss' under result['cache'].
+    """
+    if not node.config.get('cache') or not node.can_cache():
+        return run()
+
+    key = cache_key(node, node_type, upstream_ids)
+    entry = result_cache.get(key)
+    if entry is not None:
+        node.context.update(entry['context'])
+        node.logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Result served from cache ({key[:12]})"})
+        result = node.restore_cached(entry['result'])
+        result['cache'] = 'hit'
+        return result
+
+    before = dict(node.context)
+    result = run()
+    if node.should_cache_result(result):
+        # Cache only what the node itself wrote into the shared context
+        result_cache.set(key, node_type, {'result': result, 'context': context_delta(before, node.context)}, ttl=int(node.config.get('cacheTtl', DEFAULT_TTL)))
+    result['cache'] = 'miss'
+    return result
@@ -0,0 +1,175 @@
+"""
+Retention and compaction for executions and their files.
+
+Each pass, per workflow:
+  1. finished executions older than `archiveAfterDays` are compacted: logs and full
+     results move to a gzip archive and the row keeps a per-node status summary;
+  2. executions beyond `maxCount`, older than `maxAgeDays`, or (oldest first) beyond
+     `maxBytes` of stored logs/results are deleted together with their files.
+Then /tmp files whose execution no longer exists, unreferenced artifact blobs and old
+Slack deliveries sent outside an execution are removed, rows stored before column compression are recompressed, planner statistics are
+refreshed, and the database is vacuumed every VACUUM_INTERVAL seconds.
+
+Defaults come from RETENTION_* environment variables; a workflow can override them with
+`settings.retention`. A value of 0 disables that limit. The deletion limits (maxAgeDays,
+maxCount, maxBytes) default to 0, so no execution is deleted until they are configured.
+"""
+import os
+import time
+import tempfile
+import threading
+from .storage import storage
+from .archive import ARTIFACT_DIR, ARTIFACT_PATTERN
+from .artifacts import collect_garbage
+from .process_lock import FileLock
+from .utils import log
+
+RETENTION_ENABLED = os.environ.get('RETENTION_ENABLED', '1') == '1'
+RETENTION_INTERVAL = float(os.environ.get('RETENTION_INTERVAL', 3600))
+VACUUM_INTERVAL = float(os.environ.get('VACUUM_INTERVAL', 24 * 3600))
+# Files younger than this are never treated as orphans (their execution may not be committed yet)
+ORPHAN_GRACE_SECONDS = int(os.environ.get('RETENTION_ORPHAN_GRACE', 3600))
+# Slack deliveries without an execution are kept this long for status lookups
+SLACK_DELIVERY_RETENTION_SECONDS = float(os.environ.get('RETENTION_SLACK_DELIVERY_DAYS', 7)) * 24 * 3600
+LOCK_PATH = os.path.join(tempfile.gettempdir(), 'orchestrator_retention.lock')
+# Its mtime records the last VACUUM, shared by every process running retention
+VACUUM_MARKER_PATH = LOCK_PATH + '.vacuum'
+
+DEFAULT_POLICY = {
+    'archiveAfterDays': float(os.environ.get('RETENTION_ARCHIVE_AFTER_DAYS', 7)),
+    'maxAgeDays': float(os.environ.get('RETENTION_MAX_AGE_DAYS', 0)),
+    'maxCount': int(os.environ.get('RETENTION_MAX_COUNT', 0)),
+    'maxBytes': int(os.environ.get('RETENTION_MAX_BYTES', 0))
+}
+TERMINAL_STATUSES = ('completed', 'failed')
+DAY_MS = 24 * 3600 * 1000
+
+def policy_for(settings):
+    return {**DEFAULT_POLICY, **{k: v for k, v in (settings or {}).items() if k in DEFAULT_POLICY}}
+
+def select_expired(executions, policy, now_ms):
+    """Ids of finished executions (newest first input) that fall outside the policy."""
+    expired = []
+    total_bytes = 0
+    kept = 0
+    for execution_id, status, started_at, archived_at, size in executions:
+        if status not in TERMINAL_STATUSES:
+            continue
+        too_old = policy['maxAgeDays'] and started_at and now_ms - started_at > policy['maxAgeDays'] * DAY_MS
+        too_many = policy['maxCount'] and kept >= policy['maxCount']
+        too_big = policy['maxBytes'] and total_bytes + size > policy['maxBytes']
+        if too_old or too_many or too_big:
+            expired.append(execution_id)
+        else:
+            kept += 1
+            total_bytes += size
+    return expired
+
+def collect_orphan_artifacts(now=None):
+    """Remove per-execution files in ARTIFACT_DIR whose execution no longer exists."""
+    now = now or time.time()
+    candidates = {}
+    try:
+        with os.scandir(ARTIFACT_DIR) as it:
+            for entry in it:
+                match = ARTIFACT_PATTERN.match(entry.name)
+                if match and entry.is_file() and now - entry.stat().st_mtime > ORPHAN_GRACE_SECONDS:
+                    candidates.setdefault(int(match.group(2)), []).append(entry.path)
+    except OSError:
+        return 0
+    removed = 0
+    ids = list(candidates)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        known = storage.get_known_execution_ids(chunk)
+        for execution_id in chunk:
+            if execution_id in known:
+                continue
+            for path in candidates[execution_id]:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+    return removed
+
+class RetentionManager:
+    def __init__(self, interval=RETENTION_INTERVAL):
+        self.interval = interval
+        self.last_run = None
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def run_once(self, vacuum=None):
+        """Run one pass; returns its statistics, or None if another process is running one."""
+        with FileLock(LOCK_PATH) as acquired:
+            if not acquired:
+                return None
+            return self._run(vacuum)
+
+    def _run(self, vacuum):
+        started = time.time()
+        now_ms = int(started * 1000)
+        stats = {'archived': 0, 'archivedBytes': 0, 'deleted': 0, 'orphanFiles': 0, 'blobsRemoved': 0, 'blobBytesFreed': 0, 'slackDeliveriesRemoved': 0, 'logsDeduplicated': 0, 'recompressed': 0, 'vacuumed': False}
+
+        for workflow_id, settings in storage.get_workflow_retention_settings().items():
+            policy = policy_for(settings)
+            executions = storage.get_execution_sizes(workflow_id)
+            expired = select_expired(executions, policy, now_ms)
+            if expired:
+                stats['deleted'] += len(storage.delete_executions(execution_ids=expired))
+            if policy['archiveAfterDays']:
+                cutoff = now_ms - policy['archiveAfterDays'] * DAY_MS
+                expired_ids = set(expired)
+                for execution_id, status, started_at, archived_at, _ in executions:
+                    if execution_id in expired_ids or archived_at or status not in TERMINAL_STATUSES:
+                        continue
+                    if started_at and started_at < cutoff:
+                        stats['archivedBytes'] += storage.archive_execution(execution_id)
+                        stats['archived'] += 1
+
+        stats['orphanFiles'] = collect_orphan_artifacts()
+        stats['blobsRemoved'], stats['blobBytesFreed'] = collect_garbage()
+        stats['slackDeliveriesRemoved'] = storage.prune_slack_deliveries(started - SLACK_DELIVERY_RETENTION_SECONDS)
+        # Rows written before column compression existed, or before the log rows were the
+        # only copy of the logs; both are no-ops once the old rows have been rewritten
+        stats['logsDeduplicated'] = storage.drop_duplicate_logs()
+        stats['recompressed'] = storage.recompress_executions()
+        if vacuum is None:
+            try:
+                vacuum = time.time() - os.path.getmtime(VACUUM_MARKER_PATH) >= VACUUM_INTERVAL
+            except OSError:
+                vacuum = True
+        storage.optimize_database(vacuum=vacuum)
+        if vacuum:
+            with open(VACUUM_MARKER_PATH, 'w'):
+                pass
+            stats['vacuumed'] = True
+
+        stats['durationMs'] = int((time.time() - started) * 1000)
+        stats['finishedAt'] = time.time()
+        self.last_run = stats
+        log(f"Retention pass: archived {stats['archived']}, deleted {stats['deleted']}, removed {stats['orphanFiles']} orphan files in {stats['durationMs']}ms", source='retention')
+        return stats
+
+    def _loop(self):
+        # First pass shortly after startup, then every interval
+        while not self._stopping.wait(min(60, self.interval) if self.last_run is None else self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                log(f"Retention pass failed: {e}", source='retention', level='error')
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='retention', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+retention = RetentionManager()
+
+def start_retention():
+    if RETENTION_ENABLED:
+        retention.start()
@@ -0,0 +1,65 @@
+import time
+from flask import request, jsonify
+from .storage import storage
+from .scheduler import scheduler, validate_schedule, next_fire_time
+
+TIMING_FIELDS = ('cron', 'intervalSeconds', 'enabled')
+
+def register_schedule_routes(app):
+    @app.get('/api/schedules')
+    def list_schedules():
+        workflow_id = request.args.get('workflowId', type=int)
+        return jsonify(storage.get_schedules(workflow_id))
+
+    @app.post('/api/schedules')
+    def create_schedule():
+        data = request.json or {}
+        if not storage.get_workflow(data.get('workflowId')):
+            return jsonify({'message': 'Workflow not found'}), 404
+        error = validate_schedule(data)
+        if error:
+            return jsonify({'message': error}), 400
+        data['nextRunAt'] = next_fire_time(data, int(time.time() * 1000))
+        schedule = storage.create_schedule(data)
+        scheduler.reload(schedule['id'])
+        return jsonify(schedule), 201
+
+    @app.get('/api/schedules/<int:id>')
+    def get_schedule(id):
+        schedule = storage.get_schedule(id)
+        if not schedule:
+            return jsonify({'message': 'Schedule not found'}), 404
+        return jsonify(schedule)
+
+    @app.put('/api/schedules/<int:id>')
+    def update_schedule(id):
+        schedule = storage.get_schedule(id)
+        if not schedule:
+            return jsonify({'message': 'Schedule not found'}), 404
+        data = request.json or {}
+        merged = {**schedule, **data}
+        if 'cron' in data and data['cron']:
+            merged['intervalSeconds'] = data['intervalSeconds'] = None
+        elif 'intervalSeconds' in data and data['intervalSeconds']:
+            merged['cron'] = data['cron'] = None
+        error = validate_schedule(merged)
+        if error:
+            return jsonify({'message': error}), 400
+        if any(field in data for field in TIMING_FIELDS):
+            data['nextRunAt'] = next_fire_time(merged, int(time.time() * 1000))
+        schedule = storage.update_schedule(id, data)
+        scheduler.reload(id)
+        return jsonify(schedule)
+
+    @app.delete('/api/schedules/<int:id>')
+    def delete_schedule(id):
+        storage.delete_schedule(id)
+        scheduler.reload(id)
+        return '', 204
+
+    @app.post('/api/schedules/<int:id>/run')
+    def run_schedule_now(id):
+        schedule = storage.get_schedule(id)
+        if not schedule:
+            return jsonify({'message': 'Schedule not found'}), 404
+        return jsonify(scheduler.fire(schedule)), 202
@@ -0,0 +1,323 @@
+"""
+In-process workflow scheduler.
+
+Schedules (cron expressions or fixed intervals) are kept in the `schedules` table; the
+scheduler keeps the upcoming fire time of each one in a min-heap and sleeps until the
+earliest is due. Every fire time is claimed with a compare-and-set on `next_run_at`, so
+several processes may run a scheduler without starting the same run twice.
+
+A run only starts if its workflow has no active execution; the check and the insert are
+one conditional INSERT, so two schedulers cannot both start one. Runs that have to wait
+(overlapPolicy 'queue', catch_up) are kept in the `scheduled_runs` table and started,
+oldest first, by whichever scheduler sees the workflow become idle.
+"""
+import os
+import time
+import heapq
+import random
+import threading
+from datetime import datetime, timedelta
+from .storage import storage
+from .utils import log
+
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '1') == '1'
+# How often schedules changed by other processes are picked up, and queued runs re-checked
+SYNC_INTERVAL = float(os.environ.get('SCHEDULER_SYNC_INTERVAL', 30))
+QUEUE_POLL_INTERVAL = float(os.environ.get('SCHEDULER_QUEUE_POLL_INTERVAL', 5))
+MAX_QUEUED_RUNS = int(os.environ.get('SCHEDULER_MAX_QUEUED_RUNS', 10))
+
+MISFIRE_POLICIES = ('skip', 'run_once', 'catch_up')
+OVERLAP_POLICIES = ('skip', 'queue')
+
+class CronExpression:
+    """Standard five-field cron (minute hour day-of-month month day-of-week)."""
+
+    FIELDS = [('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 6)]
+    NAMES = {
+        'month': {name: i for i, name in enumerate(['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)},
+        'weekday': {name: i for i, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])}
+    }
+    MACROS = {
+        '@hourly': '0 * * * *', '@daily': '0 0 * * *', '@midnight': '0 0 * * *',
+        '@weekly': '0 0 * * 0', '@monthly': '0 0 1 * *', '@yearly': '0 0 1 1 *', '@annually': '0 0 1 1 *'
+    }
+
+    def __init__(self, expression):
+        self.expression = expression
+        parts = self.MACROS.get(expression.strip().lower(), expression).split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: '{expression}'")
+        self.values = {}
+        for part, (name, low, high) in zip(parts, self.FIELDS):
+            self.values[name] = self._parse_field(part, name, low, high)
+        # Sunday may be written as 7
+        if 7 in self.values['weekday']:
+            self.values['weekday'].discard(7)
+            self.values['weekday'].add(0)
+        self.day_restricted = parts[2] != '*'
+        self.weekday_restricted = parts[4] != '*'
+
+    def _parse_value(self, value, name):
+        value = value.lower()
+        if value in self.NAMES.get(name, {}):
+            return self.NAMES[name][value]
+        return int(value)
+
+    def _parse_field(self, field, name, low, high):
+        values = set()
+        for item in field.split(','):
+            step = 1
+            if '/' in item:
+                item, step_text = item.split('/', 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Invalid step in cron field '{field}'")
+            if item == '*':
+                start, end = low, high
+            elif '-' in item:
+                start_text, end_text = item.split('-', 1)
+                start, end = self._parse_value(start_text, name), self._parse_value(end_text, name)
+            else:
+                start = self._parse_value(item, name)
+                end = high if step > 1 else start
+            upper = 7 if name == 'weekday' else high
+            if start < low or end > upper or start > end:
+                raise ValueError(f"Cron field '{field}' is out of range for {name}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, dt):
+        day_ok = dt.day in self.values['day']
+        weekday_ok = (dt.isoweekday() % 7) in self.values['weekday']
+        # Like cron: when both day fields are restricted, either may match
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, dt):
+        """First matching minute strictly after `dt`."""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.values['month']:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.values['hour']:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.values['minute']:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+# Optional integer settings and the smallest value each accepts
+INTEGER_SETTINGS = {'jitterSeconds': 0, 'misfireGraceSeconds': 0, 'maxCatchUp': 0}
+
+def _check_integer(data, key, minimum):
+    value = data[key]
+    if isinstance(value, bool):
+        return f"{key} must be an integer"
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return f"{key} must be an integer"
+    if isinstance(value, float) and number != value:
+        return f"{key} must be an integer"
+    if number < minimum:
+        return f"{key} must be at least {minimum}"
+    return None
+
+def validate_schedule(data):
+    """Return an error message for invalid schedule settings, or None."""
+    if not data.get('cron') and not data.get('intervalSeconds'):
+        return 'Either cron or intervalSeconds is required'
+    if data.get('cron'):
+        try:
+            CronExpression(data['cron'])
+        except ValueError as e:
+            return str(e)
+    else:
+        error = _check_integer(data, 'intervalSeconds', 1)
+        if error:
+            return error
+    for key, minimum in INTEGER_SETTINGS.items():
+        error = _check_integer(data, key, minimum) if key in data else None
+        if error:
+            return error
+    if data.get('misfirePolicy', 'run_once') not in MISFIRE_POLICIES:
+        return f"misfirePolicy must be one of {', '.join(MISFIRE_POLICIES)}"
+    if data.get('overlapPolicy', 'skip') not in OVERLAP_POLICIES:
+        return f"overlapPolicy must be one of {', '.join(OVERLAP_POLICIES)}"
+    return None
+
+def next_fire_time(schedule, after_ms):
+    """Next nominal fire time (ms) strictly after `after_ms`."""
+    if schedule.get('cron'):
+        after = datetime.fromtimestamp(after_ms / 1000)
+        return int(CronExpression(schedule['cron']).next_after(after).timestamp() * 1000)
+    return after_ms + int(schedule['intervalSeconds']) * 1000
+
+class WorkflowScheduler:
+    def __init__(self):
+        self._heap = []
+        self._known = {}
+        self._queue_pending = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._sync()
+        self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+        self._thread.start()
+        log(f"Scheduler started with {len(self._known)} schedules", source='scheduler')
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def _push(self, schedule_id, next_run_at, jitter_seconds=0):
+        due = next_run_at / 1000 + (random.uniform(0, jitter_seconds) if jitter_seconds else 0)
+        self._known[schedule_id] = next_run_at
+        heapq.heappush(self._heap, (due, schedule_id, next_run_at))
+        self._cond.notify_all()
+
+    def _sync(self):
+        """Pick up schedules created or changed by any process."""
+        next_runs = storage.get_schedule_next_runs()
+        with self._cond:
+            for schedule_id in list(self._known):
+                if schedule_id not in next_runs:
+                    del self._known[schedule_id]
+            changed = {schedule_id: next_run_at for schedule_id, next_run_at in next_runs.items() if self._known.get(schedule_id) != next_run_at}
+        # Database reads happen outside the lock so that fire() and reload() never wait on them
+        schedules = {schedule_id: storage.get_schedule(schedule_id) for schedule_id in changed}
+        with self._cond:
+            for schedule_id, next_run_at in changed.items():
+                self._push(schedule_id, next_run_at, schedules[schedule_id]['jitterSeconds'] if schedules[schedule_id] else 0)
+
+    def reload(self, schedule_id):
+        """Called after a schedule is created, updated or deleted through the API."""
+        next_runs = storage.get_schedule_next_runs()
+        schedule = storage.get_schedule(schedule_id) if schedule_id in next_runs else None
+        with self._cond:
+            if schedule:
+                self._push(schedule_id, next_runs[schedule_id], schedule['jitterSeconds'])
+            else:
+                self._known.pop(schedule_id, None)
+
+    def _loop(self):
+        last_sync = time.time()
+        while True:
+            due_entries = []
+            with self._cond:
+                if self._stopping:
+                    return
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    due_entries.append(heapq.heappop(self._heap))
+                if not due_entries:
+                    wait = QUEUE_POLL_INTERVAL if self._queue_pending else SYNC_INTERVAL
+                    if self._heap:
+                        wait = min(wait, self._heap[0][0] - now)
+                    self._cond.wait(max(wait, 0))
+            for _, schedule_id, next_run_at in due_entries:
+                # Entries superseded by a later push are dropped here
+                if self._known.get(schedule_id) != next_run_at:
+                    continue
+                try:
+                    self._process(schedule_id, next_run_at)
+                except Exception as e:
+                    log(f"Schedule {schedule_id} failed to fire: {e}", source='scheduler', level='error')
+            try:
+                self._drain_queued()
+                if time.time() - last_sync >= SYNC_INTERVAL:
+                    self._sync()
+                    last_sync = time.time()
+            except Exception as e:
+                log(f"Scheduler maintenance failed: {e}", source='scheduler', level='error')
+
+    def _process(self, schedule_id, next_run_at):
+        schedule = storage.get_schedule(schedule_id)
+        if not schedule or not schedule['enabled']:
+            self._known.pop(schedule_id, None)
+            return
+
+        now_ms = int(time.time() * 1000)
+        missed = [next_run_at]
+        following = next_fire_time(schedule, next_run_at)
+        while following <= now_ms and len(missed) <= schedule['maxCatchUp']:
+            missed.append(following)
+            following = next_fire_time(schedule, following)
+        upcoming = following if following > now_ms else next_fire_time(schedule, now_ms)
+
+        if not storage.claim_schedule_run(schedule_id, next_run_at, upcoming):
+            # Another scheduler already fired this time; follow whatever it stored
+            self.reload(schedule_id)
+            return
+        with self._cond:
+            self._push(schedule_id, upcoming, schedule['jitterSeconds'])
+
+        # Jitter delay counts towards lateness, so the grace period is measured after it
+        lateness = (now_ms - next_run_at) / 1000 - schedule['jitterSeconds']
+        if lateness <= schedule['misfireGraceSeconds'] and len(missed) == 1:
+            fires = missed
+        elif schedule['misfirePolicy'] == 'skip':
+            log(f"Schedule {schedule_id} misfired by {int(lateness)}s; skipping {len(missed)} run(s)", source='scheduler', level='warning')
+            fires = []
+        elif schedule['misfirePolicy'] == 'catch_up':
+            # Missed runs are replayed one after another rather than overlapping
+            for fire_time in missed[:schedule['maxCatchUp']]:
+                self.fire(schedule, fire_time, catch_up=True)
+            return
+        else:
+            fires = missed[-1:]
+        for fire_time in fires:
+            self.fire(schedule, fire_time)
+
+    def fire(self, schedule, fire_time_ms=None, catch_up=False):
+        """Start (or queue) one run of the schedule, applying its overlap policy."""
+        fire_time = datetime.fromtimestamp((fire_time_ms or int(time.time() * 1000)) / 1000)
+        params = {'runDate': fire_time.strftime('%Y-%m-%d'), **(schedule.get('params') or {}), 'scheduledAt': fire_time.isoformat()}
+        workflow_id = schedule['workflowId']
+        # Runs already waiting go first
+        if not storage.has_queued_runs(workflow_id):
+            execution = storage.create_execution_if_idle(workflow_id, params)
+            if execution:
+                return {'status': 'started', 'execution': self._started(schedule['id'], execution)}
+        if catch_up or schedule['overlapPolicy'] == 'queue':
+            if storage.queue_scheduled_run(schedule['id'], workflow_id, params, limit=None if catch_up else MAX_QUEUED_RUNS):
+                with self._cond:
+                    self._queue_pending = True
+                    self._cond.notify_all()
+                log(f"Schedule {schedule['id']}: workflow {workflow_id} is running; run queued", source='scheduler')
+                return {'status': 'queued'}
+        log(f"Schedule {schedule['id']}: workflow {workflow_id} is running; run skipped", source='scheduler')
+        return {'status': 'skipped'}
+
+    def _started(self, schedule_id, execution):
+        from .executor import dispatch_execution
+        dispatch_execution(execution)
+        storage.record_schedule_run(schedule_id, execution['id'])
+        log(f"Schedule {schedule_id} started execution {execution['id']}", source='scheduler')
+        return execution
+
+    def _drain_queued(self):
+        """Start the oldest queued run of every workflow that has become idle."""
+        queued = storage.get_queued_runs()
+        for run in queued:
+            execution = storage.create_execution_if_idle(run['workflowId'], run['params'], queued_run_id=run['id'])
+            if execution:
+                self._started(run['scheduleId'], execution)
+        self._queue_pending = bool(queued)
+
+scheduler = WorkflowScheduler()
+
+def start_scheduler():
+    if SCHEDULER_ENABLED:
+        scheduler.start()
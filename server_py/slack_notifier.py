@@ -0,0 +1,195 @@
+import os
+import time
+import uuid
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .http_client import get_session
+from .storage import storage
+from .utils import log
+
+COALESCE_WINDOW = float(os.environ.get('SLACK_COALESCE_WINDOW', 1.0))
+MIN_POST_INTERVAL = float(os.environ.get('SLACK_MIN_POST_INTERVAL', 1.0))
+MAX_BATCH_MESSAGES = int(os.environ.get('SLACK_MAX_BATCH_MESSAGES', 20))
+MAX_BATCH_CHARS = 3500
+MAX_ATTEMPTS = int(os.environ.get('SLACK_MAX_ATTEMPTS', 5))
+MAX_BACKOFF = 60
+DELIVERY_HISTORY = 5000
+
+
+class SlackNotifier:
+    """
+    Background delivery of Slack webhook messages.
+
+    Messages are queued per webhook and coalesced: everything queued for the same
+    webhook within COALESCE_WINDOW is posted as one message. Each webhook is posted
+    to at most once per MIN_POST_INTERVAL (Slack allows roughly one message per second),
+    429 responses honour Retry-After and other failures back off exponentially.
+
+    The queue lives in the process that enqueued the message, but every delivery's state
+    is written to the `slack_deliveries` table, so get_delivery() works in any process.
+    """
+
+    def __init__(self, workers=4):
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._ready_at = {}
+        self._next_allowed = {}
+        self._in_flight = set()
+        self._deliveries = OrderedDict()
+        self._workers = workers
+        self._pool = None
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='slack-post')
+            self._thread = threading.Thread(target=self._run, name='slack-notifier', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, webhook_url, text, execution_id=None):
+        """Queue a message and return its delivery id immediately."""
+        delivery_id = uuid.uuid4().hex
+        queued_at = time.time()
+        storage.create_slack_delivery(delivery_id, execution_id, queued_at)
+        with self._cond:
+            self._ensure_started()
+            self._deliveries[delivery_id] = {
+                'id': delivery_id,
+                'status': 'queued',
+                'attempts': 0,
+                'executionId': execution_id,
+                'queuedAt': queued_at,
+                'event': threading.Event()
+            }
+            while len(self._deliveries) > DELIVERY_HISTORY:
+                self._deliveries.popitem(last=False)
+
+            queue = self._pending.setdefault(webhook_url, deque())
+            if not queue:
+                self._ready_at[webhook_url] = time.time() + COALESCE_WINDOW
+            queue.append((delivery_id, text))
+            self._cond.notify()
+        return delivery_id
+
+    def get_delivery(self, delivery_id):
+        return storage.get_slack_delivery(delivery_id)
+
+    def wait(self, delivery_id, timeout=None):
+        """Block until the delivery is settled (delivered or failed); returns its final state."""
+        with self._cond:
+            delivery = self._deliveries.get(delivery_id)
+        if delivery:
+            delivery['event'].wait(timeout)
+        return self.get_delivery(delivery_id)
+
+    def _next_ready(self, now):
+        earliest = None
+        for webhook_url, queue in self._pending.items():
+            if not queue or webhook_url in self._in_flight:
+                continue
+            ready = max(self._ready_at.get(webhook_url, now), self._next_allowed.get(webhook_url, 0))
+            if ready <= now:
+                return webhook_url, None
+            earliest = ready if earliest is None else min(earliest, ready)
+        return None, earliest
+
+    def _take_batch(self, webhook_url):
+        queue = self._pending[webhook_url]
+        batch = []
+        chars = 0
+        while queue and len(batch) < MAX_BATCH_MESSAGES:
+            delivery_id, text = queue[0]
+            if batch and chars + len(text) + 1 > MAX_BATCH_CHARS:
+                break
+            batch.append(queue.popleft())
+            chars += len(text) + 1
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                webhook_url, earliest = self._next_ready(time.time())
+                if webhook_url is None:
+                    self._cond.wait(None if earliest is None else max(0.0, earliest - time.time()))
+                    continue
+                batch = self._take_batch(webhook_url)
+                self._in_flight.add(webhook_url)
+            self._pool.submit(self._deliver, webhook_url, batch)
+
+    def _deliver(self, webhook_url, batch):
+        text = '\n'.join(message for _, message in batch)
+        retry_after = None
+        error = None
+        try:
+            response = get_session().post(webhook_url, json={'text': text}, timeout=(10, 30))
+            if response.status_code == 429:
+                retry_after = float(response.headers.get('Retry-After', 1))
+                error = 'rate limited'
+            else:
+                response.raise_for_status()
+        except Exception as e:
+            error = str(e)
+
+        now = time.time()
+        settled = []
+        with self._cond:
+            if error is None:
+                for delivery_id, _ in batch:
+                    settled.append(self._settle(delivery_id, 'delivered', now))
+            else:
+                requeue = []
+                attempts = 0
+                for delivery_id, message in batch:
+                    delivery = self._deliveries.get(delivery_id)
+                    if delivery is None:
+                        continue
+                    # Rate limiting is not the message's fault, so it does not use up an attempt
+                    if retry_after is None:
+                        delivery['attempts'] += 1
+                    delivery['error'] = error
+                    attempts = max(attempts, delivery['attempts'])
+                    if delivery['attempts'] >= MAX_ATTEMPTS:
+                        settled.append(self._settle(delivery_id, 'failed', now))
+                        log(f"Slack delivery {delivery_id} failed after {delivery['attempts']} attempts: {error}", source='slack', level='error')
+                    else:
+                        requeue.append((delivery_id, message))
+                if requeue:
+                    queue = self._pending.setdefault(webhook_url, deque())
+                    queue.extendleft(reversed(requeue))
+            states = [{k: v for k, v in self._deliveries[delivery_id].items() if k != 'event'}
+                      for delivery_id, _ in batch if delivery_id in self._deliveries]
+
+        # Written before the webhook is released, so a later attempt's state cannot be
+        # overwritten by this one, and before waiters are woken, so they read the outcome
+        try:
+            storage.update_slack_deliveries(states)
+        except Exception as e:
+            log(f"Could not record Slack delivery state: {e}", source='slack', level='error')
+
+        with self._cond:
+            self._in_flight.discard(webhook_url)
+            if error is None:
+                self._next_allowed[webhook_url] = now + MIN_POST_INTERVAL
+            else:
+                backoff = retry_after if retry_after is not None else min(MAX_BACKOFF, 2 ** attempts)
+                self._next_allowed[webhook_url] = now + backoff
+            if self._pending.get(webhook_url):
+                self._ready_at[webhook_url] = now
+            self._cond.notify()
+        for event in settled:
+            if event is not None:
+                event.set()
+
+    def _settle(self, delivery_id, status, now):
+        """Record the final status; returns the event to set once it is stored."""
+        delivery = self._deliveries.get(delivery_id)
+        if delivery is None:
+            return None
+        delivery['status'] = status
+        if status == 'delivered':
+            delivery['deliveredAt'] = now
+            delivery.pop('error', None)
+        return delivery['event']
+
+notifier = SlackNotifier()
@@ -0,0 +1,37 @@
+import os
+import mimetypes
+from flask import request, send_from_directory
+
+# Vite emits content-hashed file names under assets/, so those can be cached forever.
+# Everything else (index.html in particular) must be revalidated on every load.
+IMMUTABLE_PREFIXES = ('assets/',)
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Checked in order of preference against the request's Accept-Encoding
+PRECOMPRESSED_VARIANTS = [('br', '.br'), ('gzip', '.gz')]
+
+def _accepted_encodings():
+    header = request.headers.get('Accept-Encoding', '')
+    return {part.split(';')[0].strip().lower() for part in header.split(',') if part.strip()}
+
+def serve_static(static_folder, path):
+    """Serve a built frontend file, preferring a precompressed variant and setting cache headers."""
+    accepted = _accepted_encodings()
+    response = None
+    for encoding, suffix in PRECOMPRESSED_VARIANTS:
+        if encoding in accepted and os.path.isfile(os.path.join(static_folder, path + suffix)):
+            response = send_from_directory(static_folder, path + suffix)
+            # Keep the original file's type rather than application/gzip
+            response.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = send_from_directory(static_folder, path)
+
+    response.headers['Vary'] = 'Accept-Encoding'
+    if path.startswith(IMMUTABLE_PREFIXES):
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response
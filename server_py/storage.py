@@ -1,16 +1,92 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy import and_, desc, exists, func, insert, literal, or_, select, update
 from datetime import datetime
+import os
+import copy
 import json
 import time
-from .models import Workflow, Credential, Execution, SessionLocal
+import threading
+from .models import engine, load_json, COMPRESSION_MIN_BYTES, Workflow, Credential, Execution, ExecutionBatch, ExecutionLog, ExecutionCheckpoint, ExecutionTrace, Profile, Schedule, ScheduledRun, SlackDelivery, Artifact, ArtifactRef, SessionLocal
+from .utils import log
+from . import typed_json
+from .events import event_bus
+from .workflow_plan import WorkflowPlan
+from .archive import archive_path, read_archive, write_archive, remove_execution_files
+from .metrics import DB_WRITE_DURATION, EXECUTIONS_FINISHED, register_collector
+from .tracing import span
+from .profiling import PROFILE_MAX_STORED
 
 def get_timestamp_ms():
     return int(time.time() * 1000)
 
+CREDENTIAL_CACHE_CHECK_INTERVAL = float(os.environ.get('CREDENTIAL_CACHE_CHECK_INTERVAL', 2))
+
+class CredentialCache:
+    """
+    Thread-safe cache of credentials keyed by (id, updated_at). Objects derived from a
+    credential (auth headers, connection strings, clients) are cached in the same entry, so
+    they are invalidated together with it. Entries are dropped on update/delete in this
+    process; changes made by other processes are noticed by re-reading updated_at at most
+    every CREDENTIAL_CACHE_CHECK_INTERVAL seconds.
+    """
+    def __init__(self, check_interval=CREDENTIAL_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def get(self, id):
+        with self._lock:
+            return self._entries.get(id)
+    
+    def put(self, id, version, credential):
+        entry = {'version': version, 'checked_at': time.time(), 'credential': credential, 'derived': {}}
+        with self._lock:
+            self._entries[id] = entry
+        return entry
+    
+    def invalidate(self, id=None):
+        with self._lock:
+            if id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(id, None)
+
+WORKFLOW_CACHE_CHECK_INTERVAL = float(os.environ.get('WORKFLOW_CACHE_CHECK_INTERVAL', 2))
+
+class WorkflowCache:
+    """
+    Parsed workflow definitions and compiled plans keyed by (id, updated_at). Entries are
+    dropped on update/delete in this process; changes made by other processes are noticed
+    by re-reading updated_at at most every WORKFLOW_CACHE_CHECK_INTERVAL seconds.
+    """
+    def __init__(self, check_interval=WORKFLOW_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def get(self, id):
+        with self._lock:
+            return self._entries.get(id)
+    
+    def put(self, id, version, plan):
+        entry = {'version': version, 'checked_at': time.time(), 'plan': plan}
+        with self._lock:
+            self._entries[id] = entry
+        return entry
+    
+    def invalidate(self, id=None):
+        with self._lock:
+            if id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(id, None)
+
 class DatabaseStorage:
     def __init__(self):
         self.Session = SessionLocal
+        self.credential_cache = CredentialCache()
+        self.workflow_cache = WorkflowCache()
     
     def get_db(self):
         return self.Session()
@@ -20,10 +96,28 @@ class DatabaseStorage:
             workflows = db.query(Workflow).order_by(desc(Workflow.updated_at)).all()
             return [w.to_dict() for w in workflows]
     
-    def get_workflow(self, id: int):
+    def get_workflow_plan(self, id: int):
+        """Cached, read-only WorkflowPlan for the current version of the workflow (or None)."""
+        entry = self.workflow_cache.get(id)
+        if entry and time.time() - entry['checked_at'] < self.workflow_cache.check_interval:
+            return entry['plan']
         with self.get_db() as db:
+            version = db.query(Workflow.updated_at).filter(Workflow.id == id).scalar()
+            if version is None and not db.query(Workflow.id).filter(Workflow.id == id).first():
+                self.workflow_cache.invalidate(id)
+                return None
+            if entry and entry['version'] == version:
+                entry['checked_at'] = time.time()
+                return entry['plan']
             workflow = db.query(Workflow).filter(Workflow.id == id).first()
-            return workflow.to_dict() if workflow else None
+            plan = WorkflowPlan(workflow.to_dict())
+        self.workflow_cache.put(id, version, plan)
+        return plan
+    
+    def get_workflow(self, id: int):
+        plan = self.get_workflow_plan(id)
+        # The cached definition is shared, so hand out a copy
+        return copy.deepcopy(plan.workflow) if plan else None
     
     def create_workflow(self, data: dict):
         with self.get_db() as db:
@@ -34,12 +128,14 @@ class DatabaseStorage:
                 nodes=json.dumps(data.get('nodes', [])),
                 edges=json.dumps(data.get('edges', [])),
                 last_prompt=data.get('lastPrompt'),
+                settings=json.dumps(data['settings']) if data.get('settings') else None,
                 created_at=now,
                 updated_at=now
             )
             db.add(workflow)
             db.commit()
             db.refresh(workflow)
+            self.workflow_cache.invalidate(workflow.id)
             return workflow.to_dict()
     
     def update_workflow(self, id: int, data: dict):
@@ -58,21 +154,133 @@ class DatabaseStorage:
                 workflow.edges = json.dumps(data['edges'])
             if 'lastPrompt' in data:
                 workflow.last_prompt = data['lastPrompt']
+            if 'settings' in data:
+                workflow.settings = json.dumps(data['settings']) if data['settings'] else None
             
             workflow.updated_at = get_timestamp_ms()
             db.commit()
             db.refresh(workflow)
+            self.workflow_cache.invalidate(id)
             return workflow.to_dict()
     
     def delete_workflow(self, id: int):
         with self.get_db() as db:
-            # Delete related executions first to satisfy foreign key constraints
-            db.query(Execution).filter(Execution.workflow_id == id).delete(synchronize_session=False)
-            
-            workflow = db.query(Workflow).filter(Workflow.id == id).first()
-            if workflow:
-                db.delete(workflow)
-                db.commit()
+            execution_ids = self._delete_workflow_rows(db, [id])
+            db.commit()
+            self.workflow_cache.invalidate(id)
+        remove_execution_files(execution_ids)
+    
+    def _delete_workflow_rows(self, db, ids: list):
+        """Delete workflows with their executions, batches, schedules and queued runs; returns the execution ids."""
+        # Related rows first to satisfy foreign key constraints
+        execution_ids = self._delete_execution_rows(db, db.query(Execution.id).filter(Execution.workflow_id.in_(ids)))
+        db.query(ExecutionBatch).filter(ExecutionBatch.workflow_id.in_(ids)).delete(synchronize_session=False)
+        db.query(ScheduledRun).filter(ScheduledRun.workflow_id.in_(ids)).delete(synchronize_session=False)
+        db.query(Schedule).filter(Schedule.workflow_id.in_(ids)).delete(synchronize_session=False)
+        db.query(Workflow).filter(Workflow.id.in_(ids)).delete(synchronize_session=False)
+        return execution_ids
+    
+    def _bulk_save(self, db, model, batch, upsert, to_row):
+        """
+        Insert/update a batch in one transaction. Items with an `id` update that row; with
+        `upsert`, items whose name matches an existing row update it; the rest are inserted.
+        """
+        now = get_timestamp_ms()
+        ids = [item['id'] for _, item in batch if item.get('id') is not None]
+        known_ids = {row.id for row in db.query(model.id).filter(model.id.in_(ids))} if ids else set()
+        by_name = {}
+        if upsert:
+            names = [item['name'] for _, item in batch if item.get('id') is None]
+            by_name = {row.name: row.id for row in db.query(model.name, model.id).filter(model.name.in_(names)).order_by(model.id)}
+
+        results, inserts, updates, seen_names = [], [], [], set()
+        for index, item in batch:
+            row = to_row(item)
+            if item.get('id') is not None:
+                if item['id'] not in known_ids:
+                    results.append({'index': index, 'status': 'error', 'error': f"{model.__name__} {item['id']} not found"})
+                    continue
+                updates.append({'id': item['id'], **row})
+                results.append({'index': index, 'status': 'updated', 'id': item['id']})
+            elif upsert and item['name'] in seen_names:
+                results.append({'index': index, 'status': 'error', 'error': 'Duplicate name in this batch'})
+            elif upsert and item['name'] in by_name:
+                seen_names.add(item['name'])
+                updates.append({'id': by_name[item['name']], **row})
+                results.append({'index': index, 'status': 'updated', 'id': by_name[item['name']]})
+            else:
+                seen_names.add(item['name'])
+                inserts.append({**row, 'created_at': now})
+                results.append({'index': index, 'status': 'created'})
+
+        if inserts:
+            new_ids = db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), inserts).scalars().all()
+            created = iter(new_ids)
+            for result in results:
+                if result['status'] == 'created':
+                    result['id'] = next(created)
+        for row in updates:
+            if hasattr(model, 'updated_at'):
+                row['updated_at'] = now
+        # Executemany UPDATE groups rows by their key set, so partial updates are fine
+        if updates:
+            db.execute(update(model), updates)
+        db.commit()
+        return results
+    
+    def bulk_save_workflows(self, batch: list, upsert: bool = False):
+        """`batch` is a list of (index, workflow data); returns a result per item."""
+        def to_row(data):
+            row = {}
+            for key, column in (('name', 'name'), ('description', 'description'), ('lastPrompt', 'last_prompt')):
+                if key in data:
+                    row[column] = data[key]
+            if 'settings' in data:
+                row['settings'] = json.dumps(data['settings']) if data['settings'] else None
+            for key in ('nodes', 'edges'):
+                if key in data or 'id' not in data:
+                    row[key] = json.dumps(data.get(key, []))
+            row['updated_at'] = get_timestamp_ms()
+            return row
+        with self.get_db() as db:
+            results = self._bulk_save(db, Workflow, batch, upsert, to_row)
+        for result in results:
+            if result.get('id') is not None:
+                self.workflow_cache.invalidate(result['id'])
+        return results
+    
+    def bulk_save_credentials(self, batch: list, upsert: bool = False):
+        def to_row(data):
+            row = {key: data[key] for key in ('name', 'type') if key in data}
+            row['updated_at'] = get_timestamp_ms()
+            if 'data' in data or 'id' not in data:
+                row['data'] = json.dumps(data.get('data', {}))
+            return row
+        with self.get_db() as db:
+            results = self._bulk_save(db, Credential, batch, upsert, to_row)
+        for result in results:
+            if result.get('id') is not None:
+                self.credential_cache.invalidate(result['id'])
+        return results
+    
+    def bulk_delete_workflows(self, ids: list):
+        with self.get_db() as db:
+            existing = {row.id for row in db.query(Workflow.id).filter(Workflow.id.in_(ids))}
+            execution_ids = self._delete_workflow_rows(db, list(existing))
+            db.commit()
+        for id in existing:
+            self.workflow_cache.invalidate(id)
+        remove_execution_files(execution_ids)
+        return [{'index': index, 'id': id, 'status': 'deleted' if id in existing else 'not_found'} for index, id in enumerate(ids)]
+    
+    def bulk_delete_credentials(self, ids: list):
+        with self.get_db() as db:
+            existing = {row.id for row in db.query(Credential.id).filter(Credential.id.in_(ids))}
+            db.query(Credential).filter(Credential.id.in_(existing)).delete(synchronize_session=False)
+            db.commit()
+        for id in existing:
+            self.credential_cache.invalidate(id)
+        return [{'index': index, 'id': id, 'status': 'deleted' if id in existing else 'not_found'} for index, id in enumerate(ids)]
     
     def get_credentials(self):
         try:
@@ -80,17 +288,45 @@ class DatabaseStorage:
                 credentials = db.query(Credential).order_by(desc(Credential.created_at)).all()
                 return [c.to_dict() for c in credentials]
         except Exception as e:
-            log(f"Error fetching credentials: {e}")
+            log(f"Error fetching credentials: {e}", level='error')
             return []
     
-    def get_credential(self, id: int):
+    def _cached_credential(self, id: int):
+        entry = self.credential_cache.get(id)
+        if entry and time.time() - entry['checked_at'] < self.credential_cache.check_interval:
+            return entry
         try:
             with self.get_db() as db:
+                row = db.query(Credential.updated_at).filter(Credential.id == id).first()
+                if row is None:
+                    self.credential_cache.invalidate(id)
+                    return None
+                if entry and entry['version'] == row.updated_at:
+                    entry['checked_at'] = time.time()
+                    return entry
                 credential = db.query(Credential).filter(Credential.id == id).first()
-                return credential.to_dict() if credential else None
+                return self.credential_cache.put(id, credential.updated_at, credential.to_dict()) if credential else None
         except Exception as e:
-            log(f"Error fetching credential {id}: {e}")
+            log(f"Error fetching credential {id}: {e}", level='error')
+            return None
+    
+    def get_credential(self, id: int):
+        entry = self._cached_credential(id)
+        # Callers get their own copy so they cannot alter the cached credential
+        return copy.deepcopy(entry['credential']) if entry else None
+    
+    def get_credential_artifact(self, id: int, name: str, build):
+        """
+        Return `build(credential)` for the credential, computed once per cache entry.
+        `build` receives the cached credential dict and must not modify it.
+        """
+        entry = self._cached_credential(id)
+        if not entry:
             return None
+        derived = entry['derived']
+        if name not in derived:
+            derived.setdefault(name, build(entry['credential']))
+        return derived[name]
     
     def create_credential(self, data: dict):
         with self.get_db() as db:
@@ -98,11 +334,14 @@ class DatabaseStorage:
                 name=data.get('name', ''),
                 type=data.get('type', ''),
                 data=json.dumps(data.get('data', {})),
-                created_at=get_timestamp_ms()
+                created_at=get_timestamp_ms(),
+                updated_at=get_timestamp_ms()
             )
             db.add(credential)
             db.commit()
             db.refresh(credential)
+            # SQLite may reuse the id of a deleted credential
+            self.credential_cache.invalidate(credential.id)
             return credential.to_dict()
     
     def delete_credential(self, id: int):
@@ -111,6 +350,7 @@ class DatabaseStorage:
             if credential:
                 db.delete(credential)
                 db.commit()
+            self.credential_cache.invalidate(id)
     
     def get_executions(self, workflow_id: int = None):
         with self.get_db() as db:
@@ -118,49 +358,684 @@ class DatabaseStorage:
             if workflow_id:
                 query = query.filter(Execution.workflow_id == workflow_id)
             executions = query.all()
-            return [e.to_dict() for e in executions]
+            return [self._execution_dict(db, e) for e in executions]
     
-    def get_execution(self, id: int):
+    def get_execution(self, id: int, include_logs: bool = True):
         with self.get_db() as db:
             execution = db.query(Execution).filter(Execution.id == id).first()
-            return execution.to_dict() if execution else None
+            return self._execution_dict(db, execution, include_logs) if execution else None
     
-    def create_execution(self, workflow_id: int):
+    def _execution_dict(self, db, execution, include_logs: bool = True):
+        """execution.to_dict(), with the logs read from the execution_logs rows (see update_execution)."""
+        data = execution.to_dict(include_logs=include_logs)
+        if include_logs and execution.archived_at is None:
+            data['logs'] = self._log_entries(db, execution)
+        return data
+    
+    def _log_entries(self, db, execution):
+        """
+        An execution's log entries. They are stored once, as execution_logs rows; the logs
+        column only holds the entries of executions recorded before those rows existed.
+        """
+        rows = db.query(ExecutionLog.timestamp, ExecutionLog.level, ExecutionLog.message).filter(
+            ExecutionLog.execution_id == execution.id
+        ).order_by(ExecutionLog.seq).all()
+        if not rows:
+            return load_json(execution.logs, [])
+        return [{'timestamp': row.timestamp, 'level': row.level, 'message': row.message} for row in rows]
+    
+    def _log_row_bytes(self, execution_id_column):
+        """Correlated subquery: the text stored in an execution's execution_logs rows."""
+        return select(func.coalesce(func.sum(
+            func.length(ExecutionLog.timestamp) + func.length(ExecutionLog.level) + func.length(ExecutionLog.message)
+        ), 0)).where(ExecutionLog.execution_id == execution_id_column).scalar_subquery()
+    
+    def get_execution_status(self, id: int):
+        with self.get_db() as db:
+            row = db.query(Execution.status).filter(Execution.id == id).first()
+            return row.status if row else None
+    
+    def get_execution_results(self, id: int):
+        """Only the results column, for callers that do not need the logs or the rest of the row."""
+        with self.get_db() as db:
+            row = db.query(Execution.results).filter(Execution.id == id).first()
+            return load_json(row.results, {}) if row else None
+    
+    def _append_log_rows(self, db, execution_id: int, logs: list):
+        """Index log entries that are not yet in execution_logs; the logs list only ever grows."""
+        last_seq = db.query(func.max(ExecutionLog.seq)).filter(ExecutionLog.execution_id == execution_id).scalar()
+        start = 0 if last_seq is None else last_seq + 1
+        rows = []
+        for seq, entry in enumerate(logs[start:], start=start):
+            if not isinstance(entry, dict):
+                entry = {'message': str(entry)}
+            rows.append({
+                'execution_id': execution_id,
+                'seq': seq,
+                'timestamp': str(entry.get('timestamp', '')),
+                'level': str(entry.get('level', 'INFO')).upper(),
+                'message': str(entry.get('message', ''))
+            })
+        if rows:
+            db.bulk_insert_mappings(ExecutionLog, rows)
+        return len(rows)
+    
+    def get_execution_logs(self, execution_id: int, after: int = -1, levels: list = None, limit: int = 500):
+        """
+        Page through an execution's log entries with seq > after, optionally restricted to levels.
+        Returns (entries, has_more), or None if the execution does not exist.
+        """
+        with self.get_db() as db:
+            execution = db.query(Execution.id, Execution.logs, Execution.archived_at).filter(Execution.id == execution_id).first()
+            if not execution:
+                return None
+            if execution.archived_at is not None:
+                return self._archived_log_page(execution_id, after, levels, limit)
+            if not db.query(ExecutionLog.id).filter(ExecutionLog.execution_id == execution_id).first():
+                # Executions recorded before the log index existed: backfill once from the JSON column
+                logs = load_json(execution.logs, [])
+                if self._append_log_rows(db, execution_id, logs):
+                    db.commit()
+            
+            query = db.query(ExecutionLog).filter(ExecutionLog.execution_id == execution_id, ExecutionLog.seq > after)
+            if levels:
+                query = query.filter(ExecutionLog.level.in_([level.upper() for level in levels]))
+            rows = query.order_by(ExecutionLog.seq).limit(limit + 1).all()
+            return [row.to_dict() for row in rows[:limit]], len(rows) > limit
+    
+    SUMMARY_RESULT_KEYS = ('status', 'error', 'count', 'cache', 'checkpoint', 'status_code', 'artifacts', 'excel_path', 'logs_path', 'logs_size', 'path', 'size')
+    
+    def get_execution_sizes(self, workflow_id: int):
+        """(id, status, started_at, archived_at, bytes) for a workflow's executions, newest first."""
+        with self.get_db() as db:
+            rows = db.query(
+                Execution.id, Execution.status, Execution.started_at, Execution.archived_at,
+                func.coalesce(func.length(Execution.logs), 0) + func.coalesce(func.length(Execution.results), 0)
+                + self._log_row_bytes(Execution.id)
+            ).filter(Execution.workflow_id == workflow_id).order_by(desc(Execution.id)).all()
+            return [tuple(row) for row in rows]
+    
+    def get_workflow_retention_settings(self):
+        """{workflow_id: retention settings dict} for every workflow."""
+        with self.get_db() as db:
+            rows = db.query(Workflow.id, Workflow.settings).all()
+            return {row.id: (json.loads(row.settings) if row.settings else {}).get('retention', {}) for row in rows}
+    
+    def get_known_execution_ids(self, ids: list):
+        with self.get_db() as db:
+            return {row.id for row in db.query(Execution.id).filter(Execution.id.in_(ids))}
+    
+    def archive_execution(self, id: int):
+        """
+        Move an execution's logs and full results to the compressed archive, keeping a
+        per-node status summary in the row. Returns the number of bytes freed in the table.
+        """
+        with self.get_db() as db:
+            execution = db.query(Execution).filter(Execution.id == id, Execution.archived_at.is_(None)).first()
+            if not execution:
+                return 0
+            logs = self._log_entries(db, execution)
+            results = load_json(execution.results, {})
+            write_archive(id, {'logs': logs, 'results': results})
+            summary = {
+                node_id: {k: v for k, v in result.items() if k in self.SUMMARY_RESULT_KEYS} if isinstance(result, dict) else result
+                for node_id, result in results.items()
+            }
+            freed = len(execution.logs or '') + len(execution.results or '') + db.query(self._log_row_bytes(id)).scalar()
+            execution.logs = '[]'
+            execution.results = json.dumps(summary, default=str)
+            execution.archived_at = get_timestamp_ms()
+            db.flush()
+            freed -= db.query(func.length(Execution.results)).filter(Execution.id == id).scalar() or 0
+            db.query(ExecutionLog).filter(ExecutionLog.execution_id == id).delete(synchronize_session=False)
+            db.query(ExecutionCheckpoint).filter(ExecutionCheckpoint.execution_id == id).delete(synchronize_session=False)
+            db.commit()
+            return freed
+    
+    def drop_duplicate_logs(self):
+        """
+        Empty the logs column of executions whose entries are also in execution_logs (rows
+        written before the rows became the only copy). Returns the rows cleared.
+        """
+        with self.get_db() as db:
+            cleared = db.query(Execution).filter(
+                Execution.archived_at.is_(None), Execution.logs.isnot(None), Execution.logs != '[]',
+                exists().where(ExecutionLog.execution_id == Execution.id)
+            ).update({Execution.logs: '[]'}, synchronize_session=False)
+            db.commit()
+            return cleared
+    
+    def recompress_executions(self, batch_size: int = 200):
+        """
+        Rewrite execution and checkpoint rows still holding uncompressed text so they are
+        stored framed and compressed. Works in short transactions; returns the rows rewritten.
+        """
+        rewritten = 0
+        for model, columns in ((Execution, ('logs', 'results')), (ExecutionCheckpoint, ('result', 'context'))):
+            legacy = or_(*[
+                and_(func.typeof(getattr(model, name)) == 'text', func.length(getattr(model, name)) >= COMPRESSION_MIN_BYTES)
+                for name in columns
+            ])
+            last_id = 0
+            while True:
+                with self.get_db() as db:
+                    rows = db.query(model.id, *[getattr(model, name) for name in columns]).filter(
+                        model.id > last_id, legacy
+                    ).order_by(model.id).limit(batch_size).all()
+                    if not rows:
+                        break
+                    for row in rows:
+                        # Binding goes through CompressedText, which frames values over the threshold
+                        db.query(model).filter(model.id == row.id).update(
+                            {getattr(model, name): value for name, value in zip(columns, row[1:]) if isinstance(value, str)},
+                            synchronize_session=False
+                        )
+                    db.commit()
+                    last_id = rows[-1].id
+                    rewritten += len(rows)
+        return rewritten
+    
+    def optimize_database(self, vacuum: bool = False):
+        """Refresh planner statistics, and rebuild the file to return free pages when `vacuum`."""
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.exec_driver_sql('ANALYZE')
+            if vacuum:
+                conn.exec_driver_sql('VACUUM')
+    
+    def _archived_log_page(self, execution_id: int, after: int, levels: list, limit: int):
+        try:
+            logs = read_archive(archive_path(execution_id)).get('logs', [])
+        except OSError:
+            return [], False
+        wanted = {level.upper() for level in levels} if levels else None
+        entries = []
+        for seq, entry in enumerate(logs):
+            if seq <= after or not isinstance(entry, dict):
+                continue
+            level = str(entry.get('level', 'INFO')).upper()
+            if wanted and level not in wanted:
+                continue
+            entries.append({'seq': seq, 'timestamp': entry.get('timestamp'), 'level': level, 'message': entry.get('message')})
+            if len(entries) > limit:
+                break
+        return entries[:limit], len(entries) > limit
+    
+    def get_archived_execution(self, id: int):
+        """Full logs and results of a compacted execution, read back from its archive."""
+        try:
+            return read_archive(archive_path(id))
+        except OSError:
+            return None
+    
+    def create_execution(self, workflow_id: int, resumed_from: int = None, params: dict = None, batch_id: int = None):
         with self.get_db() as db:
             execution = Execution(
                 workflow_id=workflow_id,
                 status='pending',
                 logs=json.dumps([]),
-                started_at=get_timestamp_ms()
+                started_at=get_timestamp_ms(),
+                resumed_from=resumed_from,
+                params=json.dumps(params, default=str) if params else None,
+                batch_id=batch_id
             )
             db.add(execution)
             db.commit()
             db.refresh(execution)
             return execution.to_dict()
     
-    def update_execution(self, id: int, status: str, logs: list, results: dict = None):
+    def create_batch(self, workflow_id: int, params: list, concurrency: int):
         with self.get_db() as db:
+            batch = ExecutionBatch(
+                workflow_id=workflow_id,
+                params=json.dumps(params, default=str),
+                concurrency=concurrency,
+                created_at=get_timestamp_ms()
+            )
+            db.add(batch)
+            db.commit()
+            db.refresh(batch)
+            return batch.to_dict()
+    
+    def get_batch(self, id: int):
+        with self.get_db() as db:
+            batch = db.query(ExecutionBatch).filter(ExecutionBatch.id == id).first()
+            if not batch:
+                return None
+            executions = db.query(Execution).filter(Execution.batch_id == id).order_by(Execution.id).all()
+            return {**batch.to_dict(), 'executions': [e.to_dict(include_logs=False) for e in executions]}
+    
+    def save_checkpoint(self, execution_id: int, node_id: str, config_hash: str, result: dict, context: dict):
+        with span('save_checkpoint', 'db', nodeId=node_id), self.get_db() as db:
+            db.add(ExecutionCheckpoint(
+                execution_id=execution_id,
+                node_id=node_id,
+                config_hash=config_hash,
+                result=typed_json.dumps(result),
+                context=typed_json.dumps(context),
+                created_at=get_timestamp_ms()
+            ))
+            db.commit()
+    
+    def save_trace(self, execution_id: int, trace: dict):
+        with self.get_db() as db:
+            db.merge(ExecutionTrace(execution_id=execution_id, spans=json.dumps(trace, separators=(',', ':')), created_at=get_timestamp_ms()))
+            db.commit()
+    
+    def get_trace(self, execution_id: int):
+        with self.get_db() as db:
+            row = db.query(ExecutionTrace.spans).filter(ExecutionTrace.execution_id == execution_id).first()
+            return load_json(row.spans) if row else None
+    
+    def save_profile(self, profile: dict):
+        """Store a profiling summary, dropping the oldest beyond PROFILE_MAX_STORED; returns its id."""
+        data = {'functions': profile.get('functions', []), 'stacks': profile.get('stacks', []),
+                'startedAt': profile.get('startedAt'), 'sampleIntervalMs': profile.get('sampleIntervalMs'),
+                'unprofiledThreads': profile.get('unprofiledThreads', 0)}
+        with self.get_db() as db:
+            row = Profile(kind=profile['kind'], target=profile.get('target'), mode=profile['mode'],
+                          execution_id=profile.get('executionId'), workflow_id=profile.get('workflowId'),
+                          duration_ms=profile.get('durationMs'), samples=profile.get('samples'),
+                          data=json.dumps(data, separators=(',', ':')), created_at=get_timestamp_ms())
+            db.add(row)
+            db.flush()
+            profile_id = row.id
+            cutoff = db.query(Profile.id).order_by(desc(Profile.id)).offset(PROFILE_MAX_STORED).limit(1).scalar()
+            if cutoff is not None:
+                db.query(Profile).filter(Profile.id <= cutoff).delete(synchronize_session=False)
+            db.commit()
+            return profile_id
+    
+    def get_profiles(self, kind: str = None, execution_id: int = None, workflow_id: int = None, limit: int = 50):
+        """Newest first; each entry includes its function table under 'functions'."""
+        with self.get_db() as db:
+            query = db.query(Profile)
+            if kind:
+                query = query.filter(Profile.kind == kind)
+            if execution_id:
+                query = query.filter(Profile.execution_id == execution_id)
+            if workflow_id:
+                query = query.filter(Profile.workflow_id == workflow_id)
+            rows = query.order_by(desc(Profile.id)).limit(limit).all()
+            return [{**row.to_dict(), 'functions': load_json(row.data).get('functions', [])} for row in rows]
+    
+    def get_profile(self, id: int):
+        with self.get_db() as db:
+            row = db.query(Profile).filter(Profile.id == id).first()
+            return {**row.to_dict(), **load_json(row.data)} if row else None
+    
+    def delete_profile(self, id: int):
+        with self.get_db() as db:
+            deleted = db.query(Profile).filter(Profile.id == id).delete(synchronize_session=False)
+            db.commit()
+            return deleted > 0
+    
+    def get_checkpoints(self, execution_id: int):
+        with self.get_db() as db:
+            checkpoints = db.query(ExecutionCheckpoint).filter(ExecutionCheckpoint.execution_id == execution_id).all()
+            return {c.node_id: c.to_dict() for c in checkpoints}
+    
+    SCHEDULE_FIELDS = {
+        'name': 'name', 'cron': 'cron', 'intervalSeconds': 'interval_seconds', 'enabled': 'enabled',
+        'misfirePolicy': 'misfire_policy', 'misfireGraceSeconds': 'misfire_grace_seconds',
+        'maxCatchUp': 'max_catch_up', 'jitterSeconds': 'jitter_seconds', 'overlapPolicy': 'overlap_policy'
+    }
+    
+    def _apply_schedule_data(self, schedule: Schedule, data: dict):
+        for key, column in self.SCHEDULE_FIELDS.items():
+            if key in data:
+                value = data[key]
+                setattr(schedule, column, int(value) if key == 'enabled' else value)
+        if 'params' in data:
+            schedule.params = json.dumps(data['params'], default=str) if data['params'] else None
+        if 'nextRunAt' in data:
+            schedule.next_run_at = data['nextRunAt']
+    
+    def get_schedules(self, workflow_id: int = None):
+        with self.get_db() as db:
+            query = db.query(Schedule).order_by(Schedule.id)
+            if workflow_id:
+                query = query.filter(Schedule.workflow_id == workflow_id)
+            return [s.to_dict() for s in query.all()]
+    
+    def get_schedule(self, id: int):
+        with self.get_db() as db:
+            schedule = db.query(Schedule).filter(Schedule.id == id).first()
+            return schedule.to_dict() if schedule else None
+    
+    def create_schedule(self, data: dict):
+        """`data` uses the API field names; `nextRunAt` is in epoch milliseconds."""
+        with self.get_db() as db:
+            now = get_timestamp_ms()
+            schedule = Schedule(workflow_id=data['workflowId'], created_at=now, updated_at=now)
+            self._apply_schedule_data(schedule, data)
+            db.add(schedule)
+            db.commit()
+            db.refresh(schedule)
+            return schedule.to_dict()
+    
+    def update_schedule(self, id: int, data: dict):
+        with self.get_db() as db:
+            schedule = db.query(Schedule).filter(Schedule.id == id).first()
+            if not schedule:
+                return None
+            self._apply_schedule_data(schedule, data)
+            schedule.updated_at = get_timestamp_ms()
+            db.commit()
+            db.refresh(schedule)
+            return schedule.to_dict()
+    
+    def delete_schedule(self, id: int):
+        with self.get_db() as db:
+            db.query(ScheduledRun).filter(ScheduledRun.schedule_id == id).delete(synchronize_session=False)
+            deleted = db.query(Schedule).filter(Schedule.id == id).delete(synchronize_session=False)
+            db.commit()
+            return deleted == 1
+    
+    def get_schedule_next_runs(self):
+        """{schedule_id: next_run_at in ms} for every enabled schedule."""
+        with self.get_db() as db:
+            rows = db.query(Schedule.id, Schedule.next_run_at).filter(Schedule.enabled == 1, Schedule.next_run_at.isnot(None)).all()
+            return {row.id: row.next_run_at for row in rows}
+    
+    def claim_schedule_run(self, id: int, expected_next_run_at: int, next_run_at: int):
+        """Advance next_run_at only if it is unchanged, so a given fire time is claimed by one scheduler."""
+        with self.get_db() as db:
+            claimed = db.query(Schedule).filter(
+                Schedule.id == id, Schedule.enabled == 1, Schedule.next_run_at == expected_next_run_at
+            ).update({Schedule.next_run_at: next_run_at}, synchronize_session=False)
+            db.commit()
+            return claimed == 1
+    
+    def record_schedule_run(self, id: int, execution_id: int):
+        with self.get_db() as db:
+            db.query(Schedule).filter(Schedule.id == id).update(
+                {Schedule.last_run_at: get_timestamp_ms(), Schedule.last_execution_id: execution_id},
+                synchronize_session=False
+            )
+            db.commit()
+    
+    def _active_execution_exists(self, workflow_id: int):
+        return exists().where(Execution.workflow_id == workflow_id, Execution.status.notin_(['completed', 'failed']))
+    
+    def create_execution_if_idle(self, workflow_id: int, params: dict = None, queued_run_id: int = None):
+        """
+        Create a pending execution only if the workflow still exists and has no active one,
+        in a single INSERT ... SELECT WHERE NOT EXISTS so that concurrent schedulers cannot
+        both start a run (or start one for a workflow deleted meanwhile). With `queued_run_id`, that queued run is removed in the same transaction (and
+        nothing is created if another scheduler already took it). Returns the execution or None.
+        """
+        now = get_timestamp_ms()
+        with self.get_db() as db:
+            created = db.execute(insert(Execution).from_select(
+                ['workflow_id', 'status', 'logs', 'started_at', 'params'],
+                select(literal(workflow_id), literal('pending'), literal('[]'), literal(now),
+                       literal(json.dumps(params, default=str) if params else None)).where(
+                    exists().where(Workflow.id == workflow_id), ~self._active_execution_exists(workflow_id)
+                )
+            ))
+            if created.rowcount != 1:
+                db.rollback()
+                return None
+            execution_id = created.lastrowid
+            if queued_run_id is not None:
+                taken = db.query(ScheduledRun).filter(ScheduledRun.id == queued_run_id).delete(synchronize_session=False)
+                if taken != 1:
+                    db.rollback()
+                    return None
+            db.commit()
+            return db.query(Execution).filter(Execution.id == execution_id).first().to_dict()
+    
+    def queue_scheduled_run(self, schedule_id: int, workflow_id: int, params: dict = None, limit: int = None):
+        """Queue a fire behind the workflow's active execution; False if `limit` runs are already queued."""
+        row = select(literal(schedule_id), literal(workflow_id), literal(json.dumps(params, default=str) if params else None), literal(get_timestamp_ms()))
+        if limit is not None:
+            queued = select(func.count(ScheduledRun.id)).where(ScheduledRun.workflow_id == workflow_id).scalar_subquery()
+            row = row.where(queued < limit)
+        with self.get_db() as db:
+            added = db.execute(insert(ScheduledRun).from_select(['schedule_id', 'workflow_id', 'params', 'queued_at'], row))
+            db.commit()
+            return added.rowcount == 1
+    
+    def has_queued_runs(self, workflow_id: int):
+        with self.get_db() as db:
+            return db.query(ScheduledRun.id).filter(ScheduledRun.workflow_id == workflow_id).first() is not None
+    
+    def get_queued_runs(self):
+        """The oldest queued run of each workflow that has any."""
+        with self.get_db() as db:
+            oldest = db.query(func.min(ScheduledRun.id)).group_by(ScheduledRun.workflow_id)
+            return [run.to_dict() for run in db.query(ScheduledRun).filter(ScheduledRun.id.in_(oldest)).order_by(ScheduledRun.id).all()]
+    
+    def has_active_execution(self, workflow_id: int):
+        with self.get_db() as db:
+            return db.query(self._active_execution_exists(workflow_id)).scalar()
+    
+    def count_active_executions(self):
+        """{status: count} of executions that have not finished."""
+        with self.get_db() as db:
+            rows = db.query(Execution.status, func.count(Execution.id)).filter(
+                Execution.status.notin_(['completed', 'failed'])
+            ).group_by(Execution.status).all()
+            return dict(rows)
+    
+    def get_pending_execution_ids(self, limit: int = 10):
+        with self.get_db() as db:
+            rows = db.query(Execution.id, Execution.workflow_id).filter(Execution.status == 'pending').order_by(Execution.id).limit(limit).all()
+            return [(row.id, row.workflow_id) for row in rows]
+    
+    def claim_execution(self, id: int):
+        """Atomically move a pending execution to 'checking'; False if another worker got it first."""
+        with self.get_db() as db:
+            claimed = db.query(Execution).filter(Execution.id == id, Execution.status == 'pending').update(
+                {Execution.status: 'checking', Execution.heartbeat_at: get_timestamp_ms()}, synchronize_session=False
+            )
+            db.commit()
+            return claimed == 1
+    
+    def touch_executions(self, ids: list):
+        """Refresh the heartbeat of unfinished executions this process is responsible for."""
+        with self.get_db() as db:
+            db.query(Execution).filter(Execution.id.in_(ids), Execution.status.notin_(['completed', 'failed'])).update(
+                {Execution.heartbeat_at: get_timestamp_ms()}, synchronize_session=False
+            )
+            db.commit()
+    
+    def get_stale_execution_ids(self, stale_before: int, include_pending: bool = True):
+        """Unfinished executions whose heartbeat (or start, if they never had one) is older than `stale_before` (ms)."""
+        with self.get_db() as db:
+            query = db.query(Execution.id).filter(
+                Execution.status.notin_(['completed', 'failed']),
+                func.coalesce(Execution.heartbeat_at, Execution.started_at) < stale_before
+            )
+            if not include_pending:
+                query = query.filter(Execution.status != 'pending')
+            return [row.id for row in query.order_by(Execution.id)]
+    
+    def update_execution(self, id: int, status: str, logs: list, results: dict = None):
+        with span('update_execution', 'db', status=status), DB_WRITE_DURATION.time(operation='update_execution'), self.get_db() as db:
             execution = db.query(Execution).filter(Execution.id == id).first()
             if not execution:
                 return None
             
             execution.status = status
-            execution.logs = json.dumps(logs, default=str)
+            execution.heartbeat_at = get_timestamp_ms()
+            # The execution_logs rows are the only copy of the logs; each update only
+            # inserts the entries added since the last one
+            self._append_log_rows(db, id, logs)
             if results:
                 execution.results = json.dumps(results)
             if status in ['completed', 'failed']:
                 execution.completed_at = get_timestamp_ms()
+                EXECUTIONS_FINISHED.inc(status=status)
             
             db.commit()
             db.refresh(execution)
-            return execution.to_dict()
+            event_bus.publish_status(id, status)
+            return self._execution_dict(db, execution)
 
-    def delete_executions(self, workflow_id: int = None):
+    def fail_execution(self, id: int, error: str):
+        """Mark an execution failed after a crash, keeping the logs and results it already recorded."""
+        with self.get_db() as db:
+            execution = db.query(Execution).filter(Execution.id == id).first()
+            if not execution:
+                return None
+            current = self._execution_dict(db, execution)
+            logs = current['logs']
+            results = current['results']
+            if not isinstance(results, dict):
+                results = {}
+        logs.append({'timestamp': datetime.now().isoformat(), 'level': 'ERROR', 'message': f"Execution crashed: {error}"})
+        return self.update_execution(id, 'failed', logs, {**results, 'error': error})
+
+    def create_slack_delivery(self, id: str, execution_id: int, queued_at: float):
+        with self.get_db() as db:
+            db.add(SlackDelivery(id=id, execution_id=execution_id, status='queued', attempts=0, queued_at=queued_at))
+            db.commit()
+    
+    def update_slack_deliveries(self, deliveries: list):
+        """Record the status, attempts and error of SlackNotifier delivery dicts."""
+        with self.get_db() as db:
+            db.bulk_update_mappings(SlackDelivery, [{
+                'id': delivery['id'],
+                'status': delivery['status'],
+                'attempts': delivery['attempts'],
+                'error': delivery.get('error'),
+                'delivered_at': delivery.get('deliveredAt')
+            } for delivery in deliveries])
+            db.commit()
+    
+    def get_slack_delivery(self, id: str):
+        with self.get_db() as db:
+            delivery = db.query(SlackDelivery).filter(SlackDelivery.id == id).first()
+            return delivery.to_dict() if delivery else None
+    
+    def prune_slack_deliveries(self, queued_before: float):
+        """
+        Delete deliveries not tied to an execution that were queued before `queued_before`.
+        Ones tied to an execution go with it; these would otherwise never be removed.
+        """
         with self.get_db() as db:
-            query = db.query(Execution)
+            deleted = db.query(SlackDelivery).filter(
+                SlackDelivery.execution_id.is_(None), SlackDelivery.queued_at < queued_before
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+    
+    def add_artifact(self, sha256: str, size: int, content_type: str, execution_id: int, node_id: str, name: str, filename: str = None):
+        """
+        Record a stored blob and make it the `name` output of an execution node, moving the
+        reference from any blob that output pointed at before. Returns the artifact metadata.
+        """
+        now = get_timestamp_ms()
+        with self.get_db() as db:
+            db.execute(sqlite_insert(Artifact).values(
+                sha256=sha256, size=size, content_type=content_type, ref_count=0, created_at=now, last_used_at=now
+            ).on_conflict_do_nothing(index_elements=['sha256']))
+            # Claim back a blob the garbage collector has tombstoned; the caller then re-creates the file
+            db.query(Artifact).filter(Artifact.sha256 == sha256, Artifact.ref_count < 0).update(
+                {Artifact.ref_count: 0}, synchronize_session=False
+            )
+            if execution_id is not None:
+                ref = db.query(ArtifactRef).filter(
+                    ArtifactRef.execution_id == execution_id, ArtifactRef.node_id == node_id, ArtifactRef.name == name
+                ).first()
+                if ref is None:
+                    db.add(ArtifactRef(execution_id=execution_id, node_id=node_id, name=name, sha256=sha256, filename=filename, created_at=now))
+                    self._adjust_ref_count(db, sha256, 1, now)
+                elif ref.sha256 != sha256:
+                    self._adjust_ref_count(db, ref.sha256, -1, now)
+                    self._adjust_ref_count(db, sha256, 1, now)
+                    ref.sha256, ref.filename = sha256, filename
+            db.query(Artifact).filter(Artifact.sha256 == sha256).update({Artifact.last_used_at: now}, synchronize_session=False)
+            db.commit()
+        return {'sha256': sha256, 'size': size, 'contentType': content_type, 'filename': filename}
+    
+    def _adjust_ref_count(self, db, sha256, delta, now=None):
+        values = {Artifact.ref_count: Artifact.ref_count + delta}
+        if now is not None:
+            values[Artifact.last_used_at] = now
+        db.query(Artifact).filter(Artifact.sha256 == sha256).update(values, synchronize_session=False)
+    
+    def get_artifact(self, sha256: str):
+        with self.get_db() as db:
+            artifact = db.query(Artifact).filter(Artifact.sha256 == sha256).first()
+            return artifact.to_dict() if artifact else None
+    
+    def get_execution_artifacts(self, execution_id: int):
+        with self.get_db() as db:
+            rows = db.query(ArtifactRef, Artifact.size, Artifact.content_type).join(
+                Artifact, Artifact.sha256 == ArtifactRef.sha256
+            ).filter(ArtifactRef.execution_id == execution_id).order_by(ArtifactRef.id).all()
+            return [{**ref.to_dict(), 'size': size, 'contentType': content_type} for ref, size, content_type in rows]
+    
+    def get_unreferenced_artifacts(self, used_before: int):
+        """(sha256, size) of blobs with no references that have not been used since `used_before` (ms)."""
+        with self.get_db() as db:
+            rows = db.query(Artifact.sha256, Artifact.size).filter(
+                Artifact.ref_count <= 0, Artifact.last_used_at < used_before
+            ).all()
+            return [tuple(row) for row in rows]
+    
+    def tombstone_artifact(self, sha256: str, used_before: int):
+        """
+        Mark an unreferenced blob as being deleted (ref_count -1) if it still is unreferenced
+        and unused since `used_before`; True if this caller may remove its file.
+        """
+        with self.get_db() as db:
+            marked = db.query(Artifact).filter(
+                Artifact.sha256 == sha256, Artifact.ref_count <= 0, Artifact.last_used_at < used_before
+            ).update({Artifact.ref_count: -1}, synchronize_session=False)
+            db.commit()
+            return marked == 1
+    
+    def delete_artifact_tombstone(self, sha256: str):
+        """Delete a tombstoned artifact row; False if add_artifact claimed the blob back meanwhile."""
+        with self.get_db() as db:
+            deleted = db.query(Artifact).filter(Artifact.sha256 == sha256, Artifact.ref_count < 0).delete(synchronize_session=False)
+            db.commit()
+            return deleted == 1
+    
+    def _release_artifact_refs(self, db, execution_ids):
+        counts = db.query(ArtifactRef.sha256, func.count(ArtifactRef.id)).filter(
+            ArtifactRef.execution_id.in_(execution_ids)
+        ).group_by(ArtifactRef.sha256).all()
+        for sha256, count in counts:
+            self._adjust_ref_count(db, sha256, -count)
+        db.query(ArtifactRef).filter(ArtifactRef.execution_id.in_(execution_ids)).delete(synchronize_session=False)
+    
+    def _delete_execution_rows(self, db, id_query):
+        """Delete executions selected by `id_query` with their log, checkpoint, trace, profile, artifact and Slack delivery rows; returns their ids."""
+        execution_ids = [row.id for row in id_query]
+        for start in range(0, len(execution_ids), 500):
+            chunk = execution_ids[start:start + 500]
+            self._release_artifact_refs(db, chunk)
+            db.query(ExecutionTrace).filter(ExecutionTrace.execution_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(Profile).filter(Profile.execution_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(ExecutionLog).filter(ExecutionLog.execution_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(ExecutionCheckpoint).filter(ExecutionCheckpoint.execution_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(SlackDelivery).filter(SlackDelivery.execution_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(Execution).filter(Execution.id.in_(chunk)).delete(synchronize_session=False)
+        return execution_ids
+    
+    def delete_executions(self, workflow_id: int = None, execution_ids: list = None):
+        """Delete executions (all, one workflow's, or the given ids) along with their files."""
+        with self.get_db() as db:
+            query = db.query(Execution.id)
             if workflow_id:
                 query = query.filter(Execution.workflow_id == workflow_id)
-            query.delete(synchronize_session=False)
+            if execution_ids is not None:
+                query = query.filter(Execution.id.in_(execution_ids))
+            deleted = self._delete_execution_rows(db, query)
             db.commit()
+        remove_execution_files(deleted)
+        return deleted
 
 storage = DatabaseStorage()
+
+def _collect_execution_metrics():
+    # Read from the database so the figures cover every process, including queue workers
+    return [('executions_in_flight', 'gauge', 'Unfinished executions per status (pending is the queue depth)', [
+        ({'status': status}, count) for status, count in sorted(storage.count_active_executions().items())
+    ])]
+
+register_collector(_collect_execution_metrics)
@@ -0,0 +1,258 @@
+"""
+Hierarchical timing spans per execution.
+
+execute_workflow_async opens a trace with a root 'workflow' span; code running on its
+behalf (preflight, nodes, retries, polls, external calls, DB writes) opens child spans
+with span(). The current span lives in a context variable, which node pools copy into
+their worker threads, so spans nest correctly across threads. Outside a trace span()
+costs one context variable lookup.
+
+Finished traces are stored compactly (a string table plus one array per span, in a
+compressed column) and analysed on request: the critical path through the span tree,
+time per category, and an export in the Chrome trace-event format.
+"""
+import os
+import time
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+TRACE_FORMAT_VERSION = 1
+# Spans beyond this are dropped (and counted) so a runaway polling loop cannot bloat the row
+TRACE_MAX_SPANS = int(os.environ.get('TRACE_MAX_SPANS', 20000))
+
+_current = contextvars.ContextVar('trace_current_span', default=None)
+# Traces of executions running in this process, so in-progress runs can be inspected
+active_traces = {}
+_active_lock = threading.Lock()
+
+class Trace:
+    def __init__(self, execution_id):
+        self.execution_id = execution_id
+        self.started_ns = time.perf_counter_ns()
+        self.started_at = time.time()
+        self.spans = []
+        self.dropped = 0
+        self._ids = itertools.count(1)
+
+    def open_span(self, parent_id, name, category, attrs):
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return None
+        # [id, parent id, name, category, start us, duration us (None while open), thread, status, attrs]
+        span = [next(self._ids), parent_id, name, category, (time.perf_counter_ns() - self.started_ns) // 1000,
+                None, threading.current_thread().name, 'ok', attrs or None]
+        self.spans.append(span)
+        return span
+
+    def close_span(self, span, status=None):
+        span[5] = (time.perf_counter_ns() - self.started_ns) // 1000 - span[4]
+        if status is not None:
+            span[7] = status
+
+    def encode(self):
+        """Compact form: repeated strings (names, categories, threads, statuses) go to a table."""
+        strings = {}
+        def ref(value):
+            return strings.setdefault(value, len(strings))
+        now_us = (time.perf_counter_ns() - self.started_ns) // 1000
+        rows = []
+        for span_id, parent_id, name, category, start, duration, thread, status, attrs in list(self.spans):
+            if duration is None:
+                duration, status = now_us - start, 'open'
+            row = [span_id, parent_id or 0, ref(name), ref(category), start, duration, ref(thread), ref(status)]
+            if attrs:
+                row.append(attrs)
+            rows.append(row)
+        return {
+            'v': TRACE_FORMAT_VERSION,
+            'executionId': self.execution_id,
+            'startedAt': self.started_at,
+            'dropped': self.dropped,
+            'strings': list(strings),
+            'spans': rows
+        }
+
+def decode_trace(data):
+    """Expand the compact form into a list of span dicts (times in microseconds)."""
+    strings = data['strings']
+    spans = []
+    for row in data['spans']:
+        spans.append({
+            'id': row[0],
+            'parentId': row[1] or None,
+            'name': strings[row[2]],
+            'category': strings[row[3]],
+            'start': row[4],
+            'duration': row[5],
+            'thread': strings[row[6]],
+            'status': strings[row[7]],
+            'attrs': row[8] if len(row) > 8 else {}
+        })
+    return spans
+
+@contextmanager
+def span(name, category, **attrs):
+    """Time the enclosed block as a child of the current span; a no-op outside a trace."""
+    handle = open_span(name, category, **attrs)
+    status = None
+    try:
+        yield handle[1] if handle else None
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        close_span(handle, status)
+
+def open_span(name, category, **attrs):
+    """
+    Start a span that is not tied to a `with` block; finish it with close_span() in the
+    same context. Returns a handle, or None outside a trace.
+    """
+    current = _current.get()
+    if current is None:
+        return None
+    trace, parent_id = current
+    record = trace.open_span(parent_id, name, category, attrs)
+    if record is None:
+        return None
+    return trace, record, _current.set((trace, record[0]))
+
+def close_span(handle, status=None):
+    """Finish a span from open_span(), optionally recording a status such as 'failure'."""
+    if handle is None:
+        return
+    trace, record, token = handle
+    _current.reset(token)
+    trace.close_span(record, status)
+
+def set_span_status(record, status):
+    """Mark a span (as yielded by span()) e.g. 'failure' without raising."""
+    if record is not None:
+        record[7] = status
+
+@contextmanager
+def trace_execution(execution_id, save):
+    """Open the trace and root span of an execution; `save(encoded)` persists it afterwards."""
+    trace = Trace(execution_id)
+    with _active_lock:
+        active_traces[execution_id] = trace
+    token = _current.set((trace, None))
+    try:
+        with span('workflow', 'workflow', executionId=execution_id):
+            yield trace
+    finally:
+        _current.reset(token)
+        with _active_lock:
+            active_traces.pop(execution_id, None)
+        save(trace.encode())
+
+def get_active_trace(execution_id):
+    with _active_lock:
+        trace = active_traces.get(execution_id)
+    return trace.encode() if trace else None
+
+def _children_index(spans):
+    children = {}
+    for s in spans:
+        children.setdefault(s['parentId'], []).append(s)
+    return children
+
+def critical_path(spans):
+    """
+    The chain of spans that determined the run's duration. Walking back from the end of a
+    span, the child that finished last before the cursor is on the path; time no child
+    covers is the span's own. Returns segments of {id, name, category, start, duration}.
+    """
+    children = _children_index(spans)
+    path = []
+
+    def walk(s):
+        cursor = s['start'] + s['duration']
+        segments = []
+        remaining = sorted(children.get(s['id'], []), key=lambda c: c['start'] + c['duration'], reverse=True)
+        for child in remaining:
+            child_end = child['start'] + child['duration']
+            if child_end > cursor or child['start'] < s['start']:
+                continue
+            if child_end < cursor:
+                segments.append(('self', child_end, cursor))
+            segments.append(('child', child))
+            cursor = child['start']
+        if cursor > s['start']:
+            segments.append(('self', s['start'], cursor))
+        for segment in reversed(segments):
+            if segment[0] == 'child':
+                walk(segment[1])
+            else:
+                path.append({'id': s['id'], 'name': s['name'], 'category': s['category'],
+                             'start': segment[1], 'duration': segment[2] - segment[1]})
+
+    for root in children.get(None, []):
+        walk(root)
+    # Merge consecutive self segments of the same span
+    merged = []
+    for segment in path:
+        if merged and merged[-1]['id'] == segment['id'] and merged[-1]['start'] + merged[-1]['duration'] == segment['start']:
+            merged[-1]['duration'] += segment['duration']
+        elif segment['duration'] > 0:
+            merged.append(segment)
+    return merged
+
+def category_breakdown(spans):
+    """Exclusive time per category: a span's duration minus the time covered by its children."""
+    children = _children_index(spans)
+    totals = {}
+    for s in spans:
+        covered = 0
+        cursor = s['start']
+        for child in sorted(children.get(s['id'], []), key=lambda c: c['start']):
+            start = max(child['start'], cursor)
+            end = min(child['start'] + child['duration'], s['start'] + s['duration'])
+            if end > start:
+                covered += end - start
+                cursor = end
+        totals[s['category']] = totals.get(s['category'], 0) + max(0, s['duration'] - covered)
+    return totals
+
+def analyze(data):
+    spans = decode_trace(data)
+    path = critical_path(spans)
+    path_by_category = {}
+    for segment in path:
+        path_by_category[segment['category']] = path_by_category.get(segment['category'], 0) + segment['duration']
+    roots = [s for s in spans if s['parentId'] is None]
+    return {
+        'executionId': data.get('executionId'),
+        'startedAt': data.get('startedAt'),
+        'durationUs': max((s['start'] + s['duration'] for s in roots), default=0),
+        'droppedSpans': data.get('dropped', 0),
+        'spans': spans,
+        'criticalPath': path,
+        'criticalPathByCategory': path_by_category,
+        'exclusiveTimeByCategory': category_breakdown(spans)
+    }
+
+def to_chrome_trace(data):
+    """Chrome trace-event JSON (chrome://tracing, Perfetto): one complete event per span."""
+    spans = decode_trace(data)
+    threads = {}
+    events = [{'name': 'process_name', 'ph': 'M', 'pid': data.get('executionId', 0), 'tid': 0,
+               'args': {'name': f"execution {data.get('executionId')}"}}]
+    base_us = int(data.get('startedAt', 0) * 1_000_000)
+    for s in spans:
+        tid = threads.setdefault(s['thread'], len(threads) + 1)
+        events.append({
+            'name': s['name'],
+            'cat': s['category'],
+            'ph': 'X',
+            'ts': base_us + s['start'],
+            'dur': s['duration'],
+            'pid': data.get('executionId', 0),
+            'tid': tid,
+            'args': {**(s['attrs'] or {}), 'status': s['status'], 'spanId': s['id'], 'parentId': s['parentId']}
+        })
+    for thread, tid in threads.items():
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': data.get('executionId', 0), 'tid': tid, 'args': {'name': thread}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
@@ -0,0 +1,54 @@
+"""
+JSON that keeps the Python types database drivers return.
+
+Values JSON has no type for (datetime, date, time, timedelta, Decimal, UUID, bytes) are
+written as {"__typed__": <tag>, "value": <text>} and turned back into the same type on
+load, so cached query rows and checkpointed contexts compare and compute like the live
+ones. Other unknown objects fall back to str(), as json.dumps(default=str) did.
+Documents without tags (written before this encoding) load unchanged.
+"""
+import json
+import uuid
+import base64
+from decimal import Decimal
+from datetime import date, datetime, time, timedelta
+
+TAG = '__typed__'
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {TAG: 'datetime', 'value': value.isoformat()}
+    if isinstance(value, date):
+        return {TAG: 'date', 'value': value.isoformat()}
+    if isinstance(value, time):
+        return {TAG: 'time', 'value': value.isoformat()}
+    if isinstance(value, timedelta):
+        return {TAG: 'timedelta', 'value': value.total_seconds()}
+    if isinstance(value, Decimal):
+        return {TAG: 'decimal', 'value': str(value)}
+    if isinstance(value, uuid.UUID):
+        return {TAG: 'uuid', 'value': str(value)}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {TAG: 'bytes', 'value': base64.b64encode(bytes(value)).decode('ascii')}
+    return str(value)
+
+DECODERS = {
+    'datetime': datetime.fromisoformat,
+    'date': date.fromisoformat,
+    'time': time.fromisoformat,
+    'timedelta': lambda seconds: timedelta(seconds=seconds),
+    'decimal': Decimal,
+    'uuid': uuid.UUID,
+    'bytes': base64.b64decode
+}
+
+def object_hook(obj):
+    if len(obj) == 2 and obj.get(TAG) in DECODERS and 'value' in obj:
+        return DECODERS[obj[TAG]](obj['value'])
+    return obj
+
+def dumps(value):
+    return json.dumps(value, default=_encode)
+
+def loads(text):
+    return json.loads(text, object_hook=object_hook)
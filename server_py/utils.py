@@ -2,7 +2,8 @@ import os
 import re
 import json
 from datetime import datetime, timedelta
-from openai import OpenAI
+from .lazy_imports import openai
+from .log_pipeline import pipeline
 
 openai_client = None
 
@@ -18,7 +19,7 @@ def get_ai():
             
             # Only use if tokens look valid (not placeholders)
             if api_key and base_url and "your_access_token_here" not in api_key and "your_base_url_here" not in base_url:
-                openai_client = OpenAI(
+                openai_client = openai.OpenAI(
                     api_key=api_key,
                     base_url=base_url
                 )
@@ -31,27 +32,38 @@ def get_ai():
             base_url = os.environ.get('AI_INTEGRATIONS_OPENAI_BASE_URL')
             
             if api_key and base_url:
-                openai_client = OpenAI(
+                openai_client = openai.OpenAI(
                     api_key=api_key,
                     base_url=base_url
                 )
                 log("Using Replit AI Integration for OpenAI.")
             else:
                 # Last resort: try standard OpenAI env var
-                openai_client = OpenAI()
+                openai_client = openai.OpenAI()
                 log("Using default OpenAI client configuration.")
     return openai_client
 
-def log(message, source='flask'):
-    formatted_time = datetime.now().strftime('%I:%M:%S %p')
-    print(f"{formatted_time} [{source}] {message}")
+def log(message, source='flask', level='info', rate_key=None, **fields):
+    """
+    Queue a structured log record (written by a background thread). `rate_key` groups
+    messages for rate limiting when their text varies; extra keyword fields are included
+    in the record.
+    """
+    pipeline.emit(level, source, message, rate_key, **fields)
 
 def resolve_variables(text, context):
     if not text or not isinstance(text, str):
         return text
     
     resolved = text
+    # Batch runs pin the logical date with a `runDate` (YYYY-MM-DD) parameter
     today = datetime.now()
+    run_date = context.get('runDate')
+    if isinstance(run_date, str):
+        try:
+            today = datetime.strptime(run_date, '%Y-%m-%d')
+        except ValueError:
+            pass
     yesterday = today - timedelta(days=1)
     
     resolved = resolved.replace('{{today}}', today.strftime('%Y-%m-%d'))
@@ -61,7 +73,7 @@ def resolve_variables(text, context):
     def replace_date(match):
         fmt = match.group(1)
         modifier = match.group(2) or ''
-        date = datetime.now()
+        date = today
         if modifier.startswith('sub'):
             days = int(modifier.replace('sub', ''))
             date = date - timedelta(days=days)
@@ -77,3 +89,107 @@ def resolve_variables(text, context):
             resolved = pattern.sub(json.dumps(value), resolved)
     
     return resolved
+
+DAG_LOG_PREVIEW_CHARS = 2000
+
+def artifact_ref(meta):
+    """Artifact metadata as kept in node results (the blob path is derived from the hash)."""
+    return {k: v for k, v in meta.items() if k != 'path'}
+
+def save_dag_log(text, node_id, execution_id):
+    """Store captured task logs in the artifact store so results only carry a path and a preview."""
+    # Imported here: artifacts -> storage -> utils
+    from .artifacts import put_bytes
+    meta = put_bytes(text, execution_id, node_id, 'dag_log', 'text/plain', f"dag_log_{node_id}.txt")
+    return {
+        'logs_path': meta['path'],
+        'logs_size': meta['size'],
+        'logs_preview': text[-DAG_LOG_PREVIEW_CHARS:],
+        'artifacts': {'dag_log': artifact_ref(meta)}
+    }
+
+# Downloaded files up to this size are also decoded into the context for downstream nodes
+DOWNLOAD_CONTEXT_MAX_BYTES = int(os.environ.get('DOWNLOAD_CONTEXT_MAX_BYTES', 10 * 1024 * 1024))
+# Small downloads also keep their text in the node result as `content`, as they did before the artifact store
+DOWNLOAD_RESULT_MAX_BYTES = int(os.environ.get('DOWNLOAD_RESULT_MAX_BYTES', 64 * 1024))
+
+def save_download(fill, node_id, execution_id, filename):
+    """
+    Stream a downloaded file into the artifact store via `fill(file_obj)`.
+    Returns (text content or None if too large, result fields).
+    """
+    from .artifacts import put_stream
+    meta = put_stream(fill, execution_id, node_id, 'download', None, filename)
+    content = None
+    if meta['size'] <= DOWNLOAD_CONTEXT_MAX_BYTES:
+        with open(meta['path'], 'rb') as f:
+            content = f.read().decode('utf-8', errors='replace')
+    fields = {
+        'path': meta['path'],
+        'size': meta['size'],
+        'content_preview': content[:DAG_LOG_PREVIEW_CHARS] if content else None,
+        'artifacts': {'download': artifact_ref(meta)}
+    }
+    if meta['size'] <= DOWNLOAD_RESULT_MAX_BYTES:
+        fields['content'] = content
+    return content, fields
+
+EXCEL_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+def export_to_excel(data, node_id, execution_id):
+    """
+    Export query result to an HTML-based Excel file with column auto-fitting and yellow headers.
+    The file goes to the artifact store; returns its metadata (including 'path') or None.
+    """
+    try:
+        if not data or not isinstance(data, list) or len(data) == 0:
+            return None
+            
+        headers = list(data[0].keys())
+        
+        # Calculate approximate column widths based on headers and data
+        col_widths = {h: len(str(h)) for h in headers}
+        for row in data:
+            for h in headers:
+                val_len = len(str(row.get(h, '')))
+                if val_len > col_widths[h]:
+                    col_widths[h] = val_len
+
+        # Generate HTML table with basic Excel-compatible styling
+        html = [
+            '<html xmlns:o="urn:schemas-microsoft-com:office:office" xmlns:x="urn:schemas-microsoft-com:office:excel" xmlns="http://www.w3.org/TR/REC-html40">',
+            '<head><meta http-equiv="content-type" content="application/vnd.ms-excel; charset=UTF-8">',
+            '<style>',
+            'table { border-collapse: collapse; }',
+            'th { background-color: #FFFF00; border: 0.5pt solid black; font-weight: bold; }',
+            'td { border: 0.5pt solid black; white-space: nowrap; }',
+            '</style>',
+            '</head><body><table>'
+        ]
+        
+        # Set column widths using <col> tags
+        for h in headers:
+            width = (col_widths[h] + 2) * 7
+            html.append(f'<col width="{width}">')
+            
+        # Write headers
+        html.append('<tr>')
+        for h in headers:
+            html.append(f'<th>{h}</th>')
+        html.append('</tr>')
+        
+        # Write data
+        for row in data:
+            html.append('<tr>')
+            for h in headers:
+                val = str(row.get(h, ''))
+                html.append(f'<td>{val}</td>')
+            html.append('</tr>')
+            
+        html.append('</table></body></html>')
+        
+        from .artifacts import put_bytes
+        return put_bytes('\n'.join(html), execution_id, node_id, 'excel', EXCEL_CONTENT_TYPE, f"query_result_{node_id}.xlsx")
+    except Exception as e:
+        log(f"Export failed: {e}", level='error')
+        return None
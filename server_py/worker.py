@@ -0,0 +1,97 @@
+"""
+Execution worker process.
+
+Run with EXECUTION_MODE=queue on the web tier so that web workers only record
+executions as pending; this process claims them and runs them on its own pool:
+
+    python -m server_py.worker
+"""
+import os
+import time
+import signal
+import threading
+from .models import init_db
+from .nodes.registry import load_node_registry
+from .lazy_imports import warm_up
+from .storage import storage
+from .executor import execute_workflow_async, get_execution_pool, own_execution, release_execution, recover_stale_executions, start_heartbeat, EXECUTION_WORKERS
+from .utils import log
+from .log_pipeline import install_stdlib_bridge
+from .scheduler import start_scheduler, scheduler
+from .retention import start_retention
+
+POLL_INTERVAL = float(os.environ.get('WORKER_POLL_INTERVAL', 1.0))
+SHUTDOWN_TIMEOUT = float(os.environ.get('WORKER_SHUTDOWN_TIMEOUT', 300))
+
+class ExecutionWorker:
+    def __init__(self, slots=EXECUTION_WORKERS):
+        self.slots = slots
+        self.running = set()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def _run(self, execution_id, workflow_id):
+        try:
+            execute_workflow_async(execution_id, workflow_id)
+        except Exception as e:
+            log(f"Execution {execution_id} crashed: {e}", source='worker', level='error')
+            storage.fail_execution(execution_id, str(e))
+        finally:
+            release_execution(execution_id)
+            with self.lock:
+                self.running.discard(execution_id)
+
+    def poll_once(self):
+        with self.lock:
+            free = self.slots - len(self.running)
+        if free <= 0:
+            return 0
+        started = 0
+        for execution_id, workflow_id in storage.get_pending_execution_ids(limit=free):
+            if not storage.claim_execution(execution_id):
+                continue
+            own_execution(execution_id)
+            with self.lock:
+                self.running.add(execution_id)
+            get_execution_pool().submit(self._run, execution_id, workflow_id)
+            started += 1
+        return started
+
+    def serve_forever(self):
+        log(f"Execution worker started with {self.slots} slots", source='worker')
+        while not self.stopping.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                log(f"Worker poll failed: {e}", source='worker', level='error')
+            self.stopping.wait(POLL_INTERVAL)
+
+        # Graceful shutdown: stop claiming and let in-flight executions finish
+        deadline = time.time() + SHUTDOWN_TIMEOUT
+        while time.time() < deadline:
+            with self.lock:
+                if not self.running:
+                    break
+            time.sleep(0.5)
+        log(f"Execution worker stopped ({len(self.running)} executions still running)", source='worker')
+
+    def stop(self, *args):
+        scheduler.stop()
+        self.stopping.set()
+
+def main():
+    install_stdlib_bridge()
+    init_db()
+    load_node_registry()
+    warm_up(log_fn=log)
+    recover_stale_executions()
+    start_heartbeat()
+    start_scheduler()
+    start_retention()
+    worker = ExecutionWorker()
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import re
+from .nodes.registry import get_node_class
+
+TEMPLATE_PATTERN = re.compile(r'\{\{\s*([^}]+?)\s*\}\}')
+
+def _template_names(value, names):
+    if isinstance(value, str):
+        names.update(TEMPLATE_PATTERN.findall(value))
+    elif isinstance(value, dict):
+        for item in value.values():
+            _template_names(item, names)
+    elif isinstance(value, list):
+        for item in value:
+            _template_names(item, names)
+    return names
+
+class WorkflowPlan:
+    """
+    Pre-parsed execution plan for a workflow definition: node and edge indexes, root
+    nodes, the template variables each node's config refers to, config problems found by
+    each node class's validate_config, and structural problems.
+    Plans are cached per workflow version and shared, so they must be treated as read-only.
+    """
+
+    def __init__(self, workflow):
+        self.workflow = workflow
+        self.version = workflow.get('updatedAt')
+        self.nodes = workflow.get('nodes', [])
+        self.edges = workflow.get('edges', [])
+        self.nodes_by_id = {node.get('id'): node for node in self.nodes}
+
+        self.children = {node_id: [] for node_id in self.nodes_by_id}
+        self.parents = {node_id: [] for node_id in self.nodes_by_id}
+        self.warnings = []
+        for edge in self.edges:
+            source, target = edge.get('source'), edge.get('target')
+            if source not in self.nodes_by_id or target not in self.nodes_by_id:
+                self.warnings.append(f"Edge {source} -> {target} references a missing node")
+                continue
+            self.children[source].append((target, edge.get('sourceHandle')))
+            self.parents[target].append(source)
+
+        self.roots = [node for node in self.nodes if not self.parents.get(node.get('id'))]
+        self.node_classes = {}
+        self.templates = {}
+        self.config_errors = {}
+        for node in self.nodes:
+            node_id = node.get('id')
+            node_data = node.get('data', {})
+            node_type = node_data.get('type')
+            self.node_classes[node_id] = get_node_class(node_type)
+            if self.node_classes[node_id] is None and node_type != 'condition':
+                self.warnings.append(f"Node {node_id} has unknown type '{node_type}'")
+            elif self.node_classes[node_id] is not None:
+                errors = self.node_classes[node_id].validate_config(node_data.get('config', {}))
+                if errors:
+                    self.config_errors[node_id] = errors
+            self.templates[node_id] = sorted(_template_names(node_data.get('config', {}), set()))
+
+    def next_nodes(self, node_id, handle=None):
+        return [
+            self.nodes_by_id[target] for target, source_handle in self.children.get(node_id, [])
+            if not handle or source_handle == handle
+        ]
+
+    def upstream_ids(self, node_id):
+        return self.parents.get(node_id, [])
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'roots': [node.get('id') for node in self.roots],
+            'edges': {node_id: [target for target, _ in children] for node_id, children in self.children.items()},
+            'templates': self.templates,
+            'configErrors': self.config_errors,
+            'warnings': self.warnings
+        }
@@ -1,588 +1,13 @@
 import os
 import json
 import time
-import base64
-import requests
-import re
-import threading
-import sqlalchemy
-from sqlalchemy import text
-from datetime import datetime, timedelta
 from flask import request, jsonify
 from .storage import storage
-from .utils import log, resolve_variables, get_ai
-
-def export_to_excel(data, node_id, execution_id):
-    """Export query result to an HTML-based Excel file with column auto-fitting and yellow headers."""
-    try:
-        if not data or not isinstance(data, list) or len(data) == 0:
-            return None
-            
-        file_path = f"/tmp/query_result_{execution_id}_{node_id}.xlsx"
-        headers = list(data[0].keys())
-        
-        # Calculate approximate column widths based on headers and data
-        col_widths = {h: len(str(h)) for h in headers}
-        for row in data:
-            for h in headers:
-                val_len = len(str(row.get(h, '')))
-                if val_len > col_widths[h]:
-                    col_widths[h] = val_len
-
-        # Generate HTML table with basic Excel-compatible styling
-        html = [
-            '<html xmlns:o="urn:schemas-microsoft-com:office:office" xmlns:x="urn:schemas-microsoft-com:office:excel" xmlns="http://www.w3.org/TR/REC-html40">',
-            '<head><meta http-equiv="content-type" content="application/vnd.ms-excel; charset=UTF-8">',
-            '<style>',
-            'table { border-collapse: collapse; }',
-            'th { background-color: #FFFF00; border: 0.5pt solid black; font-weight: bold; }',
-            'td { border: 0.5pt solid black; white-space: nowrap; }',
-            '</style>',
-            '</head><body><table>'
-        ]
-        
-        # Set column widths using <col> tags
-        for h in headers:
-            width = (col_widths[h] + 2) * 7
-            html.append(f'<col width="{width}">')
-            
-        # Write headers
-        html.append('<tr>')
-        for h in headers:
-            html.append(f'<th>{h}</th>')
-        html.append('</tr>')
-        
-        # Write data
-        for row in data:
-            html.append('<tr>')
-            for h in headers:
-                val = str(row.get(h, ''))
-                html.append(f'<td>{val}</td>')
-            html.append('</tr>')
-            
-        html.append('</table></body></html>')
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(html))
-            
-        return file_path
-    except Exception as e:
-        log(f"Export failed: {e}")
-        return None
-
-def get_dag_state(dag_id, base_url, auth_headers):
-    try:
-        response = requests.get(
-            f"{base_url}/api/v1/dags/{dag_id}/dagRuns",
-            params={'order_by': '-execution_date', 'limit': 1},
-            headers=auth_headers
-        )
-        response.raise_for_status()
-        dag_runs = response.json().get('dag_runs', [])
-        if dag_runs:
-            return dag_runs[0].get('state', 'unknown')
-        return 'no_runs'
-    except Exception as e:
-        log(f"Error checking DAG state for {dag_id}: {e}")
-        return 'unknown'
-
-def wait_for_dags_to_complete(dag_infos, logs, execution_id, storage):
-    max_wait_time = 3600
-    poll_interval = 10
-    elapsed = 0
-    
-    while elapsed < max_wait_time:
-        all_complete = True
-        for dag_info in dag_infos:
-            dag_id = dag_info['dag_id']
-            base_url = dag_info['base_url']
-            auth_headers = dag_info['auth_headers']
-            
-            if not base_url:
-                continue
-            
-            state = get_dag_state(dag_id, base_url, auth_headers)
-            running_states = ['running', 'queued', 'scheduled', 'up_for_retry', 'up_for_reschedule', 'restarting', 'deferred']
-            
-            if state.lower() in running_states:
-                all_complete = False
-                logs.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'level': 'INFO',
-                    'message': f"DAG {dag_id} is currently {state}. Waiting for it to reach a terminal state..."
-                })
-                storage.update_execution(execution_id, 'waiting', logs)
-                break
-        
-        if all_complete:
-            return True
-        
-        time.sleep(poll_interval)
-        elapsed += poll_interval
-    
-    logs.append({
-        'timestamp': datetime.now().isoformat(),
-        'level': 'ERROR',
-        'message': f"Timeout waiting for DAGs to reach a terminal state after {max_wait_time} seconds"
-    })
-    return False
-
-def collect_dag_infos_from_workflow(nodes, storage):
-    dag_infos = []
-    for node in nodes:
-        node_data = node.get('data', {})
-        node_type = node_data.get('type')
-        
-        if node_type in ['airflow_trigger', 'airflow_log_check']:
-            config = node_data.get('config', {})
-            dag_id = config.get('dagId', '')
-            credential_id = config.get('credentialId')
-            
-            base_url = ""
-            auth_headers = {}
-            
-            if credential_id:
-                cred = storage.get_credential(int(credential_id))
-                if cred and cred.get('type') == 'airflow':
-                    cred_data = cred.get('data', {})
-                    base_url = cred_data.get('baseUrl', '')
-                    auth = base64.b64encode(f"{cred_data.get('username')}:{cred_data.get('password')}".encode()).decode()
-                    auth_headers = {'Authorization': f'Basic {auth}'}
-            
-            if dag_id and base_url:
-                dag_infos.append({
-                    'dag_id': dag_id,
-                    'base_url': base_url,
-                    'auth_headers': auth_headers
-                })
-    return dag_infos
-
-def execute_workflow_async(execution_id, workflow_id):
-    workflow = storage.get_workflow(workflow_id)
-    if not workflow:
-        return
-    
-    logs = []
-    results = {}
-    nodes = workflow.get('nodes', [])
-    edges = workflow.get('edges', [])
-    
-    logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': 'Checking if any involved DAGs are currently running...'})
-    storage.update_execution(execution_id, 'checking', logs)
-    
-    dag_infos = collect_dag_infos_from_workflow(nodes, storage)
-    
-    if dag_infos:
-        if not wait_for_dags_to_complete(dag_infos, logs, execution_id, storage):
-            logs.append({'timestamp': datetime.now().isoformat(), 'level': 'ERROR', 'message': 'Workflow aborted: DAGs did not complete in time'})
-            storage.update_execution(execution_id, 'failed', logs, results)
-            return
-    
-    logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': 'Starting workflow execution...'})
-    storage.update_execution(execution_id, 'running', logs)
-    
-    execution_context = {}
-    
-    def find_next_nodes(current_node_id, handle=None):
-        return [
-            node for edge in edges
-            if edge.get('source') == current_node_id and (not handle or edge.get('sourceHandle') == handle)
-            for node in nodes if node.get('id') == edge.get('target')
-        ]
-    
-    current_nodes = [n for n in nodes if not any(e.get('target') == n.get('id') for e in edges)]
-    visited = set()
-    assertion_failed = False
-    
-    while current_nodes and not assertion_failed:
-        next_batch = []
-        for node in current_nodes:
-            node_id = node.get('id')
-            if node_id in visited: continue
-            visited.add(node_id)
-            
-            time.sleep(1)
-            node_data = node.get('data', {})
-            node_type = node_data.get('type')
-            config = node_data.get('config', {})
-            
-            logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Executing node {node_data.get('label')} ({node_type})..."})
-            results[node_id] = {'status': 'running'}
-            storage.update_execution(execution_id, 'running', logs, results)
-            
-            output_handle = 'output'
-            try:
-                retries = int(config.get('retries', 0))
-                retry_delay = int(config.get('retryDelay', 5))
-                timeout = int(config.get('timeout', 3600))
-                
-                def run_with_retry(func, *args, **kwargs):
-                    last_exc = None
-                    for attempt in range(retries + 1):
-                        try:
-                            return func(*args, **kwargs)
-                        except Exception as e:
-                            last_exc = e
-                            if attempt < retries:
-                                logs.append({'timestamp': datetime.now().isoformat(), 'level': 'WARN', 'message': f"Attempt {attempt + 1} failed: {e}. Retrying in {retry_delay}s..."})
-                                time.sleep(retry_delay)
-                    raise last_exc
-
-                if node_type == 'airflow_trigger':
-                    dag_id = resolve_variables(config.get('dagId', ''), execution_context)
-                    conf = config.get('conf', {})
-                    credential_id = config.get('credentialId')
-                    wait_for_completion = config.get('waitForCompletion', True)
-                    
-                    auth_headers = {}
-                    base_url = ""
-                    username = ""
-                    password = ""
-                    
-                    if credential_id:
-                        cred = storage.get_credential(int(credential_id))
-                        if cred and cred.get('type') == 'airflow':
-                            cred_data = cred.get('data', {})
-                            base_url = cred_data.get('baseUrl', '')
-                            username = cred_data.get('username', '')
-                            password = cred_data.get('password', '')
-                            auth = base64.b64encode(f"{username}:{password}".encode()).decode()
-                            auth_headers = {'Authorization': f'Basic {auth}'}
-                    
-                    dag_run_id = f"run_{int(time.time() * 1000)}"
-                    if base_url:
-                        response = requests.post(f"{base_url}/api/v1/dags/{dag_id}/dagRuns", json={'conf': conf}, headers=auth_headers)
-                        response.raise_for_status()
-                        dag_run_id = response.json().get('dag_run_id', dag_run_id)
-                        
-                        if wait_for_completion:
-                            logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Waiting for DAG {dag_id} (run: {dag_run_id}) to complete..."})
-                            terminal_states = ['success', 'failed']
-                            max_wait_time = 3600  # 1 hour timeout
-                            poll_interval = 10
-                            elapsed_wait = 0
-                            
-                            while elapsed_wait < max_wait_time:
-                                try:
-                                    run_response = requests.get(f"{base_url}/api/v1/dags/{dag_id}/dagRuns/{dag_run_id}", headers=auth_headers)
-                                    run_response.raise_for_status()
-                                    current_state = run_response.json().get('state', 'unknown')
-                                    
-                                    if current_state.lower() in terminal_states:
-                                        logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"DAG {dag_id} finished with state: {current_state}"})
-                                        if current_state.lower() == 'failed':
-                                            raise Exception(f"DAG {dag_id} failed")
-                                        break
-                                        
-                                    # Log progress every minute
-                                    if elapsed_wait % 60 == 0:
-                                        logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"DAG {dag_id} is still {current_state}..."})
-                                        storage.update_execution(execution_id, 'running', logs, results)
-                                        
-                                except Exception as poll_error:
-                                    log(f"Error polling DAG status: {poll_error}")
-                                    # Don't fail immediately on network blips
-                                
-                                time.sleep(poll_interval)
-                                elapsed_wait += poll_interval
-                            else:
-                                raise Exception(f"Timeout waiting for DAG {dag_id} to complete after {max_wait_time} seconds")
-                    
-                    execution_context['dagRunId'] = dag_run_id
-                    execution_context['dagId'] = dag_id
-                    
-                    # Store result in node-specific context as well
-                    execution_context[node_id] = {
-                        'dagId': dag_id,
-                        'dagRunId': dag_run_id,
-                        'status': 'success'
-                    }
-                    results[node_id] = {'status': 'success', 'dagId': dag_id, 'dagRunId': dag_run_id}
-                
-                elif node_type == 'airflow_log_check':
-                    node_dag_id = resolve_variables(config.get('dagId', execution_context.get('dagId', '')), execution_context)
-                    task_name = resolve_variables(config.get('taskName', ''), execution_context)
-                    log_assertions = config.get('logAssertions', []) # Expecting a list of strings
-                    if not log_assertions and config.get('logAssertion'):
-                        log_assertions = [config.get('logAssertion')]
-                    
-                    run_id = execution_context.get('dagRunId', '')
-                    credential_id = config.get('credentialId') or next((n.get('data', {}).get('config', {}).get('credentialId') for n in nodes if n.get('data', {}).get('type') == 'airflow_trigger'), None)
-                    
-                    if not run_id or not node_dag_id or not task_name:
-                        raise Exception("Missing DAG ID, Task Name, or Run ID for log check")
-
-                    auth_headers = {}
-                    base_url = ""
-                    if credential_id:
-                        cred = storage.get_credential(int(credential_id))
-                        if cred and cred.get('type') == 'airflow':
-                            cred_data = cred.get('data', {})
-                            base_url = cred_data.get('baseUrl', '')
-                            auth = base64.b64encode(f"{cred_data.get('username')}:{cred_data.get('password')}".encode()).decode()
-                            auth_headers = {'Authorization': f'Basic {auth}'}
-
-                    if base_url:
-                        # Get task logs
-                        log_response = requests.get(f"{base_url}/api/v1/dags/{node_dag_id}/dagRuns/{run_id}/taskInstances/{task_name}/logs/1", headers=auth_headers)
-                        log_response.raise_for_status()
-                        logs_text = log_response.text
-                        
-                        failed_assertions = []
-                        for assertion in log_assertions:
-                            resolved_assertion = resolve_variables(assertion, execution_context)
-                            if resolved_assertion not in logs_text:
-                                failed_assertions.append(resolved_assertion)
-                        
-                        if failed_assertions:
-                            error_msg = f"Assertions failed: {', '.join(failed_assertions)}"
-                            logs.append({'timestamp': datetime.now().isoformat(), 'level': 'ERROR', 'message': error_msg})
-                            results[node_id] = {'status': 'failure', 'error': error_msg, 'logs_text': logs_text, 'dag_id': node_dag_id, 'task_name': task_name}
-                            assertion_failed = True
-                            break
-                        else:
-                            logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"All {len(log_assertions)} log assertions passed for task {task_name}"})
-                            execution_context[node_id] = {'status': 'success', 'logs_text': logs_text}
-                            results[node_id] = {'status': 'success', 'logs_text': logs_text, 'dag_id': node_dag_id, 'task_name': task_name}
-                    else:
-                        raise Exception("Airflow credential not found for log check")
-                
-                elif node_type == 'parallel_dags':
-                    dag_configs = config.get('dags', [])
-                    threads = []
-                    parallel_results = {}
-                    
-                    def run_single_dag(dag_conf, idx):
-                        # Simulating trigger logic for each dag in the list
-                        # In a real scenario, this would call airflow_trigger logic
-                        # For now, we'll log it
-                        dag_id = resolve_variables(dag_conf.get('dagId', ''), execution_context)
-                        logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Parallel trigger: {dag_id}"})
-                        parallel_results[f"dag_{idx}"] = "triggered"
-
-                    for i, dag_conf in enumerate(dag_configs):
-                        t = threading.Thread(target=run_single_dag, args=(dag_conf, i))
-                        t.start()
-                        threads.append(t)
-                    
-                    for t in threads:
-                        t.join()
-                        
-                    results[node_id] = {'status': 'success', 'parallel_results': parallel_results}
-
-                elif node_type == 'sql_query':
-                    query = resolve_variables(config.get('query', ''), execution_context)
-                    credential_id = config.get('credentialId')
-                    logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Running SQL: {query}"})
-                    
-                    query_results = []
-                    try:
-                        if credential_id:
-                            cred = storage.get_credential(int(credential_id))
-                            if cred:
-                                cred_type = cred.get('type')
-                                cred_data = cred.get('data', {})
-                                
-                                if cred_type == 'mssql':
-                                    conn_str = f"mssql+pymssql://{cred_data.get('username')}:{cred_data.get('password')}@{cred_data.get('host')}:{cred_data.get('port', 1433)}/{cred_data.get('database')}"
-                                    engine = sqlalchemy.create_engine(conn_str)
-                                    with engine.connect() as conn:
-                                        result = conn.execute(text(query))
-                                        query_results = [dict(row._mapping) for row in result]
-                                else:
-                                    raise Exception(f"Unsupported SQL credential type: {cred_type}")
-                        else:
-                            # Use internal database engine
-                            from .models import engine as internal_engine
-                            with internal_engine.connect() as conn:
-                                result = conn.execute(text(query))
-                                query_results = [dict(row._mapping) for row in result]
-                    except Exception as e:
-                        log(f"SQL Execution failed: {e}")
-                        raise Exception(f"SQL Error: {str(e)}")
-
-                    excel_path = export_to_excel(query_results, node_id, execution_id)
-                    if excel_path:
-                        logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Query results exported to Excel: {excel_path}"})
-                    
-                    record_count = len(query_results)
-                    
-                    # Process Python assertion if provided
-                    python_assertion = config.get('pythonAssertion', '').strip()
-                    assertion_passed = True
-                    assertion_error = None
-                    
-                    if python_assertion:
-                        try:
-                            # Create a safe local scope for assertion evaluation
-                            local_scope = {
-                                'results': query_results, 
-                                'count': record_count,
-                                'context': execution_context,
-                                'ctx': execution_context,
-                                'prev': execution_context,
-                                'datetime': datetime,
-                                'json': json,
-                                're': re
-                            }
-                            # Include previous node results as direct variables if they are valid identifiers
-                            for k, v in execution_context.items():
-                                if k and isinstance(k, str) and k.isidentifier():
-                                    local_scope[k] = v
-
-                            assertion_result = eval(python_assertion, {
-                                "__builtins__": {
-                                    'any': any, 'all': all, 'len': len, 'sum': sum, 'min': min, 'max': max, 
-                                    'abs': abs, 'round': round, 'True': True, 'False': False, 'int': int, 
-                                    'str': str, 'float': float, 'list': list, 'dict': dict, 'bool': bool,
-                                    'type': type, 'isinstance': isinstance
-                                }
-                            }, local_scope)
-                            
-                            if not assertion_result:
-                                assertion_passed = False
-                                assertion_error = f"Assertion failed: '{python_assertion}' evaluated to False"
-                                logs.append({'timestamp': datetime.now().isoformat(), 'level': 'ERROR', 'message': assertion_error})
-                            else:
-                                logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Assertion passed: '{python_assertion}'"})
-                        except Exception as e:
-                            assertion_passed = False
-                            assertion_error = f"Assertion error: {str(e)}"
-                            logs.append({'timestamp': datetime.now().isoformat(), 'level': 'ERROR', 'message': assertion_error})
-                    
-                    execution_context['queryResult'] = {'record_count': record_count}
-                    execution_context[node_id] = {'count': record_count, 'excel_path': excel_path, 'results': query_results, 'assertion_passed': assertion_passed}
-                    
-                    if assertion_passed:
-                        results[node_id] = {'status': 'success', 'count': record_count, 'excel_path': excel_path}
-                    else:
-                        results[node_id] = {'status': 'failure', 'count': record_count, 'excel_path': excel_path, 'error': assertion_error}
-                        assertion_failed = True
-                        break
-                
-                elif node_type == 'api_request':
-                    url = resolve_variables(config.get('url', ''), execution_context)
-                    method = config.get('method', 'GET').upper()
-                    headers = config.get('headers', {})
-                    body = resolve_variables(config.get('body', ''), execution_context)
-                    
-                    logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': f"Sending {method} request to {url}"})
-                    response = requests.request(method, url, headers=headers, data=body)
-                    response.raise_for_status()
-                    
-                    try:
-                        res_data = response.json()
-                    except:
-                        res_data = response.text
-                        
-                    execution_context[node_id] = {'response': res_data}
-                    results[node_id] = {'status': 'success', 'data': res_data}
-
-                elif node_type == 'python_script':
-                    script_code = config.get('code', '')
-                    logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO', 'message': "Executing Python script..."})
-                    
-                    local_scope = {'context': execution_context, 'result': None, 'requests': requests, 'json': json}
-                    exec(script_code, {}, local_scope)
-                    
-                    script_result = local_scope.get('result')
-                    execution_context[node_id] = {'result': script_result}
-                    results[node_id] = {'status': 'success', 'result': script_result}
-                
-                elif node_type == 's3_operation':
-                    bucket = resolve_variables(config.get('bucket', ''), execution_context)
-                    operation = config.get('operation', 'list')
-                    key = resolve_variables(config.get('key', ''), execution_context)
-                    credential_id = config.get('credentialId')
-                    
-                    if not credential_id:
-                        raise Exception("S3 credentials required")
-                    
-                    cred = storage.get_credential(int(credential_id))
-                    if not cred or cred.get('type') != 's3':
-                        raise Exception("Invalid S3 credential")
-                    
-                    cred_data = cred.get('data', {})
-                    import boto3
-                    s3 = boto3.client(
-                        's3',
-                        aws_access_key_id=cred_data.get('accessKey'),
-                        aws_secret_access_key=cred_data.get('secretKey'),
-                        region_name=cred_data.get('region', 'us-east-1')
-                    )
-                    
-                    if operation == 'list':
-                        response = s3.list_objects_v2(Bucket=bucket, Prefix=config.get('prefix', ''))
-                        contents = [obj['Key'] for obj in response.get('Contents', [])]
-                        execution_context[node_id] = {'files': contents}
-                        results[node_id] = {'status': 'success', 'files': contents}
-                    elif operation == 'upload':
-                        content = resolve_variables(config.get('content', ''), execution_context)
-                        s3.put_object(Bucket=bucket, Key=key, Body=content)
-                        results[node_id] = {'status': 'success'}
-                    elif operation == 'delete':
-                        s3.delete_object(Bucket=bucket, Key=key)
-                        results[node_id] = {'status': 'success'}
-                    
-                elif node_type == 'sftp_operation':
-                    host = resolve_variables(config.get('host', ''), execution_context)
-                    port = int(config.get('port', 22))
-                    operation = config.get('operation', 'list') # list, upload, download, delete
-                    remote_path = resolve_variables(config.get('remotePath', ''), execution_context)
-                    credential_id = config.get('credentialId')
-                    
-                    if not credential_id:
-                        raise Exception("SFTP credentials required")
-                    
-                    cred = storage.get_credential(int(credential_id))
-                    if not cred or cred.get('type') != 'sftp':
-                        raise Exception("Invalid SFTP credential")
-                    
-                    cred_data = cred.get('data', {})
-                    import paramiko
-                    transport = paramiko.Transport((host, port))
-                    transport.connect(username=cred_data.get('username'), password=cred_data.get('password'))
-                    sftp = paramiko.SFTPClient.from_transport(transport)
-                    
-                    try:
-                        if operation == 'list':
-                            files = sftp.listdir(remote_path or '.')
-                            execution_context[node_id] = {'files': files}
-                            results[node_id] = {'status': 'success', 'files': files}
-                        elif operation == 'upload':
-                            content = resolve_variables(config.get('content', ''), execution_context)
-                            import io
-                            file_obj = io.BytesIO(content.encode() if isinstance(content, str) else content)
-                            sftp.putfo(file_obj, remote_path)
-                            results[node_id] = {'status': 'success'}
-                        elif operation == 'download':
-                            import io
-                            file_obj = io.BytesIO()
-                            sftp.getfo(remote_path, file_obj)
-                            file_obj.seek(0)
-                            downloaded_content = file_obj.read().decode()
-                            execution_context[node_id] = {'content': downloaded_content}
-                            results[node_id] = {'status': 'success', 'content': downloaded_content}
-                        elif operation == 'delete':
-                            sftp.remove(remote_path)
-                            results[node_id] = {'status': 'success'}
-                    finally:
-                        sftp.close()
-                        transport.close()
-                    
-                next_batch.extend(find_next_nodes(node_id, output_handle if node_type == 'condition' else None))
-            except Exception as e:
-                logs.append({'timestamp': datetime.now().isoformat(), 'level': 'ERROR', 'message': f"Error: {e}"})
-                results[node_id] = {'status': 'failure', 'error': str(e)}
-                assertion_failed = True
-                break
-            
-            storage.update_execution(execution_id, 'running', logs, results)
-        current_nodes = next_batch
-    
-    final_status = 'failed' if assertion_failed else 'completed'
-    logs.append({'timestamp': datetime.now().isoformat(), 'level': 'INFO' if not assertion_failed else 'ERROR', 'message': f'Workflow {final_status}.'})
-    storage.update_execution(execution_id, final_status, logs, results)
+from .utils import log, get_ai
+from .lazy_imports import git
+from .bulk import iter_bulk_items, run_bulk, validate_workflow
+from .artifacts import execution_files
+from .executor import start_execution, start_batch, summarize_batch, BATCH_CONCURRENCY
 
 def generate_python_code(workflow):
     nodes = workflow.get('nodes', [])
@@ -761,9 +186,9 @@ def register_workflow_routes(app):
     @app.post('/api/git/sync')
     def git_sync():
         try:
-            import git
+            git.Repo
         except ImportError:
-            log("GitPython not installed")
+            log("GitPython not installed", level='warning')
             return jsonify({'status': 'error', 'message': 'GitPython not installed'}), 500
         
         data = request.get_json()
@@ -791,18 +216,28 @@ def register_workflow_routes(app):
         python_code = generate_python_code(workflow)
         return jsonify({'code': python_code})
 
+    @app.get('/api/workflows/<int:id>/plan')
+    def get_workflow_plan(id):
+        plan = storage.get_workflow_plan(id)
+        if not plan: return jsonify({'message': 'Workflow not found'}), 404
+        return jsonify(plan.to_dict())
+
     @app.get('/api/executions/<int:execution_id>/excel/<node_id>')
     def download_excel(execution_id, node_id):
         from flask import send_file
         import os
         
-        file_path = f"/tmp/query_result_{execution_id}_{node_id}.xlsx"
+        file_path = next((path for ref_node, name, path, _ in execution_files({'id': execution_id}) if ref_node == node_id and name == 'excel'), None)
+        if not file_path:
+            # Exports written before the artifact store
+            file_path = f"/tmp/query_result_{execution_id}_{node_id}.xlsx"
         if os.path.exists(file_path):
             return send_file(
                 file_path,
                 mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                 as_attachment=True,
-                download_name=f'query_result_{execution_id}_{node_id}.xlsx'
+                download_name=f'query_result_{execution_id}_{node_id}.xlsx',
+                conditional=True
             )
         return jsonify({'message': 'Excel file not found'}), 404
 
@@ -825,25 +260,25 @@ def register_workflow_routes(app):
         
         zip_buffer = io.BytesIO()
         
+        labels = {node.get('id'): node.get('data', {}).get('label', node.get('id')) for node in (workflow or {}).get('nodes', [])}
+        def safe_label(node_id):
+            return "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in str(labels.get(node_id, node_id))).strip()
+        
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
             results = execution.get('results', {})
             if isinstance(results, str):
                 results = json.loads(results)
             
-            # Add Excel files for SQL query nodes
-            for node_id, result in results.items():
-                if isinstance(result, dict) and result.get('excel_path'):
-                    excel_path = f"/tmp/query_result_{execution_id}_{node_id}.xls"
-                    if os.path.exists(excel_path):
-                        # Get node label for filename
-                        node_label = node_id
-                        if workflow:
-                            for node in workflow.get('nodes', []):
-                                if node.get('id') == node_id:
-                                    node_label = node.get('data', {}).get('label', node_id)
-                                    break
-                        safe_label = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in str(node_label)).strip()
-                        zipf.write(excel_path, f"excel/{safe_label}_{node_id}.xls")
+            # Add Excel exports, downloaded files and (with logs) captured DAG logs
+            dag_log_nodes = set()
+            for node_id, name, path, filename in execution_files(execution):
+                if name == 'excel':
+                    zipf.write(path, f"excel/{safe_label(node_id)}_{node_id}.xlsx")
+                elif name == 'download':
+                    zipf.write(path, f"files/{safe_label(node_id)}_{node_id}_{filename or 'download'}")
+                elif name == 'dag_log' and include_logs:
+                    zipf.write(path, f"logs/dag_{safe_label(node_id)}_{node_id}.txt")
+                    dag_log_nodes.add(node_id)
             
             # Add execution logs
             if include_logs:
@@ -864,19 +299,10 @@ def register_workflow_routes(app):
                 if log_content:
                     zipf.writestr("logs/execution_log.txt", "\n".join(log_content))
                 
-                # Add DAG-specific logs from results
+                # Executions recorded before DAG logs were stored as files
                 for node_id, result in results.items():
-                    if isinstance(result, dict):
-                        # Check if this is an airflow log check node with captured logs
-                        if result.get('logs_text'):
-                            node_label = node_id
-                            if workflow:
-                                for node in workflow.get('nodes', []):
-                                    if node.get('id') == node_id:
-                                        node_label = node.get('data', {}).get('label', node_id)
-                                        break
-                            safe_label = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in str(node_label)).strip()
-                            zipf.writestr(f"logs/dag_{safe_label}_{node_id}.txt", result.get('logs_text', ''))
+                    if isinstance(result, dict) and result.get('logs_text') and node_id not in dag_log_nodes:
+                        zipf.writestr(f"logs/dag_{safe_label(node_id)}_{node_id}.txt", result['logs_text'])
             
             # Add execution summary
             summary = {
@@ -912,6 +338,21 @@ def register_workflow_routes(app):
     def create_workflow():
         return jsonify(storage.create_workflow(request.get_json())), 201
 
+    @app.post('/api/workflows/bulk')
+    def bulk_save_workflows():
+        upsert = request.args.get('upsert', 'false').lower() == 'true'
+        try:
+            return jsonify(run_bulk(iter_bulk_items(), validate_workflow, storage.bulk_save_workflows, upsert=upsert))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+    @app.delete('/api/workflows/bulk')
+    def bulk_delete_workflows():
+        ids = (request.get_json(silent=True) or {}).get('ids')
+        if not isinstance(ids, list):
+            return jsonify({'message': 'ids must be an array'}), 400
+        return jsonify({'results': storage.bulk_delete_workflows(ids)})
+
     @app.put('/api/workflows/<int:id>')
     def update_workflow(id):
         workflow = storage.update_workflow(id, request.get_json())
@@ -966,7 +407,7 @@ Example response format:
                 )
                 
                 raw_content = response.choices[0].message.content or "{}"
-                log(f"AI Raw Response: {raw_content}")
+                log(f"AI Raw Response: {raw_content}", level='debug')
                 content = json.loads(raw_content)
                 
                 if 'nodes' not in content or not isinstance(content['nodes'], list):
@@ -977,7 +418,7 @@ Example response format:
                 
                 return jsonify(content)
             except Exception as e:
-                log(f"AI Generation attempt {attempt + 1} failed: {e}")
+                log(f"AI Generation attempt {attempt + 1} failed: {e}", level='warning')
                 if attempt == max_retries - 1:
                     return jsonify({
                         'message': 'Failed to generate workflow after multiple attempts',
@@ -987,7 +428,38 @@ Example response format:
 
     @app.post('/api/workflows/<int:id>/execute')
     def execute_workflow(id):
-        execution = storage.create_execution(id)
-        thread = threading.Thread(target=execute_workflow_async, args=(execution['id'], id))
-        thread.start()
+        execution = start_execution(id)
         return jsonify(execution), 201
+
+    @app.post('/api/executions/<int:id>/resume')
+    def resume_execution(id):
+        execution = storage.get_execution(id, include_logs=False)
+        if not execution:
+            return jsonify({'message': 'Execution not found'}), 404
+        if execution['status'] != 'failed':
+            return jsonify({'message': 'Only failed executions can be resumed'}), 409
+        return jsonify(start_execution(execution['workflowId'], resumed_from=id, params=execution['params'])), 201
+
+    @app.post('/api/workflows/<int:id>/batch')
+    def execute_workflow_batch(id):
+        if not storage.get_workflow(id):
+            return jsonify({'message': 'Workflow not found'}), 404
+        data = request.json or {}
+        param_sets = data.get('params')
+        if not isinstance(param_sets, list) or not param_sets or not all(isinstance(p, dict) for p in param_sets):
+            return jsonify({'message': 'params must be a non-empty list of objects'}), 400
+        try:
+            concurrency = int(data.get('concurrency', BATCH_CONCURRENCY))
+        except (TypeError, ValueError):
+            concurrency = 0
+        if concurrency < 1:
+            return jsonify({'message': 'concurrency must be a positive integer'}), 400
+        batch = start_batch(id, param_sets, concurrency)
+        return jsonify(summarize_batch(storage.get_batch(batch['id']))), 201
+
+    @app.get('/api/batches/<int:id>')
+    def get_batch(id):
+        batch = storage.get_batch(id)
+        if not batch:
+            return jsonify({'message': 'Batch not found'}), 404
+        return jsonify(summarize_batch(batch))
@@ -0,0 +1,4 @@
+"""WSGI entry point for production servers: gunicorn -c gunicorn.conf.py server_py.wsgi:app"""
+from .main import create_app
+
+app = create_app()
@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# The app keeps local.db in the working directory and its caches, artifacts and locks in
+# the temp directory, so the suite runs in a scratch directory of its own
+WORKDIR = tempfile.mkdtemp(prefix='orchestrator-tests-')
+os.chdir(WORKDIR)
+tempfile.tempdir = WORKDIR
+os.environ.setdefault('RESULT_CACHE_PATH', os.path.join(WORKDIR, 'result_cache.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server_py.models import init_db
+from server_py.storage import storage as _storage
+
+init_db()
+
+@pytest.fixture
+def storage():
+    return _storage
+
+@pytest.fixture
+def workflow(storage):
+    return storage.create_workflow({'name': 'test workflow', 'nodes': [], 'edges': []})
+
+@pytest.fixture
+def client():
+    from server_py.main import create_app
+    return create_app().test_client()
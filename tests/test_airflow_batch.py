@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from server_py.airflow_async import plan_batch, run_batch
+from server_py.async_http import run_sync
+
+class FakeAirflow:
+    """Async stand-in for AsyncAirflowAPI that records the order operations ran in."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    async def get_dag(self, dag_id):
+        await asyncio.sleep(0.01)
+        self.calls.append(dag_id)
+        if dag_id in self.failing:
+            return {'success': False, 'error': f"{dag_id} failed"}
+        return {'success': True, 'data': {'dag_id': dag_id}}
+
+def op(op_id, depends_on=None, **extra):
+    return {'id': op_id, 'operation': 'get_dag', 'params': {'dag_id': op_id}, 'dependsOn': depends_on, **extra}
+
+def run(operations, api, **kwargs):
+    error, deps = plan_batch(operations)
+    assert error is None
+    return {r['id']: r for r in run_sync(run_batch(api, operations, deps, **kwargs))}
+
+def test_dependencies_run_in_order_and_failures_skip_dependents():
+    api = FakeAirflow(failing={'b'})
+    results = run([op('a'), op('b', ['a']), op('c', ['b']), op('d', ['a'])], api, concurrency=4)
+    assert api.calls.index('a') < api.calls.index('b')
+    assert api.calls.index('a') < api.calls.index('d')
+    assert 'c' not in api.calls
+    assert [results[i]['status'] for i in 'abcd'] == ['success', 'failed', 'skipped', 'success']
+
+def test_stop_on_error_skips_operations_not_started():
+    api = FakeAirflow(failing={'a'})
+    results = run([op('a'), op('b'), op('c')], api, concurrency=1, stop_on_error=True)
+    assert api.calls == ['a']
+    assert results['b']['status'] == results['c']['status'] == 'skipped'
+
+def test_operation_timeout():
+    results = run([op('a', timeout=0.001)], FakeAirflow())
+    assert results['a']['status'] == 'timeout'
+
+@pytest.mark.parametrize('operations, message', [
+    ([op('a', ['b']), op('b', ['a'])], 'cycle'),
+    ([op('a', ['missing'])], 'unknown operation'),
+    ([op('a'), op('a')], 'Duplicate'),
+    ([op('a', timeout='soon')], 'timeout'),
+    ([{'id': 'a', 'operation': 'get_dag', 'params': ['x']}], 'params'),
+])
+def test_invalid_batches_are_rejected(operations, message):
+    error, _ = plan_batch(operations)
+    assert message in error
+
+@pytest.mark.parametrize('body', [{'concurrency': 'many'}, {'concurrency': 0}, {'concurrency': -2}, {'timeout': 'soon'}, {'timeout': -1}, {'concurrency': [2]}])
+def test_batch_route_rejects_bad_settings(client, storage, body):
+    credential = storage.create_credential({'name': 'airflow', 'type': 'airflow', 'data': {'baseUrl': 'http://127.0.0.1:9'}})
+    response = client.post('/api/airflow/batch', json={'credentialId': credential['id'], 'operations': [op('a')], **body})
+    assert response.status_code == 400
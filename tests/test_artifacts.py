@@ -0,0 +1,51 @@
+import os
+import time
+import server_py.artifacts as artifacts
+
+LATER = time.time() + artifacts.ARTIFACT_GC_GRACE + 60
+
+def put(storage, workflow, data=b'report contents'):
+    execution_id = storage.create_execution(workflow['id'])['id']
+    return execution_id, artifacts.put_bytes(data, execution_id, 'n1', 'excel', filename='report.xlsx')
+
+def test_ref_count_follows_executions_and_gc_removes_unreferenced_blobs(storage, workflow):
+    first, meta = put(storage, workflow)
+    second, again = put(storage, workflow)
+    assert again['sha256'] == meta['sha256']
+    assert storage.get_artifact(meta['sha256'])['refCount'] == 2
+
+    storage.delete_executions(execution_ids=[first])
+    assert storage.get_artifact(meta['sha256'])['refCount'] == 1
+    assert artifacts.collect_garbage(LATER) == (0, 0)
+
+    storage.delete_executions(execution_ids=[second])
+    assert artifacts.collect_garbage(LATER) == (1, len(b'report contents'))
+    assert storage.get_artifact(meta['sha256']) is None
+    assert not os.path.exists(meta['path'])
+
+def test_put_during_collection_keeps_the_blob(storage, workflow, monkeypatch):
+    execution_id, meta = put(storage, workflow, b'shared output')
+    storage.delete_executions(execution_ids=[execution_id])
+    tombstone = storage.tombstone_artifact
+
+    def tombstone_then_put(sha256, used_before):
+        marked = tombstone(sha256, used_before)
+        put(storage, workflow, b'shared output')
+        return marked
+    monkeypatch.setattr(storage, 'tombstone_artifact', tombstone_then_put)
+
+    assert artifacts.collect_garbage(LATER) == (0, 0)
+    assert storage.get_artifact(meta['sha256'])['refCount'] == 1
+    assert artifacts.read_range(meta['sha256']) == b'shared output'
+
+def test_small_downloads_keep_their_content_in_the_result(storage, workflow, monkeypatch):
+    import server_py.utils as utils
+    execution_id = storage.create_execution(workflow['id'])['id']
+    content, fields = utils.save_download(lambda f: f.write(b'id,name\n1,a\n'), 'n1', execution_id, 'small.csv')
+    assert content == fields['content'] == 'id,name\n1,a\n'
+
+    monkeypatch.setattr(utils, 'DOWNLOAD_RESULT_MAX_BYTES', 4)
+    content, fields = utils.save_download(lambda f: f.write(b'larger file'), 'n1', execution_id, 'large.txt')
+    assert content == 'larger file'
+    assert 'content' not in fields
+    assert fields['content_preview'] == 'larger file'
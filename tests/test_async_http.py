@@ -0,0 +1,72 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from server_py.async_http import AsyncHTTPPool, ProxyError, run_sync
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    seen = []
+
+    def do_GET(self):
+        Handler.seen.append((self.requestline, self.headers.get('Authorization'), self.headers.get('Proxy-Authorization')))
+        if self.path.endswith('/moved'):
+            self.send_response(302)
+            self.send_header('Location', '/api/v1/dags')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = gzip.compress(json.dumps({'dags': [], 'path': self.path}).encode())
+        self.send_response(200)
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_CONNECT(self):
+        Handler.seen.append((self.requestline, None, self.headers.get('Proxy-Authorization')))
+        self.send_response(403)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    Handler.seen = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+async def get(url, **kwargs):
+    return await AsyncHTTPPool().request('GET', url, **kwargs)
+
+def test_follows_redirects_and_decodes_gzip(server, monkeypatch):
+    monkeypatch.delenv('http_proxy', raising=False)
+    monkeypatch.delenv('HTTP_PROXY', raising=False)
+    response = run_sync(get(f"{server}/api/v1/moved", headers={'Authorization': 'Basic x'}))
+    assert response.status == 200
+    assert response.json()['path'] == '/api/v1/dags'
+    assert [line for line, _, _ in Handler.seen] == ['GET /api/v1/moved HTTP/1.1', 'GET /api/v1/dags HTTP/1.1']
+    # Same host, so the credentials follow the redirect
+    assert Handler.seen[1][1] == 'Basic x'
+
+def test_plain_http_goes_through_the_proxy(server, monkeypatch):
+    proxy = server.replace('http://', 'http://user:secret@')
+    monkeypatch.setenv('http_proxy', proxy)
+    monkeypatch.setenv('no_proxy', '')
+    response = run_sync(get('http://airflow.example:8080/api/v1/dags', params={'limit': 1}))
+    assert response.status == 200
+    line, _, proxy_auth = Handler.seen[0]
+    assert line == 'GET http://airflow.example:8080/api/v1/dags?limit=1 HTTP/1.1'
+    assert proxy_auth == 'Basic dXNlcjpzZWNyZXQ='
+
+def test_https_tunnel_refused_by_proxy(server, monkeypatch):
+    monkeypatch.setenv('https_proxy', server)
+    monkeypatch.setenv('no_proxy', '')
+    with pytest.raises(ProxyError):
+        run_sync(get('https://airflow.example/api/v1/dags'))
+    assert Handler.seen[0][0] == 'CONNECT airflow.example:443 HTTP/1.1'
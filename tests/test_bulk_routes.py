@@ -0,0 +1,80 @@
+import json
+import uuid
+
+def unique(prefix):
+    return f"{prefix}-{uuid.uuid4().hex[:8]}"
+
+def statuses(response):
+    return [result['status'] for result in response.get_json()['results']]
+
+def test_workflow_bulk_creates_updates_and_reports_errors(client, storage):
+    existing = storage.create_workflow({'name': unique('existing'), 'nodes': [], 'edges': []})
+    name = unique('created')
+    response = client.post('/api/workflows/bulk', json=[
+        {'name': name, 'nodes': [{'id': 'a', 'type': 'start'}], 'edges': []},
+        {'id': existing['id'], 'description': 'updated without a name'},
+        {'nodes': []},
+        {'name': unique('dupes'), 'nodes': [{'id': 'a'}, {'id': 'a'}]},
+        {'id': 10 ** 9, 'description': 'missing'},
+    ])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert statuses(response) == ['created', 'updated', 'error', 'error', 'error']
+    assert body['results'][2]['error'] == 'name is required'
+    assert body['results'][3]['error'] == 'node ids must be unique'
+    assert body['summary'] == {'created': 1, 'updated': 1, 'error': 3}
+
+    updated = storage.get_workflow(existing['id'])
+    assert updated['name'] == existing['name']
+    assert updated['description'] == 'updated without a name'
+    assert storage.get_workflow(body['results'][0]['id'])['name'] == name
+
+def test_workflow_bulk_upsert_matches_by_name(client, storage):
+    existing = storage.create_workflow({'name': unique('upsert'), 'nodes': [], 'edges': []})
+    response = client.post('/api/workflows/bulk?upsert=true', json={'items': [
+        {'name': existing['name'], 'description': 'upserted'},
+        {'name': existing['name'], 'description': 'again'},
+    ]})
+    results = response.get_json()['results']
+    assert [r['status'] for r in results] == ['updated', 'error']
+    assert results[0]['id'] == existing['id']
+    assert storage.get_workflow(existing['id'])['description'] == 'upserted'
+
+def test_workflow_bulk_reads_ndjson(client):
+    lines = [json.dumps({'name': unique('ndjson')}), 'not json', json.dumps({'name': unique('ndjson')})]
+    response = client.post('/api/workflows/bulk', data='\n'.join(lines), content_type='application/x-ndjson')
+    assert statuses(response) == ['created', 'error', 'created']
+
+def test_workflow_bulk_rejects_non_array_body(client):
+    response = client.post('/api/workflows/bulk', json={'name': 'not a list'})
+    assert response.status_code == 400
+
+def test_workflow_bulk_delete(client, storage):
+    workflow = storage.create_workflow({'name': unique('delete'), 'nodes': [], 'edges': []})
+    response = client.delete('/api/workflows/bulk', json={'ids': [workflow['id'], 10 ** 9]})
+    assert statuses(response) == ['deleted', 'not_found']
+    assert storage.get_workflow(workflow['id']) is None
+    assert client.delete('/api/workflows/bulk', json={}).status_code == 400
+
+def test_credential_bulk_save_and_delete(client, storage):
+    existing = storage.create_credential({'name': unique('cred'), 'type': 'postgres', 'data': {'host': 'old'}})
+    response = client.post('/api/credentials/bulk', json=[
+        {'name': unique('cred'), 'type': 'http', 'data': {'token': 'x'}},
+        {'id': existing['id'], 'data': {'host': 'new'}},
+        {'name': unique('cred')},
+        {'name': unique('cred'), 'type': 'http', 'data': []},
+    ])
+    body = response.get_json()
+    assert statuses(response) == ['created', 'updated', 'error', 'error']
+    assert body['results'][2]['error'] == 'type is required'
+    assert body['results'][3]['error'] == 'data must be an object'
+
+    updated = storage.get_credential(existing['id'])
+    assert updated['name'] == existing['name']
+    assert updated['type'] == 'postgres'
+    assert updated['data'] == {'host': 'new'}
+
+    created_id = body['results'][0]['id']
+    response = client.delete('/api/credentials/bulk', json={'ids': [created_id, existing['id'], 10 ** 9]})
+    assert statuses(response) == ['deleted', 'deleted', 'not_found']
+    assert storage.get_credential(created_id) is None
@@ -0,0 +1,50 @@
+from decimal import Decimal
+from datetime import datetime
+from server_py.executor import execute_workflow_async
+
+FIRST = (
+    "from datetime import datetime\n"
+    "from decimal import Decimal\n"
+    "context['loaded_at'] = datetime(2024, 3, 1, 12, 0)\n"
+    "context['total'] = Decimal('12.50')\n"
+    "context['runs'] = context.get('runs', 0) + 1\n"
+    "result = 'loaded'"
+)
+# Fails until the test sets DOWNSTREAM_READY, like a downstream system that was down
+SECOND = (
+    "import os\n"
+    "if not os.environ.get('DOWNSTREAM_READY'):\n"
+    "    raise Exception('downstream unavailable')\n"
+    "result = [type(context['loaded_at']).__name__, type(context['total']).__name__, context['runs']]"
+)
+
+def make_workflow(storage):
+    return storage.create_workflow({
+        'name': 'resume',
+        'nodes': [
+            {'id': 'load', 'data': {'type': 'python_script', 'label': 'load', 'config': {'code': FIRST}}},
+            {'id': 'check', 'data': {'type': 'python_script', 'label': 'check', 'config': {'code': SECOND}}}
+        ],
+        'edges': [{'id': 'e1', 'source': 'load', 'target': 'check'}]
+    })
+
+def test_resume_reuses_checkpoints_with_their_types(storage, monkeypatch):
+    workflow = make_workflow(storage)
+
+    failed = storage.create_execution(workflow['id'])
+    execute_workflow_async(failed['id'], workflow['id'])
+    assert storage.get_execution(failed['id'])['status'] == 'failed'
+
+    checkpoint = storage.get_checkpoints(failed['id'])['load']
+    assert checkpoint['context']['loaded_at'] == datetime(2024, 3, 1, 12, 0)
+    assert checkpoint['context']['total'] == Decimal('12.50')
+
+    monkeypatch.setenv('DOWNSTREAM_READY', '1')
+    resumed = storage.create_execution(workflow['id'], resumed_from=failed['id'])
+    execute_workflow_async(resumed['id'], workflow['id'])
+
+    execution = storage.get_execution(resumed['id'])
+    assert execution['status'] == 'completed'
+    assert execution['results']['load']['checkpoint'] == failed['id']
+    # The checkpointed node did not run again and its context kept its types
+    assert execution['results']['check']['result'] == ['datetime', 'Decimal', 1]
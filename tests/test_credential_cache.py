@@ -0,0 +1,24 @@
+import time
+from server_py.storage import DatabaseStorage
+
+def test_changes_from_another_process_reach_the_cache(storage, monkeypatch):
+    credential = storage.create_credential({'name': 'warehouse', 'type': 'sql', 'data': {'host': 'old'}})
+    # Another worker process, with its own cache
+    other = DatabaseStorage()
+    monkeypatch.setattr(other.credential_cache, 'check_interval', 0)
+    builds = []
+
+    def build(data):
+        builds.append(data['data']['host'])
+        return f"client for {data['data']['host']}"
+    assert other.get_credential_artifact(credential['id'], 'client', build) == 'client for old'
+    assert other.get_credential_artifact(credential['id'], 'client', build) == 'client for old'
+
+    time.sleep(0.002)  # updated_at has millisecond resolution
+    storage.bulk_save_credentials([(0, {'id': credential['id'], 'name': 'warehouse', 'type': 'sql', 'data': {'host': 'new'}})])
+    assert other.get_credential(credential['id'])['data'] == {'host': 'new'}
+    assert other.get_credential_artifact(credential['id'], 'client', build) == 'client for new'
+    assert builds == ['old', 'new']
+
+    storage.bulk_delete_credentials([credential['id']])
+    assert other.get_credential(credential['id']) is None
@@ -0,0 +1,52 @@
+import json
+from server_py.models import Execution
+
+def logs_column(storage, execution_id):
+    with storage.get_db() as db:
+        return db.query(Execution.logs).filter(Execution.id == execution_id).scalar()
+
+def test_logs_are_stored_once_as_rows(storage, workflow):
+    execution_id = storage.create_execution(workflow['id'])['id']
+    logs = []
+    for i in range(3):
+        logs.append({'timestamp': f"t{i}", 'level': 'INFO', 'message': f"line {i}"})
+        storage.update_execution(execution_id, 'running', logs)
+
+    assert storage.get_execution(execution_id)['logs'] == logs
+    entries, has_more = storage.get_execution_logs(execution_id)
+    assert [entry['seq'] for entry in entries] == [0, 1, 2] and not has_more
+
+    storage.update_execution(execution_id, 'completed', logs)
+    assert logs_column(storage, execution_id) == '[]'
+    assert storage.get_execution(execution_id)['logs'] == logs
+    assert len(storage.get_execution_logs(execution_id)[0]) == 3
+
+def test_duplicated_log_columns_are_cleared(storage, workflow):
+    execution_id = storage.create_execution(workflow['id'])['id']
+    logs = [{'timestamp': 't0', 'level': 'INFO', 'message': 'done'}]
+    storage.update_execution(execution_id, 'completed', logs)
+    # A row finished before the rows were the only copy
+    with storage.get_db() as db:
+        db.query(Execution).filter(Execution.id == execution_id).update({Execution.logs: json.dumps(logs)})
+        db.commit()
+
+    assert storage.drop_duplicate_logs() >= 1
+    assert logs_column(storage, execution_id) == '[]'
+    assert storage.get_execution(execution_id)['logs'] == logs
+
+def test_crash_keeps_logs_recorded_while_running(storage, workflow):
+    execution_id = storage.create_execution(workflow['id'])['id']
+    storage.update_execution(execution_id, 'running', [{'timestamp': 't0', 'level': 'INFO', 'message': 'started'}])
+
+    execution = storage.fail_execution(execution_id, 'boom')
+    assert [entry['message'] for entry in execution['logs']] == ['started', 'Execution crashed: boom']
+    assert execution['results']['error'] == 'boom'
+
+def test_archiving_moves_the_log_rows(storage, workflow):
+    execution_id = storage.create_execution(workflow['id'])['id']
+    logs = [{'timestamp': f"t{i}", 'level': 'ERROR' if i == 1 else 'INFO', 'message': f"line {i}"} for i in range(3)]
+    storage.update_execution(execution_id, 'completed', logs)
+
+    assert storage.archive_execution(execution_id) > 0
+    entries, _ = storage.get_execution_logs(execution_id, levels=['error'])
+    assert [entry['message'] for entry in entries] == ['line 1']
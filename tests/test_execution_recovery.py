@@ -0,0 +1,53 @@
+import time
+import pytest
+import server_py.executor as executor
+from server_py.models import Execution
+from server_py.scheduler import WorkflowScheduler
+
+LATER = time.time() + executor.STALE_EXECUTION_SECONDS + 60
+
+@pytest.fixture(autouse=True)
+def queue_mode(monkeypatch):
+    monkeypatch.setattr(executor, 'EXECUTION_MODE', 'queue')
+
+def set_heartbeat(storage, execution_id, at_ms):
+    with storage.get_db() as db:
+        db.query(Execution).filter(Execution.id == execution_id).update({Execution.heartbeat_at: at_ms})
+        db.commit()
+
+def test_interrupted_execution_is_failed_and_unblocks_its_schedule(storage, workflow):
+    schedule = storage.create_schedule({'workflowId': workflow['id'], 'intervalSeconds': 60, 'nextRunAt': 1000})
+    execution = WorkflowScheduler().fire(schedule)['execution']
+    assert storage.claim_execution(execution['id'])
+    storage.update_execution(execution['id'], 'running', [{'timestamp': 't0', 'level': 'INFO', 'message': 'started'}])
+    # The process running it died: nothing refreshes the heartbeat any more
+    assert WorkflowScheduler().fire(schedule)['status'] == 'skipped'
+
+    assert execution['id'] in executor.recover_stale_executions(LATER)
+    failed = storage.get_execution(execution['id'])
+    assert failed['status'] == 'failed'
+    assert [entry['message'] for entry in failed['logs']][0] == 'started'
+    assert 'interrupted' in failed['results']['error']
+    assert WorkflowScheduler().fire(schedule)['status'] == 'started'
+
+def test_live_and_waiting_executions_are_left_alone(storage, workflow):
+    owned = storage.create_execution(workflow['id'])['id']
+    storage.claim_execution(owned)
+    executor.own_execution(owned)
+    try:
+        beating = storage.create_execution(workflow['id'])['id']
+        storage.claim_execution(beating)
+        set_heartbeat(storage, beating, int(LATER * 1000))
+        # Queue mode: pending executions are waiting for the worker, not abandoned
+        pending = storage.create_execution(workflow['id'])['id']
+
+        assert not {owned, beating, pending} & set(executor.recover_stale_executions(LATER))
+        assert {storage.get_execution_status(i) for i in (owned, beating, pending)} == {'checking', 'pending'}
+    finally:
+        executor.release_execution(owned)
+
+def test_inline_mode_recovers_pending_executions(storage, workflow, monkeypatch):
+    monkeypatch.setattr(executor, 'EXECUTION_MODE', 'inline')
+    pending = storage.create_execution(workflow['id'])['id']
+    assert pending in executor.recover_stale_executions(LATER)
+    assert storage.get_execution_status(pending) == 'failed'
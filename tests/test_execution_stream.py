@@ -0,0 +1,69 @@
+import json
+import threading
+import server_py.management as management
+from server_py.events import ExecutionEventBus, ExecutionLogs, ExecutionResults
+
+ENTRIES = [{'timestamp': f"t{i}", 'level': 'INFO', 'message': f"line {i}"} for i in range(3)]
+
+def read_stream(client, execution_id, after):
+    body = client.get(f"/api/executions/{execution_id}/stream?after={after}").get_data(as_text=True)
+    events = []
+    for block in body.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields['event'], fields.get('id'), json.loads(fields['data'])))
+    return events
+
+def run_execution(storage, workflow, bus):
+    execution = storage.create_execution(workflow['id'])
+    logs, results = ExecutionLogs(execution['id']), ExecutionResults(execution['id'])
+    for entry in ENTRIES:
+        logs.append(entry)
+    results['n1'] = {'status': 'success'}
+    storage.update_execution(execution['id'], 'completed', logs, results)
+    return execution['id']
+
+def test_live_and_polled_streams_share_event_ids(client, storage, workflow, monkeypatch):
+    execution_id = run_execution(storage, workflow, management.event_bus)
+    live = read_stream(client, execution_id, after=1)
+
+    # Another process has no channel for the execution and polls the database instead
+    monkeypatch.setattr(management, 'event_bus', ExecutionEventBus())
+    polled = read_stream(client, execution_id, after=1)
+
+    for events in (live, polled):
+        logs = [(event_id, data['message']) for kind, event_id, data in events if kind == 'log']
+        assert logs == [('2', 'line 1'), ('3', 'line 2')]
+        assert ('node', None, {'nodeId': 'n1', 'status': 'success'}) in events
+        assert events[-1] == ('end', None, {'seq': 3})
+
+def test_resuming_past_the_replay_buffer_sends_a_snapshot(client, storage, workflow, monkeypatch):
+    monkeypatch.setattr(management, 'event_bus', ExecutionEventBus(history=2))
+    monkeypatch.setattr('server_py.events.event_bus', management.event_bus)
+    monkeypatch.setattr('server_py.storage.event_bus', management.event_bus)
+    execution_id = run_execution(storage, workflow, management.event_bus)
+    events = read_stream(client, execution_id, after=0)
+    assert events[0][0] == 'snapshot' and events[0][1] == '3'
+    assert [kind for kind, _, _ in events if kind == 'log'] == []
+    assert events[-1] == ('end', None, {'seq': 3})
+
+def test_resync_replays_logs_the_snapshot_did_not_have(storage, workflow, monkeypatch):
+    bus = ExecutionEventBus(history=3)
+    for target in ('server_py.management.event_bus', 'server_py.events.event_bus', 'server_py.storage.event_bus'):
+        monkeypatch.setattr(target, bus)
+    execution_id = storage.create_execution(workflow['id'])['id']
+    logs = ExecutionLogs(execution_id)
+    for i in range(6):
+        logs.append({'timestamp': f"t{i}", 'level': 'INFO', 'message': f"line {i}"})
+    # The database is behind the bus: only the first two entries are written so far
+    storage.update_execution(execution_id, 'running', logs[:2])
+    threading.Timer(0.3, storage.update_execution, (execution_id, 'completed', logs)).start()
+
+    events = []
+    for chunk in management.stream_live_execution(execution_id, 0):
+        if chunk.startswith('id:') or chunk.startswith('event:'):
+            fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines())
+            events.append((fields['event'], fields.get('id')))
+    assert events[0] == ('snapshot', '2')
+    assert [event_id for kind, event_id in events if kind == 'log'] == ['3', '4', '5', '6']
+    assert events[-1] == ('end', None)
@@ -0,0 +1,82 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from server_py.http_client import get_session, request_streamed, preview_of, run_batch, PREVIEW_BYTES
+
+BIG_BODY = b'x' * 200_000
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.clients.append(self.client_address)
+        self.server.cookies.append(self.headers.get('Cookie'))
+        if self.path == '/big':
+            body, status = BIG_BODY, 200
+        elif self.path == '/fail':
+            body, status = b'{"error": "boom"}', 500
+        else:
+            body, status = json.dumps({'path': self.path}).encode(), 200
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        if self.path == '/cookie':
+            self.send_header('Set-Cookie', 'session=abc')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.clients, httpd.cookies = [], []
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_pooled_session_reuses_connections(server):
+    httpd, base = server
+    assert get_session() is get_session()
+    for _ in range(5):
+        assert request_streamed('GET', f"{base}/small")['data'] == {'path': '/small'}
+    # Every request arrived on the same keep-alive connection
+    assert len(set(httpd.clients)) == 1
+
+def test_session_never_sends_cookies_back(server):
+    httpd, base = server
+    request_streamed('GET', f"{base}/cookie")
+    request_streamed('GET', f"{base}/small")
+    assert httpd.cookies == [None, None]
+
+def test_large_bodies_spill_to_disk(server, tmp_path):
+    _, base = server
+    spill_path = tmp_path / 'body.bin'
+    result = request_streamed('GET', f"{base}/big", spill_path=str(spill_path), stream_threshold=1024)
+    assert result['truncated'] is True
+    assert result['size'] == len(BIG_BODY)
+    assert spill_path.read_bytes() == BIG_BODY
+    assert result['preview'] == 'x' * PREVIEW_BYTES
+    assert preview_of(result) == {'preview': result['preview'], 'body_path': str(spill_path), 'size': len(BIG_BODY)}
+
+def test_large_bodies_stay_in_memory_without_a_spill_path(server):
+    _, base = server
+    result = request_streamed('GET', f"{base}/big", stream_threshold=1024)
+    assert result['truncated'] is False
+    assert result['data'] == BIG_BODY.decode()
+    assert preview_of(result) == {'preview': 'x' * PREVIEW_BYTES, 'size': len(BIG_BODY)}
+
+def test_http_errors_raise(server):
+    _, base = server
+    with pytest.raises(requests.exceptions.HTTPError):
+        request_streamed('GET', f"{base}/fail")
+
+def test_batch_results_keep_input_order(server):
+    _, base = server
+    results = run_batch([{'method': 'GET', 'url': f"{base}/{i}"} for i in range(6)] + [{'method': 'GET', 'url': f"{base}/fail"}], concurrency=3)
+    assert [r['data'] for r in results[:6]] == [{'path': f"/{i}"} for i in range(6)]
+    assert results[6]['ok'] is False and results[6]['status_code'] == 500
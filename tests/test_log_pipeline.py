@@ -0,0 +1,67 @@
+import json
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from server_py.log_pipeline import LogPipeline, RateLimiter, correlation, format_text
+from server_py.metrics import LOG_RECORDS_DROPPED
+
+def written(capsys, pipeline):
+    pipeline.flush()
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('{')]
+    return [line for line in lines if line['source'] == 'test']
+
+def dropped(reason):
+    return LOG_RECORDS_DROPPED._collect().get((reason,), 0)
+
+def test_rate_limiter_reports_suppressed_records_when_the_window_ends():
+    limiter = RateLimiter(burst=2, window=10)
+    assert [limiter.check('key', t) for t in (0, 1, 2, 3)] == [(True, 0), (True, 0), (False, 0), (False, 0)]
+    assert limiter.check('other', 3) == (True, 0)
+    assert limiter.check('key', 11) == (True, 2)
+    assert limiter.check('key', 12) == (True, 0)
+
+def test_records_carry_correlation_ids_into_pool_threads(capsys):
+    pipeline = LogPipeline(fmt='json')
+    with correlation(requestId='req-1'), correlation(executionId=42):
+        pipeline.emit('info', 'test', 'in request')
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(contextvars.copy_context().run, pipeline.emit, 'warning', 'test', 'in node', nodeId='n1').result()
+    pipeline.emit('info', 'test', 'after')
+    records = written(capsys, pipeline)
+    assert [(r['msg'], r.get('requestId'), r.get('executionId')) for r in records] == [
+        ('in request', 'req-1', 42), ('in node', 'req-1', 42), ('after', None, None)
+    ]
+    assert records[1]['nodeId'] == 'n1' and records[1]['level'] == 'warning'
+
+def test_rate_limited_records_are_dropped_and_counted(capsys):
+    pipeline = LogPipeline(fmt='json', limiter=RateLimiter(burst=2, window=60))
+    before = dropped('rate_limited')
+    for _ in range(5):
+        pipeline.emit('info', 'test', 'same message')
+    pipeline.emit('debug', 'test', 'below the level')
+    assert len(written(capsys, pipeline)) == 2
+    assert dropped('rate_limited') - before == 3
+
+def test_full_queue_drops_records_instead_of_blocking(capsys):
+    release = threading.Event()
+    pipeline = LogPipeline(fmt='json', queue_size=2)
+
+    def blocking_formatter(record):
+        release.wait(5)
+        return json.dumps(record)
+    pipeline.formatter = blocking_formatter
+    before = dropped('queue_full')
+    pipeline.emit('info', 'test', 'taken by the writer', rate_key=0)
+    # Wait until the writer holds the first record, so the queue is empty again
+    while pipeline.queue.qsize():
+        time.sleep(0.001)
+    for i in range(1, 6):
+        pipeline.emit('info', 'test', f"record {i}", rate_key=i)
+    assert dropped('queue_full') - before == 3
+    release.set()
+    assert [r['msg'] for r in written(capsys, pipeline)] == ['taken by the writer', 'record 1', 'record 2']
+
+def test_text_format():
+    line = format_text({'ts': 0, 'level': 'error', 'source': 'worker', 'msg': 'failed', 'thread': 'main', 'executionId': 3})
+    assert line.endswith('[worker] ERROR failed (executionId=3)')
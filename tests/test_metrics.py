@@ -0,0 +1,36 @@
+import json
+import server_py.metrics as metrics
+
+REQUESTS = metrics.Counter('test_requests_total', 'Requests', ('route',))
+IN_FLIGHT = metrics.Gauge('test_in_flight', 'Requests in flight')
+LATENCY = metrics.Histogram('test_latency_seconds', 'Latency', buckets=(1,))
+
+def write_process(directory, pid, snapshot):
+    (directory / f'{pid}.json').write_text(json.dumps(snapshot))
+
+def test_scrape_adds_up_every_process(tmp_path, monkeypatch):
+    REQUESTS.inc(route='/a')
+    IN_FLIGHT.inc()
+    LATENCY.observe(0.5)
+    exited = {'test_requests_total': [[['/a'], 2], [['/b'], 1]], 'test_in_flight': [[[], 5]],
+              'test_latency_seconds': [[[], [0, 1, 3.0]]]}
+    write_process(tmp_path, 2 ** 22 + 1, exited)
+    write_process(tmp_path, 1, {'test_in_flight': [[[], 2]]})
+    monkeypatch.setattr(metrics, 'METRICS_MULTIPROCESS_DIR', str(tmp_path))
+    monkeypatch.setattr(metrics, '_process_alive', lambda pid: pid == 1)
+
+    lines = metrics.render().splitlines()
+    assert 'test_requests_total{route="/a"} 3' in lines
+    assert 'test_requests_total{route="/b"} 1' in lines
+    # The exited process's gauge is dropped; the live one's counts
+    assert 'test_in_flight 3' in lines
+    assert 'test_latency_seconds_bucket{le="1"} 1' in lines
+    assert 'test_latency_seconds_count 2' in lines
+    assert 'test_latency_seconds_sum 3.5' in lines
+
+def test_export_writes_this_process(tmp_path, monkeypatch):
+    REQUESTS.inc(route='/c')
+    monkeypatch.setattr(metrics, 'METRICS_MULTIPROCESS_DIR', str(tmp_path))
+    metrics.export()
+    snapshot = json.loads((tmp_path / f'{metrics.os.getpid()}.json').read_text())
+    assert [['/c'], 1] in snapshot['test_requests_total']
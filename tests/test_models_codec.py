@@ -0,0 +1,52 @@
+import json
+import pytest
+from sqlalchemy import text
+from server_py import models
+from server_py.models import CompressedText, Execution, FRAME_HEADER, FRAME_MAGIC, decode_text, encode_text, load_json
+
+LOGS = json.dumps([{'timestamp': f"t{i}", 'level': 'INFO', 'message': 'polling DAG state'} for i in range(200)])
+
+def test_compressible_text_round_trips_through_zlib():
+    framed = encode_text(LOGS)
+    assert framed.startswith(FRAME_MAGIC)
+    assert FRAME_HEADER.unpack_from(framed)[2] == models.CODEC_ZLIB
+    assert len(framed) < len(LOGS)
+    assert decode_text(framed) == LOGS
+
+def test_incompressible_text_is_framed_uncompressed():
+    value = 'é'
+    framed = encode_text(value)
+    assert FRAME_HEADER.unpack_from(framed)[2] == models.CODEC_NONE
+    assert decode_text(memoryview(framed)) == value
+
+def test_legacy_text_rows_read_unchanged():
+    assert decode_text('[1, 2]') == '[1, 2]'
+    assert decode_text(b'{"a": 1}') == '{"a": 1}'
+    assert load_json('{"a": 1}') == {'a': 1}
+    assert load_json(None, []) == []
+
+def test_values_under_the_threshold_stay_plain_text():
+    column = CompressedText()
+    short = 'x' * (models.COMPRESSION_MIN_BYTES - 1)
+    assert column.process_bind_param(short, None) == short
+    assert column.process_bind_param(LOGS, None).startswith(FRAME_MAGIC)
+
+@pytest.mark.parametrize('version, codec, message', [(2, models.CODEC_ZLIB, 'version 2'), (models.FRAME_VERSION, 9, 'codec 9')])
+def test_unknown_version_or_codec_is_rejected(version, codec, message):
+    framed = FRAME_HEADER.pack(FRAME_MAGIC, version, codec, 2) + b'{}'
+    with pytest.raises(ValueError, match=message):
+        decode_text(framed)
+
+def test_execution_columns_round_trip_compressed_and_legacy(storage, workflow):
+    execution_id = storage.create_execution(workflow['id'])['id']
+    results = {'n1': {'status': 'success', 'rows': json.loads(LOGS)}}
+    storage.update_execution(execution_id, 'completed', [], results)
+    with storage.get_db() as db:
+        stored = db.query(Execution.results).filter(Execution.id == execution_id).scalar()
+        assert isinstance(stored, bytes) and stored.startswith(FRAME_MAGIC)
+        # Logs written as plain text before compression (and the execution_logs rows) existed
+        db.execute(text("UPDATE executions SET logs = :logs WHERE id = :id"), {'logs': LOGS, 'id': execution_id})
+        db.commit()
+    execution = storage.get_execution(execution_id)
+    assert execution['results'] == results
+    assert execution['logs'] == json.loads(LOGS)
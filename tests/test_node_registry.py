@@ -0,0 +1,33 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(manifest_path, code):
+    env = {**os.environ, 'NODE_MANIFEST_PATH': str(manifest_path)}
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+CHECK = """
+import sys, json
+from server_py.nodes.registry import load_node_registry, get_node_class
+load_node_registry()
+loaded = sorted(name for name in sys.modules if name.startswith('server_py.nodes.') and name != 'server_py.nodes.registry')
+cls = get_node_class('sql_query')
+after = sorted(name for name in sys.modules if name.startswith('server_py.nodes.') and name != 'server_py.nodes.registry')
+print(json.dumps({'loaded': loaded, 'after': after, 'cls': cls.__name__, 'unknown': get_node_class('no_such_type')}))
+"""
+
+def test_node_modules_are_imported_on_first_use(tmp_path):
+    manifest_path = tmp_path / 'manifest.json'
+    first = run(manifest_path, CHECK)
+    # Without a manifest every node module is imported once to build it
+    assert 'server_py.nodes.airflow_node' in first['loaded']
+    assert json.loads(manifest_path.read_text())['nodes']['sql_query'] == 'sql_node'
+
+    second = run(manifest_path, CHECK)
+    assert second['loaded'] == []
+    assert second['after'] == ['server_py.nodes.sql_node']
+    assert second['cls'] == first['cls'] and second['unknown'] is None
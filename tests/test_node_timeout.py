@@ -0,0 +1,23 @@
+from server_py.executor import execute_workflow_async
+
+def run_sleeping_node(storage, **config):
+    workflow = storage.create_workflow({
+        'name': 'sleeper',
+        'nodes': [{'id': 'sleep', 'data': {'type': 'python_script', 'label': 'sleep',
+                                           'config': {'code': "import time\ntime.sleep(0.5)\nresult = 'done'", **config}}}],
+        'edges': []
+    })
+    execution = storage.create_execution(workflow['id'])
+    execute_workflow_async(execution['id'], workflow['id'])
+    return storage.get_execution(execution['id'])
+
+def test_nodes_have_no_timeout_by_default(storage):
+    execution = run_sleeping_node(storage)
+    assert execution['status'] == 'completed'
+    assert execution['results']['sleep']['result'] == 'done'
+
+def test_timed_out_node_is_failed_without_a_retry(storage):
+    execution = run_sleeping_node(storage, timeout=0.1, retries=2, retryDelay=0)
+    assert execution['status'] == 'failed'
+    assert execution['results']['sleep']['threadAbandoned'] is True
+    assert not any('Retrying' in entry['message'] for entry in execution['logs'])
@@ -0,0 +1,19 @@
+from flask import Flask
+import server_py.profiling as profiling
+
+def admin(monkeypatch, **request_args):
+    monkeypatch.setattr(profiling, 'PROFILING_ADMIN_TOKEN', 'secret')
+    with Flask(__name__).test_request_context(**request_args) as context:
+        return profiling.is_admin(context.request)
+
+def test_admin_token_is_read_from_the_header(monkeypatch):
+    assert admin(monkeypatch, headers={'X-Profile-Token': 'secret'})
+    assert not admin(monkeypatch, headers={'X-Profile-Token': 'wrong'})
+
+def test_admin_token_is_not_accepted_in_the_query_string(monkeypatch):
+    assert not admin(monkeypatch, path='/?profileToken=secret')
+
+def test_no_token_configured_means_no_admin(monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILING_ADMIN_TOKEN', '')
+    with Flask(__name__).test_request_context(headers={'X-Profile-Token': ''}) as context:
+        assert not profiling.is_admin(context.request)
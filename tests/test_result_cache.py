@@ -0,0 +1,54 @@
+from decimal import Decimal
+from datetime import date, datetime
+from server_py import typed_json
+from server_py.nodes.sql_node import SQLQueryNode, is_read_only_query
+from server_py.result_cache import ResultCache, run_cached
+import server_py.result_cache as result_cache_module
+
+ROWS = [
+    {'id': 1, 'amount': Decimal('10.50'), 'day': date(2024, 1, 31), 'loaded_at': datetime(2024, 2, 1, 6, 30), 'raw': b'\x00\x01'},
+    {'id': 2, 'amount': Decimal('0.25'), 'day': date(2024, 2, 1), 'loaded_at': datetime(2024, 2, 2, 6, 30), 'raw': None},
+]
+
+class FakeQueryNode(SQLQueryNode):
+    queries = 0
+
+    def run_query(self, query):
+        FakeQueryNode.queries += 1
+        return [dict(row) for row in ROWS]
+
+def make_node(assertion):
+    config = {'query': 'SELECT * FROM sales', 'cache': True, 'pythonAssertion': assertion}
+    return FakeQueryNode(config, {}, [], None, None, node_id='n1')
+
+def run(node):
+    return run_cached(node, 'sql_query', [], node.execute)
+
+def test_cache_hit_matches_miss(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache_module, 'result_cache', ResultCache(str(tmp_path / 'cache.db')))
+    assertion = "sum(r['amount'] for r in results) == Decimal('10.75') and results[0]['day'] < date(2024, 2, 1)"
+    FakeQueryNode.queries = 0
+
+    first, second = make_node(assertion), make_node(assertion)
+    for node in (first, second):
+        node.context.update({'Decimal': Decimal, 'date': date})
+    miss, hit = run(first), run(second)
+
+    assert FakeQueryNode.queries == 1
+    assert (miss['cache'], hit['cache']) == ('miss', 'hit')
+    assert miss['status'] == hit['status'] == 'success'
+    assert second.context['n1']['results'] == first.context['n1']['results'] == ROWS
+
+def test_typed_json_round_trip():
+    value = {'rows': ROWS, 'plain': {'__typed__': 'other', 'value': 1}}
+    assert typed_json.loads(typed_json.dumps(value)) == value
+    assert typed_json.loads('{"a": "2024-01-31"}') == {'a': '2024-01-31'}
+
+def test_only_single_read_only_statements_are_cacheable():
+    assert is_read_only_query("SELECT * FROM t WHERE note = 'insert; delete'")
+    assert is_read_only_query("WITH x AS (SELECT 1 AS a) SELECT a FROM x -- update later")
+    assert not is_read_only_query("SELECT 1; DELETE FROM t")
+    assert not is_read_only_query("SELECT * INTO backup FROM t")
+    assert not is_read_only_query("WITH x AS (SELECT 1) DELETE FROM t")
+    assert not is_read_only_query("MERGE INTO t USING s ON t.id = s.id WHEN MATCHED THEN DELETE")
+    assert not is_read_only_query("UPDATE t SET a = 1")
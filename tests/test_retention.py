@@ -0,0 +1,26 @@
+from server_py.retention import DAY_MS, policy_for, select_expired
+
+NOW = 100 * DAY_MS
+
+def execution(execution_id, age_days, size=100, status='completed'):
+    return (execution_id, status, NOW - age_days * DAY_MS, None, size)
+
+# Newest first, as get_execution_sizes returns them
+EXECUTIONS = [execution(5, 1, status='running'), execution(4, 2), execution(3, 10), execution(2, 40, status='failed'), execution(1, 90)]
+
+def test_deletion_limits_default_to_off():
+    policy = policy_for(None)
+    assert (policy['maxAgeDays'], policy['maxCount'], policy['maxBytes']) == (0, 0, 0)
+    assert select_expired(EXECUTIONS, policy, NOW) == []
+
+def test_max_count_keeps_the_newest_finished_executions():
+    assert select_expired(EXECUTIONS, policy_for({'maxCount': 2}), NOW) == [2, 1]
+
+def test_max_age_and_max_bytes():
+    assert select_expired(EXECUTIONS, policy_for({'maxAgeDays': 30}), NOW) == [2, 1]
+    assert select_expired(EXECUTIONS, policy_for({'maxBytes': 250}), NOW) == [2, 1]
+
+def test_unfinished_executions_are_never_selected():
+    policy = policy_for({'maxAgeDays': 0.5, 'maxCount': 1, 'ignored': 5})
+    assert 'ignored' not in policy
+    assert select_expired(EXECUTIONS, policy, NOW) == [4, 3, 2, 1]
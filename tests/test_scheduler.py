@@ -0,0 +1,98 @@
+import threading
+import pytest
+import server_py.executor as executor
+from server_py.scheduler import WorkflowScheduler
+
+@pytest.fixture(autouse=True)
+def queue_mode(monkeypatch):
+    # Leave started executions pending instead of running them
+    monkeypatch.setattr(executor, 'EXECUTION_MODE', 'queue')
+
+def make_schedule(storage, workflow, **settings):
+    return storage.create_schedule({'workflowId': workflow['id'], 'intervalSeconds': 60, 'nextRunAt': 1000, **settings})
+
+def race(count, target):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(index):
+        barrier.wait()
+        results[index] = target()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_fire_time_is_claimed_once(storage, workflow):
+    schedule = make_schedule(storage, workflow)
+    claims = race(8, lambda: storage.claim_schedule_run(schedule['id'], 1000, 61000))
+    assert claims.count(True) == 1
+
+def test_only_one_execution_starts_for_an_idle_workflow(storage, workflow):
+    started = race(8, lambda: storage.create_execution_if_idle(workflow['id'], {'n': 1}))
+    assert len([e for e in started if e]) == 1
+    assert storage.create_execution_if_idle(workflow['id']) is None
+
+def test_queued_runs_survive_the_scheduler_and_start_once(storage, workflow):
+    schedule = make_schedule(storage, workflow, overlapPolicy='queue')
+    first = WorkflowScheduler().fire(schedule)
+    assert first['status'] == 'started'
+    assert WorkflowScheduler().fire(schedule)['status'] == 'queued'
+    assert storage.has_queued_runs(workflow['id'])
+
+    # Still running: nothing leaves the queue
+    WorkflowScheduler()._drain_queued()
+    assert storage.has_queued_runs(workflow['id'])
+
+    storage.update_execution(first['execution']['id'], 'completed', [])
+    # A fresh scheduler (another process, or after a restart) picks the queued run up
+    schedulers = [WorkflowScheduler() for _ in range(4)]
+    race(4, lambda: schedulers.pop()._drain_queued())
+    assert not storage.has_queued_runs(workflow['id'])
+    active = [e for e in storage.get_executions(workflow['id']) if e['status'] == 'pending']
+    assert len(active) == 1
+    assert storage.get_schedule(schedule['id'])['lastExecutionId'] == active[0]['id']
+
+def test_skip_policy_and_queue_limit(storage, workflow, monkeypatch):
+    import server_py.scheduler as scheduler_module
+    skipping = make_schedule(storage, workflow)
+    assert WorkflowScheduler().fire(skipping)['status'] == 'started'
+    assert WorkflowScheduler().fire(skipping)['status'] == 'skipped'
+
+    monkeypatch.setattr(scheduler_module, 'MAX_QUEUED_RUNS', 2)
+    queueing = make_schedule(storage, workflow, overlapPolicy='queue')
+    statuses = [WorkflowScheduler().fire(queueing)['status'] for _ in range(3)]
+    assert statuses == ['queued', 'queued', 'skipped']
+
+def test_bulk_delete_drops_queued_runs(storage, workflow):
+    schedule = make_schedule(storage, workflow, overlapPolicy='queue')
+    WorkflowScheduler().fire(schedule)
+    assert WorkflowScheduler().fire(schedule)['status'] == 'queued'
+
+    storage.bulk_delete_workflows([workflow['id']])
+    assert not storage.has_queued_runs(workflow['id'])
+    assert storage.create_execution_if_idle(workflow['id']) is None
+    assert storage.get_executions(workflow['id']) == []
+
+@pytest.mark.parametrize('settings, error', [
+    ({'intervalSeconds': 'soon'}, 'intervalSeconds must be an integer'),
+    ({'intervalSeconds': -5}, 'intervalSeconds must be at least 1'),
+    ({'intervalSeconds': 1.5}, 'intervalSeconds must be an integer'),
+    ({'intervalSeconds': 60, 'jitterSeconds': 'x'}, 'jitterSeconds must be an integer'),
+    ({'intervalSeconds': 60, 'jitterSeconds': -1}, 'jitterSeconds must be at least 0'),
+    ({'intervalSeconds': 60, 'misfireGraceSeconds': None}, 'misfireGraceSeconds must be an integer'),
+    ({'cron': '0 * * * *', 'maxCatchUp': True}, 'maxCatchUp must be an integer'),
+    ({'cron': '0 * * * *', 'maxCatchUp': -3}, 'maxCatchUp must be at least 0'),
+])
+def test_invalid_schedule_settings_are_rejected(client, workflow, settings, error):
+    response = client.post('/api/schedules', json={'workflowId': workflow['id'], **settings})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == error
+
+def test_schedule_update_validates_settings(client, storage, workflow):
+    schedule = make_schedule(storage, workflow)
+    response = client.put(f"/api/schedules/{schedule['id']}", json={'jitterSeconds': 'lots'})
+    assert response.status_code == 400
+    assert client.put(f"/api/schedules/{schedule['id']}", json={'jitterSeconds': 5}).get_json()['jitterSeconds'] == 5
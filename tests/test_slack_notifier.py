@@ -0,0 +1,65 @@
+import time
+import uuid
+import server_py.slack_notifier as slack_notifier
+from server_py.slack_notifier import SlackNotifier
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"{self.status_code} Server Error")
+
+class FakeSession:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append(json['text'])
+        return FakeResponse(self.status_code)
+
+def notifier_posting(monkeypatch, status_code):
+    session = FakeSession(status_code)
+    monkeypatch.setattr(slack_notifier, 'get_session', lambda: session)
+    monkeypatch.setattr(slack_notifier, 'COALESCE_WINDOW', 0.2)
+    return SlackNotifier(workers=1), session
+
+def test_delivery_state_is_readable_from_another_process(monkeypatch, storage, workflow):
+    execution_id = storage.create_execution(workflow['id'])['id']
+    notifier, session = notifier_posting(monkeypatch, 200)
+    first = notifier.enqueue('https://hooks.example/a', 'one', execution_id=execution_id)
+    second = notifier.enqueue('https://hooks.example/a', 'two', execution_id=execution_id)
+
+    assert notifier.wait(second, timeout=5)['status'] == 'delivered'
+    assert session.posts == ['one\ntwo']
+    # A notifier with an empty queue stands in for another worker process
+    delivery = SlackNotifier().get_delivery(first)
+    assert delivery['status'] == 'delivered' and delivery['executionId'] == execution_id
+    assert 'deliveredAt' in delivery and 'error' not in delivery
+
+    storage.delete_executions(execution_ids=[execution_id])
+    assert SlackNotifier().get_delivery(first) is None
+
+def test_failed_delivery_records_attempts_and_error(monkeypatch):
+    monkeypatch.setattr(slack_notifier, 'MAX_ATTEMPTS', 1)
+    notifier, _ = notifier_posting(monkeypatch, 500)
+    delivery_id = notifier.enqueue('https://hooks.example/b', 'boom')
+
+    delivery = notifier.wait(delivery_id, timeout=5)
+    assert delivery['status'] == 'failed' and delivery['attempts'] == 1
+    assert delivery['error'] == '500 Server Error'
+
+def test_retention_prunes_old_deliveries_without_an_execution(storage, workflow):
+    execution_id = storage.create_execution(workflow['id'])['id']
+    old, recent, with_execution = (uuid.uuid4().hex for _ in range(3))
+    storage.create_slack_delivery(old, None, time.time() - 10 * 24 * 3600)
+    storage.create_slack_delivery(recent, None, time.time())
+    storage.create_slack_delivery(with_execution, execution_id, time.time() - 10 * 24 * 3600)
+
+    assert storage.prune_slack_deliveries(time.time() - 7 * 24 * 3600) >= 1
+    assert storage.get_slack_delivery(old) is None
+    assert storage.get_slack_delivery(recent) is not None
+    assert storage.get_slack_delivery(with_execution) is not None
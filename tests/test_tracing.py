@@ -0,0 +1,85 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import server_py.tracing as tracing
+from server_py.tracing import span, set_span_status, trace_execution, decode_trace, analyze, to_chrome_trace
+
+def encoded(*spans, started_at=1000.0):
+    """Build a stored trace from (id, parent id, name, category, start us, duration us) tuples."""
+    strings = []
+    def ref(value):
+        if value not in strings:
+            strings.append(value)
+        return strings.index(value)
+    rows = [[span_id, parent_id, ref(name), ref(category), start, duration, ref('main'), ref('ok')]
+            for span_id, parent_id, name, category, start, duration in spans]
+    return {'v': 1, 'executionId': 7, 'startedAt': started_at, 'dropped': 0, 'strings': strings, 'spans': rows}
+
+# A 100us run: 'a' and 'b' overlap, 'c' starts when 'b' ends
+PARALLEL = encoded(
+    (1, 0, 'workflow', 'workflow', 0, 100),
+    (2, 1, 'a', 'node', 0, 30),
+    (3, 1, 'b', 'node', 10, 70),
+    (4, 1, 'c', 'db', 80, 15),
+)
+
+def traced(execution_id=1):
+    saved = []
+    return saved, trace_execution(execution_id, saved.append)
+
+def test_spans_nest_across_node_threads():
+    saved, tracer = traced()
+    with tracer, span('node', 'node', nodeId='n1'):
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='pool') as pool:
+            def call():
+                with span('GET /dags', 'call'):
+                    pass
+            pool.submit(contextvars.copy_context().run, call).result()
+    spans = {s['name']: s for s in decode_trace(saved[0])}
+    assert spans['workflow']['parentId'] is None
+    assert spans['node']['parentId'] == spans['workflow']['id']
+    assert spans['node']['attrs'] == {'nodeId': 'n1'}
+    assert spans['GET /dags']['parentId'] == spans['node']['id']
+    assert spans['GET /dags']['thread'].startswith('pool')
+    assert spans['GET /dags']['thread'] != spans['node']['thread']
+
+def test_span_status_and_no_trace():
+    with span('outside', 'call') as outside:
+        assert outside is None
+    saved, tracer = traced()
+    with tracer:
+        with span('failed', 'call') as failed:
+            set_span_status(failed, '500')
+        with pytest.raises(ValueError), span('raised', 'call'):
+            raise ValueError('boom')
+    statuses = {s['name']: s['status'] for s in decode_trace(saved[0])}
+    assert statuses == {'workflow': 'ok', 'failed': '500', 'raised': 'error'}
+
+def test_spans_beyond_the_limit_are_dropped(monkeypatch):
+    monkeypatch.setattr(tracing, 'TRACE_MAX_SPANS', 3)
+    saved, tracer = traced()
+    with tracer:
+        for i in range(5):
+            with span(f"poll {i}", 'poll'):
+                pass
+    assert len(saved[0]['spans']) == 3
+    assert saved[0]['dropped'] == 3
+
+def test_critical_path_follows_the_last_finishing_chain():
+    analysis = analyze(PARALLEL)
+    assert [(s['name'], s['start'], s['duration']) for s in analysis['criticalPath']] == [
+        ('workflow', 0, 10), ('b', 10, 70), ('c', 80, 15), ('workflow', 95, 5)
+    ]
+    assert analysis['criticalPathByCategory'] == {'workflow': 15, 'node': 70, 'db': 15}
+    assert analysis['exclusiveTimeByCategory'] == {'workflow': 5, 'node': 100, 'db': 15}
+    assert analysis['durationUs'] == 100
+
+def test_chrome_trace_export():
+    events = to_chrome_trace(PARALLEL)['traceEvents']
+    complete = [e for e in events if e['ph'] == 'X']
+    assert [e['name'] for e in complete] == ['workflow', 'a', 'b', 'c']
+    b = complete[2]
+    assert (b['ts'], b['dur'], b['cat'], b['pid']) == (1000 * 1_000_000 + 10, 70, 'node', 7)
+    assert b['args'] == {'status': 'ok', 'spanId': 3, 'parentId': 1}
+    metadata = {e['name']: e['args']['name'] for e in events if e['ph'] == 'M'}
+    assert metadata == {'process_name': 'execution 7', 'thread_name': 'main'}
@@ -0,0 +1,64 @@
+import time
+import threading
+import server_py.executor as executor
+from server_py.main import create_app
+from server_py.worker import ExecutionWorker
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+def only_pending(monkeypatch, storage, ids):
+    # The test database is shared, so only hand this worker the executions the test created
+    pending = storage.get_pending_execution_ids
+    monkeypatch.setattr(storage, 'get_pending_execution_ids', lambda limit=10: [p for p in pending(limit=10000) if p[0] in ids][:limit])
+
+def test_an_execution_is_claimed_by_one_worker(storage, workflow):
+    execution_id = storage.create_execution(workflow['id'])['id']
+    results = []
+    barrier = threading.Barrier(8)
+
+    def claim():
+        barrier.wait()
+        results.append(storage.claim_execution(execution_id))
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+    assert storage.get_execution(execution_id)['status'] == 'checking'
+
+def test_worker_runs_pending_executions_within_its_slots(monkeypatch, storage):
+    workflow = storage.create_workflow({'name': 'worker', 'nodes': [
+        {'id': 'n1', 'data': {'type': 'python_script', 'label': 'n1', 'config': {'code': "result = 'ok'"}}}
+    ], 'edges': []})
+    ids = [storage.create_execution(workflow['id'])['id'] for _ in range(3)]
+    only_pending(monkeypatch, storage, set(ids))
+    worker = ExecutionWorker(slots=2)
+
+    assert worker.poll_once() == 2
+    assert wait_for(lambda: not worker.running)
+    assert worker.poll_once() == 1
+    assert wait_for(lambda: not worker.running)
+    assert worker.poll_once() == 0
+
+    for execution_id in ids:
+        execution = storage.get_execution(execution_id)
+        assert execution['status'] == 'completed'
+        assert execution['results']['n1']['result'] == 'ok'
+        assert execution_id not in executor._owned_executions
+
+def test_app_factory_builds_independent_apps():
+    first, second = create_app(), create_app()
+    assert first is not second
+    rules = {rule.rule for rule in first.url_map.iter_rules()}
+    assert {'/api/health', '/metrics', '/api/workflows/bulk', '/api/schedules'} <= rules
+    response = first.test_client().get('/api/health')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'healthy'
+    assert 'startupMs' in response.get_json()
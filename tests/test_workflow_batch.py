@@ -0,0 +1,79 @@
+import time
+import threading
+import pytest
+import server_py.executor as executor
+
+REGION_CODE = "if context['region'] == 'fail':\n    raise ValueError('bad region')\nresult = context['region']"
+
+@pytest.fixture(autouse=True)
+def inline_mode(monkeypatch):
+    monkeypatch.setattr(executor, 'EXECUTION_MODE', 'inline')
+
+@pytest.fixture
+def region_workflow(storage):
+    return storage.create_workflow({'name': 'per region', 'nodes': [
+        {'id': 'n1', 'data': {'type': 'python_script', 'label': 'n1', 'config': {'code': REGION_CODE}}}
+    ], 'edges': []})
+
+def wait_for_batch(client, batch_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        batch = client.get(f"/api/batches/{batch_id}").get_json()
+        if batch['status'] != 'running':
+            return batch
+        time.sleep(0.05)
+    raise AssertionError(f"Batch {batch_id} did not finish")
+
+def test_batch_runs_once_per_parameter_set(client, storage, region_workflow):
+    params = [{'region': 'eu'}, {'region': 'fail'}, {'region': 'us'}]
+    response = client.post(f"/api/workflows/{region_workflow['id']}/batch", json={'params': params, 'concurrency': 2})
+    assert response.status_code == 201
+    assert len(response.get_json()['matrix']) == 3
+
+    batch = wait_for_batch(client, response.get_json()['id'])
+    assert batch['status'] == 'failed'
+    assert batch['counts'] == {'completed': 2, 'failed': 1}
+    assert [row['params'] for row in batch['matrix']] == params
+    assert [row['status'] for row in batch['matrix']] == ['completed', 'failed', 'completed']
+    assert [row['nodes'] for row in batch['matrix']] == [{'n1': 'success'}, {'n1': 'failure'}, {'n1': 'success'}]
+    results = [storage.get_execution(row['executionId'])['results']['n1'] for row in batch['matrix']]
+    assert results[0]['result'] == 'eu' and results[2]['result'] == 'us'
+    assert 'bad region' in results[1]['error']
+
+def test_batch_runs_at_most_concurrency_executions_at_once(client, monkeypatch, region_workflow):
+    run_execution = executor.run_execution
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def tracked(execution_id, workflow_id):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        try:
+            time.sleep(0.05)
+            run_execution(execution_id, workflow_id)
+        finally:
+            with lock:
+                active[0] -= 1
+    monkeypatch.setattr(executor, 'run_execution', tracked)
+
+    params = [{'region': str(i)} for i in range(6)]
+    response = client.post(f"/api/workflows/{region_workflow['id']}/batch", json={'params': params, 'concurrency': 2})
+    batch = wait_for_batch(client, response.get_json()['id'])
+    assert batch['status'] == 'completed'
+    assert peak[0] == 2
+
+@pytest.mark.parametrize('concurrency', ['many', 0, -2, None, [3]])
+def test_batch_rejects_bad_concurrency(client, workflow, concurrency):
+    response = client.post(f"/api/workflows/{workflow['id']}/batch", json={'params': [{}], 'concurrency': concurrency})
+    assert response.status_code == 400
+    assert 'concurrency' in response.get_json()['message']
+
+@pytest.mark.parametrize('params', [None, [], [1, 2], {'region': 'eu'}])
+def test_batch_rejects_bad_params(client, workflow, params):
+    response = client.post(f"/api/workflows/{workflow['id']}/batch", json={'params': params})
+    assert response.status_code == 400
+
+def test_batch_for_a_missing_workflow_or_batch(client):
+    assert client.post('/api/workflows/999999999/batch', json={'params': [{}]}).status_code == 404
+    assert client.get('/api/batches/999999999').status_code == 404
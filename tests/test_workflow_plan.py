@@ -0,0 +1,36 @@
+from server_py.executor import execute_workflow_async
+from server_py.workflow_plan import WorkflowPlan
+
+def node(node_id, node_type, **config):
+    return {'id': node_id, 'data': {'type': node_type, 'label': node_id, 'config': config}}
+
+def test_plan_indexes_the_graph():
+    plan = WorkflowPlan({
+        'nodes': [node('a', 'python_script', code="result = '{{ region }}'"), node('b', 'python_script'), node('c', 'mystery')],
+        'edges': [{'source': 'a', 'target': 'b'}, {'source': 'a', 'target': 'missing'}]
+    })
+    assert [n['id'] for n in plan.roots] == ['a', 'c']
+    assert [n['id'] for n in plan.next_nodes('a')] == ['b']
+    assert plan.upstream_ids('b') == ['a']
+    assert plan.templates['a'] == ['region']
+    assert plan.warnings == ["Edge a -> missing references a missing node", "Node c has unknown type 'mystery'"]
+
+def test_plan_validates_node_configs_once():
+    plan = WorkflowPlan({'nodes': [
+        node('s3', 's3_operation', operation='list'),
+        node('retry', 'python_script', retries='often', timeout=-1),
+        node('ok', 'sftp_operation', credentialId=1, retries=2, timeout='30')
+    ], 'edges': []})
+    assert plan.config_errors == {
+        's3': ['credentialId is required'],
+        'retry': ['retries must be a number', 'timeout must be at least 0']
+    }
+    assert plan.to_dict()['configErrors'] == plan.config_errors
+
+def test_node_with_invalid_config_fails_before_running(storage):
+    workflow = storage.create_workflow({'name': 'invalid config', 'nodes': [node('bad', 'python_script', code="result = 'ran'", retryDelay='soon')], 'edges': []})
+    execution = storage.create_execution(workflow['id'])
+    execute_workflow_async(execution['id'], workflow['id'])
+    execution = storage.get_execution(execution['id'])
+    assert execution['status'] == 'failed'
+    assert execution['results']['bad'] == {'status': 'failure', 'error': 'Invalid config: retryDelay must be a number'}